@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
+from auth.principal_cache import invalidate_user as _invalidate_principal
+
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / "data" / "nova_auth.db"
@@ -286,6 +288,7 @@ def update_user(user_id: int, **kwargs) -> bool:
                 _assert_capacity(conn, current["society_id"], exclude_user_id=user_id)
         cursor = conn.execute(f"UPDATE nova_users SET {set_clause} WHERE id = ?", values)
         conn.commit()
+        _invalidate_principal(user_id)
         return cursor.rowcount > 0
     finally:
         conn.close()
@@ -480,6 +483,7 @@ def revoke_all_user_tokens(user_id: int) -> None:
     )
     conn.commit()
     conn.close()
+    _invalidate_principal(user_id)
 
 
 def cleanup_expired_tokens() -> int:
@@ -17,6 +17,7 @@ from fastapi import Depends, HTTPException, Request, status
 
 from auth.auth_db import check_mailbox_permission, get_user_by_id
 from auth.jwt_service import decode_access_token
+from auth.principal_cache import principal_cache, token_version
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +46,8 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
        Fallback sur le header `Authorization: Bearer <token>` pour compatibilité
        (clients externes, scripts, tests).
     2. Décode et valide signature + expiration.
-    3. Vérifie que l'utilisateur est toujours actif en base.
+    3. Vérifie que l'utilisateur est toujours actif en base
+       (résultat mémorisé quelques secondes, voir auth/principal_cache.py).
     4. Retourne AuthenticatedUser.
     """
     token = request.cookies.get("nova_session")
@@ -73,6 +75,11 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
         )
 
     user_id = int(payload.get("sub", 0))
+    version = token_version(payload)
+    cached = principal_cache.get(user_id, version)
+    if cached is not None:
+        return cached
+
     db_user = get_user_by_id(user_id)
     if not db_user or not db_user.get("is_active"):
         raise HTTPException(
@@ -80,7 +87,9 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
             detail="Utilisateur inactif ou supprimé",
         )
 
-    return AuthenticatedUser(payload)
+    user = AuthenticatedUser(payload)
+    principal_cache.put(user_id, version, user)
+    return user
 
 
 def require_role(*roles: str) -> Callable:
@@ -0,0 +1,93 @@
+"""
+NOVA — cache des utilisateurs authentifiés (get_current_user)
+
+Évite un accès SQLite (get_user_by_id) à chaque requête authentifiée :
+la vérification « utilisateur actif » est mémorisée quelques secondes.
+
+- Clé : (user_id, version du token = jti, ou iat à défaut) — un nouveau token
+  n'hérite jamais d'une entrée d'un token précédent
+- TTL court (NOVA_PRINCIPAL_CACHE_TTL, 30 s par défaut) et taille bornée
+- Invalidation explicite par utilisateur depuis auth_db (update_user /
+  deactivate_user, révocation des tokens) : effet immédiat dans ce processus ;
+  les autres workers se réalignent au plus tard après le TTL
+- Les permissions boîtes mail restent vérifiées à chaque requête
+  (require_mailbox_access), elles ne passent pas par ce cache
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("NOVA_PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("NOVA_PRINCIPAL_CACHE_MAX", "2048"))
+
+CacheKey = Tuple[int, Hashable]
+
+
+def token_version(payload: Dict[str, Any]) -> Hashable:
+    """Identifiant de version d'un token décodé."""
+    return payload.get("jti") or payload.get("iat")
+
+
+class PrincipalCache:
+    """Cache LRU + TTL des principaux authentifiés, indexé par utilisateur."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+        max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, version: Hashable) -> Optional[Any]:
+        key = (user_id, version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: int, version: Hashable, principal: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[(user_id, version)] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end((user_id, version))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Supprime toutes les entrées d'un utilisateur ; retourne le nombre supprimé."""
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == user_id]
+            for k in keys:
+                del self._entries[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_user(user_id: int) -> None:
+    """À appeler après toute modification des droits d'un utilisateur."""
+    principal_cache.invalidate_user(int(user_id))
@@ -92,24 +92,19 @@ def create_trgm_index():
                 print("⚠️ Table produits_sap inexistante - Index ignoré")
                 return False
             
-            # Vérifier index existant
-            index_exists = conn.execute(text(
-                "SELECT 1 FROM pg_indexes WHERE tablename = 'produits_sap' AND indexdef LIKE '%gin_trgm_ops%'"
-            )).fetchone()
-            
-            if index_exists:
-                print("✅ Index GIN trigram déjà existant")
-                return True
-            
             print("⏳ Création index GIN pour recherche trigram...")
             
-            # Création index (sans CONCURRENTLY dans transaction)
+            # Index utilisés par services/produits_sap_search.py (opérateurs % et <%)
+            # Création sans CONCURRENTLY (dans transaction) ; IF NOT EXISTS = idempotent
             conn.execute(text(
                 "CREATE INDEX IF NOT EXISTS idx_produits_sap_name_trgm ON produits_sap USING GIN (item_name gin_trgm_ops)"
             ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_produits_sap_description_trgm ON produits_sap USING GIN (u_description gin_trgm_ops)"
+            ))
             conn.commit()
             
-            print("✅ Index GIN créé")
+            print("✅ Index GIN créés (item_name, u_description)")
             return True
             
     except Exception as e:
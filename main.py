@@ -53,6 +53,7 @@ from routes.routes_shipping import router as shipping_router
 from routes.routes_auth import router as auth_router
 from routes.routes_admin import router as admin_router, llm_admin_router
 from services.webhook_scheduler import start_webhook_scheduler, stop_webhook_scheduler
+from services.risk_verdict_cache import start_risk_cache_refresher, stop_risk_cache_refresher
 
 if sys.platform == "win32":
     os.environ["PYTHONIOENCODING"] = "utf-8"
@@ -124,13 +125,12 @@ async def lifespan(app: FastAPI):
         finally:
             _db.close()
 
-        # CORRECTION: Import et utilisation de la bonne classe
-        from services.health_checker import HealthChecker
-        health_checker = HealthChecker()
+        # Sondes en parallèle ; le rapport est ensuite partagé avec /health
+        from services.health_checker import get_health_report
 
         logger.info("Execution des tests de sante...")
         await asyncio.sleep(2)  # Délai pour l'initialisation
-        HEALTH_CHECK_RESULTS = await health_checker.run_full_health_check()
+        HEALTH_CHECK_RESULTS = await get_health_report(force=True)
         # Test connexion WebSocket au démarrage
         logger.info("Test de connectivité WebSocket...")
         try:
@@ -180,6 +180,19 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"❌ Failed to start webhook scheduler: {e}")
 
+        # Revérification en arrière-plan des verdicts de risque client proches de l'expiration
+        try:
+            start_risk_cache_refresher()
+        except Exception as e:
+            logger.error(f"❌ Failed to start risk cache refresher: {e}")
+
+        # Rafraîchissement périodique du rapport de santé (désactivé par défaut)
+        try:
+            from services.health_checker import start_health_refresher
+            start_health_refresher()
+        except Exception as e:
+            logger.error(f"❌ Failed to start health refresher: {e}")
+
         # 2. CHARGEMENT DES MODULES
         logger.info("Chargement des modules...")
 
@@ -214,6 +227,17 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"❌ Error stopping webhook scheduler: {e}")
 
+        try:
+            await stop_risk_cache_refresher()
+        except Exception as e:
+            logger.error(f"❌ Error stopping risk cache refresher: {e}")
+
+        try:
+            from services.health_checker import stop_health_refresher
+            await stop_health_refresher()
+        except Exception as e:
+            logger.error(f"❌ Error stopping health refresher: {e}")
+
         # Logout SAP pour libérer le quota sessions (P4-C3)
         try:
             from services.sap_business_service import get_sap_business_service
@@ -472,8 +496,12 @@ async def mail_to_biz_interface(path: str = ""):
 
 @app.get("/health")
 async def health_check():
-    """Endpoint de contrôle de santé en temps réel"""
+    """Endpoint de contrôle de santé (dernier rapport, sans sonder les backends)"""
+    global HEALTH_CHECK_RESULTS
     try:
+        from services.health_checker import get_cached_health_report
+        HEALTH_CHECK_RESULTS = get_cached_health_report() or HEALTH_CHECK_RESULTS
+
         # Santé de base
         basic_health = {
             "service": "NOVA Server",
@@ -552,9 +580,8 @@ async def force_health_recheck():
     
     try:
         logger.info("🔄 Relancement des vérifications de santé...")
-        from services.health_checker import HealthChecker
-        health_checker = HealthChecker()
-        HEALTH_CHECK_RESULTS = await health_checker.run_full_health_check()
+        from services.health_checker import get_health_report
+        HEALTH_CHECK_RESULTS = await get_health_report(force=True)
         
         return {
             "message": "Vérification complète terminée",
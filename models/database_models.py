@@ -164,6 +164,29 @@ class QuoteUsageCounter(Base):
     )
 
 
+class QuoteQuotaReservation(Base):
+    """Bloc de devis réservé par un worker sur le quota (society_id, period).
+
+    Chaque worker réserve quelques unités d'avance (cf. QuoteQuotaService) et
+    les consomme localement ; `slots` = unités réservées non encore consommées.
+    Invariant garanti à l'attribution : count + somme(slots actifs) <= max_quota.
+    Une réservation non renouvelée expire (`expires_at`) et ses unités redeviennent
+    disponibles pour les autres workers (worker arrêté brutalement).
+    """
+    __tablename__ = 'quote_quota_reservation'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    society_id = Column(String(100), nullable=False)
+    period = Column(String(7), nullable=False)  # 'YYYY-MM'
+    worker_id = Column(String(100), nullable=False)
+    slots = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint('society_id', 'period', 'worker_id', name='uq_quote_reservation_worker'),
+    )
+
+
 # Configuration base de données
 DATABASE_URL = os.getenv('DATABASE_URL')
 engine = create_engine(DATABASE_URL)
@@ -1313,13 +1313,13 @@ async def analyze_email(message_id: str, force: bool = False):
         # === PHASE 4.5 : VÉRIFICATION RISQUE CLIENT (non bloquant) ===
         t_phase = time.time()
         try:
-            from services.risk_check_service import get_company_risk
+            from services.risk_verdict_cache import get_company_risk_cached
             _client_name = result.extracted_data.client_name if result.extracted_data else None
             _client_siren = None
             if result.extracted_data and hasattr(result.extracted_data, "client_siren"):
                 _client_siren = result.extracted_data.client_siren
             if _client_name or _client_siren:
-                result.client_risk = await get_company_risk(
+                result.client_risk = await get_company_risk_cached(
                     company_name=_client_name,
                     siren=_client_siren,
                 )
@@ -1645,7 +1645,8 @@ async def analyze_email(message_id: str, force: bool = False):
                 sender_email=email.from_address,
                 subject=email.subject,
                 client_card_code=result.extracted_data.client_card_code if result.extracted_data else None,
-                product_codes=product_codes if product_codes else None
+                product_codes=product_codes if product_codes else None,
+                body=clean_text
             )
 
             # Enrichir le résultat avec les infos de doublon
@@ -1672,7 +1673,8 @@ async def analyze_email(message_id: str, force: bool = False):
                     client_name=result.extracted_data.client_name if result.extracted_data else None,
                     product_codes=product_codes,
                     status=QuoteStatus.PENDING,
-                    notes=f"Auto-enregistré lors de l'analyse"
+                    notes=f"Auto-enregistré lors de l'analyse",
+                    body=clean_text
                 )
 
         except Exception as e:
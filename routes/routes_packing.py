@@ -66,7 +66,7 @@ async def calculate_packing(request: PackingCalculateRequest) -> PackingResponse
     """
     Calcule le colisage optimal pour une liste d'articles.
 
-    **Algorithme** : First Fit Decreasing (FFD)
+    **Algorithme** : colisage 3D par blocs (orientations, articles identiques regroupés)
 
     **Catalogue colis** :
     - S : 30×20×20 cm, max 10 kg
@@ -199,7 +199,7 @@ async def calculate_packing_and_shipping(
     Enchaîne calcul de colisage puis récupération du tarif DHL Express.
 
     **Pipeline** :
-    1. Algorithme FFD → suggestion de colis
+    1. Colisage 3D → suggestion de colis
     2. API DHL → tarif transport
 
     **Paramètres query** :
@@ -5,7 +5,7 @@ Routes API pour le workflow de validation commerciale
 
 import logging
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Optional
 
 from auth.dependencies import get_current_user
@@ -29,14 +29,17 @@ router = APIRouter(dependencies=[Depends(get_current_user)])
 
 @router.get("/pending", response_model=List[ValidationRequest])
 async def get_pending_validations(
+    response: Response,
     priority: Optional[str] = Query(None, description="Filtrer par priorité (low, medium, high, urgent)"),
     item_code: Optional[str] = Query(None, description="Filtrer par code article"),
     card_code: Optional[str] = Query(None, description="Filtrer par code client"),
     limit: int = Query(50, le=200, description="Nombre de résultats"),
-    offset: int = Query(0, ge=0, description="Offset pour pagination")
+    offset: int = Query(0, ge=0, description="Offset pour pagination (préférer cursor)"),
+    cursor: Optional[str] = Query(None, description="Curseur de page (en-tête X-Next-Cursor de la page précédente)")
 ):
     """
-    Récupère la liste des validations en attente
+    Récupère la liste des validations en attente.
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
     """
     try:
         validator = get_quote_validator()
@@ -46,14 +49,19 @@ async def get_pending_validations(
             item_code=item_code,
             card_code=card_code,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
 
-        validations = validator.list_pending_validations(filters)
+        validations, next_cursor = validator.list_pending_page(filters)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         logger.info(f"✓ {len(validations)} validation(s) en attente récupérée(s)")
         return validations
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erreur récupération validations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -243,13 +251,13 @@ async def get_urgent_validations_count():
 
         filters = ValidationListFilter(
             priority=ValidationPriority.URGENT,
-            limit=1000
+            limit=200
         )
 
         validations = validator.list_pending_validations(filters)
 
         return {
-            "urgent_count": len(validations),
+            "urgent_count": validator.count_pending_by_priority()[ValidationPriority.URGENT.value],
             "validations": validations
         }
 
@@ -369,24 +377,21 @@ async def get_validation_dashboard():
         stats = validator.get_statistics(days=30)
 
         # Validations urgentes
-        urgent_filters = ValidationListFilter(priority=ValidationPriority.URGENT, limit=100)
+        urgent_filters = ValidationListFilter(priority=ValidationPriority.URGENT, limit=10)
         urgent = validator.list_pending_validations(urgent_filters)
 
         # Validations haute priorité
-        high_filters = ValidationListFilter(priority=ValidationPriority.HIGH, limit=100)
+        high_filters = ValidationListFilter(priority=ValidationPriority.HIGH, limit=10)
         high = validator.list_pending_validations(high_filters)
 
         # Totaux en attente
-        all_pending = validator.list_pending_validations(ValidationListFilter(limit=1000))
+        pending_counts = validator.count_pending_by_priority()
 
         return {
             "statistics": stats,
             "pending_summary": {
-                "total": len(all_pending),
-                "urgent": len(urgent),
-                "high": len(high),
-                "medium": len([v for v in all_pending if v.priority == ValidationPriority.MEDIUM]),
-                "low": len([v for v in all_pending if v.priority == ValidationPriority.LOW])
+                "total": sum(pending_counts.values()),
+                **pending_counts
             },
             "urgent_validations": urgent[:10],  # Top 10 urgentes
             "high_priority_validations": high[:10],  # Top 10 haute priorité
@@ -259,21 +259,10 @@ async def delete_mapping(
     mapping_db = get_product_mapping_db()
 
     try:
-        import sqlite3
-        conn = sqlite3.connect(mapping_db.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            DELETE FROM product_code_mapping
-            WHERE external_code = ?
-            AND supplier_card_code = ?
-        """, (external_code, supplier_card_code))
-
-        deleted = cursor.rowcount
-        conn.commit()
-        conn.close()
+        # Via ProductMappingDB : l'index mémoire des mappings reste cohérent
+        deleted = mapping_db.delete_mapping(external_code, supplier_card_code)
 
-        if deleted > 0:
+        if deleted:
             return {
                 "success": True,
                 "message": f"Mapping {external_code} supprimé"
@@ -6,7 +6,7 @@ GET /api/risk-check?company_name=XXX&siren=YYY
 
 from fastapi import APIRouter, Depends, Query
 from auth.dependencies import get_current_user
-from services.risk_check_service import get_company_risk
+from services.risk_verdict_cache import get_company_risk_cached
 
 router = APIRouter(
     prefix="/api",
@@ -28,8 +28,9 @@ async def risk_check(
       - reason : explication lisible
       - source : pappers
       - raw    : données brutes Pappers
+      - cached : présent si servi depuis le cache des verdicts (24 h)
     """
     if not company_name and not siren:
         return {"status": "UNKNOWN", "reason": "Paramètre company_name ou siren requis", "source": "pappers", "raw": {}}
 
-    return await get_company_risk(company_name=company_name, siren=siren)
+    return await get_company_risk_cached(company_name=company_name, siren=siren)
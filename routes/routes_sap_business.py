@@ -114,7 +114,8 @@ async def sap_health():
         return {
             "connected": connected,
             "company_db": sap_service.company_db,
-            "base_url": sap_service.base_url
+            "base_url": sap_service.base_url,
+            "session_pool": sap_service.get_pool_stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
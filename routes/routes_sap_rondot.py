@@ -141,6 +141,9 @@ async def call_sap_rondot(endpoint: str, method: str = "GET", payload: Optional[
     except httpx.HTTPStatusError as e:
         logger.error(f"Erreur HTTP SAP Rondot: {e}")
         return {"error": f"Erreur HTTP: {e.response.status_code}"}
+    except httpx.TimeoutException as e:
+        logger.error(f"Timeout appel SAP Rondot: {e}")
+        return {"error": f"Timeout SAP Rondot: {e}", "timeout": True}
     except Exception as e:
         logger.error(f"Erreur appel SAP Rondot: {e}")
         return {"error": str(e)}
@@ -347,9 +350,17 @@ async def create_sap_rondot_quotation(request: CreateQuoteRequest):
         ]
     }
 
-    result = await call_sap_rondot("/Quotations", method="POST", payload=payload)
+    try:
+        result = await call_sap_rondot("/Quotations", method="POST", payload=payload)
+    except Exception:
+        get_quote_quota_service().release()
+        raise
 
     if "error" in result:
+        # Création en échec : unité de quota rendue (sauf délai dépassé : le devis
+        # a pu être créé côté SAP)
+        if not result.get("timeout"):
+            get_quote_quota_service().release()
         raise HTTPException(status_code=500, detail=result["error"])
 
     # Incrément du quota APRÈS création réussie (doc_entry obtenu). Une erreur de
@@ -363,6 +374,8 @@ async def create_sap_rondot_quotation(request: CreateQuoteRequest):
                 f"⚠️ Devis SAP Rondot créé (DocEntry={doc_entry}) mais incrément du "
                 f"compteur de quota échoué : {quota_exc}"
             )
+    else:
+        get_quote_quota_service().release()
 
     return {
         "success": True,
@@ -79,14 +79,18 @@ async def get_shipping_quote(request: ShippingRequest) -> ShippingResponse:
 @router.get("/carriers", summary="Liste des transporteurs disponibles")
 async def list_carriers() -> Dict[str, Any]:
     """
-    Retourne la liste des transporteurs configurés et disponibles.
+    Retourne la liste des transporteurs configurés et disponibles,
+    avec les compteurs du cache de tarifs partagé.
     """
+    from services.transport.rate_cache import get_carrier_rate_cache
+
     service = get_transport_service()
     carriers = service.list_carriers()
     return {
         "success": True,
         "carriers": carriers,
-        "count": len(carriers)
+        "count": len(carriers),
+        "rate_cache": get_carrier_rate_cache().stats()
     }
 
 
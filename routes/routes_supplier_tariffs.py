@@ -221,6 +221,9 @@ async def get_indexation_status():
         "indexation_running": indexation_state["running"],
         "progress": indexation_state["progress"],
         "current_file": indexation_state["current_file"],
+        "files_total": indexation_state.get("files_total", 0),
+        "files_done": indexation_state.get("files_done", 0),
+        "files_skipped": indexation_state.get("files_skipped", 0),
         "stats": stats
     }
 
@@ -270,15 +273,17 @@ async def start_indexation(
 
 
 async def run_indexation(folder_path: str, clear_existing: bool, recursive: bool):
-    """Exécute l'indexation des fichiers."""
+    """
+    Exécute l'indexation des fichiers (incrémentale, parsing parallèle).
+    Voir services/tariff_ingestion.py.
+    """
     global indexation_state
 
     from services.supplier_tariffs_db import (
-        start_indexation, update_indexation_session,
-        add_indexed_file, add_supplier_products_batch,
-        update_file_status, clear_all_data
+        start_indexation, update_indexation_session, clear_all_data
     )
-    from services.file_parsers import scan_folder, parse_file
+    from services.file_parsers import scan_folder
+    from services.tariff_ingestion import run_ingestion
 
     indexation_state["running"] = True
     indexation_state["progress"] = 0
@@ -287,90 +292,51 @@ async def run_indexation(folder_path: str, clear_existing: bool, recursive: bool
     session_id = start_indexation()
     indexation_state["session_id"] = session_id
 
-    files_processed = 0
-    files_success = 0
-    files_error = 0
-    total_items = 0
+    counters = {
+        "files_processed": 0,
+        "files_success": 0,
+        "files_error": 0,
+        "items_extracted": 0,
+    }
 
     try:
         # Optionnel: effacer les données existantes
         if clear_existing:
-            clear_all_data()
+            await asyncio.to_thread(clear_all_data)
             logger.info("Données existantes effacées")
 
         # Scanner le dossier
-        files = scan_folder(folder_path, recursive=recursive)
-        total_files = len(files)
-
-        logger.info(f"Indexation de {total_files} fichiers depuis {folder_path}")
-
-        for i, file_info in enumerate(files):
-            file_path = file_info['path']
-            indexation_state["current_file"] = file_info['name']
-            indexation_state["progress"] = int((i / total_files) * 100)
-
-            try:
-                # Ajouter le fichier à la base
-                file_id = add_indexed_file(
-                    file_path=file_path,
-                    file_name=file_info['name'],
-                    file_type=file_info['type'],
-                    file_size=file_info['size'],
-                    last_modified=file_info['modified']
-                )
-
-                # Parser le fichier
-                products = parse_file(file_path)
-
-                if products:
-                    # Ajouter les produits
-                    count = add_supplier_products_batch(file_id, products)
-                    update_file_status(file_id, 'indexed', items_count=count)
-                    total_items += count
-                    files_success += 1
-                    logger.info(f"Indexé: {file_info['name']} - {count} produits")
-                else:
-                    update_file_status(file_id, 'empty', error_message="Aucun produit extrait")
-                    files_success += 1  # Fichier traité sans erreur
-
-            except Exception as e:
-                logger.error(f"Erreur indexation {file_path}: {e}")
-                files_error += 1
-                try:
-                    file_id = add_indexed_file(
-                        file_path=file_path,
-                        file_name=file_info['name'],
-                        file_type=file_info['type'],
-                        file_size=file_info['size'],
-                        last_modified=file_info['modified']
-                    )
-                    update_file_status(file_id, 'error', error_message=str(e))
-                except:
-                    pass
-
-            files_processed += 1
+        files = await asyncio.to_thread(scan_folder, folder_path, recursive)
+
+        logger.info(f"Indexation de {len(files)} fichiers depuis {folder_path}")
+
+        counters.update(await run_ingestion(files, indexation_state))
 
         # Mise à jour finale
         update_indexation_session(
             session_id,
-            status='completed',
-            files_processed=files_processed,
-            files_success=files_success,
-            files_error=files_error,
-            items_extracted=total_items
+            status='completed' if indexation_state["running"] else 'stopped',
+            files_processed=counters["files_processed"],
+            files_success=counters["files_success"],
+            files_error=counters["files_error"],
+            items_extracted=counters["items_extracted"]
         )
 
-        logger.info(f"Indexation terminée: {files_success} réussis, {files_error} erreurs, {total_items} produits")
+        logger.info(
+            f"Indexation terminée: {counters['files_success']} réussis "
+            f"({counters.get('files_skipped', 0)} inchangés), {counters['files_error']} erreurs, "
+            f"{counters['items_extracted']} produits"
+        )
 
     except Exception as e:
         logger.error(f"Erreur indexation globale: {e}")
         update_indexation_session(
             session_id,
             status='error',
-            files_processed=files_processed,
-            files_success=files_success,
-            files_error=files_error,
-            items_extracted=total_items,
+            files_processed=counters["files_processed"],
+            files_success=counters["files_success"],
+            files_error=counters["files_error"],
+            items_extracted=counters["items_extracted"],
             error_message=str(e)
         )
 
@@ -388,8 +354,7 @@ async def stop_indexation():
     if not indexation_state["running"]:
         return {"success": False, "message": "Aucune indexation en cours"}
 
-    # Note: L'arrêt réel nécessiterait un mécanisme de signal
-    # Pour l'instant on marque juste comme non running
+    # Le pipeline d'indexation consulte ce drapeau entre deux fichiers
     indexation_state["running"] = False
 
     return {"success": True, "message": "Demande d'arrêt envoyée"}
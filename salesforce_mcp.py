@@ -14,6 +14,8 @@ import traceback
 import argparse
 import logging
 
+from services.salesforce_bulk import create_records_bulk
+
 # Configuration sécurisée pour Windows
 if sys.platform == "win32":
     os.environ["PYTHONIOENCODING"] = "utf-8"
@@ -428,25 +430,30 @@ async def salesforce_create_opportunity_complete(opportunity_data: Dict[str, Any
         opportunity_id = opportunity_result.get("id")
         log(f"Opportunité créée: {opportunity_id}", "SUCCESS")
 
-        # Créer les lignes d'opportunité
+        # Créer les lignes d'opportunité en lots (sObject Collections), tout ou rien
         line_items_created = []
         if line_items:
             log(f"Création de {len(line_items)} lignes d'opportunité")
+            records = [{**line_item, "OpportunityId": opportunity_id} for line_item in line_items]
+            bulk_result = create_records_bulk(sf, "OpportunityLineItem", records)
 
-            for i, line_item in enumerate(line_items):
+            if not bulk_result["success"]:
+                log(f"Échec création lignes: {bulk_result['errors']}", "ERROR")
+                # Pas d'opportunité incomplète : on supprime l'en-tête créé ci-dessus
                 try:
-                    line_item["OpportunityId"] = opportunity_id
-                    line_result = sf.OpportunityLineItem.create(line_item)
-
-                    if is_success_result(line_result):
-                        line_id = line_result.get("id")
-                        line_items_created.append(line_id)
-                        log(f"Ligne {i+1} créée: {line_id}", "SUCCESS")
-                    else:
-                        log(f"Échec création ligne {i+1}: {line_result}", "ERROR")
-
+                    sf.Opportunity.delete(opportunity_id)
+                    log(f"Opportunité {opportunity_id} supprimée (lignes refusées)", "WARNING")
                 except Exception as e:
-                    log(f"Erreur création ligne {i+1}: {str(e)}", "ERROR")
+                    log(f"Suppression opportunité {opportunity_id} impossible: {str(e)}", "ERROR")
+                return {
+                    "success": False,
+                    "error": bulk_result["error"],
+                    "line_errors": bulk_result["errors"],
+                    "opportunity_id": None
+                }
+
+            line_items_created = bulk_result["ids"]
+            log(f"{len(line_items_created)} lignes créées en {bulk_result['requests']} requête(s)", "SUCCESS")
 
         log_success("SF_OPPORTUNITY_COMPLETE", len(line_items_created))
         return {
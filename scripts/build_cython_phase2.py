@@ -50,6 +50,8 @@ VAR_INIT_SRC = BUILD / "variant_init_src"  # variante (b) : __init__ en .py
 SUBMODULES = [
     "services.packing.box_catalog",
     "services.packing.packing_algorithm",
+    "services.packing.packing_3d",
+    "services.packing.dimension_resolver",
     "services.packing.packing_service",
 ]
 # Le package init, compile a part : source = __init__.py, nom dote = le PACKAGE
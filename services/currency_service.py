@@ -4,9 +4,12 @@ Service de gestion des taux de change et conversions de devises
 """
 
 import os
+import json
+import asyncio
 import logging
 import httpx
-from typing import Optional, Dict
+from pathlib import Path
+from typing import Optional, Dict, Tuple
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
@@ -19,12 +22,18 @@ class ExchangeRate(BaseModel):
     to_currency: str
     rate: float
     last_updated: datetime
+    is_stale: bool = False  # True : dernière table connue, source indisponible
 
 
 class CurrencyService:
     """
     Service de taux de change avec cache
     Supporte EUR, USD, GBP, CHF
+
+    Une seule requête charge la table complète des taux de la devise de base ;
+    toutes les paires (et taux croisés) en sont dérivées. Les appels concurrents
+    partagent la même requête en cours. La dernière table connue est persistée
+    localement et sert de secours (taux marqués is_stale) si l'API est indisponible.
     """
 
     # Devises supportées
@@ -34,10 +43,23 @@ class CurrencyService:
     # Alternative : fixer.io, currencyapi.com
     API_BASE_URL = "https://api.exchangerate-api.com/v4/latest"
 
+    # Dernière table connue (secours hors ligne)
+    RATES_FILE = Path(__file__).parent.parent / "data" / "currency_rates.json"
+
+    # Délai avant de réinterroger l'API après un échec (évite les rafales pendant une panne)
+    RETRY_AFTER_FAILURE_SECONDS = 60
+
     def __init__(self):
         self.base_currency = os.getenv("PRICING_BASE_CURRENCY", "EUR")
         self.cache: Dict[str, ExchangeRate] = {}
         self.cache_duration_hours = int(os.getenv("CURRENCY_CACHE_HOURS", "4"))  # 4h par défaut
+        # Table {devise: taux depuis base_currency}
+        self._rate_table: Optional[Dict[str, float]] = None
+        self._table_updated: Optional[datetime] = None
+        self._table_stale = False
+        self._retry_at: Optional[datetime] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self.fetch_count = 0  # requêtes API émises (observabilité / tests)
 
     async def get_exchange_rate(
         self,
@@ -74,45 +96,90 @@ class CurrencyService:
                 last_updated=datetime.utcnow()
             )
 
-        # Vérifier cache
-        cache_key = f"{from_currency}_{to_currency}"
-        if not force_refresh and cache_key in self.cache:
-            cached_rate = self.cache[cache_key]
-            age = datetime.utcnow() - cached_rate.last_updated
-            if age < timedelta(hours=self.cache_duration_hours):
-                logger.debug(f"✓ Cache hit: {cache_key} = {cached_rate.rate}")
-                return cached_rate
-
-        # Récupérer depuis l'API
-        try:
-            rate_value = await self._fetch_rate_from_api(from_currency, to_currency)
-            if rate_value is None:
-                return None
-
-            exchange_rate = ExchangeRate(
-                from_currency=from_currency,
-                to_currency=to_currency,
-                rate=rate_value,
-                last_updated=datetime.utcnow()
-            )
+        table = await self._get_rate_table(force_refresh)
+        if table is None:
+            return None
 
-            # Mettre en cache
-            self.cache[cache_key] = exchange_rate
-            logger.info(f"✓ Taux de change mis à jour: {cache_key} = {rate_value}")
+        # Vérifier cache (paires dérivées de la table courante)
+        cache_key = f"{from_currency}_{to_currency}"
+        cached_rate = self.cache.get(cache_key)
+        if cached_rate is not None:
+            logger.debug(f"✓ Cache hit: {cache_key} = {cached_rate.rate}")
+            return cached_rate
 
-            return exchange_rate
+        if from_currency not in table or to_currency not in table:
+            logger.error(f"Taux {from_currency}/{to_currency} absent de la table {self.base_currency}")
+            return None
 
-        except Exception as e:
-            logger.error(f"✗ Erreur récupération taux de change: {e}")
+        # Taux croisé via la devise de base
+        exchange_rate = ExchangeRate(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            rate=table[to_currency] / table[from_currency],
+            last_updated=self._table_updated,
+            is_stale=self._table_stale
+        )
+        self.cache[cache_key] = exchange_rate
+        if exchange_rate.is_stale:
+            logger.warning(f"⚠️ Taux {cache_key} issu de la dernière table connue ({self._table_updated:%Y-%m-%d %H:%M} UTC)")
+        return exchange_rate
+
+    def _table_is_fresh(self) -> bool:
+        return (
+            self._rate_table is not None
+            and not self._table_stale
+            and datetime.utcnow() - self._table_updated < timedelta(hours=self.cache_duration_hours)
+        )
+
+    async def _get_rate_table(self, force_refresh: bool = False) -> Optional[Dict[str, float]]:
+        """Table des taux courante ; un seul chargement en cours à la fois."""
+        if not force_refresh and self._table_is_fresh():
+            return self._rate_table
+
+        # Source en échec récemment : servir la table connue sans réinterroger l'API
+        if not force_refresh and self._retry_at and datetime.utcnow() < self._retry_at and self._rate_table:
+            return self._rate_table
+
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._refresh_rate_table())
+        # shield : l'annulation d'un appelant n'interrompt pas le chargement partagé
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh_rate_table(self) -> Optional[Dict[str, float]]:
+        """Charge la table depuis l'API ; à défaut, dernière table connue (marquée périmée)."""
+        rates = await self._fetch_rate_table_from_api(self.base_currency)
+        if rates is not None:
+            self._set_table(rates, datetime.utcnow(), stale=False)
+            self._retry_at = None
+            self._save_rate_table()
+            logger.info(f"✓ Table des taux {self.base_currency} mise à jour ({len(rates)} devises)")
+            return self._rate_table
+
+        self._retry_at = datetime.utcnow() + timedelta(seconds=self.RETRY_AFTER_FAILURE_SECONDS)
+        if self._rate_table is None:
+            persisted = self._load_rate_table()
+            if persisted is not None:
+                self._set_table(persisted[0], persisted[1], stale=True)
+        elif not self._table_stale:
+            self._set_table(self._rate_table, self._table_updated, stale=True)
+
+        if self._rate_table is None:
+            logger.error("✗ Aucun taux de change disponible (API indisponible, pas de table locale)")
             return None
+        logger.warning(f"⚠️ API taux de change indisponible - table du {self._table_updated:%Y-%m-%d %H:%M} UTC utilisée")
+        return self._rate_table
 
-    async def _fetch_rate_from_api(
-        self,
-        from_currency: str,
-        to_currency: str
-    ) -> Optional[float]:
-        """Récupère le taux depuis l'API externe"""
-        url = f"{self.API_BASE_URL}/{from_currency}"
+    def _set_table(self, rates: Dict[str, float], updated: datetime, stale: bool) -> None:
+        self._rate_table = dict(rates)
+        self._rate_table[self.base_currency] = 1.0
+        self._table_updated = updated
+        self._table_stale = stale
+        self.cache.clear()  # paires dérivées de l'ancienne table
+
+    async def _fetch_rate_table_from_api(self, base_currency: str) -> Optional[Dict[str, float]]:
+        """Récupère en une requête tous les taux depuis la devise de base"""
+        url = f"{self.API_BASE_URL}/{base_currency}"
+        self.fetch_count += 1
 
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
@@ -124,12 +191,15 @@ class CurrencyService:
 
                 data = response.json()
 
-                if "rates" not in data or to_currency not in data["rates"]:
-                    logger.error(f"Taux {to_currency} non trouvé dans la réponse")
+                if "rates" not in data:
+                    logger.error("Table des taux absente de la réponse")
                     return None
 
-                rate = float(data["rates"][to_currency])
-                return rate
+                return {
+                    currency: float(data["rates"][currency])
+                    for currency in self.SUPPORTED_CURRENCIES
+                    if currency in data["rates"]
+                }
 
         except httpx.RequestError as e:
             logger.error(f"Erreur réseau API taux de change: {e}")
@@ -138,6 +208,36 @@ class CurrencyService:
             logger.error(f"Erreur parsing réponse API: {e}")
             return None
 
+    def _save_rate_table(self) -> None:
+        """Persiste la table courante (écriture atomique)"""
+        try:
+            self.RATES_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.RATES_FILE.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({
+                "base_currency": self.base_currency,
+                "updated": self._table_updated.isoformat(),
+                "rates": self._rate_table,
+            }), encoding="utf-8")
+            os.replace(tmp_path, self.RATES_FILE)
+        except Exception as e:
+            logger.warning(f"⚠️ Sauvegarde table des taux impossible: {e}")
+
+    def _load_rate_table(self) -> Optional[Tuple[Dict[str, float], datetime]]:
+        """Dernière table persistée pour la devise de base, ou None"""
+        try:
+            data = json.loads(self.RATES_FILE.read_text(encoding="utf-8"))
+            if data.get("base_currency") != self.base_currency:
+                return None
+            return (
+                {k: float(v) for k, v in data["rates"].items()},
+                datetime.fromisoformat(data["updated"]),
+            )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Lecture table des taux locale impossible: {e}")
+            return None
+
     async def convert(
         self,
         amount: float,
@@ -191,22 +291,18 @@ class CurrencyService:
         """
         Récupère tous les taux depuis la devise de base
         """
-        rates = {}
-
-        for currency in self.SUPPORTED_CURRENCIES:
-            if currency == self.base_currency:
-                rates[currency] = 1.0
-                continue
-
-            rate_data = await self.get_exchange_rate(self.base_currency, currency)
-            if rate_data:
-                rates[currency] = rate_data.rate
-
-        return rates
+        table = await self._get_rate_table()
+        if table is None:
+            return {self.base_currency: 1.0}
+        return {currency: table[currency] for currency in self.SUPPORTED_CURRENCIES if currency in table}
 
     def clear_cache(self):
-        """Vide le cache des taux de change"""
+        """Vide le cache des taux de change (la table persistée est conservée)"""
         self.cache.clear()
+        self._rate_table = None
+        self._table_updated = None
+        self._table_stale = False
+        self._retry_at = None
         logger.info("✓ Cache taux de change vidé")
 
     def get_cache_status(self) -> Dict[str, any]:
@@ -227,6 +323,8 @@ class CurrencyService:
             "cache_duration_hours": self.cache_duration_hours,
             "base_currency": self.base_currency,
             "supported_currencies": self.SUPPORTED_CURRENCIES,
+            "table_updated": self._table_updated.isoformat() if self._table_updated else None,
+            "is_stale": self._table_stale,
             "entries": cache_entries
         }
 
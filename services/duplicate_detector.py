@@ -6,14 +6,39 @@ Détecte les doublons de demandes de devis pour éviter les traitements multiple
 import sqlite3
 import logging
 import json
+import hashlib
+import random
+import re
+import unicodedata
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Set
 from dataclasses import dataclass
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Fenêtre de recherche des doublons
+DUPLICATE_HORIZON_DAYS = 30
+PRODUCT_SIMILARITY_THRESHOLD = 0.7
+TEXT_SIMILARITY_THRESHOLD = 0.8
+
+# MinHash/LSH : 16 bandes de 4 lignes → un couple de Jaccard 0.7 est candidat
+# avec une probabilité ~99 %, un couple à 0.3 dans ~12 % des cas (vérifié ensuite)
+LSH_BANDS = 16
+LSH_ROWS = 4
+_NUM_PERM = LSH_BANDS * LSH_ROWS
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)  # graine fixe : signatures stables entre redémarrages
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(_NUM_PERM)
+]
+
+_SUBJECT_PREFIX_RE = re.compile(r"^\s*((re|tr|fw|fwd|aw|wg)\s*:\s*)+", re.IGNORECASE)
+# Corps tronqué : le début du message suffit à reconnaître une relance
+_BODY_MAX_CHARS = 2000
+
 
 class DuplicateType(str, Enum):
     """Types de doublons détectés."""
@@ -53,8 +78,62 @@ class DuplicateCheckResult:
     confidence: float  # 0.0 à 1.0
 
 
+def _normalize_words(text: str) -> List[str]:
+    """Mots en minuscules, sans accents ni ponctuation."""
+    text = unicodedata.normalize("NFD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def _text_features(subject: str, body: Optional[str] = None) -> Set[str]:
+    """Mots du sujet (sans RE:/TR:) + 3-grammes de mots du corps."""
+    features = {f"w:{w}" for w in _normalize_words(_SUBJECT_PREFIX_RE.sub("", subject or ""))}
+    body_words = _normalize_words((body or "")[:_BODY_MAX_CHARS])
+    features.update(f"s:{' '.join(body_words[i:i + 3])}" for i in range(max(len(body_words) - 2, 0)))
+    return features
+
+
+def _product_features(product_codes: Optional[Iterable[str]]) -> Set[str]:
+    return {str(code).strip().upper() for code in product_codes or [] if str(code).strip()}
+
+
+def _minhash(features: Set[str]) -> List[int]:
+    """Signature MinHash (_NUM_PERM valeurs) d'un ensemble de chaînes."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big")
+        for f in features
+    ]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def _lsh_buckets(features: Set[str]) -> List[str]:
+    """Une clé de bucket par bande de la signature MinHash."""
+    if not features:
+        return []
+    signature = _minhash(features)
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode(), digest_size=8).hexdigest()
+        buckets.append(f"{band}:{digest}")
+    return buckets
+
+
+def _jaccard(set1: Set[str], set2: Set[str]) -> float:
+    if not set1 or not set2:
+        return 0.0
+    union = len(set1 | set2)
+    return len(set1 & set2) / union if union > 0 else 0.0
+
+
 class DuplicateDetector:
-    """Service de détection des doublons de demandes de devis."""
+    """
+    Service de détection des doublons de demandes de devis.
+
+    Les doublons probables (produits) et possibles (sujet/corps) sont
+    cherchés via un index MinHash/LSH (table processed_emails_lsh) sur tout
+    l'horizon de DUPLICATE_HORIZON_DAYS jours, puis vérifiés par Jaccard exact.
+    """
 
     def __init__(self, db_path: Optional[str] = None):
         """Initialise le détecteur de doublons."""
@@ -107,6 +186,31 @@ class DuplicateDetector:
                 ON processed_emails(status, processed_at DESC)
             """)
 
+            # Migration : texte normalisé (sujet + début du corps) pour la vérification exacte
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(processed_emails)")}
+            if "dedup_text" not in columns:
+                cursor.execute("ALTER TABLE processed_emails ADD COLUMN dedup_text TEXT")
+
+            # Index LSH : une ligne par (email, type, bande)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS processed_emails_lsh (
+                    email_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    bucket TEXT NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_processed_emails_lsh_lookup
+                ON processed_emails_lsh(kind, scope, bucket)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_processed_emails_lsh_email
+                ON processed_emails_lsh(email_id)
+            """)
+
+            self._prune_and_backfill_index(cursor)
+
             conn.commit()
             logger.info("Table processed_emails créée avec succès")
 
@@ -122,7 +226,8 @@ class DuplicateDetector:
         sender_email: str,
         subject: str,
         client_card_code: Optional[str] = None,
-        product_codes: Optional[List[str]] = None
+        product_codes: Optional[List[str]] = None,
+        body: Optional[str] = None
     ) -> DuplicateCheckResult:
         """
         Vérifie si un email est un doublon.
@@ -133,6 +238,7 @@ class DuplicateDetector:
             subject: Sujet de l'email
             client_card_code: Code client SAP (si identifié)
             product_codes: Liste des codes produits (si identifiés)
+            body: Corps de l'email (optionnel, affine la similarité texte)
 
         Returns:
             DuplicateCheckResult avec type de doublon et référence existante
@@ -158,60 +264,38 @@ class DuplicateDetector:
                     confidence=1.0
                 )
 
+            cutoff_time = (datetime.now() - timedelta(days=DUPLICATE_HORIZON_DAYS)).isoformat()
+
             # 2. VÉRIFICATION PROBABLE : Même client + produits similaires (30 jours)
             if client_card_code and product_codes:
-                cutoff_time = (datetime.now() - timedelta(days=30)).isoformat()
-
-                cursor.execute("""
-                    SELECT * FROM processed_emails
-                    WHERE client_card_code = ?
-                    AND processed_at > ?
-                    AND status IN ('pending', 'completed')
-                    ORDER BY processed_at DESC
-                    LIMIT 10
-                """, (client_card_code, cutoff_time))
-
-                candidates = cursor.fetchall()
-                for candidate in candidates:
-                    existing_products = json.loads(candidate['product_codes'] or '[]')
-                    similarity = self._calculate_product_similarity(
-                        product_codes, existing_products
-                    )
-
-                    if similarity >= 0.7:  # 70% de produits communs
-                        return DuplicateCheckResult(
-                            is_duplicate=True,
-                            duplicate_type=DuplicateType.PROBABLE,
-                            existing_quote=self._row_to_quote(candidate),
-                            confidence=similarity
-                        )
-
-            # 3. VÉRIFICATION POSSIBLE : Même expéditeur + sujet similaire (30 jours)
-            cutoff_time = (datetime.now() - timedelta(days=30)).isoformat()
-
-            cursor.execute("""
-                SELECT * FROM processed_emails
-                WHERE sender_email = ?
-                AND processed_at > ?
-                AND status IN ('pending', 'completed')
-                ORDER BY processed_at DESC
-                LIMIT 10
-            """, (sender_email, cutoff_time))
-
-            candidates = cursor.fetchall()
-            for candidate in candidates:
-                subject_similarity = self._calculate_text_similarity(
-                    subject, candidate['email_subject'] or ""
+                wanted = _product_features(product_codes)
+                match = self._best_lsh_match(
+                    cursor, "products", client_card_code, wanted, cutoff_time,
+                    lambda row: _product_features(json.loads(row['product_codes'] or '[]')),
                 )
-
-                if subject_similarity >= 0.8:  # 80% de similarité de sujet
+                if match and match[1] >= PRODUCT_SIMILARITY_THRESHOLD:
                     return DuplicateCheckResult(
                         is_duplicate=True,
-                        duplicate_type=DuplicateType.POSSIBLE,
-                        existing_quote=self._row_to_quote(candidate),
-                        confidence=subject_similarity
+                        duplicate_type=DuplicateType.PROBABLE,
+                        existing_quote=self._row_to_quote(match[0]),
+                        confidence=match[1]
                     )
 
+            # 3. VÉRIFICATION POSSIBLE : Même expéditeur + sujet/corps similaire (30 jours)
+            wanted = _text_features(subject, body)
+            match = self._best_lsh_match(
+                cursor, "text", sender_email, wanted, cutoff_time,
+                lambda row: set(json.loads(row['dedup_text']))
+                if row['dedup_text'] else _text_features(row['email_subject'] or ""),
+            )
+            if match and match[1] >= TEXT_SIMILARITY_THRESHOLD:
+                return DuplicateCheckResult(
+                    is_duplicate=True,
+                    duplicate_type=DuplicateType.POSSIBLE,
+                    existing_quote=self._row_to_quote(match[0]),
+                    confidence=match[1]
+                )
+
             # Aucun doublon détecté
             return DuplicateCheckResult(
                 is_duplicate=False,
@@ -242,7 +326,8 @@ class DuplicateDetector:
         product_codes: Optional[List[str]] = None,
         status: QuoteStatus = QuoteStatus.PENDING,
         quote_id: Optional[str] = None,
-        notes: Optional[str] = None
+        notes: Optional[str] = None,
+        body: Optional[str] = None
     ) -> bool:
         """
         Enregistre un email traité dans la base.
@@ -257,11 +342,13 @@ class DuplicateDetector:
 
             product_codes_json = json.dumps(product_codes or [])
 
+            text_features = _text_features(subject, body)
+
             cursor.execute("""
                 INSERT OR REPLACE INTO processed_emails
                 (email_id, email_subject, sender_email, client_card_code,
-                 client_name, product_codes, status, quote_id, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 client_name, product_codes, status, quote_id, notes, dedup_text)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 email_id,
                 subject,
@@ -271,9 +358,16 @@ class DuplicateDetector:
                 product_codes_json,
                 status.value,
                 quote_id,
-                notes
+                notes,
+                json.dumps(sorted(text_features))
             ))
 
+            cursor.execute("DELETE FROM processed_emails_lsh WHERE email_id = ?", (email_id,))
+            self._index_email(
+                cursor, email_id, sender_email, client_card_code,
+                _product_features(product_codes), text_features,
+            )
+
             conn.commit()
             logger.info(f"Email {email_id} enregistré avec status {status.value}")
             return True
@@ -361,6 +455,74 @@ class DuplicateDetector:
 
     # --- Méthodes privées ---
 
+    def _index_email(
+        self,
+        cursor: sqlite3.Cursor,
+        email_id: str,
+        sender_email: str,
+        client_card_code: Optional[str],
+        products: Set[str],
+        text: Set[str],
+    ) -> None:
+        """Ajoute les buckets LSH d'un email (produits par client, texte par expéditeur)."""
+        rows = []
+        if client_card_code and products:
+            rows += [(email_id, "products", client_card_code, b) for b in _lsh_buckets(products)]
+        if sender_email and text:
+            rows += [(email_id, "text", sender_email, b) for b in _lsh_buckets(text)]
+        cursor.executemany(
+            "INSERT INTO processed_emails_lsh (email_id, kind, scope, bucket) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    def _best_lsh_match(self, cursor, kind, scope, wanted, cutoff_time, features_of):
+        """Candidats partageant au moins un bucket, puis meilleur Jaccard exact."""
+        buckets = _lsh_buckets(wanted)
+        if not buckets:
+            return None
+        placeholders = ",".join("?" * len(buckets))
+        cursor.execute(f"""
+            SELECT * FROM processed_emails
+            WHERE email_id IN (
+                SELECT email_id FROM processed_emails_lsh
+                WHERE kind = ? AND scope = ? AND bucket IN ({placeholders})
+            )
+            AND processed_at > ?
+            AND status IN ('pending', 'completed')
+            ORDER BY processed_at DESC
+        """, (kind, scope, *buckets, cutoff_time))
+
+        best = None
+        for candidate in cursor.fetchall():
+            similarity = _jaccard(wanted, features_of(candidate))
+            if best is None or similarity > best[1]:
+                best = (candidate, similarity)
+        return best
+
+    def _prune_and_backfill_index(self, cursor: sqlite3.Cursor) -> None:
+        """Retire de l'index les emails hors horizon, indexe ceux qui n'y sont pas encore."""
+        cutoff_time = (datetime.now() - timedelta(days=DUPLICATE_HORIZON_DAYS)).isoformat()
+        cursor.execute("""
+            DELETE FROM processed_emails_lsh WHERE email_id IN (
+                SELECT email_id FROM processed_emails WHERE processed_at <= ?
+            )
+        """, (cutoff_time,))
+        cursor.execute("""
+            SELECT email_id, email_subject, sender_email, client_card_code, product_codes
+            FROM processed_emails
+            WHERE processed_at > ?
+            AND email_id NOT IN (SELECT DISTINCT email_id FROM processed_emails_lsh)
+        """, (cutoff_time,))
+        missing = cursor.fetchall()
+        for email_id, subject, sender, client, products_json in missing:
+            self._index_email(
+                cursor, email_id, sender, client,
+                _product_features(json.loads(products_json or '[]')),
+                _text_features(subject or ""),
+            )
+        if missing:
+            logger.info(f"🔎 Index doublons (LSH) : {len(missing)} email(s) indexé(s)")
+
     def _row_to_quote(self, row: sqlite3.Row) -> ExistingQuote:
         """Convertit une ligne DB en objet ExistingQuote."""
         return ExistingQuote(
@@ -374,36 +536,6 @@ class DuplicateDetector:
             subject=row['email_subject'] or ""
         )
 
-    def _calculate_product_similarity(
-        self,
-        products1: List[str],
-        products2: List[str]
-    ) -> float:
-        """Calcule la similarité entre deux listes de produits."""
-        if not products1 or not products2:
-            return 0.0
-
-        set1 = set(products1)
-        set2 = set(products2)
-
-        intersection = len(set1 & set2)
-        union = len(set1 | set2)
-
-        return intersection / union if union > 0 else 0.0
-
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Calcule la similarité entre deux textes (Jaccard sur mots)."""
-        if not text1 or not text2:
-            return 0.0
-
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-
-        intersection = len(words1 & words2)
-        union = len(words1 | words2)
-
-        return intersection / union if union > 0 else 0.0
-
 
 # --- Singleton ---
 
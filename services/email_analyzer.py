@@ -72,6 +72,48 @@ QUANTITY_PATTERNS = [
 ]
 
 
+def _keyword_trie_pattern(words: List[str]) -> str:
+    """
+    Expression régulière en arbre de préfixes : 'offre' et 'offre de prix'
+    deviennent 'offre(?: de prix)?'. Une seule passe sur le texte (comme un
+    automate Aho–Corasick) mais exécutée par le moteur C de `re`, plus rapide
+    qu'un automate en Python pur ; à chaque position, la plus longue entrée
+    est prise (quantificateurs gloutons).
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+# Matchers pré-compilés de quick_classify (textes déjà en minuscules)
+# Sujet : lookahead pour obtenir à chaque position la plus longue clé, même chevauchante ;
+# les clés plus courtes commençant au même endroit en sont des préfixes
+_SUBJECT_KEYWORDS_RE = re.compile(f"(?=({_keyword_trie_pattern(QUOTE_KEYWORDS_SUBJECT)}))")
+_SUBJECT_KEYWORD_PREFIXES = {
+    keyword: {other for other in QUOTE_KEYWORDS_SUBJECT if keyword.startswith(other)}
+    for keyword in QUOTE_KEYWORDS_SUBJECT
+}
+# Corps : une seule phrase suffit, celles qui en contiennent une autre sont redondantes
+_BODY_PHRASES_RE = re.compile(_keyword_trie_pattern([
+    phrase for phrase in QUOTE_KEYWORDS_BODY
+    if not any(other != phrase and other in phrase for other in QUOTE_KEYWORDS_BODY)
+]))
+# Union de QUANTITY_PATTERNS compilée une fois : une seule recherche au lieu d'une par motif
+_QUANTITY_RE = re.compile("|".join(f"(?:{pattern})" for pattern in QUANTITY_PATTERNS))
+
+
 # Modèles de données
 class ExtractedProduct(BaseModel):
     description: Optional[str] = ""
@@ -223,35 +265,33 @@ class EmailAnalyzer:
 
     def quick_classify(self, subject: str, body_preview: str) -> Dict[str, Any]:
         """
-        Pré-filtrage rapide basé sur des règles (sans LLM).
+        Pré-filtrage rapide basé sur des règles (sans LLM), matchers pré-compilés.
         Retourne un score de probabilité et les règles matchées.
         """
         subject_lower = subject.lower()
         body_lower = body_preview.lower()
-        combined = f"{subject_lower} {body_lower}"
 
         matched_rules = []
         score = 0
 
         # Vérifier les mots-clés dans le sujet (poids plus élevé)
+        found = set()
+        for match in _SUBJECT_KEYWORDS_RE.finditer(subject_lower):
+            found |= _SUBJECT_KEYWORD_PREFIXES[match.group(1)]
         for keyword in QUOTE_KEYWORDS_SUBJECT:
-            if keyword in subject_lower:
+            if keyword in found:
                 matched_rules.append(f"Subject contains '{keyword}'")
                 score += 30
 
-        # Vérifier les phrases dans le body
-        for phrase in QUOTE_KEYWORDS_BODY:
-            if phrase in body_lower:
-                matched_rules.append(f"Body contains quote phrase")
-                score += 25
-                break  # Une seule phrase suffit
+        # Vérifier les phrases dans le body (une seule phrase suffit)
+        if _BODY_PHRASES_RE.search(body_lower):
+            matched_rules.append(f"Body contains quote phrase")
+            score += 25
 
         # Vérifier les patterns de quantité
-        for pattern in QUANTITY_PATTERNS:
-            if re.search(pattern, combined, re.IGNORECASE):
-                matched_rules.append("Contains quantity patterns")
-                score += 15
-                break
+        if _QUANTITY_RE.search(f"{subject_lower} {body_lower}"):
+            matched_rules.append("Contains quantity patterns")
+            score += 15
 
         # Déterminer le niveau de confiance du pré-filtrage
         if score >= 50:
@@ -6,7 +6,7 @@ import json
 import time
 import os
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import httpx
 from sqlalchemy import text
 from db.session import SessionLocal
@@ -23,21 +23,25 @@ STATUS_ICONS = {
     "timeout": "[TIMEOUT]"
 }
 
+# Délais des sondes : chacune est bornée, l'ensemble aussi (sondes lancées en parallèle)
+PROBE_TIMEOUT_S = float(os.getenv("HEALTH_PROBE_TIMEOUT_S", "10"))
+HEALTH_CHECK_DEADLINE_S = float(os.getenv("HEALTH_CHECK_DEADLINE_S", "12"))
+# Rafraîchissement périodique du rapport servi par /health, hors sondes LLM
+# (0 = désactivé : sondes au démarrage et via /diagnostic/recheck uniquement)
+HEALTH_REFRESH_INTERVAL_S = float(os.getenv("HEALTH_REFRESH_INTERVAL_S", "60"))
+# Sondes facturées (appels LLM) : jamais relancées par le rafraîchissement périodique
+PAID_PROBES = ("claude_api", "mistral_api")
+
 class HealthChecker:
     """Vérification complète des connexions et services NOVA au démarrage"""
     
     def __init__(self):
         self.test_results = {}
         self.start_time = None
-        
-    async def run_full_health_check(self) -> Dict[str, Any]:
-        """Exécute tous les tests de santé du système"""
-        self.start_time = time.time()
-        logger.info("DEMARRAGE DES TESTS DE SANTE NOVA")
-        logger.info("-" * 80)
-        
-        # Tests critiques à exécuter
-        tests = [
+
+    def _probes(self):
+        """Tests critiques à exécuter"""
+        return [
             ("environment_check", self._test_environment),
             ("database", self._test_database),
             ("sap_connection", self._test_sap_connection),
@@ -46,35 +50,72 @@ class HealthChecker:
             ("sap_data_retrieval", self._test_sap_data_retrieval),
             ("routes_availability", self._test_routes_availability)
         ]
+
+    async def _run_probe(self, test_name: str, test_func) -> None:
+        start_test_time = time.time()
+        try:
+            result = await asyncio.wait_for(test_func(), timeout=PROBE_TIMEOUT_S)
+            duration = round((time.time() - start_test_time) * 1000, 1)
+
+            if result.get("success", False):
+                logger.info(f"{STATUS_ICONS['success']} {test_name}: {result.get('message', 'OK')} ({duration}ms)")
+            else:
+                logger.info(f"{STATUS_ICONS['error']} {test_name}: {result.get('message', 'Échec')} ({duration}ms)")
+
+            self.test_results[test_name] = result
+
+        except asyncio.TimeoutError:
+            logger.info(f"{STATUS_ICONS['timeout']} {test_name}: Timeout après {PROBE_TIMEOUT_S:g}s")
+            self.test_results[test_name] = {
+                "success": False,
+                "message": f"Timeout après {PROBE_TIMEOUT_S:g}s",
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            logger.info(f"{STATUS_ICONS['error']} {test_name}: Erreur - {str(e)}")
+            self.test_results[test_name] = {
+                "success": False,
+                "message": f"Erreur: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            }
         
-        # Exécution séquentielle des tests
-        for test_name, test_func in tests:
-            try:
-                start_test_time = time.time()
-                result = await asyncio.wait_for(test_func(), timeout=10.0)
-                duration = round((time.time() - start_test_time) * 1000, 1)
-                
-                if result.get("success", False):
-                    logger.info(f"{STATUS_ICONS['success']} {test_name}: {result.get('message', 'OK')} ({duration}ms)")
-                else:
-                    logger.info(f"{STATUS_ICONS['error']} {test_name}: {result.get('message', 'Échec')} ({duration}ms)")
-                
-                self.test_results[test_name] = result
-                
-            except asyncio.TimeoutError:
-                logger.info(f"{STATUS_ICONS['timeout']} {test_name}: Timeout après 10s")
-                self.test_results[test_name] = {
-                    "success": False,
-                    "message": "Timeout après 10s",
-                    "timestamp": datetime.now().isoformat()
-                }
-            except Exception as e:
-                logger.info(f"{STATUS_ICONS['error']} {test_name}: Erreur - {str(e)}")
-                self.test_results[test_name] = {
-                    "success": False,
-                    "message": f"Erreur: {str(e)}",
-                    "timestamp": datetime.now().isoformat()
-                }
+    async def run_full_health_check(self, skip: tuple = (),
+                                    previous_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Exécute tous les tests de santé du système (en parallèle, délai global borné).
+        Les sondes de `skip` ne sont pas relancées : leur dernier résultat
+        (`previous_results`) est repris dans le rapport.
+        """
+        self.start_time = time.time()
+        logger.info("DEMARRAGE DES TESTS DE SANTE NOVA")
+        logger.info("-" * 80)
+
+        probes = self._probes()
+        for test_name in skip:
+            if previous_results and test_name in previous_results:
+                self.test_results[test_name] = previous_results[test_name]
+        tasks = {
+            asyncio.create_task(self._run_probe(test_name, test_func)): test_name
+            for test_name, test_func in probes
+            if test_name not in self.test_results
+        }
+        _, pending = await asyncio.wait(tasks, timeout=HEALTH_CHECK_DEADLINE_S) if tasks else (set(), set())
+
+        # Sondes encore en cours à l'échéance globale : annulées et comptées en timeout
+        for task in pending:
+            task.cancel()
+            test_name = tasks[task]
+            logger.info(f"{STATUS_ICONS['timeout']} {test_name}: Délai global de {HEALTH_CHECK_DEADLINE_S:g}s dépassé")
+            self.test_results[test_name] = {
+                "success": False,
+                "message": f"Délai global de {HEALTH_CHECK_DEADLINE_S:g}s dépassé",
+                "timestamp": datetime.now().isoformat()
+            }
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # Ordre du rapport identique à l'ordre de déclaration des sondes
+        self.test_results = {name: self.test_results[name] for name, _ in probes if name in self.test_results}
         
         # Construction du rapport final
         return self._build_final_report()
@@ -433,4 +474,77 @@ class HealthChecker:
                 elif test_name == "routes_availability":
                     recommendations.append("[FIX] Vérifier l'installation des modules de routes")
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+
+
+# --- Rapport partagé (sondes au démarrage, sur demande et périodiques hors LLM) ---
+
+_cached_report: Optional[Dict[str, Any]] = None
+_refresh_task: Optional[asyncio.Task] = None
+_refresher_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_report(skip: tuple = ()) -> Dict[str, Any]:
+    global _cached_report
+    previous = _cached_report["detailed_results"] if _cached_report else None
+    report = await HealthChecker().run_full_health_check(skip=skip, previous_results=previous)
+    _cached_report = report
+    return report
+
+
+def _start_refresh(skip: tuple = ()) -> asyncio.Task:
+    """Rafraîchissement en cours, ou nouveau (une seule série de sondes à la fois)."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_report(skip))
+    return _refresh_task
+
+
+async def get_health_report(force: bool = False) -> Dict[str, Any]:
+    """
+    Dernier rapport de santé.
+
+    - rapport existant : servi tel quel, sans sonder les backends
+    - aucun rapport ou force=True : attend une série de sondes (partagée
+      entre appelants simultanés)
+    """
+    if force or _cached_report is None:
+        return await asyncio.shield(_start_refresh())
+    return _cached_report
+
+
+def get_cached_health_report() -> Optional[Dict[str, Any]]:
+    """Dernier rapport de santé, sans jamais lancer de sonde (None si aucun)."""
+    return _cached_report
+
+
+async def _refresher_loop(interval_s: float) -> None:
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await asyncio.shield(_start_refresh(skip=PAID_PROBES))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f"Rafraîchissement du rapport de santé échoué : {exc}")
+
+
+def start_health_refresher(interval_s: float = HEALTH_REFRESH_INTERVAL_S) -> None:
+    """Rafraîchissement périodique hors sondes LLM (à appeler depuis le lifespan ; 0 = désactivé)."""
+    global _refresher_task
+    if interval_s <= 0:
+        return
+    if _refresher_task is None or _refresher_task.done():
+        _refresher_task = asyncio.create_task(_refresher_loop(interval_s))
+        logger.info(f"✅ Rafraîchissement du rapport de santé toutes les {interval_s:g}s (hors LLM)")
+
+
+async def stop_health_refresher() -> None:
+    global _refresher_task
+    if _refresher_task is not None:
+        _refresher_task.cancel()
+        try:
+            await _refresher_task
+        except asyncio.CancelledError:
+            pass
+        _refresher_task = None
@@ -1,13 +1,23 @@
 # services/local_product_search.py
 # Service de recherche locale produits avec LLM
 
-import os
 import logging
 from typing import Dict, List, Any, Optional
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 from dotenv import load_dotenv
 from services.llm_extractor import LLMExtractor
+from services.product_keywords_cache import (
+    RULES_MIN_CONFIDENCE,
+    get_cached_keywords,
+    normalize_description,
+    rule_based_keywords,
+    store_keywords,
+)
+from services.produits_sap_search import (
+    get_produits_sap_engine,
+    get_produits_sap_sessionmaker,
+    search_similar_products,
+)
 
 logger = logging.getLogger('local_product_search')
 load_dotenv()
@@ -16,9 +26,9 @@ class LocalProductSearchService:
     """Service de recherche locale dans produits_sap avec assistance LLM"""
     
     def __init__(self):
-        db_url = os.getenv("DATABASE_URL")
-        self.engine = create_engine(db_url)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        # Pool partagé du processus (plus de moteur par instance)
+        self.engine = get_produits_sap_engine()
+        self.SessionLocal = get_produits_sap_sessionmaker()
         self.llm_extractor = LLMExtractor()
     
     async def search_products(self, product_name: str, product_code: str = "") -> Dict[str, Any]:
@@ -96,7 +106,23 @@ class LocalProductSearchService:
         return []
     
     async def _extract_search_keywords(self, product_name: str) -> Dict[str, str]:
-        """Extraction mots-clés via LLM pour recherche optimisée"""
+        """
+        Extraction mots-clés pour recherche optimisée :
+        cache (description normalisée) -> règles déterministes -> LLM si confiance faible
+        """
+        
+        normalized_key = normalize_description(product_name)
+        try:
+            cached = get_cached_keywords(normalized_key)
+            if cached:
+                return cached
+        except Exception as e:
+            logger.warning(f"⚠️ Lecture cache mots-clés échouée: {str(e)}")
+        
+        rules_keywords, confidence = rule_based_keywords(product_name)
+        if confidence >= RULES_MIN_CONFIDENCE:
+            self._remember_keywords(normalized_key, rules_keywords, "rules", confidence)
+            return rules_keywords
         
         try:
             prompt = f"""
@@ -115,12 +141,14 @@ class LocalProductSearchService:
             response = await self.llm_extractor.extract_with_claude(prompt)
             
             if response and "category" in response:
-                return {
+                llm_keywords = {
                     "category": response.get("category", "autre"),
                     "tech_keywords": response.get("tech_keywords", ""),
                     "brand_hint": response.get("brand_hint", ""),
                     "specs_hint": response.get("specs_hint", "")
                 }
+                self._remember_keywords(normalized_key, llm_keywords, "llm", None)
+                return llm_keywords
                 
         except Exception as e:
             logger.warning(f"⚠️ LLM extraction échouée: {str(e)}")
@@ -133,6 +161,13 @@ class LocalProductSearchService:
             "specs_hint": ""
         }
     
+    def _remember_keywords(self, normalized_key: str, keywords: Dict[str, str], source: str, confidence: Optional[float]) -> None:
+        """Mémorise une extraction (le cache n'est jamais bloquant)"""
+        try:
+            store_keywords(normalized_key, keywords, source, confidence)
+        except Exception as e:
+            logger.warning(f"⚠️ Écriture cache mots-clés échouée: {str(e)}")
+    
     def _build_intelligent_sql(self, keywords: Dict[str, str]) -> str:
         """Construction requête SQL intelligente basée sur les mots-clés LLM"""
         
@@ -171,30 +206,20 @@ class LocalProductSearchService:
         return base_query
     
     def _fuzzy_search(self, product_name: str) -> List[Dict[str, Any]]:
-        """Recherche fuzzy en dernier recours"""
+        """Recherche fuzzy en dernier recours (trigramme indexé, une requête classée)"""
         
-        with self.SessionLocal() as session:
-            try:
-                # Recherche avec similarity PostgreSQL
-                results = session.execute(
-                    text("""
-                    SELECT item_code, item_name, u_description, avg_price, on_hand,
-                           items_group_code, manufacturer, sales_unit,
-                           similarity(item_name, :name) as sim_score
-                    FROM produits_sap 
-                    WHERE valid = true 
-                      AND similarity(item_name, :name) > 0.3
-                    ORDER BY sim_score DESC, on_hand DESC
-                    LIMIT 5
-                    """),
-                    {"name": product_name}
-                ).fetchall()
-                
-                if results:
-                    return [self._format_product_result(row) for row in results]
-                    
-            except Exception as e:
-                logger.error(f"❌ Erreur fuzzy search: {str(e)}")
+        try:
+            # Dernier recours : produits sans stock inclus
+            results = search_similar_products(product_name, limit=5, in_stock_only=False)
+            for product in results:
+                product.update({
+                    "price": product["AvgPrice"],
+                    "unit_price": product["AvgPrice"],
+                    "currency": "EUR",
+                })
+            return results
+        except Exception as e:
+            logger.error(f"❌ Erreur fuzzy search: {str(e)}")
         
         return []
     
@@ -359,7 +359,12 @@ class MCPConnector:
                     "quota_exceeded": True,
                 }
 
-        result = await MCPConnector._call_mcp("sap_mcp", action, params)
+        try:
+            result = await MCPConnector._call_mcp("sap_mcp", action, params)
+        except Exception:
+            if gated:
+                get_quote_quota_service().release()
+            raise
 
         if gated and MCPConnector._is_quotation_created(result):
             try:
@@ -369,6 +374,9 @@ class MCPConnector:
                     "⚠️ Devis SAP créé via MCP (%s) mais incrément du compteur de "
                     "quota échoué : %s", action, quota_exc,
                 )
+        elif gated:
+            # Création en échec : unité de quota rendue
+            get_quote_quota_service().release()
 
         return result
 
@@ -966,6 +974,7 @@ class MCPConnector:
                 await self._init_sap()
 
             if not self.sap_client:
+                get_quote_quota_service().release()
                 return {"success": False, "error": "Connexion SAP non disponible"}
 
             endpoint = "/Quotations"
@@ -989,6 +998,8 @@ class MCPConnector:
                         "incrément du compteur de quota échoué : %s",
                         result.get("DocEntry"), quota_exc,
                     )
+            else:
+                get_quote_quota_service().release()
 
             return {
                 "success": True,
@@ -1000,6 +1011,10 @@ class MCPConnector:
 
         except Exception as e:
             logger.error(f"Erreur création devis SAP: {str(e)}")
+            # Création en échec : unité de quota rendue (sauf délai dépassé : le
+            # devis a pu être créé côté SAP)
+            if not isinstance(e, httpx.TimeoutException):
+                get_quote_quota_service().release()
             return {"success": False, "error": str(e)}
 
     # ===================================================================
@@ -1,16 +1,18 @@
 """
 Module de colisage (packing) NOVA
-Algorithme First Fit Decreasing pour calcul automatique des colis
+Colisage 3D par blocs (SpacePacker3D) ; First Fit Decreasing volumique conservé
 """
 
 from .packing_service import PackingService, get_packing_service
 from .packing_algorithm import FirstFitDecreasingPacker
+from .packing_3d import SpacePacker3D
 from .box_catalog import BOX_CATALOG, BoxSpec, BoxType
 
 __all__ = [
     "PackingService",
     "get_packing_service",
     "FirstFitDecreasingPacker",
+    "SpacePacker3D",
     "BOX_CATALOG",
     "BoxSpec",
     "BoxType",
@@ -0,0 +1,156 @@
+"""
+Résolution groupée des poids/dimensions depuis supplier_tariffs_db
+
+- Une seule requête indexée (reference_norm IN …) pour tous les articles d'un devis
+- Cache mémoire LRU des résultats (y compris « inconnu »), invalidé dès que
+  les tarifs fournisseurs sont réindexés (compteur tariffs_generation, lu une
+  fois par résolution : valable pour tous les workers)
+"""
+
+from __future__ import annotations
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DIMENSION_CACHE_MAX_ENTRIES = 5000
+
+
+def extract_dimensions(product: Dict[str, Any], item_code: str = "") -> Optional[Dict[str, float]]:
+    """Extrait poids + dimensions (cm) d'une ligne supplier_products, None si absentes."""
+    result: Dict[str, float] = {}
+
+    # Poids
+    if product.get("weight"):
+        result["weight"] = float(product["weight"])
+
+    # Dimensions (stockées en JSON : {"length": x, "width": y, "height": z})
+    dims_raw = product.get("dimensions")
+    if dims_raw:
+        try:
+            dims = json.loads(dims_raw) if isinstance(dims_raw, str) else dims_raw
+            # Tolérer "l", "w", "h" ou "length", "width", "height"
+            result["length_cm"] = float(
+                dims.get("length") or dims.get("l") or dims.get("longueur") or 0
+            )
+            result["width_cm"] = float(
+                dims.get("width") or dims.get("w") or dims.get("largeur") or 0
+            )
+            result["height_cm"] = float(
+                dims.get("height") or dims.get("h") or dims.get("hauteur") or 0
+            )
+            # Supprimer les zéros (données absentes)
+            result = {k: v for k, v in result.items() if v > 0}
+        except (json.JSONDecodeError, TypeError, ValueError, AttributeError) as exc:
+            logger.warning(
+                f"⚠️ Impossible de parser dimensions pour {item_code}: {exc}"
+            )
+
+    return result if result else None
+
+
+class DimensionResolver:
+    """Résout les dimensions de plusieurs articles en une requête, avec cache."""
+
+    def __init__(self, max_entries: int = DIMENSION_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Optional[Dict[str, float]]]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self.queries = 0  # requêtes SQLite de recherche émises (observabilité / tests)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._generation = None
+
+    def _check_generation(self) -> None:
+        from services.supplier_tariffs_db import get_tariffs_generation
+
+        generation = get_tariffs_generation()
+        with self._lock:
+            if generation != self._generation:
+                if self._generation is not None:
+                    logger.info("♻️ Tarifs réindexés — cache des dimensions vidé")
+                self._cache.clear()
+                self._generation = generation
+
+    def resolve_many(self, item_codes: Iterable[str]) -> Dict[str, Optional[Dict[str, float]]]:
+        """
+        Retourne {item_code: {weight, length_cm, width_cm, height_cm} partiel, ou None}.
+        Les articles déjà en cache ne sont pas relus.
+        """
+        codes = list(dict.fromkeys(item_codes))
+        if not codes:
+            return {}
+
+        try:
+            self._check_generation()
+        except Exception as exc:
+            logger.error(f"✗ Lecture version tarifs impossible : {exc}")
+            return {code: None for code in codes}
+
+        results: Dict[str, Optional[Dict[str, float]]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for code in codes:
+                if code in self._cache:
+                    self._cache.move_to_end(code)
+                    results[code] = self._cache[code]
+                else:
+                    missing.append(code)
+
+        if missing:
+            fetched = self._fetch(missing)
+            if fetched is None:
+                # Erreur DB passagère : rien n'est mis en cache, prochaine résolution relue
+                results.update((code, None) for code in missing)
+                return results
+            with self._lock:
+                for code in missing:
+                    results[code] = fetched.get(code)
+                    if code in fetched:
+                        self._cache[code] = results[code]
+                        self._cache.move_to_end(code)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        return results
+
+    def _fetch(self, item_codes: List[str]) -> Optional[Dict[str, Optional[Dict[str, float]]]]:
+        """Dimensions des articles répondus par la requête (None si la requête a échoué)."""
+        try:
+            from services.supplier_tariffs_db import find_products_by_references  # éviter import circulaire
+
+            self.queries += 1
+            rows_by_code = find_products_by_references(item_codes)
+        except Exception as exc:
+            logger.error(f"✗ Erreur DB dimensions ({len(item_codes)} articles): {exc}")
+            return None
+
+        resolved: Dict[str, Optional[Dict[str, float]]] = {}
+        for code, rows in rows_by_code.items():
+            # Première ligne portant des données logistiques
+            resolved[code] = next(
+                (dims for dims in (extract_dimensions(row, code) for row in rows) if dims),
+                None,
+            )
+        return resolved
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Singleton
+# ─────────────────────────────────────────────────────────────────────────────
+
+_dimension_resolver: Optional[DimensionResolver] = None
+
+
+def get_dimension_resolver() -> DimensionResolver:
+    """Factory singleton du résolveur de dimensions."""
+    global _dimension_resolver
+    if _dimension_resolver is None:
+        _dimension_resolver = DimensionResolver()
+    return _dimension_resolver
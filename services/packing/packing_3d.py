@@ -0,0 +1,271 @@
+"""
+Algorithme de colisage 3D par blocs (guillotine)
+Place réellement les articles dans l'espace des colis BOX_CATALOG
+
+Principe :
+1. Regrouper les articles identiques (code + dimensions + poids) : une ligne de
+   500 pièces reste UN groupe avec un compteur, jamais 500 objets
+2. Trier les groupes par volume unitaire décroissant (comme le FFD)
+3. Chaque colis tient une liste d'espaces libres (x, y, z, dx, dy, dz) ;
+   un placement pose un BLOC rectangulaire nx × ny × nz d'unités identiques
+   dans le premier espace libre (bas, fond, gauche), selon l'orientation
+   qui y loge le plus d'unités, puis découpe le reste en 3 espaces
+4. Si aucun colis ouvert ne convient : ouvrir le plus petit colis pouvant
+   contenir une unité (dimensions réelles + poids)
+
+Le calcul travaille sur des tuples numériques ; les modèles pydantic ne sont
+construits qu'en sortie (un PackageResult par colis).
+"""
+
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+
+from .box_catalog import BOX_CATALOG, BoxSpec
+from .packing_algorithm import PackageResult, PackingItem, PackingResult
+
+logger = logging.getLogger(__name__)
+
+# Tolérance numérique sur les dimensions (cm) et le poids (kg)
+_EPS = 1e-6
+
+Space = Tuple[float, float, float, float, float, float]  # x, y, z, dx, dy, dz
+Dims = Tuple[float, float, float]
+
+
+@dataclass
+class _ItemGroup:
+    """Articles identiques à placer"""
+    item_code: str
+    weight_kg: float
+    orientations: Tuple[Dims, ...]
+    remaining: int
+
+    @property
+    def unit_volume(self) -> float:
+        l, w, h = self.orientations[0]
+        return l * w * h
+
+
+class _OpenBox:
+    """Colis en cours de remplissage : espaces libres + compteurs"""
+
+    __slots__ = ("spec", "spaces", "weight_kg", "volume_cm3", "counts", "oversize")
+
+    def __init__(self, spec: BoxSpec, oversize: bool = False) -> None:
+        self.spec = spec
+        self.spaces: List[Space] = (
+            [] if oversize else [(0.0, 0.0, 0.0, spec.length_cm, spec.width_cm, spec.height_cm)]
+        )
+        self.weight_kg = 0.0
+        self.volume_cm3 = 0.0
+        self.counts: Dict[str, int] = {}
+        self.oversize = oversize
+
+    @property
+    def is_full(self) -> bool:
+        return not self.spaces or self.weight_kg >= self.spec.max_weight_kg - _EPS
+
+    def _weight_capacity(self, unit_weight: float) -> int:
+        if unit_weight <= 0:
+            return 1 << 30
+        return int((self.spec.max_weight_kg - self.weight_kg + _EPS) // unit_weight)
+
+    def place_block(self, group: _ItemGroup) -> int:
+        """Pose un bloc d'unités du groupe ; retourne le nombre d'unités placées (0 si impossible)."""
+        limit = min(group.remaining, self._weight_capacity(group.weight_kg))
+        if limit <= 0:
+            return 0
+
+        for index, (x, y, z, dx, dy, dz) in enumerate(self.spaces):
+            best: Optional[Tuple[int, float, Dims, Tuple[int, int, int]]] = None
+            for ol, ow, oh in group.orientations:
+                if ol > dx + _EPS or ow > dy + _EPS or oh > dz + _EPS:
+                    continue
+                nx = int((dx + _EPS) // ol)
+                ny = int((dy + _EPS) // ow)
+                nz = int((dz + _EPS) // oh)
+                block = _block_shape(nx, ny, nz, limit)
+                units = block[0] * block[1] * block[2]
+                # Plus d'unités d'abord, puis le bloc le moins haut (couches stables)
+                key = (units, -block[2] * oh)
+                if best is None or key > (best[0], best[1]):
+                    best = (units, -block[2] * oh, (ol, ow, oh), block)
+            if best is None:
+                continue
+
+            units, _, (ol, ow, oh), (bx, by, bz) = best
+            sx, sy, sz = bx * ol, by * ow, bz * oh
+            del self.spaces[index]
+            residual = [
+                (x + sx, y, z, dx - sx, dy, dz),    # à droite du bloc, toute profondeur
+                (x, y + sy, z, sx, dy - sy, dz),    # devant le bloc
+                (x, y, z + sz, sx, sy, dz - sz),    # au-dessus du bloc
+            ]
+            self.spaces.extend(s for s in residual if s[3] > _EPS and s[4] > _EPS and s[5] > _EPS)
+            self.spaces.sort(key=lambda s: (s[2], s[1], s[0]))
+
+            self._add(group, units, ol * ow * oh)
+            return units
+        return 0
+
+    def _add(self, group: _ItemGroup, units: int, unit_volume: float) -> None:
+        self.weight_kg += units * group.weight_kg
+        self.volume_cm3 += units * unit_volume
+        self.counts[group.item_code] = self.counts.get(group.item_code, 0) + units
+        group.remaining -= units
+
+    def add_oversize_unit(self, group: _ItemGroup) -> None:
+        self._add(group, 1, group.unit_volume)
+
+
+def _block_shape(nx: int, ny: int, nz: int, limit: int) -> Tuple[int, int, int]:
+    """Plus grand bloc rectangulaire (rempli en x, puis y, puis z) d'au plus `limit` unités."""
+    layer = nx * ny
+    if limit >= layer * nz:
+        return nx, ny, nz
+    if limit >= layer:
+        return nx, ny, limit // layer
+    if limit >= nx:
+        return nx, limit // nx, 1
+    return limit, 1, 1
+
+
+def _orientations(item: PackingItem) -> Tuple[Dims, ...]:
+    dims = (item.length_cm or 0.0, item.width_cm or 0.0, item.height_cm or 0.0)
+    if item.keep_upright:
+        candidates = [(dims[0], dims[1], dims[2]), (dims[1], dims[0], dims[2])]
+    else:
+        candidates = list(permutations(dims))
+    # Dimensions nulles : l'article n'occupe pas de place mais doit rester plaçable
+    return tuple(dict.fromkeys((max(l, _EPS), max(w, _EPS), max(h, _EPS)) for l, w, h in candidates))
+
+
+class SpacePacker3D:
+    """
+    Colisage 3D : placement géométrique par blocs, orientations autorisées,
+    articles identiques regroupés. Remplace le critère purement volumique du FFD.
+    """
+
+    def pack(self, items: List[PackingItem]) -> PackingResult:
+        """
+        Lance le placement 3D sur la liste d'articles.
+
+        Args:
+            items: Articles à emballer (avec quantités)
+
+        Returns:
+            PackingResult avec la liste des colis et statistiques
+        """
+        if not items:
+            return PackingResult()
+
+        warnings: List[str] = []
+        groups = self._group_items(items)
+        groups.sort(key=lambda g: (g.unit_volume, g.weight_kg), reverse=True)
+
+        boxes: List[_OpenBox] = []
+        open_boxes: List[_OpenBox] = []
+
+        for group in groups:
+            # Un colis refusé pour ce groupe le restera (espaces et poids ne font que diminuer)
+            candidates = [b for b in open_boxes if not b.is_full]
+            while group.remaining > 0:
+                placed = 0
+                while candidates and not placed:
+                    placed = candidates[0].place_block(group)
+                    if not placed:
+                        candidates.pop(0)
+                if placed:
+                    continue
+
+                spec = self._select_box(group)
+                if spec is None:
+                    l, w, h = group.orientations[0]
+                    warnings.append(
+                        f"Article {group.item_code} ({group.weight_kg}kg, {l:g}×{w:g}×{h:g}cm) "
+                        f"dépasse tous les formats disponibles — {group.remaining} unité(s) "
+                        "placée(s) en palette par défaut"
+                    )
+                    while group.remaining > 0:
+                        oversize = _OpenBox(BOX_CATALOG[-1], oversize=True)
+                        oversize.add_oversize_unit(group)
+                        boxes.append(oversize)
+                    break
+
+                box = _OpenBox(spec)
+                boxes.append(box)
+                open_boxes.append(box)
+                candidates.append(box)
+            open_boxes = [b for b in open_boxes if not b.is_full]
+
+        packages = [self._to_package(box) for box in boxes]
+
+        total_weight = round(sum(p.weight_kg for p in packages), 3)
+        total_volume = round(sum(p.volume_m3 for p in packages), 6)
+
+        result = PackingResult(
+            packages=packages,
+            total_weight_kg=total_weight,
+            total_volume_m3=total_volume,
+            box_count=len(packages),
+            warnings=warnings,
+        )
+        result.summary = result.build_summary()
+
+        logger.info(
+            f"✓ Colisage 3D : {len(packages)} colis | "
+            f"{total_weight} kg | {total_volume:.4f} m³"
+        )
+
+        return result
+
+    # ─────────────────────────────────────────────────────────────
+    # Méthodes privées
+    # ─────────────────────────────────────────────────────────────
+
+    def _group_items(self, items: List[PackingItem]) -> List[_ItemGroup]:
+        """Fusionne les lignes identiques (même code, dimensions, poids, contrainte)"""
+        groups: Dict[tuple, _ItemGroup] = {}
+        for item in items:
+            key = (
+                item.item_code, item.weight_kg, item.length_cm,
+                item.width_cm, item.height_cm, item.keep_upright,
+            )
+            if key in groups:
+                groups[key].remaining += item.quantity
+            else:
+                groups[key] = _ItemGroup(
+                    item_code=item.item_code,
+                    weight_kg=item.weight_kg,
+                    orientations=_orientations(item),
+                    remaining=item.quantity,
+                )
+        return list(groups.values())
+
+    def _select_box(self, group: _ItemGroup) -> Optional[BoxSpec]:
+        """Plus petit colis pouvant contenir une unité (poids + une orientation autorisée)."""
+        for spec in BOX_CATALOG:
+            if group.weight_kg > spec.max_weight_kg + _EPS:
+                continue
+            for l, w, h in group.orientations:
+                if l <= spec.length_cm + _EPS and w <= spec.width_cm + _EPS and h <= spec.height_cm + _EPS:
+                    return spec
+        return None
+
+    def _to_package(self, box: _OpenBox) -> PackageResult:
+        spec = box.spec
+        return PackageResult(
+            box_type=spec.type,
+            label=spec.label,
+            length_cm=spec.length_cm,
+            width_cm=spec.width_cm,
+            height_cm=spec.height_cm,
+            weight_kg=round(box.weight_kg, 3),
+            volume_cm3=round(box.volume_cm3, 1),
+            items_count=sum(box.counts.values()),
+            item_codes=list(box.counts),
+            fill_ratio=round(min(box.volume_cm3 / spec.volume_cm3, 1.0), 3),
+        )
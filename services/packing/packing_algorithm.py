@@ -24,6 +24,7 @@ class PackingItem(BaseModel):
     width_cm: float = Field(default=10.0, ge=0.0, description="Largeur en cm")
     height_cm: float = Field(default=10.0, ge=0.0, description="Hauteur en cm")
     quantity: int = Field(default=1, ge=1, description="Quantité")
+    keep_upright: bool = Field(default=False, description="Rotation autorisée uniquement autour de l'axe vertical")
 
     @property
     def volume_cm3(self) -> float:
@@ -79,6 +80,7 @@ class PackageResult(BaseModel):
     volume_cm3: float
     items_count: int = Field(default=1)
     item_codes: List[str] = Field(default_factory=list)
+    fill_ratio: Optional[float] = Field(default=None, description="Taux de remplissage volumique (colisage 3D)")
 
     @property
     def volume_m3(self) -> float:
@@ -4,13 +4,14 @@ Orchestre le calcul de colisage et enrichit les données depuis supplier_tariffs
 """
 
 from __future__ import annotations
-import json
 import logging
 from typing import Dict, List, Optional, Any
 
 from pydantic import BaseModel, Field
 
-from .packing_algorithm import FirstFitDecreasingPacker, PackingItem, PackingResult
+from .packing_algorithm import PackingItem, PackingResult
+from .packing_3d import SpacePacker3D
+from .dimension_resolver import get_dimension_resolver
 from .box_catalog import BOX_CATALOG, BoxSpec
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,7 @@ class PackingItemInput(BaseModel):
     length_cm: Optional[float] = Field(None, ge=0.0)
     width_cm: Optional[float] = Field(None, ge=0.0)
     height_cm: Optional[float] = Field(None, ge=0.0)
+    keep_upright: bool = Field(default=False, description="Ne pas coucher l'article")
 
 
 class PackingResponse(BaseModel):
@@ -59,7 +61,7 @@ class PackingService:
 
     Responsabilités :
     - Résoudre les dimensions/poids depuis supplier_tariffs_db si absent
-    - Déléguer le calcul FFD à FirstFitDecreasingPacker
+    - Déléguer le placement 3D à SpacePacker3D
     - Formater la réponse pour l'API et pour l'intégration DHL
     """
 
@@ -70,7 +72,8 @@ class PackingService:
     DEFAULT_HEIGHT_CM = 10.0
 
     def __init__(self) -> None:
-        self._packer = FirstFitDecreasingPacker()
+        self._packer = SpacePacker3D()
+        self._resolver = get_dimension_resolver()
 
     async def suggest_packages(
         self, items: List[PackingItemInput]
@@ -80,7 +83,7 @@ class PackingService:
 
         Pipeline :
         1. Résoudre poids/dimensions depuis la DB si non fournis
-        2. Appliquer l'algorithme FFD
+        2. Appliquer le colisage 3D (orientations, articles regroupés)
         3. Formater la réponse (résumé, payload DHL)
 
         Args:
@@ -98,7 +101,7 @@ class PackingService:
                     error="Aucun article valide à emballer"
                 )
 
-            # 2. Algorithme FFD
+            # 2. Colisage 3D
             result: PackingResult = self._packer.pack(packing_items)
 
             # 3. Construire réponse
@@ -130,19 +133,26 @@ class PackingService:
     ) -> List[PackingItem]:
         """
         Enrichit chaque article avec poids/dimensions depuis supplier_tariffs_db
-        si les données ne sont pas fournies dans la requête.
+        si les données ne sont pas fournies dans la requête (une requête groupée
+        pour tous les articles incomplets, via le cache du DimensionResolver).
         """
         resolved: List[PackingItem] = []
 
+        incomplete = [
+            inp.item_code for inp in inputs
+            if any(v is None for v in (inp.weight_kg, inp.length_cm, inp.width_cm, inp.height_cm))
+        ]
+        db_dimensions = self._resolver.resolve_many(incomplete) if incomplete else {}
+
         for inp in inputs:
             weight = inp.weight_kg
             length = inp.length_cm
             width = inp.width_cm
             height = inp.height_cm
 
-            # Si dimensions manquantes, chercher en DB
+            # Si dimensions manquantes, utiliser les données DB
             if any(v is None for v in (weight, length, width, height)):
-                db_data = await self._fetch_dimensions_from_db(inp.item_code)
+                db_data = db_dimensions.get(inp.item_code)
                 if db_data:
                     weight = weight if weight is not None else db_data.get("weight")
                     length = length if length is not None else db_data.get("length_cm")
@@ -175,57 +185,12 @@ class PackingService:
                     width_cm=float(width),
                     height_cm=float(height),
                     quantity=inp.quantity,
+                    keep_upright=inp.keep_upright,
                 )
             )
 
         return resolved
 
-    async def _fetch_dimensions_from_db(
-        self, item_code: str
-    ) -> Optional[Dict[str, float]]:
-        """Cherche poids + dimensions dans supplier_tariffs_db."""
-        try:
-            from services.supplier_tariffs_db import search_products  # éviter import circulaire
-
-            products = search_products(item_code, limit=1)
-            if not products:
-                return None
-
-            product = products[0]
-            result: Dict[str, float] = {}
-
-            # Poids
-            if product.get("weight"):
-                result["weight"] = float(product["weight"])
-
-            # Dimensions (stockées en JSON : {"length": x, "width": y, "height": z})
-            dims_raw = product.get("dimensions")
-            if dims_raw:
-                try:
-                    dims = json.loads(dims_raw) if isinstance(dims_raw, str) else dims_raw
-                    # Tolérer "l", "w", "h" ou "length", "width", "height"
-                    result["length_cm"] = float(
-                        dims.get("length") or dims.get("l") or dims.get("longueur") or 0
-                    )
-                    result["width_cm"] = float(
-                        dims.get("width") or dims.get("w") or dims.get("largeur") or 0
-                    )
-                    result["height_cm"] = float(
-                        dims.get("height") or dims.get("h") or dims.get("hauteur") or 0
-                    )
-                    # Supprimer les zéros (données absentes)
-                    result = {k: v for k, v in result.items() if v > 0}
-                except (json.JSONDecodeError, TypeError, ValueError) as exc:
-                    logger.warning(
-                        f"⚠️ Impossible de parser dimensions pour {item_code}: {exc}"
-                    )
-
-            return result if result else None
-
-        except Exception as exc:
-            logger.error(f"✗ Erreur DB dimensions pour {item_code}: {exc}")
-            return None
-
     # ─────────────────────────────────────────────────────────────
     # Formatage payload DHL
     # ─────────────────────────────────────────────────────────────
@@ -288,5 +253,5 @@ def get_packing_service() -> PackingService:
     global _packing_service
     if _packing_service is None:
         _packing_service = PackingService()
-        logger.info("✓ PackingService initialisé (algorithme FFD)")
+        logger.info("✓ PackingService initialisé (colisage 3D)")
     return _packing_service
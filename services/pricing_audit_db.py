@@ -6,9 +6,9 @@ Extension de supplier_tariffs.db
 import sqlite3
 import json
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from services.pricing_models import PricingDecision, PricingCaseType
 
 logger = logging.getLogger(__name__)
@@ -16,6 +16,17 @@ logger = logging.getLogger(__name__)
 # Utiliser la même base que supplier_tariffs
 DB_PATH = Path(__file__).parent.parent / "data" / "supplier_tariffs.db"
 
+# Colonnes de pricing_statistics alimentées par case_type
+_CASE_COUNT_COLUMNS = {
+    "CAS_1_HC": "cas_1_count",
+    "CAS_2_HCM": "cas_2_count",
+    "CAS_3_HA": "cas_3_count",
+    "CAS_4_NP": "cas_4_count",
+}
+
+# Champs dont la modification oblige à recalculer les statistiques du jour
+_STATISTICS_FIELDS = {"case_type", "requires_validation", "margin_applied", "created_at"}
+
 
 def get_database_path() -> str:
     """Retourne le chemin de la base de données"""
@@ -130,12 +141,24 @@ def init_pricing_audit_tables():
             cas_4_count INTEGER DEFAULT 0,
             requiring_validation INTEGER DEFAULT 0,
             avg_margin REAL DEFAULT 0,
+            margin_sum REAL DEFAULT 0,
+            margin_count INTEGER DEFAULT 0,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
 
+    # Migration : somme/nombre des marges pour maintenir avg_margin incrémentalement
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(pricing_statistics)")}
+    migrated = "margin_sum" not in columns
+    if migrated:
+        cursor.execute("ALTER TABLE pricing_statistics ADD COLUMN margin_sum REAL DEFAULT 0")
+        cursor.execute("ALTER TABLE pricing_statistics ADD COLUMN margin_count INTEGER DEFAULT 0")
+
     conn.commit()
     conn.close()
+
+    if migrated:
+        recompute_statistics()
     logger.info(f"Tables audit pricing initialisées : {DB_PATH}")
 
 
@@ -202,10 +225,10 @@ def save_pricing_decision(decision: PricingDecision) -> int:
         ))
 
         decision_id = cursor.lastrowid
-        conn.commit()
 
-        # Mettre à jour statistiques
-        update_daily_statistics()
+        # Statistiques du jour mises à jour dans la même transaction
+        _increment_statistics(cursor, decision)
+        conn.commit()
 
         logger.info(f"✓ Décision pricing sauvegardée : {decision.decision_id} ({decision.case_type})")
         return decision_id
@@ -312,6 +335,16 @@ def update_pricing_decision(decision_id: str, update_data: dict) -> bool:
 
         values.append(decision_id)  # Pour le WHERE
 
+        affected_days = []
+        if _STATISTICS_FIELDS & update_data.keys():
+            cursor.execute(
+                "SELECT substr(created_at, 1, 10) AS day FROM pricing_decisions WHERE decision_id = ?",
+                (decision_id,),
+            )
+            affected_days = [row["day"] for row in cursor.fetchall()]
+            if "created_at" in update_data:
+                affected_days.append(str(update_data["created_at"])[:10])
+
         query = f"""
             UPDATE pricing_decisions
             SET {', '.join(set_clauses)}
@@ -324,6 +357,9 @@ def update_pricing_decision(decision_id: str, update_data: dict) -> bool:
         rows_affected = cursor.rowcount
         conn.close()
 
+        for day in affected_days:
+            update_daily_statistics(day)
+
         if rows_affected > 0:
             logger.info(f"✓ Décision {decision_id} mise à jour ({len(update_data)} champ(s))")
             return True
@@ -336,44 +372,94 @@ def update_pricing_decision(decision_id: str, update_data: dict) -> bool:
         return False
 
 
-def update_daily_statistics():
-    """Met à jour les statistiques quotidiennes"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _day_bounds(day: Union[date, str]) -> tuple:
+    """Bornes [début, fin) d'un jour, comparables à created_at (plage indexée)."""
+    start = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+    return start.isoformat(), (start + timedelta(days=1)).isoformat()
 
-    today = date.today()
+
+def _increment_statistics(cursor: sqlite3.Cursor, decision: PricingDecision):
+    """Ajoute une décision aux compteurs de son jour (upsert incrémental)."""
+    created_at = decision.created_at or datetime.now()
+    day = created_at.date() if isinstance(created_at, datetime) else date.fromisoformat(str(created_at)[:10])
+    case_column = _CASE_COUNT_COLUMNS.get(decision.case_type.value)
+    counts = {column: int(column == case_column) for column in _CASE_COUNT_COLUMNS.values()}
+    has_margin = decision.margin_applied is not None
 
     cursor.execute("""
         INSERT INTO pricing_statistics (
             date, total_decisions,
             cas_1_count, cas_2_count, cas_3_count, cas_4_count,
-            requiring_validation, avg_margin
-        )
-        SELECT
-            DATE(created_at) as date,
-            COUNT(*) as total_decisions,
-            SUM(CASE WHEN case_type = 'CAS_1_HC' THEN 1 ELSE 0 END) as cas_1_count,
-            SUM(CASE WHEN case_type = 'CAS_2_HCM' THEN 1 ELSE 0 END) as cas_2_count,
-            SUM(CASE WHEN case_type = 'CAS_3_HA' THEN 1 ELSE 0 END) as cas_3_count,
-            SUM(CASE WHEN case_type = 'CAS_4_NP' THEN 1 ELSE 0 END) as cas_4_count,
-            SUM(CASE WHEN requires_validation = 1 THEN 1 ELSE 0 END) as requiring_validation,
-            AVG(margin_applied) as avg_margin
-        FROM pricing_decisions
-        WHERE DATE(created_at) = ?
-        GROUP BY DATE(created_at)
+            requiring_validation, margin_sum, margin_count, avg_margin
+        ) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
         ON CONFLICT(date) DO UPDATE SET
-            total_decisions = excluded.total_decisions,
-            cas_1_count = excluded.cas_1_count,
-            cas_2_count = excluded.cas_2_count,
-            cas_3_count = excluded.cas_3_count,
-            cas_4_count = excluded.cas_4_count,
-            requiring_validation = excluded.requiring_validation,
-            avg_margin = excluded.avg_margin,
+            total_decisions = total_decisions + 1,
+            cas_1_count = cas_1_count + excluded.cas_1_count,
+            cas_2_count = cas_2_count + excluded.cas_2_count,
+            cas_3_count = cas_3_count + excluded.cas_3_count,
+            cas_4_count = cas_4_count + excluded.cas_4_count,
+            requiring_validation = requiring_validation + excluded.requiring_validation,
+            margin_sum = margin_sum + excluded.margin_sum,
+            margin_count = margin_count + excluded.margin_count,
+            avg_margin = CASE WHEN margin_count + excluded.margin_count > 0
+                THEN (margin_sum + excluded.margin_sum) / (margin_count + excluded.margin_count)
+                ELSE 0 END,
             updated_at = CURRENT_TIMESTAMP
-    """, (today,))
+    """, (
+        day.isoformat(),
+        counts["cas_1_count"], counts["cas_2_count"], counts["cas_3_count"], counts["cas_4_count"],
+        int(bool(decision.requires_validation)),
+        decision.margin_applied if has_margin else 0.0,
+        int(has_margin),
+        decision.margin_applied if has_margin else 0.0,
+    ))
+
+
+def recompute_statistics(from_date: Optional[Union[date, str]] = None,
+                         to_date: Optional[Union[date, str]] = None):
+    """
+    Recalcule les statistiques quotidiennes sur une plage de jours (bornes
+    incluses, tout l'historique par défaut) à partir de pricing_decisions.
+    Filtre par plage sur created_at : utilise idx_pricing_created_at.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
 
-    conn.commit()
-    conn.close()
+    start = _day_bounds(from_date)[0] if from_date else "0000-01-01"
+    end = _day_bounds(to_date)[1] if to_date else "9999-12-31"
+
+    try:
+        cursor.execute("DELETE FROM pricing_statistics WHERE date >= ? AND date < ?", (start, end))
+        cursor.execute("""
+            INSERT INTO pricing_statistics (
+                date, total_decisions,
+                cas_1_count, cas_2_count, cas_3_count, cas_4_count,
+                requiring_validation, margin_sum, margin_count, avg_margin
+            )
+            SELECT
+                substr(created_at, 1, 10) as date,
+                COUNT(*) as total_decisions,
+                SUM(CASE WHEN case_type = 'CAS_1_HC' THEN 1 ELSE 0 END) as cas_1_count,
+                SUM(CASE WHEN case_type = 'CAS_2_HCM' THEN 1 ELSE 0 END) as cas_2_count,
+                SUM(CASE WHEN case_type = 'CAS_3_HA' THEN 1 ELSE 0 END) as cas_3_count,
+                SUM(CASE WHEN case_type = 'CAS_4_NP' THEN 1 ELSE 0 END) as cas_4_count,
+                SUM(CASE WHEN requires_validation = 1 THEN 1 ELSE 0 END) as requiring_validation,
+                COALESCE(SUM(margin_applied), 0) as margin_sum,
+                COUNT(margin_applied) as margin_count,
+                COALESCE(AVG(margin_applied), 0) as avg_margin
+            FROM pricing_decisions
+            WHERE created_at >= ? AND created_at < ?
+            GROUP BY substr(created_at, 1, 10)
+        """, (start, end))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def update_daily_statistics(day: Optional[Union[date, str]] = None):
+    """Recalcule les statistiques d'un jour (aujourd'hui par défaut)"""
+    day = day or date.today()
+    recompute_statistics(day, day)
 
 
 def get_statistics(days_back: int = 30) -> List[Dict]:
@@ -381,14 +467,14 @@ def get_statistics(days_back: int = 30) -> List[Dict]:
     conn = get_connection()
     cursor = conn.cursor()
 
-    from_date = date.today().replace(day=1) if days_back > 30 else date.today()
+    from_date = date.today() - timedelta(days=max(days_back, 1) - 1)
 
     cursor.execute("""
         SELECT * FROM pricing_statistics
         WHERE date >= ?
         ORDER BY date DESC
         LIMIT ?
-    """, (from_date, days_back))
+    """, (from_date.isoformat(), days_back))
 
     rows = cursor.fetchall()
     conn.close()
@@ -16,7 +16,7 @@ from services.pricing_models import (
     SupplierPriceVariation
 )
 from services.sap_history_service import get_sap_history_service
-from services.supplier_tariffs_db import search_products
+from services.supplier_tariffs_db import get_supplier_price_by_reference
 import services.pricing_audit_db as pricing_audit_db
 from services.sap_sql_service import get_sap_sql_service
 from services.currency_service import get_currency_service
@@ -591,15 +591,13 @@ class PricingEngine:
             (price: Optional[float], currency: str) — ex: (12.50, "GBP")
         """
         try:
-            # 1. Cherche directement par item_code SAP
-            products = search_products(item_code, limit=1)
-            if products:
-                price = products[0].get('unit_price')
-                currency = products[0].get('currency', 'EUR') or 'EUR'
-                supplier_code = products[0].get('supplier_code')
-                if price and price > 0:
-                    logger.debug(f"Prix fournisseur direct pour {item_code}: {price} {currency}")
-                    return price, currency, supplier_code
+            # 1. Cherche directement par item_code SAP (référence exacte, index B-tree)
+            product = get_supplier_price_by_reference(item_code)
+            if product:
+                price = product['unit_price']
+                currency = product.get('currency', 'EUR') or 'EUR'
+                logger.debug(f"Prix fournisseur direct pour {item_code}: {price} {currency}")
+                return price, currency, product.get('supplier_code')
 
             # 2. Chercher via le mapping de références (external_code → SAP)
             try:
@@ -620,13 +618,12 @@ class PricingEngine:
                 conn.close()
 
                 for ext_code in ext_codes:
-                    products = search_products(ext_code, limit=1)
-                    if products:
-                        price = products[0].get('unit_price')
-                        currency = products[0].get('currency', 'EUR') or 'EUR'
-                        if price and price > 0:
-                            logger.debug(f"Prix fournisseur via mapping {ext_code}→{item_code}: {price} {currency}")
-                            return price, currency, products[0].get('supplier_code')
+                    product = get_supplier_price_by_reference(ext_code)
+                    if product:
+                        price = product['unit_price']
+                        currency = product.get('currency', 'EUR') or 'EUR'
+                        logger.debug(f"Prix fournisseur via mapping {ext_code}→{item_code}: {price} {currency}")
+                        return price, currency, product.get('supplier_code')
             except Exception as map_err:
                 logger.debug(f"Mapping lookup failed: {map_err}")
 
@@ -647,13 +644,12 @@ class PricingEngine:
                     import re
                     nums = re.findall(r'\b\d{7,}\b', row['ItemName'])
                     for num in nums:
-                        products = search_products(num, limit=1)
-                        if products:
-                            price = products[0].get('unit_price')
-                            currency = products[0].get('currency', 'EUR') or 'EUR'
-                            if price and price > 0:
-                                logger.debug(f"Prix fournisseur via nom SAP {num}→{item_code}: {price} {currency}")
-                                return price, currency, None
+                        product = get_supplier_price_by_reference(num)
+                        if product:
+                            price = product['unit_price']
+                            currency = product.get('currency', 'EUR') or 'EUR'
+                            logger.debug(f"Prix fournisseur via nom SAP {num}→{item_code}: {price} {currency}")
+                            return price, currency, None
 
                     # Fallback ultime : prix SAP (AvgStdPrice) — toujours en EUR
                     if row['Price'] and row['Price'] > 0:
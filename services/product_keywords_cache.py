@@ -0,0 +1,196 @@
+"""
+Extraction des mots-clés de recherche produit (LocalProductSearchService)
+
+- Extracteur déterministe à base de règles (catégorie, marque, specs,
+  termes techniques) avec un indice de confiance
+- Cache persistant SQLite indexé par la description normalisée : les
+  descriptions identiques ou quasi identiques (casse, accents, ponctuation,
+  ordre des mots) ne coûtent qu'une extraction
+- Le LLM n'est consulté que si la confiance des règles est insuffisante
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent / "data" / "product_keywords.db"
+
+# Confiance minimale des règles pour se passer du LLM (0..1)
+RULES_MIN_CONFIDENCE = float(os.getenv("KEYWORDS_RULES_MIN_CONFIDENCE", "0.5"))
+
+_STOP_WORDS = {
+    "de", "du", "des", "la", "le", "les", "un", "une", "et", "en", "pour",
+    "avec", "sans", "a", "au", "aux", "the", "for", "with", "and",
+}
+
+# Catégorie -> termes déclencheurs (formes normalisées : minuscules sans accents)
+_CATEGORY_TERMS = {
+    "imprimante": ("imprimante", "printer", "multifonction", "traceur"),
+    "ordinateur": ("ordinateur", "pc", "computer", "laptop", "portable", "notebook", "workstation"),
+    "écran": ("ecran", "moniteur", "monitor", "screen", "display"),
+    "serveur": ("serveur", "server", "nas"),
+    "réseau": ("switch", "routeur", "router", "firewall", "borne", "wifi"),
+    "stockage": ("ssd", "hdd", "disque", "cle"),
+    "consommable": ("toner", "cartouche", "encre", "tambour"),
+}
+
+_BRANDS = (
+    "hp", "canon", "epson", "brother", "xerox", "lexmark", "kyocera", "ricoh",
+    "samsung", "dell", "lenovo", "asus", "acer", "apple", "microsoft", "lg",
+    "philips", "iiyama", "cisco", "netgear", "synology", "logitech", "sharp",
+)
+
+_TECH_TERMS = (
+    "laser", "jet", "couleur", "monochrome", "recto", "verso", "reseau", "wifi",
+    "usb", "ethernet", "bluetooth", "a3", "a4", "ssd", "hdd", "ram", "4k", "hd",
+    "fullhd", "ips", "tactile", "scanner", "fax", "duplex",
+)
+
+_SPEC_RE = re.compile(
+    r"\b\d+(?:[.,]\d+)?\s*(?:ppm|go|gb|to|tb|mo|mb|ghz|mhz|pouces|po|hz|w|mm|cm|kg|dpi)\b"
+)
+
+
+def get_connection() -> sqlite3.Connection:
+    """Crée une connexion à la base SQLite."""
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_database():
+    """Crée la table de cache si elle n'existe pas."""
+    conn = get_connection()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS keyword_extractions (
+            normalized_key TEXT PRIMARY KEY,
+            keywords TEXT NOT NULL,
+            source TEXT NOT NULL,
+            confidence REAL,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def _fold(text: str) -> str:
+    """Minuscules, sans accents"""
+    text = unicodedata.normalize("NFD", text or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def normalize_description(product_name: str) -> str:
+    """
+    Clé de cache d'une description : minuscules, sans accents ni ponctuation,
+    mots vides retirés, mots dédoublonnés et triés.
+    """
+    tokens = re.findall(r"[a-z0-9]+(?:[.,][0-9]+)?", _fold(product_name))
+    return " ".join(sorted({t for t in tokens if t not in _STOP_WORDS}))
+
+
+def rule_based_keywords(product_name: str) -> Tuple[Dict[str, str], float]:
+    """
+    Extraction déterministe au format de l'extraction LLM
+    (category, tech_keywords, brand_hint, specs_hint) + confiance 0..1.
+    """
+    folded = _fold(product_name)
+    tokens = re.findall(r"[a-z0-9]+", folded)
+    token_set = set(tokens)
+
+    category = next(
+        (name for name, terms in _CATEGORY_TERMS.items() if token_set.intersection(terms)),
+        "autre",
+    )
+    brand = next((b for b in _BRANDS if b in token_set), "")
+    tech = [t for t in dict.fromkeys(tokens) if t in _TECH_TERMS]
+    specs = [m.group(0) for m in _SPEC_RE.finditer(folded)]
+
+    confidence = 0.0
+    if category != "autre":
+        confidence += 0.5
+    if brand:
+        confidence += 0.25
+    if tech or specs:
+        confidence += 0.25
+
+    keywords = {
+        "category": category,
+        "tech_keywords": "|".join(tech) if tech else folded.strip(),
+        "brand_hint": brand,
+        "specs_hint": " ".join(specs),
+    }
+    return keywords, confidence
+
+
+def get_cached_keywords(normalized_key: str) -> Optional[Dict[str, str]]:
+    """Mots-clés déjà extraits pour cette description normalisée (compte le hit)."""
+    if not normalized_key:
+        return None
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT keywords FROM keyword_extractions WHERE normalized_key = ?",
+            (normalized_key,),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE keyword_extractions SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP "
+            "WHERE normalized_key = ?",
+            (normalized_key,),
+        )
+        conn.commit()
+        return json.loads(row["keywords"])
+    finally:
+        conn.close()
+
+
+def store_keywords(normalized_key: str, keywords: Dict[str, str], source: str, confidence: float) -> None:
+    """Enregistre (ou remplace) l'extraction d'une description normalisée."""
+    if not normalized_key:
+        return
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO keyword_extractions (normalized_key, keywords, source, confidence)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(normalized_key) DO UPDATE SET
+                keywords = excluded.keywords,
+                source = excluded.source,
+                confidence = excluded.confidence,
+                last_used_at = CURRENT_TIMESTAMP
+            """,
+            (normalized_key, json.dumps(keywords, ensure_ascii=False), source, confidence),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Nombre d'entrées et de hits par source (rules / llm)."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT source, COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits "
+            "FROM keyword_extractions GROUP BY source"
+        ).fetchall()
+        return {f"{r['source']}_{k}": r[k] for r in rows for k in ("entries", "hits")}
+    finally:
+        conn.close()
+
+
+# Initialiser la base au chargement du module
+init_database()
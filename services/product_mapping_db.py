@@ -3,25 +3,42 @@ Base de données pour l'apprentissage automatique des correspondances produits.
 Stocke les mappings entre références externes (fournisseurs) et codes SAP RONDOT.
 """
 
+import atexit
+import os
 import sqlite3
 import logging
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Compteurs d'utilisation écrits par lots : tous les N hits ou toutes les N secondes
+USAGE_FLUSH_THRESHOLD = int(os.getenv("PRODUCT_MAPPING_USAGE_FLUSH_THRESHOLD", "100"))
+USAGE_FLUSH_INTERVAL_S = float(os.getenv("PRODUCT_MAPPING_USAGE_FLUSH_INTERVAL_S", "30"))
+
 
 class ProductMappingDB:
     """
     Gère les correspondances entre codes produits externes (fournisseurs)
     et codes produits SAP RONDOT.
+
+    Les mappings VALIDATED sont servis depuis un index mémoire chargé une
+    fois et tenu à jour par save_mapping / validate_mapping / delete_mapping ;
+    use_count / last_used sont cumulés en mémoire puis écrits par lots.
     """
 
     def __init__(self, db_path: str = None):
         if db_path is None:
             db_path = str(Path(__file__).parent.parent / "data" / "supplier_tariffs.db")
         self.db_path = db_path
+        self._lock = threading.RLock()
+        self._validated: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+        self._pending_usage: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._pending_hits = 0
+        self._last_flush = time.monotonic()
         self._init_db()
 
     def _init_db(self):
@@ -100,47 +117,60 @@ class ProductMappingDB:
             Dict avec matched_item_code, confidence_score, etc. ou None
         """
         logger.debug(f"🔎 get_mapping called: external_code={external_code}, supplier={supplier_card_code}")
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # Essayer d'abord avec le supplier_card_code fourni
-        if supplier_card_code:
-            cursor.execute("""
-                SELECT * FROM product_code_mapping
-                WHERE external_code = ? AND supplier_card_code = ?
-                AND status = 'VALIDATED'
-            """, (external_code, supplier_card_code))
-
-            row = cursor.fetchone()
+        index = self._get_index()
 
+        # Essayer d'abord avec le supplier_card_code fourni, puis le mapping GLOBAL
+        for supplier in ([supplier_card_code] if supplier_card_code else []) + ['GLOBAL']:
+            row = index.get((external_code, supplier))
             if row:
-                conn.close()
-                logger.debug(f"   ✅ Found specific mapping for supplier {supplier_card_code}")
-                # Mettre à jour use_count et last_used
-                self._increment_usage(external_code, supplier_card_code)
+                logger.debug(f"   ✅ Found mapping {external_code} → {row.get('matched_item_code')} ({supplier})")
+                # Mettre à jour use_count et last_used (écriture différée)
+                self._increment_usage(external_code, supplier)
                 return dict(row)
 
-        # Si rien trouvé, essayer avec mapping GLOBAL
-        logger.debug(f"   🔄 No specific mapping, trying GLOBAL...")
-        cursor.execute("""
-            SELECT * FROM product_code_mapping
-            WHERE external_code = ? AND supplier_card_code = 'GLOBAL'
-            AND status = 'VALIDATED'
-        """, (external_code,))
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            logger.debug(f"   ✅ Found GLOBAL mapping: {external_code} → {dict(row).get('matched_item_code')}")
-            # Mettre à jour use_count et last_used pour le mapping GLOBAL
-            self._increment_usage(external_code, 'GLOBAL')
-            return dict(row)
-
         logger.debug(f"   ❌ No mapping found for {external_code}")
         return None
 
+    def _get_index(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Index mémoire des mappings VALIDATED (chargé au premier accès)."""
+        if self._validated is None:
+            with self._lock:
+                if self._validated is None:
+                    conn = sqlite3.connect(self.db_path)
+                    conn.row_factory = sqlite3.Row
+                    rows = conn.execute(
+                        "SELECT * FROM product_code_mapping WHERE status = 'VALIDATED'"
+                    ).fetchall()
+                    conn.close()
+                    self._validated = {
+                        (row["external_code"], row["supplier_card_code"]): dict(row) for row in rows
+                    }
+                    logger.info(f"ProductMappingDB: {len(rows)} mappings validés chargés en mémoire")
+        return self._validated
+
+    def _refresh_entry(self, external_code: str, supplier_card_code: str):
+        """Relit une ligne après écriture et met l'index mémoire à jour."""
+        if self._validated is None:
+            return
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("""
+            SELECT * FROM product_code_mapping
+            WHERE external_code = ? AND supplier_card_code = ?
+        """, (external_code, supplier_card_code)).fetchone()
+        conn.close()
+        with self._lock:
+            if row is not None and row["status"] == 'VALIDATED':
+                self._validated[(external_code, supplier_card_code)] = dict(row)
+            else:
+                self._validated.pop((external_code, supplier_card_code), None)
+
+    def reload(self):
+        """Force le rechargement de l'index mémoire (écriture SQL externe)."""
+        self.flush_usage()
+        with self._lock:
+            self._validated = None
+
     def save_mapping(
         self,
         external_code: str,
@@ -163,6 +193,9 @@ class ProductMappingDB:
             confidence_score: Score de confiance 0-100
             status: "PENDING", "VALIDATED", "REJECTED"
         """
+        # use_count est conservé par la requête : écrire d'abord les compteurs en attente
+        self.flush_usage()
+
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
@@ -190,24 +223,59 @@ class ProductMappingDB:
 
         conn.commit()
         conn.close()
+        self._refresh_entry(external_code, supplier_card_code)
 
         logger.info(f"Mapping saved: {external_code} → {matched_item_code or 'PENDING'} "
                     f"({match_method}, score={confidence_score:.0f})")
 
     def _increment_usage(self, external_code: str, supplier_card_code: str):
-        """Incrémente le compteur d'utilisation d'un mapping."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            UPDATE product_code_mapping
-            SET use_count = use_count + 1,
-                last_used = ?
-            WHERE external_code = ? AND supplier_card_code = ?
-        """, (datetime.now().isoformat(), external_code, supplier_card_code))
-
-        conn.commit()
-        conn.close()
+        """Incrémente (en mémoire) le compteur d'utilisation d'un mapping."""
+        key = (external_code, supplier_card_code)
+        with self._lock:
+            count, _ = self._pending_usage.get(key, (0, None))
+            self._pending_usage[key] = (count + 1, datetime.now().isoformat())
+            self._pending_hits += 1
+            due = (
+                self._pending_hits >= USAGE_FLUSH_THRESHOLD
+                or time.monotonic() - self._last_flush >= USAGE_FLUSH_INTERVAL_S
+            )
+        if due:
+            self.flush_usage()
+
+    def flush_usage(self) -> int:
+        """Écrit les compteurs d'utilisation cumulés en une transaction ; retourne le nombre de mappings."""
+        with self._lock:
+            pending, self._pending_usage = self._pending_usage, {}
+            self._pending_hits = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.executemany("""
+                UPDATE product_code_mapping
+                SET use_count = use_count + ?,
+                    last_used = ?
+                WHERE external_code = ? AND supplier_card_code = ?
+            """, [(count, last_used, code, supplier) for (code, supplier), (count, last_used) in pending.items()])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"ProductMappingDB: écriture des compteurs d'utilisation échouée : {e}")
+            with self._lock:
+                for key, (count, last_used) in pending.items():
+                    current, _ = self._pending_usage.get(key, (0, None))
+                    self._pending_usage[key] = (current + count, last_used)
+            return 0
+
+        with self._lock:
+            for key, (count, last_used) in pending.items():
+                row = (self._validated or {}).get(key)
+                if row is not None:
+                    row["use_count"] = (row.get("use_count") or 0) + count
+                    row["last_used"] = last_used
+        return len(pending)
 
     def get_pending_mappings(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
@@ -262,9 +330,29 @@ class ProductMappingDB:
 
         conn.commit()
         conn.close()
+        self._refresh_entry(external_code, supplier_card_code)
 
         logger.info(f"Mapping validated: {external_code} → {matched_item_code}")
 
+    def delete_mapping(self, external_code: str, supplier_card_code: str) -> bool:
+        """Supprime un mapping ; retourne False s'il n'existait pas."""
+        self.flush_usage()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            DELETE FROM product_code_mapping
+            WHERE external_code = ?
+            AND supplier_card_code = ?
+        """, (external_code, supplier_card_code))
+
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        self._refresh_entry(external_code, supplier_card_code)
+
+        return deleted > 0
+
     def get_statistics(self) -> Dict[str, int]:
         """Retourne des statistiques sur les mappings."""
         conn = sqlite3.connect(self.db_path)
@@ -325,5 +413,7 @@ def get_product_mapping_db() -> ProductMappingDB:
     global _product_mapping_db
     if _product_mapping_db is None:
         _product_mapping_db = ProductMappingDB()
+        # Compteurs d'utilisation encore en mémoire écrits à l'arrêt du process
+        atexit.register(_product_mapping_db.flush_usage)
         logger.info("ProductMappingDB singleton created")
     return _product_mapping_db
@@ -0,0 +1,200 @@
+"""
+Accès partagé à la table PostgreSQL produits_sap
+
+- Un seul moteur SQLAlchemy (pool de connexions) par processus et par URL,
+  au lieu d'un create_engine() à chaque recherche
+- Recherche par similarité trigramme (pg_trgm) en UNE requête classée,
+  servie par les index GIN créés par install_pg_trgm.py
+- Repli LIKE multi-termes si l'extension pg_trgm est absente
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import sqlalchemy
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+PRODUITS_SAP_POOL_SIZE = int(os.getenv("PRODUITS_SAP_POOL_SIZE", "5"))
+PRODUITS_SAP_MAX_OVERFLOW = int(os.getenv("PRODUITS_SAP_MAX_OVERFLOW", "10"))
+PRODUITS_SAP_POOL_RECYCLE = int(os.getenv("PRODUITS_SAP_POOL_RECYCLE", "1800"))
+
+# Seuil pg_trgm de word_similarity (opérateur <%) pour retenir un candidat
+TRGM_MIN_SIMILARITY = float(os.getenv("PRODUITS_SAP_TRGM_THRESHOLD", "0.3"))
+
+PRODUCT_COLUMNS = (
+    "item_code, item_name, u_description, avg_price, on_hand, "
+    "items_group_code, manufacturer, sales_unit"
+)
+
+_TRGM_SEARCH_SQL = f"""
+    SELECT {PRODUCT_COLUMNS},
+        GREATEST(
+            word_similarity(:name, item_name),
+            similarity(item_name, :name),
+            0.8 * word_similarity(:name, COALESCE(u_description, ''))
+        ) AS sim_score
+    FROM produits_sap
+    WHERE valid = true
+    {{stock_filter}}
+    AND (:name <% item_name OR :name <% u_description)
+    ORDER BY sim_score DESC, on_hand DESC
+    LIMIT :limit
+"""
+
+_engines: Dict[str, Engine] = {}
+_sessionmakers: Dict[str, sessionmaker] = {}
+_trgm_available: Dict[str, bool] = {}
+_lock = threading.Lock()
+
+
+def get_produits_sap_engine(db_url: Optional[str] = None) -> Optional[Engine]:
+    """Moteur poolé partagé du processus ; None si DATABASE_URL est absente."""
+    url = db_url or os.getenv("DATABASE_URL")
+    if not url:
+        return None
+    engine = _engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(url)
+            if engine is None:
+                kwargs: Dict[str, Any] = {"pool_pre_ping": True}
+                if url.startswith("postgresql"):
+                    kwargs.update(
+                        pool_size=PRODUITS_SAP_POOL_SIZE,
+                        max_overflow=PRODUITS_SAP_MAX_OVERFLOW,
+                        pool_recycle=PRODUITS_SAP_POOL_RECYCLE,
+                    )
+                engine = sqlalchemy.create_engine(url, **kwargs)
+                _engines[url] = engine
+                logger.info("✅ Moteur produits_sap initialisé (pool partagé)")
+    return engine
+
+
+def get_produits_sap_sessionmaker(db_url: Optional[str] = None) -> Optional[sessionmaker]:
+    """Fabrique de sessions liée au moteur partagé ; None si DATABASE_URL est absente."""
+    engine = get_produits_sap_engine(db_url)
+    if engine is None:
+        return None
+    key = str(engine.url)
+    factory = _sessionmakers.get(key)
+    if factory is None:
+        with _lock:
+            factory = _sessionmakers.setdefault(key, sessionmaker(bind=engine))
+    return factory
+
+
+def dispose_engines() -> None:
+    """Ferme les pools (arrêt de l'application, tests)."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _sessionmakers.clear()
+        _trgm_available.clear()
+
+
+def trigram_available(engine: Engine) -> bool:
+    """pg_trgm installé sur cette base ? (vérifié une fois par moteur)"""
+    key = str(engine.url)
+    if key not in _trgm_available:
+        available = False
+        if engine.dialect.name == "postgresql":
+            try:
+                with engine.connect() as conn:
+                    available = conn.execute(
+                        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                    ).fetchone() is not None
+            except Exception as e:
+                logger.warning(f"⚠️ Détection pg_trgm impossible: {str(e)}")
+        if not available:
+            logger.warning("⚠️ pg_trgm indisponible - recherche produits_sap en LIKE (voir install_pg_trgm.py)")
+        _trgm_available[key] = available
+    return _trgm_available[key]
+
+
+def format_product_row(row: Any) -> Dict[str, Any]:
+    """Ligne produits_sap -> dict au format SAP attendu par le workflow"""
+    product = {
+        "ItemCode": row.item_code,
+        "ItemName": row.item_name,
+        "U_Description": row.u_description or "",
+        "AvgPrice": float(row.avg_price or 0),
+        "OnHand": int(row.on_hand or 0),
+        "QuantityOnStock": int(row.on_hand or 0),
+        "ItemsGroupCode": row.items_group_code or "",
+        "Manufacturer": row.manufacturer or "",
+        "SalesUnit": row.sales_unit or "UN",
+        "source": "local_db",
+    }
+    sim_score = getattr(row, "sim_score", None)
+    if sim_score is not None:
+        product["similarity_score"] = float(sim_score)
+    return product
+
+
+def _stock_filter(in_stock_only: bool) -> str:
+    return "AND on_hand > 0" if in_stock_only else ""
+
+
+def _like_search_sql(product_name: str, limit: int, in_stock_only: bool = True) -> tuple:
+    """Repli sans pg_trgm : LIKE sur les 3 premiers termes significatifs, score = part des termes trouvés"""
+    terms = [t for t in product_name.lower().split() if len(t) > 2][:3]
+    params: Dict[str, Any] = {"limit": limit}
+    matches = []
+    for i, term in enumerate(terms):
+        params[f"term_{i}"] = f"%{term}%"
+        matches.append(f"(LOWER(item_name) LIKE :term_{i} OR LOWER(u_description) LIKE :term_{i})")
+    if not matches:
+        params["term_0"] = f"%{product_name.lower()}%"
+        matches = ["LOWER(item_name) LIKE :term_0"]
+
+    score = " + ".join(f"CASE WHEN {m} THEN 1.0 ELSE 0 END" for m in matches)
+    sql = f"""
+    SELECT {PRODUCT_COLUMNS},
+        ({score}) / {len(matches)} AS sim_score
+    FROM produits_sap
+    WHERE valid = true
+    {_stock_filter(in_stock_only)}
+    AND ({' OR '.join(matches)})
+    ORDER BY sim_score DESC, on_hand DESC, LENGTH(item_name) ASC
+    LIMIT :limit
+    """
+    return sql, params
+
+
+def search_similar_products(
+    product_name: str,
+    limit: int = 10,
+    db_url: Optional[str] = None,
+    in_stock_only: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Candidats produits_sap classés par similarité avec `product_name`
+    (une seule requête ; trigramme si disponible, sinon LIKE).
+    `in_stock_only=False` inclut les produits sans stock.
+    """
+    if not product_name or not product_name.strip():
+        return []
+    SessionLocal = get_produits_sap_sessionmaker(db_url)
+    if SessionLocal is None:
+        logger.warning("DATABASE_URL manquant pour recherche similarité produits_sap")
+        return []
+
+    with SessionLocal() as session:
+        if trigram_available(session.get_bind()):
+            session.execute(
+                text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                {"threshold": str(TRGM_MIN_SIMILARITY)},
+            )
+            sql = _TRGM_SEARCH_SQL.format(stock_filter=_stock_filter(in_stock_only))
+            params = {"name": product_name.strip(), "limit": limit}
+        else:
+            sql, params = _like_search_sql(product_name, limit, in_stock_only)
+        rows = session.execute(text(sql), params).fetchall()
+    return [format_product_row(row) for row in rows or []]
@@ -0,0 +1,239 @@
+# services/progress_task_store.py
+"""
+Stockage de l'historique des tâches de progression (ProgressTracker)
+
+Les tâches actives restent en mémoire dans le ProgressTracker ; les tâches
+terminées sont écrites ici dès leur fin (visibles des autres workers et
+conservées après redémarrage), puis retirées de la mémoire après un TTL.
+
+Backends :
+- SQLiteTaskStore : data/progress_tasks.db, payload JSON compressé (zlib),
+  index sur (end_time) et (status, end_time)
+- MemoryTaskStore : dict borné, pour les tests ou un déploiement sans disque
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent / "data" / "progress_tasks.db"
+
+# Durée de conservation sur disque de l'historique des tâches
+DEFAULT_RETENTION_DAYS = int(os.getenv("PROGRESS_HISTORY_RETENTION_DAYS", "90"))
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
+
+class TaskStore(ABC):
+    """Interface de stockage des tâches terminées"""
+
+    @abstractmethod
+    def save(self, task_data: Dict[str, Any]) -> None:
+        """Enregistre (ou remplace) une tâche terminée"""
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne une tâche terminée par son ID"""
+
+    @abstractmethod
+    def list_recent(self, limit: int) -> List[Dict[str, Any]]:
+        """Retourne les `limit` tâches les plus récentes, de la plus ancienne à la plus récente"""
+
+    @abstractmethod
+    def count_by_status(self) -> Dict[str, int]:
+        """Nombre de tâches terminées par statut"""
+
+    @abstractmethod
+    def purge_older_than(self, cutoff: datetime) -> int:
+        """Supprime les tâches terminées avant `cutoff`, retourne le nombre supprimé"""
+
+
+class MemoryTaskStore(TaskStore):
+    """Historique en mémoire, borné à `max_entries` tâches (les plus anciennes sont écartées)"""
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, task_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._tasks.pop(task_data["task_id"], None)
+            self._tasks[task_data["task_id"]] = task_data
+            while len(self._tasks) > self.max_entries:
+                self._tasks.popitem(last=False)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._tasks.get(task_id)
+
+    def list_recent(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._tasks.values())[-limit:] if limit > 0 else []
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for task_data in self._tasks.values():
+                status = str(task_data.get("status"))
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def purge_older_than(self, cutoff: datetime) -> int:
+        cutoff_iso = cutoff.isoformat()
+        with self._lock:
+            expired = [
+                task_id for task_id, task_data in self._tasks.items()
+                if (task_data.get("end_time") or task_data.get("start_time") or "") < cutoff_iso
+            ]
+            for task_id in expired:
+                del self._tasks[task_id]
+        return len(expired)
+
+
+class SQLiteTaskStore(TaskStore):
+    """Historique persistant dans une base SQLite locale (partagée entre workers)"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DB_PATH)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            # WAL : lectures concurrentes des autres workers pendant une écriture
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS progress_tasks (
+                    task_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    start_time TEXT,
+                    end_time TEXT NOT NULL,
+                    duration REAL,
+                    payload BLOB NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_progress_tasks_end_time
+                ON progress_tasks(end_time)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_progress_tasks_status_end
+                ON progress_tasks(status, end_time)
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"Historique des tâches initialisé: {self.db_path}")
+
+    @staticmethod
+    def _encode(task_data: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(task_data, ensure_ascii=False, default=_json_default).encode("utf-8"))
+
+    @staticmethod
+    def _decode(payload: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def save(self, task_data: Dict[str, Any]) -> None:
+        end_time = task_data.get("end_time") or datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO progress_tasks
+                    (task_id, status, start_time, end_time, duration, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    task_data["task_id"],
+                    str(task_data.get("status") or ""),
+                    task_data.get("start_time"),
+                    end_time,
+                    task_data.get("duration"),
+                    self._encode(task_data),
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT payload FROM progress_tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._decode(row["payload"]) if row else None
+
+    def list_recent(self, limit: int) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT payload FROM progress_tasks ORDER BY end_time DESC LIMIT ?", (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._decode(row["payload"]) for row in reversed(rows)]
+
+    def count_by_status(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM progress_tasks GROUP BY status"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row["status"]: row["n"] for row in rows}
+
+    def purge_older_than(self, cutoff: datetime) -> int:
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM progress_tasks WHERE end_time < ?", (cutoff.isoformat(),)
+            )
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+def create_task_store() -> TaskStore:
+    """
+    Instancie le backend configuré via PROGRESS_TASK_STORE ("sqlite" par défaut, ou "memory").
+    Repli sur la mémoire si la base SQLite ne peut pas être ouverte.
+    """
+    backend = os.getenv("PROGRESS_TASK_STORE", "sqlite").lower()
+    if backend == "memory":
+        return MemoryTaskStore()
+    try:
+        return SQLiteTaskStore(os.getenv("PROGRESS_TASK_DB_PATH") or None)
+    except Exception as e:
+        logger.warning(f"⚠️ Historique SQLite indisponible ({e}) - repli sur stockage mémoire")
+        return MemoryTaskStore()
+
+
+def retention_cutoff(days: int = DEFAULT_RETENTION_DAYS) -> datetime:
+    return datetime.now() - timedelta(days=days)
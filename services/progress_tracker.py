@@ -4,13 +4,26 @@ Système de suivi de progression pour les générations de devis
 Réutilise et améliore le pattern du sync_dashboard
 """
 
+import os
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Any
 from enum import Enum
 import logging
 
+from services.progress_task_store import TaskStore, create_task_store, retention_cutoff
+
 logger = logging.getLogger(__name__)
+
+# Durée de maintien en mémoire d'une tâche terminée (elle reste ensuite lisible dans le store)
+COMPLETED_TASK_TTL_SECONDS = int(os.getenv("PROGRESS_COMPLETED_TTL_SECONDS", "900"))
+# Fréquence de l'éviction automatique (déclenchée par l'activité du tracker)
+EVICTION_INTERVAL_SECONDS = int(os.getenv("PROGRESS_EVICTION_INTERVAL_SECONDS", "300"))
+# Âge au-delà duquel une tâche encore active est considérée abandonnée
+ABANDONED_TASK_HOURS = 24
+# Nombre max de tâches renvoyées par get_task_history()
+HISTORY_QUERY_LIMIT = 500
 # Étapes métier parallèles
 BUSINESS_STEPS_PARALLEL = {
     "analyze_request": [
@@ -330,15 +343,83 @@ class ParallelStep:
             "timestamp": datetime.now().isoformat()
         })
 class ProgressTracker:
-    """Gestionnaire global des tâches de progression"""
+    """
+    Gestionnaire global des tâches de progression
+
+    Les tâches actives vivent en mémoire. Une tâche terminée est écrite
+    immédiatement dans le TaskStore (SQLite par défaut) et conservée en
+    mémoire COMPLETED_TASK_TTL_SECONDS pour les consultations de statut,
+    puis évincée : la mémoire reste stable quelle que soit la durée d'uptime.
+    """
     
-    def __init__(self):
+    def __init__(self, store: Optional[TaskStore] = None):
         self.active_tasks: Dict[str, QuoteTask] = {}
+        # Tâches récemment terminées (cache chaud, borné par TTL et par taille)
         self.completed_tasks: List[Dict[str, Any]] = []
-        self.max_completed_history = 50  # Garder les 50 dernières tâches
+        self.max_completed_history = 50  # Garder les 50 dernières tâches en mémoire
+        self.store: TaskStore = store if store is not None else create_task_store()
+        self.completed_ttl_seconds = COMPLETED_TASK_TTL_SECONDS
+        self.eviction_interval_seconds = EVICTION_INTERVAL_SECONDS
+        self._archived_at: Dict[str, float] = {}
+        self._last_eviction = time.monotonic()
         # Références aux tâches fire-and-forget (évite garbage collection prématurée)
         self._background_tasks: set = set()
     
+    def _archive_task(self, task_data: Dict[str, Any]) -> None:
+        """Place une tâche terminée dans le cache chaud et l'écrit dans le store"""
+        self.completed_tasks.append(task_data)
+        self._archived_at[task_data.get("task_id")] = time.monotonic()
+
+        # Limiter la taille de l'historique en mémoire
+        if len(self.completed_tasks) > self.max_completed_history:
+            for dropped in self.completed_tasks[:-self.max_completed_history]:
+                self._archived_at.pop(dropped.get("task_id"), None)
+            self.completed_tasks = self.completed_tasks[-self.max_completed_history:]
+
+        try:
+            self.store.save(task_data)
+        except Exception as e:
+            logger.error(f"❌ Persistance historique tâche {task_data.get('task_id')} impossible: {e}")
+
+    def _maybe_evict(self) -> None:
+        """Déclenche l'éviction si l'intervalle est écoulé"""
+        if time.monotonic() - self._last_eviction >= self.eviction_interval_seconds:
+            self.evict_expired()
+
+    def evict_expired(self) -> int:
+        """
+        Éviction périodique :
+        - tâches terminées plus vieilles que le TTL retirées de la mémoire
+        - tâches actives abandonnées archivées en échec
+        - historique disque au-delà de la rétention supprimé
+        """
+        self._last_eviction = time.monotonic()
+        cutoff = self._last_eviction - self.completed_ttl_seconds
+
+        kept = []
+        for task_data in self.completed_tasks:
+            task_id = task_data.get("task_id")
+            archived_at = self._archived_at.setdefault(task_id, self._last_eviction)
+            if archived_at >= cutoff:
+                kept.append(task_data)
+            else:
+                self._archived_at.pop(task_id, None)
+        evicted = len(self.completed_tasks) - len(kept)
+        self.completed_tasks = kept
+
+        self.cleanup_old_tasks(ABANDONED_TASK_HOURS)
+
+        try:
+            purged = self.store.purge_older_than(retention_cutoff())
+            if purged:
+                logger.info(f"🧹 {purged} tâches purgées de l'historique persistant")
+        except Exception as e:
+            logger.error(f"❌ Purge historique tâches impossible: {e}")
+
+        if evicted:
+            logger.debug(f"🧹 {evicted} tâches terminées évincées de la mémoire")
+        return evicted
+
     def create_task(self, user_prompt: str = "", draft_mode: bool = False, task_id: str = None) -> QuoteTask:
         """Crée une nouvelle tâche de génération de devis avec idempotence"""
         # Vérifier si la tâche existe déjà
@@ -346,6 +427,7 @@ class ProgressTracker:
             logger.info(f"♻️ Tâche existante récupérée: {task_id}")
             return self.active_tasks[task_id]
         
+        self._maybe_evict()
         task = QuoteTask(task_id=task_id, user_prompt=user_prompt, draft_mode=draft_mode)
         self.active_tasks[task.task_id] = task
         logger.info(f"🆕 Nouvelle tâche créée: {task.task_id}")
@@ -382,11 +464,7 @@ class ProgressTracker:
         # s'assurer d'une copie indépendante
         task_data = dict(task_data) if isinstance(task_data, dict) else {"task_id": task_id}
         task_data["result"] = result  # Ajouter le résultat
-        self.completed_tasks.append(task_data)
-
-        # Limiter la taille de l'historique
-        if len(self.completed_tasks) > self.max_completed_history:
-            self.completed_tasks = self.completed_tasks[-self.max_completed_history:]
+        self._archive_task(task_data)
 
         # Supprimer des tâches actives
         del self.active_tasks[task_id]
@@ -447,7 +525,7 @@ class ProgressTracker:
         task.fail_task(error)
         
         # Déplacer vers l'historique
-        self.completed_tasks.append(task.get_overall_progress())
+        self._archive_task(task.get_overall_progress())
         
         # Supprimer des tâches actives
         del self.active_tasks[task_id]
@@ -491,9 +569,19 @@ class ProgressTracker:
         """Retourne toutes les tâches actives"""
         return [task.get_overall_progress() for task in self.active_tasks.values()]
     
-    def get_task_history(self) -> List[Dict[str, Any]]:
-        """Retourne l'historique des tâches terminées"""
-        return self.completed_tasks.copy()
+    def get_task_history(self, limit: int = HISTORY_QUERY_LIMIT) -> List[Dict[str, Any]]:
+        """Retourne l'historique des tâches terminées (les `limit` plus récentes)"""
+        self._maybe_evict()
+        try:
+            history = self.store.list_recent(limit)
+        except Exception as e:
+            logger.error(f"❌ Lecture historique tâches impossible: {e}")
+            return self.completed_tasks[-limit:]
+
+        # Tâches en mémoire absentes du store (écriture échouée)
+        known = {t.get("task_id") for t in history}
+        history.extend(t for t in self.completed_tasks if t.get("task_id") not in known)
+        return history
 
     # 🔧 NOUVELLES MÉTHODES POUR LE WORKFLOW
 
@@ -525,18 +613,21 @@ class ProgressTracker:
         """
         🔧 NOUVELLE MÉTHODE : Statistiques des tâches
         """
-        completed_count = len(self.completed_tasks)
         active_count = len(self.active_tasks)
 
-        # Analyser les statuts des tâches terminées
-        success_count = 0
-        failed_count = 0
+        # Comptage indexé par statut côté store (plus de parcours de l'historique)
+        try:
+            counts = self.store.count_by_status()
+        except Exception as e:
+            logger.error(f"❌ Statistiques historique indisponibles: {e}")
+            counts = {}
+            for task_data in self.completed_tasks:
+                status = str(task_data.get("status"))
+                counts[status] = counts.get(status, 0) + 1
 
-        for task_data in self.completed_tasks:
-            if task_data.get("status") == TaskStatus.COMPLETED:
-                success_count += 1
-            elif task_data.get("status") == TaskStatus.FAILED:
-                failed_count += 1
+        completed_count = sum(counts.values())
+        success_count = counts.get(TaskStatus.COMPLETED.value, 0)
+        failed_count = counts.get(TaskStatus.FAILED.value, 0)
 
         return {
             "active_tasks": active_count,
@@ -551,17 +642,16 @@ class ProgressTracker:
         """
         🔧 NOUVELLE MÉTHODE : Nettoie les anciennes tâches
         """
-        from datetime import datetime, timedelta
         cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
 
         # Nettoyer les tâches actives anciennes (probablement abandonnées)
         abandoned_tasks = []
         for task_id, task in list(self.active_tasks.items()):
-            if task.created_at < cutoff_time:
+            if task.start_time < cutoff_time:
                 abandoned_tasks.append(task_id)
                 # Marquer comme échouée et déplacer vers l'historique
                 task.fail_task("Tâche abandonnée (timeout)")
-                self.completed_tasks.append(task.get_overall_progress())
+                self._archive_task(task.get_overall_progress())
                 del self.active_tasks[task_id]
 
         if abandoned_tasks:
@@ -569,11 +659,15 @@ class ProgressTracker:
 
         return len(abandoned_tasks)
     def get_task_from_history(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère une tâche depuis l'historique"""
+        """Récupère une tâche depuis l'historique (mémoire puis store)"""
         for completed_task in self.completed_tasks:
             if completed_task.get("task_id") == task_id:
                 return completed_task
-        return None
+        try:
+            return self.store.get(task_id)
+        except Exception as e:
+            logger.error(f"❌ Lecture tâche {task_id} dans l'historique impossible: {e}")
+            return None
 # Instance globale du tracker
 progress_tracker = ProgressTracker()
 
@@ -626,8 +720,4 @@ def get_workflow_progress(task_id: str) -> Optional[Dict[str, Any]]:
         return task.get_overall_progress()
 
     # Chercher dans l'historique
-    for completed_task in progress_tracker.completed_tasks:
-        if completed_task.get("task_id") == task_id:
-            return completed_task
-
-    return None
\ No newline at end of file
+    return progress_tracker.get_task_from_history(task_id)
\ No newline at end of file
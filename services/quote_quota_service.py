@@ -16,19 +16,49 @@ Usage (depuis les services de création SAP) :
     quota.check_quota()          # AVANT l'appel SAP — lève QuotaDevisDepasse si plein
     ...                          # création SAP, obtention du doc_entry
     quota.increment()            # APRÈS succès SAP — incrément atomique
+    quota.release()              # OU création SAP en échec — unité rendue
+
+Réservation par blocs (contention) :
+- Chaque worker (processus) réserve en base un bloc de QUOTA_RESERVATION_BLOCK
+  unités (table quote_quota_reservation), dans une transaction qui sérialise sur
+  la ligne du compteur. L'attribution garantit count + somme(réservations
+  actives) <= max_quota : aucun worker ne peut dépasser le quota.
+- check_quota consomme une unité du bloc local sans accès base (mise de côté
+  en attendant la création SAP) ; increment réconcilie en une transaction
+  courte (count + 1, réservation - 1). Une unité mise de côté n'est jamais
+  rendue sur délai : seulement par release() (création en échec) ou avec la
+  réservation en base quand celle-ci a expiré.
+- Les unités non consommées sont rendues à l'arrêt (release_reservations) ou
+  redeviennent disponibles à l'expiration de la réservation
+  (QUOTA_RESERVATION_TTL_S), si le worker s'est arrêté brutalement.
 """
 
+import atexit
 import os
 import logging
-from datetime import datetime
-from typing import Optional, Callable
-
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Callable, Tuple
+
+from sqlalchemy import func, update
 from sqlalchemy.exc import IntegrityError
 
-from models.database_models import SessionLocal, QuoteUsageCounter
+from models.database_models import SessionLocal, QuoteUsageCounter, QuoteQuotaReservation
 
 logger = logging.getLogger(__name__)
 
+# Unités réservées d'un coup par worker (réduites en fin de quota)
+QUOTA_RESERVATION_BLOCK = int(os.getenv("QUOTA_RESERVATION_BLOCK", "5"))
+# Durée de vie d'une réservation non renouvelée (worker arrêté brutalement)
+QUOTA_RESERVATION_TTL_S = float(os.getenv("QUOTA_RESERVATION_TTL_S", "300"))
+# Durée attendue d'une création SAP : la réservation en base est renouvelée au
+# moins cette marge avant son expiration
+QUOTA_HOLD_TIMEOUT_S = float(os.getenv("QUOTA_HOLD_TIMEOUT_S", "60"))
+
 
 # ============================================================
 # EXCEPTION TYPÉE
@@ -65,6 +95,18 @@ def _current_period() -> str:
     return datetime.now().strftime("%Y-%m")
 
 
+@dataclass
+class _LocalBlock:
+    """Part locale de la réservation d'un worker pour (society, period)."""
+    available: int = 0
+    # Unités mises de côté par check_quota, en attente d'increment ou de release
+    holds: int = 0
+    # Au-delà, la réservation en base risque d'expirer avant l'increment
+    usable_until: float = 0.0
+    count: int = 0
+    max_quota: int = 0
+
+
 class QuoteQuotaService:
     """Gestion du compteur de devis (quota mensuel calendaire, blocage dur)."""
 
@@ -80,6 +122,9 @@ class QuoteQuotaService:
             default_max_quota if default_max_quota is not None
             else os.getenv("QUOTA_DEVIS_MAX", "50")
         )
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._blocks: Dict[Tuple[str, str], _LocalBlock] = {}
+        self._lock = threading.Lock()
 
     # ----------------------------------------------------------
     # Helpers internes
@@ -120,6 +165,83 @@ class QuoteQuotaService:
             )
         return row
 
+    def _reserve(self, society: str, period: str, block: _LocalBlock, wanted: int) -> None:
+        """Complète le stock local jusqu'à `wanted` unités et renouvelle la réservation
+        en base du worker (appelé sous self._lock).
+
+        Une seule transaction, sérialisée par la mise à jour de la ligne du
+        compteur (verrou de ligne PostgreSQL, verrou d'écriture SQLite) : purge
+        des réservations expirées, calcul du disponible réel, puis extension de
+        la réservation du worker. Met à jour le bloc local (stock, compteur vu).
+        """
+        with self._session_factory() as session:
+            self._get_or_create_row(session, society, period)
+            now = datetime.now()
+            session.execute(
+                update(QuoteUsageCounter)
+                .where(QuoteUsageCounter.society_id == society, QuoteUsageCounter.period == period)
+                .values(updated_at=now)
+            )
+            row = (
+                session.query(QuoteUsageCounter)
+                .filter_by(society_id=society, period=period)
+                .populate_existing()
+                .one()
+            )
+            reservations = session.query(QuoteQuotaReservation).filter_by(society_id=society, period=period)
+            reservations.filter(QuoteQuotaReservation.expires_at < now).delete(synchronize_session=False)
+            mine = reservations.filter_by(worker_id=self.worker_id).first()
+            others = (
+                session.query(func.coalesce(func.sum(QuoteQuotaReservation.slots), 0))
+                .filter(
+                    QuoteQuotaReservation.society_id == society,
+                    QuoteQuotaReservation.period == period,
+                    QuoteQuotaReservation.worker_id != self.worker_id,
+                )
+                .scalar()
+            )
+            if mine is None:
+                # Réservation expirée (ou jamais prise) : le stock local ne vaut plus rien
+                block.holds = 0
+                block.available = 0
+            held = mine.slots if mine is not None else 0
+            free = row.max_quota - row.count - others - held
+            # En fin de quota, ne prendre que la moitié du reste pour laisser les autres workers servir
+            granted = min(wanted - block.available, max(1, free // 2)) if free > 0 else 0
+            granted = max(0, granted)
+
+            if mine is None:
+                mine = QuoteQuotaReservation(
+                    society_id=society, period=period, worker_id=self.worker_id, slots=0, expires_at=now,
+                )
+                session.add(mine)
+            slots = mine.slots = held + granted
+            mine.expires_at = now + timedelta(seconds=QUOTA_RESERVATION_TTL_S)
+            block.count, block.max_quota = row.count, row.max_quota
+            session.commit()
+
+            # Comptabilité locale (et non mine.slots) : des increments en cours de
+            # réconciliation sont encore comptés dans la réservation en base
+            block.available += granted
+            block.usable_until = time.monotonic() + QUOTA_RESERVATION_TTL_S - QUOTA_HOLD_TIMEOUT_S
+
+        if granted:
+            logger.info(
+                "📦 Quota devis réservé | société=%s | %s | worker=%s | +%d (bloc=%d, %d/%d)",
+                society, period, self.worker_id, granted, slots, block.count, block.max_quota,
+            )
+
+    def _take_slot(self, society: str, period: str) -> Tuple[bool, _LocalBlock]:
+        """Prend une unité du bloc local, en réservant un nouveau bloc si nécessaire."""
+        with self._lock:
+            block = self._blocks.setdefault((society, period), _LocalBlock())
+            if block.available <= 0 or time.monotonic() >= block.usable_until:
+                self._reserve(society, period, block, QUOTA_RESERVATION_BLOCK)
+            if block.available <= 0:
+                return False, block
+            block.available -= 1
+            return True, block
+
     # ----------------------------------------------------------
     # API publique
     # ----------------------------------------------------------
@@ -129,67 +251,130 @@ class QuoteQuotaService:
     ) -> int:
         """Vérifie le quota AVANT création SAP.
 
-        Lit (ou crée à 0) la ligne du mois courant. Si count >= max_quota,
-        lève QuotaDevisDepasse. Sinon retourne le nombre de devis restants.
+        Met de côté une unité du bloc réservé par ce worker (réservation d'un
+        nouveau bloc en base si le stock local est vide). Si aucune unité ne
+        peut être réservée, lève QuotaDevisDepasse. Sinon retourne le nombre de
+        devis restants (selon le dernier compteur vu en base).
         """
         society = self._resolve_society(society)
         period = period or _current_period()
 
-        with self._session_factory() as session:
-            row = self._get_or_create_row(session, society, period)
-            if row.count >= row.max_quota:
-                logger.warning(
-                    "🚫 Quota devis atteint | société=%s | %s | %d/%d",
-                    society, period, row.count, row.max_quota,
-                )
-                raise QuotaDevisDepasse(society, period, row.count, row.max_quota)
-            remaining = row.max_quota - row.count
-            logger.info(
-                "✓ Quota devis OK | société=%s | %s | %d/%d (restant=%d)",
-                society, period, row.count, row.max_quota, remaining,
+        ok, block = self._take_slot(society, period)
+        if not ok:
+            logger.warning(
+                "🚫 Quota devis atteint | société=%s | %s | %d/%d",
+                society, period, block.count, block.max_quota,
             )
-            return remaining
+            raise QuotaDevisDepasse(society, period, block.count, block.max_quota)
+        with self._lock:
+            block.holds += 1
+        remaining = block.max_quota - block.count
+        logger.info(
+            "✓ Quota devis OK | société=%s | %s | %d/%d (restant=%d)",
+            society, period, block.count, block.max_quota, remaining,
+        )
+        return remaining
 
     def increment(
         self, society: Optional[str] = None, period: Optional[str] = None
     ) -> int:
         """Incrémente le compteur APRÈS création SAP réussie, de façon ATOMIQUE.
 
-        Utilise un verrou de ligne (SELECT ... FOR UPDATE sur PostgreSQL) pour
-        sérialiser les incréments concurrents et éviter toute perte de mise à
-        jour. Retourne le nouveau compteur.
+        Consomme l'unité mise de côté par check_quota (ou une unité du bloc
+        local) puis réconcilie en une transaction : count + 1 sur la ligne du
+        compteur (verrou de ligne), slots - 1 sur la réservation du worker. Le
+        devis SAP existant déjà, l'incrément a lieu même sans unité réservée.
+        Retourne le nouveau compteur.
         """
         society = self._resolve_society(society)
         period = period or _current_period()
 
+        with self._lock:
+            block = self._blocks.get((society, period))
+            from_hold = block is not None and block.holds > 0
+            if from_hold:
+                block.holds -= 1
+        reserved = from_hold or self._take_slot(society, period)[0]
+
         with self._session_factory() as session:
             # Garantir l'existence de la ligne (création hors verrou si absente)
             self._get_or_create_row(session, society, period)
 
-            query = session.query(QuoteUsageCounter).filter_by(
-                society_id=society, period=period
+            # Ordre des verrous identique à _reserve : compteur puis réservation
+            session.execute(
+                update(QuoteUsageCounter)
+                .where(QuoteUsageCounter.society_id == society, QuoteUsageCounter.period == period)
+                .values(count=QuoteUsageCounter.count + 1, updated_at=datetime.now())
+            )
+            if reserved:
+                session.execute(
+                    update(QuoteQuotaReservation)
+                    .where(
+                        QuoteQuotaReservation.society_id == society,
+                        QuoteQuotaReservation.period == period,
+                        QuoteQuotaReservation.worker_id == self.worker_id,
+                        QuoteQuotaReservation.slots > 0,
+                    )
+                    .values(slots=QuoteQuotaReservation.slots - 1)
+                )
+            new_count, max_quota = (
+                session.query(QuoteUsageCounter.count, QuoteUsageCounter.max_quota)
+                .filter_by(society_id=society, period=period)
+                .one()
             )
-            # Verrou de ligne sur les SGBD qui le supportent (PostgreSQL).
-            # SQLite (tests) ignore/ne supporte pas FOR UPDATE : on s'en passe.
-            try:
-                dialect = session.bind.dialect.name
-            except Exception:
-                dialect = ""
-            if dialect == "postgresql":
-                query = query.with_for_update()
-
-            row = query.first()
-            row.count += 1
-            row.updated_at = datetime.now()
             session.commit()
-            new_count = row.count
 
+        with self._lock:
+            block = self._blocks.setdefault((society, period), _LocalBlock())
+            block.count = max(block.count, new_count)
+            block.max_quota = max_quota
+
+        if not reserved:
+            logger.warning(
+                "⚠️ Devis créé hors quota réservé | société=%s | %s | %d/%d",
+                society, period, new_count, max_quota,
+            )
         logger.info(
             "➕ Compteur devis incrémenté | société=%s | %s | nouveau=%d/%d",
-            society, period, new_count, self.default_max_quota,
+            society, period, new_count, max_quota,
         )
         return new_count
 
+    def release(self, society: Optional[str] = None, period: Optional[str] = None) -> bool:
+        """Rend l'unité mise de côté par check_quota quand la création SAP a échoué.
+
+        À appeler sur les chemins d'échec certain (pas sur un délai dépassé : le
+        devis a pu être créé côté SAP). Retourne False si aucune unité n'était
+        mise de côté (réservation en base expirée entre-temps).
+        """
+        society = self._resolve_society(society)
+        period = period or _current_period()
+
+        with self._lock:
+            block = self._blocks.get((society, period))
+            if block is None or block.holds <= 0:
+                return False
+            block.holds -= 1
+            block.available += 1
+        logger.info("↩️ Quota devis : unité rendue (création non aboutie) | société=%s | %s", society, period)
+        return True
+
+    def release_reservations(self) -> int:
+        """Rend au quota commun les unités réservées et non consommées par ce worker.
+
+        Appelé à l'arrêt du processus. Retourne le nombre d'unités rendues.
+        """
+        with self._lock:
+            self._blocks.clear()
+            with self._session_factory() as session:
+                reservations = session.query(QuoteQuotaReservation).filter_by(worker_id=self.worker_id)
+                released = sum(r.slots for r in reservations)
+                reservations.delete(synchronize_session=False)
+                session.commit()
+        if released:
+            logger.info("↩️ Quota devis rendu | worker=%s | %d unité(s)", self.worker_id, released)
+        return released
+
 
 # ============================================================
 # SINGLETON
@@ -203,5 +388,13 @@ def get_quote_quota_service() -> QuoteQuotaService:
     global _quote_quota_service
     if _quote_quota_service is None:
         _quote_quota_service = QuoteQuotaService()
+        atexit.register(_release_at_exit, _quote_quota_service)
         logger.info("QuoteQuotaService singleton créé")
     return _quote_quota_service
+
+
+def _release_at_exit(service: QuoteQuotaService) -> None:
+    try:
+        service.release_reservations()
+    except Exception as e:
+        logger.warning(f"Quota devis : réservations non rendues à l'arrêt ({e})")
@@ -1,14 +1,21 @@
 """
 services/quote_validator.py
 Service de validation commerciale pour les devis et décisions pricing
+
+File d'attente : index composite (status, priority_order, requested_at,
+validation_id) et pagination par curseur (keyset) — le coût d'une page ne
+dépend pas de sa profondeur. Statistiques : compteurs journaliers
+(validation_stats_daily) tenus à jour à chaque écriture, lus en une requête.
 """
 
+import base64
+import json
 import os
 import sqlite3
 import logging
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 
 from services.validation_models import (
@@ -28,6 +35,36 @@ from services.pricing_models import PricingDecision, PricingCaseType
 
 logger = logging.getLogger(__name__)
 
+# Ordre de traitement de la file : plus petit = plus prioritaire
+PRIORITY_ORDER = {
+    ValidationPriority.URGENT.value: 0,
+    ValidationPriority.HIGH.value: 1,
+    ValidationPriority.MEDIUM.value: 2,
+    ValidationPriority.LOW.value: 3,
+}
+
+DECIDED_STATUSES = (
+    ValidationStatus.APPROVED.value,
+    ValidationStatus.REJECTED.value,
+    ValidationStatus.MODIFIED.value,
+)
+
+
+def encode_cursor(priority_order: int, requested_at: str, validation_id: str) -> str:
+    """Curseur opaque : position du dernier élément d'une page."""
+    raw = json.dumps([priority_order, requested_at, validation_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str, str]:
+    """Décode un curseur de encode_cursor ; ValueError si invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        priority_order, requested_at, validation_id = json.loads(raw)
+        return int(priority_order), str(requested_at), str(validation_id)
+    except Exception:
+        raise ValueError(f"Curseur de pagination invalide: {cursor}")
+
 
 class QuoteValidator:
     """Service de validation commerciale"""
@@ -169,9 +206,46 @@ class QuoteValidator:
             ON validation_requests(expires_at, status)
         """)
 
+        # Migration : rang de priorité numérique (tri texte 'priority DESC' incorrect)
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(validation_requests)")}
+        if "priority_order" not in columns:
+            cursor.execute("ALTER TABLE validation_requests ADD COLUMN priority_order INTEGER NOT NULL DEFAULT 3")
+            for priority, order in PRIORITY_ORDER.items():
+                cursor.execute(
+                    "UPDATE validation_requests SET priority_order = ? WHERE priority = ?", (order, priority)
+                )
+
+        # File d'attente : filtre status + tri complet servis par le même index
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_validation_requests_queue
+            ON validation_requests(status, priority_order, requested_at, validation_id)
+        """)
+
+        # Compteurs journaliers (jour de la demande) pour get_statistics
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS validation_stats_daily (
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                validation_type TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                case_type TEXT NOT NULL DEFAULT '',
+                request_count INTEGER NOT NULL DEFAULT 0,
+                decided_count INTEGER NOT NULL DEFAULT 0,
+                decision_minutes_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, status, validation_type, priority, case_type)
+            )
+        """)
+
         conn.commit()
+        stats_missing = (
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM validation_stats_daily)").fetchone()[0] == 0
+            and cursor.execute("SELECT EXISTS(SELECT 1 FROM validation_requests)").fetchone()[0] == 1
+        )
         conn.close()
 
+        if stats_missing:
+            self.rebuild_statistics()
+
         logger.info("✓ Tables de validation initialisées")
 
     def create_validation_request(
@@ -247,26 +321,26 @@ class QuoteValidator:
             return ValidationPriority.LOW
 
     def _save_validation_request(self, request: ValidationRequest):
-        """Sauvegarde une demande de validation"""
-        import json
-
+        """Sauvegarde une demande de validation (et son compteur journalier)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        requested_at = request.requested_at.isoformat()
         cursor.execute("""
             INSERT INTO validation_requests (
-                validation_id, validation_type, priority, status,
+                validation_id, validation_type, priority, priority_order, status,
                 decision_id, item_code, item_name, card_code, card_name, quantity,
                 calculated_price, supplier_price, margin_applied,
                 case_type, justification, alerts_json,
                 last_sale_price, last_sale_date, price_variation_percent,
                 requested_by, requested_at, expires_at,
                 email_id, email_subject
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             request.validation_id,
             request.validation_type.value,
             request.priority.value,
+            PRIORITY_ORDER[request.priority.value],
             ValidationStatus.PENDING.value,
             request.decision_id,
             request.item_code,
@@ -284,11 +358,15 @@ class QuoteValidator:
             request.last_sale_date,
             request.price_variation_percent,
             request.requested_by,
-            request.requested_at.isoformat(),
+            requested_at,
             request.expires_at.isoformat() if request.expires_at else None,
             request.email_id,
             request.email_subject
         ))
+        self._bump_stats(
+            cursor, requested_at[:10], ValidationStatus.PENDING.value,
+            request.validation_type.value, request.priority.value, request.case_type, 1,
+        )
 
         conn.commit()
         conn.close()
@@ -306,14 +384,16 @@ class QuoteValidator:
         if not request:
             raise ValueError(f"Validation non trouvée: {validation_id}")
 
-        if request.status != ValidationStatus.PENDING:
-            raise ValueError(f"Validation déjà traitée: {request.status}")
-
-        # Sauvegarder la décision
-        self._save_validation_decision(decision)
-
-        # Mettre à jour le statut de la demande
-        self._update_validation_status(validation_id, decision.status)
+        # Passage pending → statut de la décision (et temps de décision dans les compteurs)
+        # et enregistrement de la décision, dans une même transaction : une validation
+        # déjà traitée n'est pas modifiée
+        decision_minutes = (decision.validated_at - request.requested_at).total_seconds() / 60
+        previous_status = self._update_validation_status(
+            validation_id, decision.status, decision_minutes,
+            expected_status=ValidationStatus.PENDING, decision=decision
+        )
+        if previous_status != ValidationStatus.PENDING.value:
+            raise ValueError(f"Validation déjà traitée: {previous_status}")
 
         # Calculer le temps de validation
         validation_time = (datetime.utcnow() - request.requested_at).total_seconds()
@@ -333,11 +413,9 @@ class QuoteValidator:
 
         return result
 
-    def _save_validation_decision(self, decision: ValidationDecision):
-        """Sauvegarde une décision de validation"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
+    @staticmethod
+    def _save_validation_decision(cursor, decision: ValidationDecision):
+        """Sauvegarde une décision de validation (dans la transaction du curseur)"""
         cursor.execute("""
             INSERT INTO validation_decisions (
                 validation_id, status,
@@ -356,42 +434,123 @@ class QuoteValidator:
             decision.validated_at.isoformat()
         ))
 
-        conn.commit()
-        conn.close()
-
-    def _update_validation_status(self, validation_id: str, status: ValidationStatus):
-        """Met à jour le statut d'une validation"""
-        conn = sqlite3.connect(self.db_path)
+    def _update_validation_status(
+        self,
+        validation_id: str,
+        status: ValidationStatus,
+        decision_minutes: Optional[float] = None,
+        expected_status: Optional[ValidationStatus] = None,
+        decision: Optional[ValidationDecision] = None
+    ) -> Optional[str]:
+        """
+        Met à jour le statut d'une validation et déplace son compteur journalier.
+        Si expected_status est fourni, ne modifie rien quand le statut courant diffère.
+        Si decision est fournie, elle est enregistrée dans la même transaction.
+        Retourne le statut précédent (None si la validation n'existe pas).
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
         cursor = conn.cursor()
 
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute("""
+                SELECT status, requested_at, validation_type, priority, case_type
+                FROM validation_requests WHERE validation_id = ?
+            """, (validation_id,)).fetchone()
+            if row is None or (expected_status and row[0] != expected_status.value):
+                cursor.execute("ROLLBACK")
+                return row[0] if row else None
+            old_status, requested_at, validation_type, priority, case_type = row
+
+            cursor.execute("""
+                UPDATE validation_requests
+                SET status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE validation_id = ?
+            """, (status.value, validation_id))
+
+            day = requested_at[:10]
+            self._bump_stats(cursor, day, old_status, validation_type, priority, case_type, -1)
+            self._bump_stats(
+                cursor, day, status.value, validation_type, priority, case_type, 1,
+                decided=1 if decision_minutes is not None else 0,
+                decision_minutes=decision_minutes or 0.0,
+            )
+            if decision is not None:
+                self._save_validation_decision(cursor, decision)
+
+            cursor.execute("COMMIT")
+            return old_status
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _bump_stats(
+        cursor,
+        day: str,
+        status: str,
+        validation_type: str,
+        priority: str,
+        case_type: Optional[str],
+        delta: int,
+        decided: int = 0,
+        decision_minutes: float = 0.0
+    ):
+        """Ajoute delta demandes (et éventuellement une décision) au compteur du jour"""
         cursor.execute("""
-            UPDATE validation_requests
-            SET status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE validation_id = ?
-        """, (status.value, validation_id))
-
-        conn.commit()
-        conn.close()
-
-    def get_validation_request(self, validation_id: str) -> Optional[ValidationRequest]:
-        """Récupère une demande de validation par ID"""
-        import json
+            INSERT INTO validation_stats_daily (
+                day, status, validation_type, priority, case_type,
+                request_count, decided_count, decision_minutes_sum
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, status, validation_type, priority, case_type) DO UPDATE SET
+                request_count = request_count + excluded.request_count,
+                decided_count = decided_count + excluded.decided_count,
+                decision_minutes_sum = decision_minutes_sum + excluded.decision_minutes_sum
+        """, (day, status, validation_type, priority, case_type or "", delta, decided, decision_minutes))
 
+    def rebuild_statistics(self) -> int:
+        """
+        Recalcule entièrement les compteurs journaliers depuis validation_requests
+        (première initialisation ou réparation). Retourne le nombre de lignes de compteurs.
+        """
         conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT * FROM validation_requests
-            WHERE validation_id = ?
-        """, (validation_id,))
+        cursor.execute("DELETE FROM validation_stats_daily")
+        cursor.execute(f"""
+            INSERT INTO validation_stats_daily (
+                day, status, validation_type, priority, case_type,
+                request_count, decided_count, decision_minutes_sum
+            )
+            SELECT
+                substr(vr.requested_at, 1, 10), vr.status, vr.validation_type, vr.priority,
+                COALESCE(vr.case_type, ''),
+                COUNT(*),
+                COALESCE(SUM(CASE WHEN vr.status IN ({",".join("?" * len(DECIDED_STATUSES))}) THEN vd.n END), 0),
+                COALESCE(SUM(CASE WHEN vr.status IN ({",".join("?" * len(DECIDED_STATUSES))})
+                    THEN (vd.validated_jd - vd.n * julianday(vr.requested_at)) * 24 * 60 END), 0)
+            FROM validation_requests vr
+            LEFT JOIN (
+                SELECT validation_id, COUNT(*) AS n, SUM(julianday(validated_at)) AS validated_jd
+                FROM validation_decisions
+                GROUP BY validation_id
+            ) vd ON vd.validation_id = vr.validation_id
+            GROUP BY 1, 2, 3, 4, 5
+        """, DECIDED_STATUSES + DECIDED_STATUSES)
+        rows = cursor.rowcount
 
-        row = cursor.fetchone()
+        conn.commit()
         conn.close()
 
-        if not row:
-            return None
+        logger.info(f"✓ Compteurs de validation recalculés ({rows} ligne(s))")
+        return rows
 
+    @staticmethod
+    def _row_to_request(row: sqlite3.Row) -> ValidationRequest:
+        """Convertit une ligne validation_requests en ValidationRequest"""
         return ValidationRequest(
             validation_id=row["validation_id"],
             validation_type=ValidationType(row["validation_type"]),
@@ -418,13 +577,47 @@ class QuoteValidator:
             email_subject=row["email_subject"]
         )
 
+    def get_validation_request(self, validation_id: str) -> Optional[ValidationRequest]:
+        """Récupère une demande de validation par ID"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT * FROM validation_requests
+            WHERE validation_id = ?
+        """, (validation_id,))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+
+        return self._row_to_request(row)
+
     def list_pending_validations(
         self,
         filters: Optional[ValidationListFilter] = None
     ) -> List[ValidationRequest]:
-        """Liste les validations en attente"""
-        import json
+        """Liste les validations en attente (une page, cf. list_pending_page)"""
+        return self.list_pending_page(filters)[0]
 
+    def list_pending_page(
+        self,
+        filters: Optional[ValidationListFilter] = None
+    ) -> Tuple[List[ValidationRequest], Optional[str]]:
+        """
+        Page de la file des validations en attente, par priorité puis ancienneté.
+
+        Pagination par curseur : filters.cursor = curseur renvoyé par la page
+        précédente (None pour la première). L'index de file sert le filtre et
+        le tri, la page démarre directement après le curseur. filters.offset
+        reste accepté sans curseur (compatibilité, coût proportionnel à l'offset).
+
+        Returns:
+            (validations, curseur de la page suivante ou None si dernière page)
+        """
         filters = filters or ValidationListFilter()
 
         conn = sqlite3.connect(self.db_path)
@@ -433,11 +626,11 @@ class QuoteValidator:
 
         # Construire la requête
         query = "SELECT * FROM validation_requests WHERE status = ?"
-        params = [ValidationStatus.PENDING.value]
+        params: List[Any] = [ValidationStatus.PENDING.value]
 
         if filters.priority:
-            query += " AND priority = ?"
-            params.append(filters.priority.value)
+            query += " AND priority_order = ?"
+            params.append(PRIORITY_ORDER[filters.priority.value])
 
         if filters.item_code:
             query += " AND item_code = ?"
@@ -447,110 +640,88 @@ class QuoteValidator:
             query += " AND card_code = ?"
             params.append(filters.card_code)
 
-        query += " ORDER BY priority DESC, requested_at ASC LIMIT ? OFFSET ?"
-        params.extend([filters.limit, filters.offset])
+        if filters.cursor:
+            query += " AND (priority_order, requested_at, validation_id) > (?, ?, ?)"
+            params.extend(decode_cursor(filters.cursor))
+
+        query += " ORDER BY priority_order, requested_at, validation_id LIMIT ?"
+        params.append(filters.limit + 1)
+        if filters.offset and not filters.cursor:
+            query += " OFFSET ?"
+            params.append(filters.offset)
 
         cursor.execute(query, params)
         rows = cursor.fetchall()
         conn.close()
 
-        validations = []
-        for row in rows:
-            validations.append(ValidationRequest(
-                validation_id=row["validation_id"],
-                validation_type=ValidationType(row["validation_type"]),
-                priority=ValidationPriority(row["priority"]),
-                decision_id=row["decision_id"],
-                item_code=row["item_code"],
-                item_name=row["item_name"],
-                card_code=row["card_code"],
-                card_name=row["card_name"],
-                quantity=row["quantity"],
-                calculated_price=row["calculated_price"],
-                supplier_price=row["supplier_price"],
-                margin_applied=row["margin_applied"],
-                case_type=row["case_type"],
-                justification=row["justification"],
-                alerts=json.loads(row["alerts_json"]) if row["alerts_json"] else [],
-                last_sale_price=row["last_sale_price"],
-                last_sale_date=row["last_sale_date"],
-                price_variation_percent=row["price_variation_percent"],
-                requested_by=row["requested_by"],
-                requested_at=datetime.fromisoformat(row["requested_at"]),
-                expires_at=datetime.fromisoformat(row["expires_at"]) if row["expires_at"] else None,
-                email_id=row["email_id"],
-                email_subject=row["email_subject"]
-            ))
-
-        return validations
+        next_cursor = None
+        if len(rows) > filters.limit:
+            rows = rows[:filters.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last["priority_order"], last["requested_at"], last["validation_id"])
 
-    def get_statistics(
-        self,
-        days: int = 30
-    ) -> ValidationStatistics:
-        """Calcule les statistiques de validation"""
+        return [self._row_to_request(row) for row in rows], next_cursor
+
+    def count_pending_by_priority(self) -> Dict[str, int]:
+        """Nombre de validations en attente par priorité (parcours de l'index de file)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        cutoff_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
-
-        # Totaux par statut
-        cursor.execute("""
-            SELECT status, COUNT(*) as count
-            FROM validation_requests
-            WHERE requested_at >= ?
-            GROUP BY status
-        """, (cutoff_date,))
-
-        status_counts = dict(cursor.fetchall())
-
-        # Temps moyen de validation
-        cursor.execute("""
-            SELECT
-                AVG((julianday(vd.validated_at) - julianday(vr.requested_at)) * 24 * 60) as avg_minutes,
-                COUNT(*) as count
-            FROM validation_requests vr
-            JOIN validation_decisions vd ON vr.validation_id = vd.validation_id
-            WHERE vr.requested_at >= ?
-            AND vr.status IN ('approved', 'rejected', 'modified')
-        """, (cutoff_date,))
-
-        time_stats = cursor.fetchone()
-        avg_minutes = time_stats[0] if time_stats[0] else None
-
-        # Répartition par type
         cursor.execute("""
-            SELECT validation_type, COUNT(*) as count
+            SELECT priority_order, COUNT(*)
             FROM validation_requests
-            WHERE requested_at >= ?
-            GROUP BY validation_type
-        """, (cutoff_date,))
+            WHERE status = ?
+            GROUP BY priority_order
+        """, (ValidationStatus.PENDING.value,))
+        by_order = dict(cursor.fetchall())
+        conn.close()
 
-        by_type = dict(cursor.fetchall())
+        return {priority: by_order.get(order, 0) for priority, order in PRIORITY_ORDER.items()}
 
-        # Répartition par priorité
-        cursor.execute("""
-            SELECT priority, COUNT(*) as count
-            FROM validation_requests
-            WHERE requested_at >= ?
-            GROUP BY priority
-        """, (cutoff_date,))
+    def get_statistics(
+        self,
+        days: int = 30
+    ) -> ValidationStatistics:
+        """
+        Calcule les statistiques de validation (demandes des `days` derniers jours,
+        au jour près) en une seule lecture des compteurs journaliers.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
 
-        by_priority = dict(cursor.fetchall())
+        cutoff_day = (datetime.utcnow() - timedelta(days=days)).date().isoformat()
 
-        # Répartition par CAS
         cursor.execute("""
-            SELECT case_type, COUNT(*) as count
-            FROM validation_requests
-            WHERE requested_at >= ?
-            AND case_type IS NOT NULL
-            GROUP BY case_type
-        """, (cutoff_date,))
-
-        by_case_type = dict(cursor.fetchall())
-
+            SELECT status, validation_type, priority, case_type,
+                   SUM(request_count), SUM(decided_count), SUM(decision_minutes_sum)
+            FROM validation_stats_daily
+            WHERE day >= ?
+            GROUP BY status, validation_type, priority, case_type
+        """, (cutoff_day,))
+        rows = cursor.fetchall()
         conn.close()
 
+        status_counts: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
+        by_priority: Dict[str, int] = {}
+        by_case_type: Dict[str, int] = {}
+        decided = 0
+        decision_minutes = 0.0
+
+        for status, validation_type, priority, case_type, count, decided_count, minutes in rows:
+            if status in DECIDED_STATUSES:
+                decided += decided_count
+                decision_minutes += minutes
+            if not count:
+                continue
+            status_counts[status] = status_counts.get(status, 0) + count
+            by_type[validation_type] = by_type.get(validation_type, 0) + count
+            by_priority[priority] = by_priority.get(priority, 0) + count
+            if case_type:
+                by_case_type[case_type] = by_case_type.get(case_type, 0) + count
+
+        avg_minutes = decision_minutes / decided if decided else None
+
         total = sum(status_counts.values())
         approved = status_counts.get("approved", 0)
         rejected = status_counts.get("rejected", 0)
@@ -572,20 +743,34 @@ class QuoteValidator:
 
     def expire_old_validations(self) -> int:
         """Expire les validations trop anciennes"""
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
         cursor = conn.cursor()
 
         now = datetime.utcnow().isoformat()
 
+        cursor.execute("BEGIN IMMEDIATE")
+        # Compteurs à déplacer pending → expired, groupés par jour/dimensions
+        moved = cursor.execute("""
+            SELECT substr(requested_at, 1, 10), validation_type, priority, case_type, COUNT(*)
+            FROM validation_requests
+            WHERE status = ?
+            AND expires_at < ?
+            GROUP BY 1, 2, 3, 4
+        """, (ValidationStatus.PENDING.value, now)).fetchall()
+
         cursor.execute("""
             UPDATE validation_requests
             SET status = ?, updated_at = CURRENT_TIMESTAMP
             WHERE status = ?
             AND expires_at < ?
         """, (ValidationStatus.EXPIRED.value, ValidationStatus.PENDING.value, now))
-
         expired_count = cursor.rowcount
-        conn.commit()
+
+        for day, validation_type, priority, case_type, count in moved:
+            self._bump_stats(cursor, day, ValidationStatus.PENDING.value, validation_type, priority, case_type, -count)
+            self._bump_stats(cursor, day, ValidationStatus.EXPIRED.value, validation_type, priority, case_type, count)
+
+        cursor.execute("COMMIT")
         conn.close()
 
         if expired_count > 0:
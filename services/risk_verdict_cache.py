@@ -0,0 +1,356 @@
+"""
+Cache persistant des verdicts de risque client (risk_check_service)
+
+- Verdicts OK / WARNING / BLOCKED conservés RISK_CACHE_TTL_HOURS (24 h),
+  indexés par SIREN et par nom d'entreprise normalisé
+- Une seule vérification Pappers en cours par clé : les devis simultanés
+  d'un même client attendent le même appel
+- Rafraîchissement en arrière-plan des verdicts proches de l'expiration
+  (à l'accès et par balayage périodique) : le chemin de requête n'attend
+  l'API que pour un client inconnu ou un verdict expiré. Le balayage ne
+  revérifie qu'une fois chaque entreprise (clés nom/SIREN regroupées), et
+  seulement celles consultées récemment ; un échec espace les tentatives
+- Verdicts expirés depuis plus de RISK_CACHE_STALE_GRACE_HOURS supprimés
+- UNKNOWN (API indisponible, clé absente…) n'est jamais mis en cache ; si
+  un verdict expiré existe, il est renvoyé marqué stale=True
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.risk_check_service import get_company_risk
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent / "data" / "risk_verdicts.db"
+
+RISK_CACHE_TTL_HOURS = float(os.getenv("RISK_CACHE_TTL_HOURS", "24"))
+# Fenêtre avant expiration pendant laquelle un verdict est revérifié en arrière-plan
+RISK_CACHE_REFRESH_AHEAD_HOURS = float(os.getenv("RISK_CACHE_REFRESH_AHEAD_HOURS", "2"))
+RISK_CACHE_SWEEP_INTERVAL_S = int(os.getenv("RISK_CACHE_SWEEP_INTERVAL_S", "900"))
+RISK_CACHE_SWEEP_BATCH = 20
+# Seuls les verdicts consultés dans cette fenêtre sont revérifiés par le balayage
+RISK_CACHE_ACTIVE_HOURS = float(os.getenv("RISK_CACHE_ACTIVE_HOURS", "72"))
+# Durée pendant laquelle un verdict expiré reste servable (stale) si Pappers est indisponible
+RISK_CACHE_STALE_GRACE_HOURS = float(os.getenv("RISK_CACHE_STALE_GRACE_HOURS", "72"))
+# Délai maximal entre deux tentatives de revérification après échecs successifs
+RISK_CACHE_MAX_BACKOFF_S = 24 * 3600
+
+_CACHEABLE_STATUSES = {"OK", "WARNING", "BLOCKED"}
+
+_LEGAL_FORMS = {
+    "sa", "sas", "sasu", "sarl", "eurl", "sci", "snc", "scop", "selarl", "gie",
+    "ets", "etablissements", "societe", "ste", "group", "groupe",
+}
+
+_inflight: Dict[str, asyncio.Task] = {}
+_refresher_task: Optional[asyncio.Task] = None
+
+
+def get_connection() -> sqlite3.Connection:
+    """Crée une connexion à la base SQLite."""
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_database():
+    """Crée la table des verdicts si elle n'existe pas."""
+    conn = get_connection()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS risk_verdicts (
+            cache_key TEXT PRIMARY KEY,
+            company_name TEXT,
+            siren TEXT,
+            verdict TEXT NOT NULL,
+            checked_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_accessed REAL NOT NULL DEFAULT 0,
+            refresh_failures INTEGER NOT NULL DEFAULT 0,
+            next_refresh_at REAL NOT NULL DEFAULT 0
+        )
+    """)
+    # Migration des bases créées avant le suivi des accès et des échecs
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(risk_verdicts)")}
+    for column, ddl in (
+        ("last_accessed", "REAL NOT NULL DEFAULT 0"),
+        ("refresh_failures", "INTEGER NOT NULL DEFAULT 0"),
+        ("next_refresh_at", "REAL NOT NULL DEFAULT 0"),
+    ):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE risk_verdicts ADD COLUMN {column} {ddl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_risk_verdicts_expires ON risk_verdicts(expires_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_risk_verdicts_siren ON risk_verdicts(siren)")
+    conn.commit()
+    conn.close()
+
+
+def normalize_siren(siren: Optional[str]) -> Optional[str]:
+    """9 chiffres du SIREN (espaces, points, SIRET tronqué) ou None."""
+    digits = re.sub(r"\D", "", siren or "")
+    return digits[:9] if len(digits) >= 9 else None
+
+
+def normalize_company_name(name: Optional[str]) -> Optional[str]:
+    """Nom sans accents, casse, ponctuation ni forme juridique (SAS, SARL…)."""
+    text = unicodedata.normalize("NFD", name or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower().replace(".", "")
+    tokens = [t for t in re.findall(r"[a-z0-9]+", text) if t not in _LEGAL_FORMS]
+    return " ".join(tokens) or None
+
+
+def _cache_keys(company_name: Optional[str], siren: Optional[str]) -> List[str]:
+    """Clés de recherche, par priorité (SIREN d'abord)."""
+    keys = []
+    clean_siren = normalize_siren(siren)
+    if clean_siren:
+        keys.append(f"siren:{clean_siren}")
+    clean_name = normalize_company_name(company_name)
+    if clean_name:
+        keys.append(f"name:{clean_name}")
+    return keys
+
+
+def _load(keys: List[str]) -> Optional[sqlite3.Row]:
+    if not keys:
+        return None
+    conn = get_connection()
+    try:
+        for key in keys:
+            row = conn.execute("SELECT * FROM risk_verdicts WHERE cache_key = ?", (key,)).fetchone()
+            if row is not None:
+                return row
+        return None
+    finally:
+        conn.close()
+
+
+def _store(keys: List[str], company_name: Optional[str], siren: Optional[str], verdict: dict) -> None:
+    now = time.time()
+    expires_at = now + RISK_CACHE_TTL_HOURS * 3600
+    # Un verdict trouvé par nom porte souvent le SIREN : l'indexer aussi par SIREN
+    found_siren = normalize_siren(str((verdict.get("raw") or {}).get("siren") or "")) or normalize_siren(siren)
+    all_keys = list(dict.fromkeys(keys + ([f"siren:{found_siren}"] if found_siren else [])))
+    verdict_json = json.dumps(verdict, ensure_ascii=False)
+    conn = get_connection()
+    try:
+        # last_accessed conservé pour une clé existante : une revérification n'est pas une consultation
+        conn.executemany(
+            """
+            INSERT INTO risk_verdicts
+                (cache_key, company_name, siren, verdict, checked_at, expires_at, last_accessed)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                company_name = excluded.company_name, siren = excluded.siren,
+                verdict = excluded.verdict, checked_at = excluded.checked_at,
+                expires_at = excluded.expires_at, refresh_failures = 0, next_refresh_at = 0
+            """,
+            [(key, company_name, found_siren, verdict_json, now, expires_at, now) for key in all_keys],
+        )
+        if found_siren:
+            # Autres noms déjà rattachés à ce SIREN : même entreprise, même verdict
+            conn.execute(
+                """
+                UPDATE risk_verdicts
+                SET verdict = ?, checked_at = ?, expires_at = ?, refresh_failures = 0, next_refresh_at = 0
+                WHERE siren = ?
+                """,
+                (verdict_json, now, expires_at, found_siren),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _touch(row: sqlite3.Row) -> None:
+    """Marque le verdict comme consulté (au plus une écriture par heure et par verdict)."""
+    now = time.time()
+    if now - row["last_accessed"] < 3600:
+        return
+    conn = get_connection()
+    try:
+        conn.execute(
+            "UPDATE risk_verdicts SET last_accessed = ? WHERE cache_key = ? OR (siren IS NOT NULL AND siren = ?)",
+            (now, row["cache_key"], row["siren"]),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def _lookup_and_store(keys: List[str], company_name: Optional[str], siren: Optional[str]) -> dict:
+    verdict = await get_company_risk(company_name=company_name, siren=siren)
+    if verdict.get("status") in _CACHEABLE_STATUSES:
+        try:
+            _store(keys, company_name, siren, verdict)
+        except Exception as exc:
+            logger.warning("risk_cache: écriture impossible pour %s : %s", keys[0], exc)
+    return verdict
+
+
+def _single_flight(keys: List[str], company_name: Optional[str], siren: Optional[str]) -> asyncio.Task:
+    """Vérification en cours pour cette clé, ou nouvelle vérification."""
+    key = keys[0]
+    task = _inflight.get(key)
+    if task is None or task.done():
+        task = asyncio.ensure_future(_lookup_and_store(keys, company_name, siren))
+        _inflight[key] = task
+        task.add_done_callback(lambda t, k=key: _inflight.pop(k, None) if _inflight.get(k) is t else None)
+    return task
+
+
+def _cached_result(row: sqlite3.Row, stale: bool = False) -> dict:
+    verdict = json.loads(row["verdict"])
+    verdict["cached"] = True
+    if stale:
+        verdict["stale"] = True
+    return verdict
+
+
+async def get_company_risk_cached(
+    company_name: Optional[str] = None,
+    siren: Optional[str] = None,
+) -> dict:
+    """
+    get_company_risk avec cache persistant et dédoublonnage des appels concurrents.
+    Même format de retour, plus cached=True (et stale=True) si servi depuis le cache.
+    """
+    keys = _cache_keys(company_name, siren)
+    if not keys:
+        return await get_company_risk(company_name=company_name, siren=siren)
+
+    try:
+        row = _load(keys)
+    except Exception as exc:
+        logger.warning("risk_cache: lecture impossible (%s) — appel direct", exc)
+        row = None
+
+    if row is not None:
+        try:
+            _touch(row)
+        except Exception as exc:
+            logger.warning("risk_cache: suivi d'accès impossible pour %s : %s", keys[0], exc)
+
+    now = time.time()
+    if row is not None and now < row["expires_at"]:
+        if now >= row["expires_at"] - RISK_CACHE_REFRESH_AHEAD_HOURS * 3600:
+            _single_flight(keys, company_name, siren)  # rafraîchissement sans attendre
+        return _cached_result(row)
+
+    # shield : un appelant annulé n'interrompt pas la vérification partagée
+    verdict = await asyncio.shield(_single_flight(keys, company_name, siren))
+    if verdict.get("status") not in _CACHEABLE_STATUSES and row is not None:
+        logger.warning("risk_cache: Pappers indisponible — verdict expiré servi pour %s", keys[0])
+        return _cached_result(row, stale=True)
+    return verdict
+
+
+def _expiring_entries(limit: int) -> List[sqlite3.Row]:
+    """
+    Entreprises à revérifier : une ligne par verdict (clés nom/SIREN regroupées),
+    consultées récemment, hors attente après échec. Purge au passage les
+    verdicts expirés depuis plus que le délai de grâce.
+    """
+    now = time.time()
+    conn = get_connection()
+    try:
+        conn.execute(
+            "DELETE FROM risk_verdicts WHERE expires_at < ?",
+            (now - RISK_CACHE_STALE_GRACE_HOURS * 3600,),
+        )
+        conn.commit()
+        return conn.execute(
+            """
+            SELECT MIN(cache_key) AS cache_key, MAX(company_name) AS company_name, siren,
+                   MAX(refresh_failures) AS refresh_failures, MIN(expires_at) AS expires_at
+            FROM risk_verdicts
+            WHERE expires_at <= ? AND next_refresh_at <= ? AND last_accessed >= ?
+            GROUP BY COALESCE(siren, cache_key)
+            ORDER BY expires_at
+            LIMIT ?
+            """,
+            (
+                now + RISK_CACHE_REFRESH_AHEAD_HOURS * 3600,
+                now,
+                now - RISK_CACHE_ACTIVE_HOURS * 3600,
+                limit,
+            ),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _postpone(entry: sqlite3.Row) -> None:
+    """Revérification échouée : prochaine tentative après un délai qui double à chaque échec."""
+    failures = entry["refresh_failures"] + 1
+    delay = min(RISK_CACHE_SWEEP_INTERVAL_S * 2 ** failures, RISK_CACHE_MAX_BACKOFF_S)
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            UPDATE risk_verdicts SET refresh_failures = ?, next_refresh_at = ?
+            WHERE cache_key = ? OR (siren IS NOT NULL AND siren = ?)
+            """,
+            (failures, time.time() + delay, entry["cache_key"], entry["siren"]),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def refresh_expiring_verdicts(limit: int = RISK_CACHE_SWEEP_BATCH) -> int:
+    """Revérifie les verdicts qui expirent bientôt ; retourne le nombre d'entreprises traitées."""
+    entries = _expiring_entries(limit)
+    for entry in entries:
+        # Revérifier par SIREN quand il est connu (plus fiable que le nom)
+        company_name, siren = entry["company_name"], entry["siren"]
+        keys = _cache_keys(company_name, siren) or [entry["cache_key"]]
+        verdict = await _single_flight(keys, company_name, siren)
+        if verdict.get("status") not in _CACHEABLE_STATUSES:
+            _postpone(entry)
+    if entries:
+        logger.info("🔄 risk_cache: %d verdict(s) revérifié(s) avant expiration", len(entries))
+    return len(entries)
+
+
+async def _refresher_loop(interval_s: int) -> None:
+    while True:
+        try:
+            await refresh_expiring_verdicts()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("risk_cache: balayage échoué : %s", exc)
+        await asyncio.sleep(interval_s)
+
+
+def start_risk_cache_refresher(interval_s: int = RISK_CACHE_SWEEP_INTERVAL_S) -> None:
+    """Lance le balayage périodique (à appeler depuis le lifespan FastAPI)."""
+    global _refresher_task
+    if _refresher_task is None or _refresher_task.done():
+        _refresher_task = asyncio.create_task(_refresher_loop(interval_s))
+        logger.info("✅ Rafraîchissement des verdicts de risque démarré")
+
+
+async def stop_risk_cache_refresher() -> None:
+    global _refresher_task
+    if _refresher_task is not None:
+        _refresher_task.cancel()
+        try:
+            await _refresher_task
+        except asyncio.CancelledError:
+            pass
+        _refresher_task = None
+
+
+# Initialiser la base au chargement du module
+init_database()
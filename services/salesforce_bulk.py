@@ -0,0 +1,103 @@
+"""
+Écritures Salesforce groupées (API sObject Collections)
+
+- Création par lots de 200 enregistrements max par requête
+  (POST composite/sobjects, allOrNone=true) au lieu d'un appel par ligne
+- Tout ou rien sur l'ensemble des lots : si un lot échoue, les lots déjà
+  créés sont supprimés (DELETE composite/sobjects)
+
+`sf` est une instance simple_salesforce.Salesforce (méthode restful).
+"""
+
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Limite Salesforce par requête sObject Collections
+COLLECTION_CHUNK_SIZE = 200
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _record_errors(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Erreurs d'un lot (hors lignes annulées par allOrNone, conséquence de ces erreurs)"""
+    errors = []
+    for index, result in enumerate(results or []):
+        if result.get("success"):
+            continue
+        for error in result.get("errors") or [{"message": "Échec sans détail"}]:
+            if error.get("statusCode") == "ALL_OR_NONE_OPERATION_ROLLED_BACK":
+                continue
+            errors.append({"index": index, **error})
+    return errors
+
+
+def delete_records_bulk(sf, record_ids: List[str], chunk_size: int = COLLECTION_CHUNK_SIZE) -> int:
+    """Supprime des enregistrements par lots ; retourne le nombre supprimé."""
+    deleted = 0
+    for chunk in _chunks(list(record_ids), chunk_size):
+        results = sf.restful(
+            "composite/sobjects",
+            params={"ids": ",".join(chunk), "allOrNone": "false"},
+            method="DELETE",
+        ) or []
+        deleted += sum(1 for r in results if r.get("success"))
+    return deleted
+
+
+def create_records_bulk(
+    sf,
+    sobject: str,
+    records: List[Dict[str, Any]],
+    chunk_size: int = COLLECTION_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Crée `records` (type `sobject`) par lots, en tout ou rien.
+
+    Returns:
+        {"success": True, "ids": [...], "requests": n} ou
+        {"success": False, "error": ..., "errors": [...], "rolled_back": n}
+    """
+    created_ids: List[str] = []
+    requests_count = 0
+
+    for chunk_index, chunk in enumerate(_chunks(records, chunk_size)):
+        payload = {
+            "allOrNone": True,
+            "records": [{"attributes": {"type": sobject}, **record} for record in chunk],
+        }
+        try:
+            requests_count += 1
+            results = sf.restful("composite/sobjects", method="POST", json=payload) or []
+            errors = _record_errors(results)
+            if not errors and len(results) != len(chunk):
+                errors = [{"message": f"{len(results)} résultats pour {len(chunk)} enregistrements"}]
+        except Exception as e:
+            results, errors = [], [{"message": str(e)}]
+
+        if errors:
+            offset = chunk_index * chunk_size
+            errors = [{**e, "index": offset + e["index"]} if "index" in e else e for e in errors]
+            logger.error(f"❌ Lot {sobject} {chunk_index + 1} refusé : {errors[0].get('message')}")
+            rolled_back = 0
+            if created_ids:
+                try:
+                    rolled_back = delete_records_bulk(sf, created_ids, chunk_size)
+                    logger.warning(f"↩️ {rolled_back}/{len(created_ids)} {sobject} déjà créés supprimés")
+                except Exception as e:
+                    logger.error(f"❌ Annulation des {sobject} déjà créés impossible : {e}")
+            return {
+                "success": False,
+                "error": f"Échec création {sobject} : {errors[0].get('message')}",
+                "errors": errors,
+                "rolled_back": rolled_back,
+                "requests": requests_count,
+            }
+
+        created_ids.extend(r["id"] for r in results)
+
+    logger.info(f"✅ {len(created_ids)} {sobject} créés en {requests_count} requête(s)")
+    return {"success": True, "ids": created_ids, "requests": requests_count}
@@ -15,7 +15,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from services.security_helpers import escape_odata
-from services.sap_tls import SAP_VERIFY
+from services.sap_session_pool import SAPSessionPool
 from services.quote_quota_service import get_quote_quota_service, QuotaDevisDepasse
 
 logger = logging.getLogger(__name__)
@@ -67,48 +67,39 @@ class SAPBusinessService:
         self.company_db = os.getenv("SAP_CLIENT_RONDOT", os.getenv("SAP_CLIENT"))
         self.password = os.getenv("SAP_CLIENT_PASSWORD_RONDOT", os.getenv("SAP_CLIENT_PASSWORD"))
 
-        self.session_id: Optional[str] = None
-        self.session_timeout: Optional[datetime] = None
+        # Sessions Service Layer partagées par toutes les requêtes du service
+        self.pool = SAPSessionPool(self.base_url, self.company_db, self.username, self.password)
 
         logger.info(f"SAP Service initialized with DB: {self.company_db}")
 
-    async def ensure_session(self) -> bool:
-        """Assure qu'une session SAP valide existe"""
-        if self.session_id and self.session_timeout and datetime.now() < self.session_timeout:
-            return True
+    @property
+    def session_id(self) -> Optional[str]:
+        """Session active la plus récente du pool (emprunt par SAPQuotationService)"""
+        session = self.pool.primary_session()
+        return session.session_id if session else None
 
-        return await self.login()
+    @property
+    def session_timeout(self) -> Optional[datetime]:
+        session = self.pool.primary_session()
+        return self.pool.session_timeout(session) if session else None
 
-    async def login(self) -> bool:
-        """Connexion à SAP Business One"""
-        try:
-            login_data = {
-                "CompanyDB": self.company_db,
-                "UserName": self.username,
-                "Password": self.password
-            }
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Taille et occupation du pool de sessions SAP"""
+        return self.pool.stats()
 
-            async with httpx.AsyncClient(verify=SAP_VERIFY, timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/Login",
-                    json=login_data
-                )
-
-            if response.status_code == 200:
-                result = response.json()
-                self.session_id = result.get("SessionId")
-                # Session valide 20 minutes
-                self.session_timeout = datetime.now() + timedelta(minutes=20)
-                logger.info(f"✓ SAP login successful - Session: {self.session_id[:20]}...")
+    async def ensure_session(self) -> bool:
+        """Assure qu'une session SAP valide existe"""
+        try:
+            async with self.pool.lease():
                 return True
-            else:
-                logger.error(f"✗ SAP login failed: {response.status_code} - {response.text}")
-                return False
-
         except Exception as e:
             logger.error(f"✗ SAP login error: {e}")
             return False
 
+    async def login(self) -> bool:
+        """Connexion à SAP Business One (nouvelle session sur la prochaine session du pool)"""
+        return await self.pool.relogin()
+
     async def _call_sap(
         self,
         endpoint: str,
@@ -126,53 +117,22 @@ class SAPBusinessService:
             raise RuntimeError(
                 f"SAP call failed after {_retry_count} retries: {method} {endpoint}"
             )
-        if not await self.ensure_session():
-            raise Exception("Impossible de se connecter à SAP")
-
-        headers = {
-            "Cookie": f"B1SESSION={self.session_id}",
-            "Content-Type": "application/json"
-        }
-
-        url = f"{self.base_url}{endpoint}"
+        if method not in ("GET", "POST", "PATCH"):
+            raise ValueError(f"Méthode HTTP non supportée: {method}")
 
         try:
-            async with httpx.AsyncClient(verify=SAP_VERIFY, timeout=30.0) as client:
-                if method == "GET":
-                    response = await client.get(url, headers=headers, params=params)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=payload)
-                elif method == "PATCH":
-                    response = await client.patch(url, headers=headers, json=payload)
-                else:
-                    raise ValueError(f"Méthode HTTP non supportée: {method}")
-
-                response.raise_for_status()
-                return response.json()
+            # 401 / switch company (305) : reconnexion de la session empruntée gérée par le pool
+            response = await self.pool.request(
+                method,
+                endpoint,
+                json=payload if method != "GET" else None,
+                params=params if method == "GET" else None,
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
-            if e.response.status_code == 401:
-                # Session expirée, réessayer après login
-                logger.warning("Session expirée, reconnexion...")
-                self.session_id = None
-                if await self.login():
-                    return await self._call_sap(endpoint, method, payload, params, _retry_count=_retry_count + 1)
-
-            elif e.response.status_code == 500:
-                # Vérifier si c'est un Switch company error (code 305)
-                try:
-                    error_body = e.response.json()
-                    if error_body.get("error", {}).get("code") == 305:
-                        logger.warning("Switch company error (305), réinitialisation session et reconnexion...")
-                        self.session_id = None
-                        self.session_timeout = None
-                        await asyncio.sleep(1.0)  # Laisser SAP stabiliser sa session
-                        if await self.login():
-                            return await self._call_sap(endpoint, method, payload, params, _retry_count=_retry_count + 1)
-                except Exception:
-                    pass
-
-            elif e.response.status_code == 502:
+            if e.response.status_code == 502:
                 # SAP proxy temporairement surchargé — réessayer après délai
                 logger.warning("Erreur 502 SAP (proxy), retry dans 3s...")
                 await asyncio.sleep(3.0)
@@ -699,28 +659,22 @@ class SAPBusinessService:
                         f"⚠️ Devis SAP créé (DocEntry={doc_entry}) mais incrément du "
                         f"compteur de quota échoué : {quota_exc}"
                     )
+            else:
+                get_quote_quota_service().release()
             return doc_entry
 
         except Exception as e:
             logger.error(f"✗ Erreur création devis: {e}")
+            # Création en échec : unité de quota rendue (sauf délai dépassé : le
+            # devis a pu être créé côté SAP)
+            if not isinstance(e, httpx.TimeoutException):
+                get_quote_quota_service().release()
             return None
 
     async def logout(self) -> bool:
-        """Déconnexion de SAP"""
-        if not self.session_id:
-            return True
-
+        """Déconnexion de SAP (toutes les sessions du pool)"""
         try:
-            headers = {
-                "Cookie": f"B1SESSION={self.session_id}",
-                "Content-Type": "application/json"
-            }
-
-            async with httpx.AsyncClient(verify=SAP_VERIFY, timeout=10.0) as client:
-                await client.post(f"{self.base_url}/Logout", headers=headers)
-
-            self.session_id = None
-            self.session_timeout = None
+            await self.pool.close()
             logger.info("✓ SAP logout successful")
             return True
 
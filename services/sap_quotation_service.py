@@ -324,8 +324,22 @@ class SAPQuotationService:
         """
         # ── Quota mensuel (blocage dur) : vérifié AVANT toute création SAP ──
         # QuotaDevisDepasse se propage volontairement (hors try) jusqu'à la route.
-        get_quote_quota_service().check_quota()
+        quota = get_quote_quota_service()
+        quota.check_quota()
 
+        try:
+            result = await self._post_sales_quotation(payload)
+        except Exception:
+            quota.release()
+            raise
+        # Création en échec : unité de quota rendue (sauf délai dépassé : le devis
+        # a pu être créé côté SAP, l'unité reste consommée)
+        if not result.success and result.error_code != "SAP_TIMEOUT":
+            quota.release()
+        return result
+
+    async def _post_sales_quotation(self, payload: QuotationPayload) -> QuotationResult:
+        """Création SAP proprement dite (quota déjà vérifié) ; incrémente le compteur si succès."""
         if not await self.ensure_session():
             return QuotationResult(
                 success=False,
@@ -0,0 +1,248 @@
+"""
+Pool de sessions SAP B1 Service Layer
+
+- SAP_SESSION_POOL_SIZE sessions authentifiées (login à la demande), sur un
+  seul httpx.AsyncClient à connexions persistantes
+- Chaque requête emprunte une session pour sa durée : un 401 ou une erreur
+  « switch company » (305) ne reconnecte que cette session, une seule fois,
+  sans perturber les requêtes en cours sur les autres
+- Sessions rendues en LIFO : en charge faible, une seule session est utilisée
+  et les autres ne consomment pas de licence SAP
+- stats() expose taille, occupation et nombre de logins
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from services.sap_tls import SAP_VERIFY
+
+logger = logging.getLogger(__name__)
+
+SAP_SESSION_POOL_SIZE = int(os.getenv("SAP_SESSION_POOL_SIZE", "3"))
+# Session valide 20 minutes (timeout Service Layer par défaut : 30)
+SESSION_TTL_S = 20 * 60
+SWITCH_COMPANY_ERROR = 305
+
+
+class SAPSessionError(Exception):
+    """Aucune session SAP n'a pu être ouverte."""
+
+
+@dataclass
+class PooledSession:
+    """Une session Service Layer du pool."""
+    index: int
+    session_id: Optional[str] = None
+    cookies: Dict[str, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+    requests: int = 0
+    logins: int = 0
+
+    @property
+    def valid(self) -> bool:
+        return bool(self.session_id) and time.monotonic() < self.expires_at
+
+    def cookie_header(self) -> str:
+        cookies = {**self.cookies, "B1SESSION": self.session_id or ""}
+        return "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+
+class SAPSessionPool:
+    """Sessions SAP partagées entre requêtes concurrentes."""
+
+    def __init__(
+        self,
+        base_url: str,
+        company_db: str,
+        username: str,
+        password: str,
+        size: int = SAP_SESSION_POOL_SIZE,
+        timeout: float = 30.0,
+        switch_company_delay_s: float = 1.0,
+    ):
+        self.base_url = base_url
+        self.company_db = company_db
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.switch_company_delay_s = switch_company_delay_s
+        self.sessions: List[PooledSession] = [PooledSession(i) for i in range(max(1, size))]
+
+        self._idle: Optional[asyncio.LifoQueue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._waiting = 0
+        self.total_requests = 0
+
+    # --- Connexions ---
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            # Les cookies sont portés par chaque session, jamais par le client partagé
+            no_cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+            self._client = httpx.AsyncClient(
+                verify=SAP_VERIFY,
+                timeout=self.timeout,
+                cookies=no_cookies,
+                limits=httpx.Limits(
+                    max_connections=len(self.sessions) * 2,
+                    max_keepalive_connections=len(self.sessions),
+                ),
+            )
+        return self._client
+
+    def _get_idle(self) -> asyncio.LifoQueue:
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+            for session in reversed(self.sessions):
+                self._idle.put_nowait(session)
+        return self._idle
+
+    async def _login(self, session: PooledSession) -> bool:
+        session.session_id = None
+        try:
+            response = await self._get_client().post(
+                f"{self.base_url}/Login",
+                json={"CompanyDB": self.company_db, "UserName": self.username, "Password": self.password},
+            )
+        except Exception as e:
+            logger.error(f"✗ SAP login error (session #{session.index}): {e}")
+            return False
+
+        if response.status_code != 200:
+            logger.error(f"✗ SAP login failed (session #{session.index}): {response.status_code} - {response.text}")
+            return False
+
+        session.session_id = response.json().get("SessionId")
+        # ROUTEID & co : affinité avec le nœud Service Layer qui a ouvert la session
+        session.cookies = {k: v for k, v in response.cookies.items() if k != "B1SESSION"}
+        session.expires_at = time.monotonic() + SESSION_TTL_S
+        session.logins += 1
+        logger.info(f"✓ SAP login successful - session #{session.index}: {(session.session_id or '')[:20]}...")
+        return bool(session.session_id)
+
+    # --- Emprunt ---
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledSession]:
+        """Emprunte une session valide (login si nécessaire) pour la durée du bloc."""
+        idle = self._get_idle()
+        self._waiting += 1
+        try:
+            session = await idle.get()
+        finally:
+            self._waiting -= 1
+        try:
+            if not session.valid and not await self._login(session):
+                raise SAPSessionError("Impossible de se connecter à SAP")
+            yield session
+        finally:
+            idle.put_nowait(session)
+
+    async def relogin(self) -> bool:
+        """Force une nouvelle session sur la prochaine session empruntée."""
+        try:
+            async with self.lease() as session:
+                return await self._login(session)
+        except SAPSessionError:
+            return False
+
+    @staticmethod
+    def _needs_relogin(response: httpx.Response) -> bool:
+        if response.status_code == 401:
+            return True
+        if response.status_code == 500:
+            try:
+                code = response.json().get("error", {}).get("code")
+            except Exception:
+                return False
+            return code in (SWITCH_COMPANY_ERROR, str(SWITCH_COMPANY_ERROR))
+        return False
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        """
+        Envoie une requête sur une session empruntée.
+        Session expirée côté SAP (401 / 305) : reconnexion de cette session puis
+        un seul nouvel essai ; la réponse finale est renvoyée telle quelle.
+        """
+        async with self.lease() as session:
+            for attempt in range(2):
+                session.requests += 1
+                self.total_requests += 1
+                response = await self._get_client().request(
+                    method,
+                    f"{self.base_url}{endpoint}",
+                    headers={"Cookie": session.cookie_header(), "Content-Type": "application/json"},
+                    json=json,
+                    params=params,
+                )
+                if attempt == 0 and self._needs_relogin(response):
+                    if response.status_code == 401:
+                        logger.warning(f"Session SAP #{session.index} expirée, reconnexion...")
+                    else:
+                        logger.warning(f"Switch company error (305) sur la session #{session.index}, reconnexion...")
+                        await self._logout(session)  # Libérer la licence de la session inutilisable
+                        await asyncio.sleep(self.switch_company_delay_s)  # Laisser SAP stabiliser sa session
+                    if await self._login(session):
+                        continue
+                return response
+
+    # --- Observabilité / arrêt ---
+
+    def primary_session(self) -> Optional[PooledSession]:
+        """Session valide la plus récemment ouverte (compatibilité session unique)."""
+        valid = [s for s in self.sessions if s.valid]
+        return max(valid, key=lambda s: s.expires_at) if valid else None
+
+    def session_timeout(self, session: PooledSession) -> datetime:
+        return datetime.now() + timedelta(seconds=session.expires_at - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        size = len(self.sessions)
+        idle = self._idle.qsize() if self._idle is not None else size
+        in_use = size - idle
+        return {
+            "size": size,
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": self._waiting,
+            "logged_in": sum(1 for s in self.sessions if s.valid),
+            "utilization": round(in_use / size, 2),
+            "requests": self.total_requests,
+            "logins": sum(s.logins for s in self.sessions),
+        }
+
+    async def _logout(self, session: PooledSession) -> None:
+        try:
+            await self._get_client().post(
+                f"{self.base_url}/Logout",
+                headers={"Cookie": session.cookie_header(), "Content-Type": "application/json"},
+            )
+        except Exception as e:
+            logger.error(f"✗ Erreur déconnexion SAP (session #{session.index}): {e}")
+        session.session_id = None
+        session.expires_at = 0.0
+
+    async def close(self) -> None:
+        """Logout de toutes les sessions ouvertes et fermeture des connexions."""
+        for session in self.sessions:
+            if session.session_id:
+                await self._logout(session)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._idle = None
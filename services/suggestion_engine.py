@@ -14,9 +14,13 @@ from dataclasses import dataclass, field
 from enum import Enum
 import asyncio
 from thefuzz import fuzz, process
+from thefuzz.utils import full_process
+from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
 import re
 from datetime import datetime, timezone
 
+from services.suggestion_index import INDEX_MIN_CANDIDATES, get_suggestion_index
+
 logger = logging.getLogger(__name__)
 
 class SuggestionType(Enum):
@@ -114,6 +118,48 @@ class FuzzyMatcher:
         
         return round(final_score, 2)
     
+    @staticmethod
+    def prepare(text: str) -> Tuple[str, str]:
+        """Formes de `text` utilisées par calculate_similarity (simple, puis pour les scores par mots)"""
+        norm = text.lower().strip()
+        return norm, full_process(norm, force_ascii=True)
+
+    @staticmethod
+    def similarities_prepared(query: str, norms: List[str], token_forms: List[str]) -> List[float]:
+        """
+        calculate_similarity(query, c) pour des candidats non vides déjà passés par
+        prepare() : mêmes scores, chaque algorithme appliqué à toute la liste dans rapidfuzz
+        """
+        if not query:
+            return [0.0] * len(norms)
+        query_norm, query_tokens = FuzzyMatcher.prepare(query)
+
+        def scores(scorer, text: str, choices: List[str]) -> List[int]:
+            result = [0] * len(choices)
+            for _, score, i in rapid_process.extract(text, choices, scorer=scorer, processor=None, limit=None):
+                result[i] = int(round(score))
+            return result
+
+        ratio = scores(rapid_fuzz.ratio, query_norm, norms)
+        partial_ratio = scores(rapid_fuzz.partial_ratio, query_norm, norms)
+        token_sort = scores(rapid_fuzz.token_sort_ratio, query_tokens, token_forms)
+        token_set = scores(rapid_fuzz.token_set_ratio, query_tokens, token_forms)
+
+        return [
+            100.0 if norm == query_norm
+            else round(ratio[i] * 0.3 + partial_ratio[i] * 0.2 + token_sort[i] * 0.25 + token_set[i] * 0.25, 2)
+            for i, (norm, token_form) in enumerate(zip(norms, token_forms))
+        ]
+
+    @staticmethod
+    def calculate_similarities(query: str, candidates: List[str]) -> List[float]:
+        """calculate_similarity(query, c) pour chaque candidat, en une passe rapidfuzz par algorithme"""
+        prepared = [FuzzyMatcher.prepare(c) if c else ("", "") for c in candidates]
+        scores = FuzzyMatcher.similarities_prepared(
+            query, [p[0] for p in prepared], [p[1] for p in prepared]
+        )
+        return [score if c else 0.0 for score, c in zip(scores, candidates)]
+
     @staticmethod
     def find_best_matches(query: str, candidates: List[Dict[str, Any]], 
                          key_field: str = "name", limit: int = 5) -> List[Dict[str, Any]]:
@@ -121,17 +167,16 @@ class FuzzyMatcher:
         if not query or not candidates:
             return []
         
+        valued = [candidate for candidate in candidates if candidate.get(key_field, "")]
+        scores = FuzzyMatcher.calculate_similarities(query, [candidate[key_field] for candidate in valued])
         matches = []
-        for candidate in candidates:
-            candidate_value = candidate.get(key_field, "")
-            if candidate_value:
-                score = FuzzyMatcher.calculate_similarity(query, candidate_value)
-                if score > 30:  # Seuil minimum de pertinence
-                    matches.append({
-                        **candidate,
-                        "similarity_score": score,
-                        "matched_field": key_field
-                    })
+        for candidate, score in zip(valued, scores):
+            if score > 30:  # Seuil minimum de pertinence
+                matches.append({
+                    **candidate,
+                    "similarity_score": score,
+                    "matched_field": key_field
+                })
         
         # Trier par score dÃ©croissant
         matches.sort(key=lambda x: x["similarity_score"], reverse=True)
@@ -147,6 +192,19 @@ class SuggestionEngine:
     def __init__(self):
         self.matcher = FuzzyMatcher()
         self.conversation_patterns = self._load_conversation_patterns()
+
+    def _find_matches(self, query: str, candidates: List[Dict[str, Any]], key_field: str,
+                      indexed_fields: Tuple[str, ...], limit: int) -> List[Dict[str, Any]]:
+        """
+        Grands catalogues : index pré-calculé (reconstruit si les données changent),
+        parcours complet si petit catalogue ou si l'index ne propose rien au-dessus du seuil
+        """
+        if len(candidates) >= INDEX_MIN_CANDIDATES:
+            matches = get_suggestion_index(candidates, indexed_fields).search(query, key_field, limit=limit)
+            if matches:
+                return matches
+            logger.debug(f"🔎 Index sans résultat pour '{query}' : parcours complet")
+        return self.matcher.find_best_matches(query, candidates, key_field=key_field, limit=limit)
         
     def _load_conversation_patterns(self) -> Dict[str, str]:
         """Templates de conversation pour diffÃ©rents scÃ©narios"""
@@ -192,10 +250,11 @@ class SuggestionEngine:
             return SuggestionResult(has_suggestions=False)
         
         # Recherche des correspondances
-        matches = self.matcher.find_best_matches(
+        matches = self._find_matches(
             user_input, 
             available_clients, 
             key_field="Name",
+            indexed_fields=("Name",),
             limit=5
         )
         
@@ -257,14 +316,16 @@ class SuggestionEngine:
         matches = []
         
         # Recherche par code produit
-        code_matches = self.matcher.find_best_matches(
-            user_input, available_products, key_field="ItemCode", limit=3
+        code_matches = self._find_matches(
+            user_input, available_products, key_field="ItemCode",
+            indexed_fields=("ItemCode", "ItemName"), limit=3
         )
         matches.extend(code_matches)
         
         # Recherche par nom produit
-        name_matches = self.matcher.find_best_matches(
-            user_input, available_products, key_field="ItemName", limit=3
+        name_matches = self._find_matches(
+            user_input, available_products, key_field="ItemName",
+            indexed_fields=("ItemCode", "ItemName"), limit=3
         )
         matches.extend(name_matches)
         
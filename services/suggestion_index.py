@@ -0,0 +1,363 @@
+"""
+Index de suggestions pré-calculé (SuggestionEngine)
+
+- Par champ (Name, ItemCode, ItemName...) : valeurs normalisées (minuscules,
+  sans accents ni ponctuation), listes inversées mot → éléments et trigramme
+  → éléments (recherche à l'intérieur des mots), triées par longueur,
+  vocabulaire trié (préfixes) et trigrammes du vocabulaire (fautes de frappe)
+- Recherche : chaque mot saisi est résolu en mots du vocabulaire (exact,
+  préfixe pour le dernier mot en cours de frappe, correction). Les éléments
+  contenant tous les mots passent en premier ; les éléments partiels ou
+  contenant un mot saisi à l'intérieur d'un mot (« jet » → « laserjet ») sont
+  pris autour de la longueur de la saisie et pré-classés par fuzz.ratio.
+  Seuls ces candidats sont scorés comme FuzzyMatcher.calculate_similarity
+  (mêmes scores, même seuil)
+- get_suggestion_index() conserve les index construits : reconstruction
+  uniquement si les données source changent (empreinte du contenu)
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
+from thefuzz import fuzz
+
+logger = logging.getLogger(__name__)
+
+# En dessous, le parcours complet reste plus simple et aussi rapide
+INDEX_MIN_CANDIDATES = int(os.getenv("SUGGESTION_INDEX_MIN_CANDIDATES", "500"))
+# Candidats re-scorés avec le score flou exact, par résultat demandé
+RERANK_FACTOR = 8
+# Part minimale des candidats réservée aux éléments partiels / mots contenant la saisie
+PARTIAL_SHARE = 3
+# Éléments partiels pré-classés par fuzz.ratio, au plus, par requête
+PARTIAL_SCANNED = 600
+# Éléments examinés au plus par requête et par mot du vocabulaire (bornent le temps de réponse)
+MAX_SCANNED = 1_000
+# Mots du vocabulaire retenus pour un préfixe ou une correction
+MAX_EXPANSIONS = 20
+MAX_CORRECTIONS = 5
+CORRECTION_MIN_RATIO = 75
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_value(text: str) -> str:
+    """Minuscules, sans accents, ponctuation remplacée par des espaces."""
+    text = unicodedata.normalize("NFD", str(text).lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def inner_grams(word: str) -> Set[str]:
+    """Trigrammes intérieurs d'un mot, sans bornes ('laser' → 'las', 'ase', 'ser')."""
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def trigrams(word: str) -> Set[str]:
+    """Trigrammes d'un mot borné par des espaces ('ab' → ' ab', 'ab ')."""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _FieldIndex:
+    """Index d'un champ : mots des éléments, listes inversées triées par longueur."""
+
+    def __init__(self, values: List[Optional[str]]):
+        from services.suggestion_engine import FuzzyMatcher
+
+        self.values = values
+        self.lengths: List[int] = []
+        self.tokens: List[FrozenSet[str]] = []
+        self.first: List[str] = []
+        # Formes pré-calculées pour FuzzyMatcher.similarities_prepared
+        self.prepared: List[str] = []
+        self.prepared_tokens: List[str] = []
+        postings: Dict[str, List[int]] = {}
+        gram_postings: Dict[str, List[int]] = {}
+        for position, value in enumerate(values):
+            normalized = normalize_value(value) if value else ""
+            split = normalized.split()
+            words = frozenset(split)
+            self.lengths.append(len(normalized))
+            self.tokens.append(words)
+            self.first.append(split[0] if split else "")
+            prepared, prepared_tokens = FuzzyMatcher.prepare(value) if value else ("", "")
+            self.prepared.append(prepared)
+            self.prepared_tokens.append(prepared_tokens)
+            for word in words:
+                postings.setdefault(word, []).append(position)
+            for gram in {word[i:i + 3] for word in words for i in range(len(word) - 2)}:
+                gram_postings.setdefault(gram, []).append(position)
+
+        # Liste inversée = (longueurs croissantes, positions) pour partir de la longueur saisie
+        self.postings = self._by_length(postings)
+        self.gram_postings = self._by_length(gram_postings)
+        self.members: Dict[str, FrozenSet[int]] = {word: frozenset(p[1]) for word, p in self.postings.items()}
+
+        self.vocabulary = sorted(self.postings)
+        self.vocabulary_grams: Dict[str, List[str]] = {}
+        for word in self.vocabulary:
+            for gram in trigrams(word):
+                self.vocabulary_grams.setdefault(gram, []).append(word)
+
+    def _by_length(self, postings: Dict[str, List[int]]) -> Dict[str, Tuple[List[int], List[int]]]:
+        # Positions déjà croissantes : le tri stable garde cet ordre à longueur égale
+        for positions in postings.values():
+            positions.sort(key=self.lengths.__getitem__)
+        return {key: ([self.lengths[p] for p in positions], positions) for key, positions in postings.items()}
+
+    # --- Résolution des mots saisis ---
+
+    def _prefixed(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        words = []
+        for word in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def _corrections(self, word: str) -> List[str]:
+        grams = sorted(
+            (self.vocabulary_grams[g] for g in trigrams(word) if g in self.vocabulary_grams), key=len
+        )
+        shared: Counter = Counter()
+        scanned = 0
+        for words in grams:
+            if scanned and scanned + len(words) > MAX_SCANNED:
+                break
+            shared.update(words)
+            scanned += len(words)
+        return [
+            candidate for candidate, _ in shared.most_common(MAX_CORRECTIONS * 4)
+            if fuzz.ratio(word, candidate) >= CORRECTION_MIN_RATIO
+        ][:MAX_CORRECTIONS]
+
+    def resolve(self, word: str, is_last: bool) -> FrozenSet[str]:
+        """Mots du vocabulaire correspondant à un mot saisi."""
+        resolved = {word} if word in self.postings else set()
+        if is_last:
+            resolved.update(self._prefixed(word))
+        if not resolved:
+            resolved.update(self._corrections(word))
+        return frozenset(resolved)
+
+    # --- Sélection des candidats ---
+
+    def _members(self, resolved: FrozenSet[str]) -> FrozenSet[int]:
+        """Positions contenant au moins un des mots du vocabulaire donnés."""
+        if len(resolved) == 1:
+            return self.members[next(iter(resolved))]
+        return frozenset().union(*(self.members[word] for word in resolved))
+
+    def candidates(self, query_norm: str, query_prepared: str, limit: int) -> List[int]:
+        """
+        Positions couvrant le plus de texte saisi : éléments contenant tous les
+        mots (les plus proches de la saisie), complétés par des éléments
+        partiels ou contenant un mot saisi à l'intérieur d'un de leurs mots,
+        pris autour de la longueur de la saisie et pré-classés par fuzz.ratio.
+        """
+        words = query_norm.split()
+        groups = []
+        in_word = []
+        leading: FrozenSet[str] = frozenset()
+        for i, word in enumerate(words):
+            resolved = self.resolve(word, i == len(words) - 1)
+            if resolved:
+                groups.append((resolved, len(word)))
+                if i == 0:
+                    leading = resolved
+            if word not in self.postings and len(word) >= 3:
+                in_word.append(word)
+        if not groups and not in_word:
+            return []
+
+        target = len(query_norm)
+
+        # Même mot en tête, moins de mots en trop, longueur la plus proche
+        def closeness(position: int) -> Tuple[bool, int, int]:
+            return (
+                self.first[position] not in leading,
+                len(self.tokens[position]),
+                abs(self.lengths[position] - target),
+            )
+
+        picked: List[int] = []
+        if groups:
+            groups.sort(key=lambda group: sum(len(self.postings[w][1]) for w in group[0]))
+            full = self._full_matches([resolved for resolved, _ in groups], target, limit * 2)
+            reserved = limit if len(groups) == 1 and not in_word else limit - limit // PARTIAL_SHARE
+            picked = sorted(heapq.nsmallest(limit, full, key=closeness), key=lambda p: (closeness(p), p))
+            rest, picked = picked[reserved:], picked[:reserved]
+            if len(groups) == 1 and not in_word:
+                return picked
+        else:
+            rest = []
+
+        # Éléments partiels : autour de la longueur saisie, budget partagé entre mots
+        # saisis puis entre les mots du vocabulaire retenus pour chacun
+        sources = [[self.postings[word] for word in resolved] for resolved, _ in groups]
+        for word in in_word:
+            grams = [self.gram_postings.get(gram) for gram in inner_grams(word)]
+            if all(grams):
+                sources.append([min(grams, key=lambda gram: len(gram[1]))])
+        partial: Set[int] = set()
+        for slices in sources:
+            width = max(limit, PARTIAL_SCANNED // len(sources) // len(slices))
+            for lengths, positions in slices:
+                start = max(0, bisect.bisect_left(lengths, target) - width // 2)
+                partial.update(positions[start:start + width])
+        partial.difference_update(picked)
+        partial.difference_update(rest)
+
+        if partial:
+            ranked = rapid_process.extract(
+                query_prepared,
+                {position: self.prepared[position] for position in partial},
+                scorer=rapid_fuzz.ratio,
+                processor=None,
+                limit=limit - len(picked),
+            )
+            picked.extend(position for _, _, position in ranked)
+        # Places restantes : éléments complets suivants
+        return picked + rest[:limit - len(picked)]
+
+    def _full_matches(self, groups: List[FrozenSet[str]], target: int, wanted: int) -> Iterable[int]:
+        """Éléments contenant tous les mots saisis (`groups` : mot le plus rare en tête)."""
+        full = self._members(groups[0])
+        if len(full) <= MAX_SCANNED:
+            # Mot rare : vérification directe des mots de chaque élément
+            full = {p for p in full if all(not other.isdisjoint(self.tokens[p]) for other in groups[1:])}
+        else:
+            for other in groups[1:]:
+                full = full & self._members(other)
+        if len(full) <= wanted * 4:
+            return full
+        # Très nombreux : ceux à longueur la plus proche, en parcourant le mot le plus rare
+        found = []
+        for position in self._walk(groups[0], target, len(full) * 4):
+            if position in full:
+                found.append(position)
+                if len(found) >= wanted:
+                    break
+        return found
+
+    def _walk(self, resolved: Iterable[str], target: int, steps: int) -> Iterator[int]:
+        """Positions des mots donnés, de la longueur la plus proche de `target` vers les extrêmes."""
+        for word in resolved:
+            lengths, positions = self.postings[word]
+            right = bisect.bisect_left(lengths, target)
+            left = right - 1
+            for _ in range(min(steps, len(positions))):
+                if right < len(positions) and (left < 0 or lengths[right] - target <= target - lengths[left]):
+                    index, right = right, right + 1
+                else:
+                    index, left = left, left - 1
+                yield positions[index]
+
+
+class SuggestionIndex:
+    """Index de recherche floue sur une liste de dictionnaires (un ou plusieurs champs)."""
+
+    def __init__(self, items: Sequence[Dict[str, Any]], fields: Sequence[str]):
+        self.items = list(items)
+        self.fields = tuple(fields)
+        self._fields = {
+            field: _FieldIndex([item.get(field) or None for item in self.items]) for field in self.fields
+        }
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def search(
+        self,
+        query: str,
+        key_field: str,
+        limit: int = 5,
+        scorer: Optional[Callable[[str, str], float]] = None,
+        min_score: float = 30,
+    ) -> List[Dict[str, Any]]:
+        """
+        Meilleures correspondances de `query` sur `key_field`, au format de
+        FuzzyMatcher.find_best_matches (élément + similarity_score + matched_field).
+        """
+        from services.suggestion_engine import FuzzyMatcher
+
+        field = self._fields[key_field]
+        query_norm = normalize_value(query or "")
+        if not query_norm:
+            return []
+
+        positions = field.candidates(query_norm, FuzzyMatcher.prepare(query)[0], limit * RERANK_FACTOR)
+        if scorer is None:
+            scores = FuzzyMatcher.similarities_prepared(
+                query,
+                [field.prepared[position] for position in positions],
+                [field.prepared_tokens[position] for position in positions],
+            )
+        else:
+            scores = [scorer(query, field.values[position]) for position in positions]
+        matches = [(score, position) for score, position in zip(scores, positions) if score > min_score]
+
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return [
+            {**self.items[position], "similarity_score": score, "matched_field": key_field}
+            for score, position in matches[:limit]
+        ]
+
+
+# ============================================================
+# CACHE DES INDEX
+# ============================================================
+
+_indexes: Dict[Tuple[str, ...], Tuple[Sequence[Dict[str, Any]], int, SuggestionIndex]] = {}
+_lock = threading.Lock()
+
+
+def _fingerprint(items: Sequence[Dict[str, Any]], fields: Tuple[str, ...]) -> int:
+    return hash(tuple(tuple([item.get(field) for item in items]) for field in fields))
+
+
+def get_suggestion_index(items: Sequence[Dict[str, Any]], fields: Sequence[str]) -> SuggestionIndex:
+    """
+    Index pour `items` sur `fields`, construit une seule fois par contenu.
+
+    Même liste (objet identique, même taille) : réutilisation immédiate. Liste
+    rechargée (nouvel objet) : l'empreinte des champs indexés décide s'il faut
+    reconstruire. Une liste modifiée en place sans changer de taille doit être
+    signalée par invalidate_suggestion_indexes().
+    """
+    key = tuple(fields)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] is items and len(cached[2]) == len(items):
+            return cached[2]
+
+    fingerprint = _fingerprint(items, key)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached and cached[1] == fingerprint:
+            # Mêmes valeurs indexées : les autres champs sont relus depuis la nouvelle liste
+            cached[2].items = list(items)
+            _indexes[key] = (items, fingerprint, cached[2])
+            return cached[2]
+
+    index = SuggestionIndex(items, key)
+    with _lock:
+        _indexes[key] = (items, fingerprint, index)
+    logger.info(f"📇 Index de suggestions construit ({'/'.join(key)}) : {len(index)} élément(s)")
+    return index
+
+
+def invalidate_suggestion_indexes() -> None:
+    """Oublie les index construits (données source modifiées en place)."""
+    with _lock:
+        _indexes.clear()
@@ -10,12 +10,24 @@ from typing import List, Dict, Optional, Any
 from pathlib import Path
 import logging
 import json
+import re
 
 logger = logging.getLogger(__name__)
 
 # Chemin de la base de données
 DB_PATH = Path(__file__).parent.parent / "data" / "supplier_tariffs.db"
 
+_REFERENCE_STRIP_RE = re.compile(r'[^0-9A-Za-z]+')
+
+# Clé indexation_config du compteur de version des produits (invalidation des caches)
+_GENERATION_KEY = "tariffs_generation"
+
+# Nombre maximal de paramètres par requête IN (limite SQLite historique : 999)
+_IN_CHUNK_SIZE = 500
+
+# Index plein texte disponible (SQLite compilé avec FTS5) — déterminé par init_database()
+FTS5_ENABLED = False
+
 
 def get_connection() -> sqlite3.Connection:
     """Crée une connexion à la base SQLite."""
@@ -27,6 +39,93 @@ def get_connection() -> sqlite3.Connection:
     return conn
 
 
+def normalize_reference(reference: Optional[str]) -> Optional[str]:
+    """
+    Forme canonique d'une référence fournisseur pour la recherche exacte :
+    majuscules, sans espaces ni ponctuation ("ab-12.3 x" → "AB123X").
+    """
+    if not reference:
+        return None
+    normalized = _REFERENCE_STRIP_RE.sub('', str(reference)).upper()
+    return normalized or None
+
+
+def _fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE IF EXISTS temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _init_search_index(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
+    """
+    Index de recherche des produits :
+    - reference_norm + B-tree pour les recherches exactes / par préfixe
+    - supplier_products_fts (FTS5, external content) sur désignation / marque / fournisseur,
+      synchronisée par triggers
+    """
+    global FTS5_ENABLED
+
+    try:
+        cursor.execute("SELECT reference_norm FROM supplier_products LIMIT 1")
+    except sqlite3.OperationalError:
+        logger.info("Migration: Ajout de la colonne reference_norm")
+        cursor.execute("ALTER TABLE supplier_products ADD COLUMN reference_norm TEXT")
+        rows = cursor.execute(
+            "SELECT id, supplier_reference FROM supplier_products WHERE supplier_reference IS NOT NULL"
+        ).fetchall()
+        cursor.executemany(
+            "UPDATE supplier_products SET reference_norm = ? WHERE id = ?",
+            [(normalize_reference(row['supplier_reference']), row['id']) for row in rows]
+        )
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_supplier_products_reference_norm
+        ON supplier_products(reference_norm)
+    """)
+
+    FTS5_ENABLED = _fts5_available(conn)
+    if not FTS5_ENABLED:
+        logger.warning("⚠️ SQLite sans FTS5 - recherche texte en LIKE")
+        return
+
+    fts_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'supplier_products_fts'"
+    ).fetchone()
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS supplier_products_fts USING fts5(
+            designation, brand, supplier_name,
+            content='supplier_products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS supplier_products_fts_ai AFTER INSERT ON supplier_products BEGIN
+            INSERT INTO supplier_products_fts(rowid, designation, brand, supplier_name)
+            VALUES (new.id, new.designation, new.brand, new.supplier_name);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS supplier_products_fts_ad AFTER DELETE ON supplier_products BEGIN
+            INSERT INTO supplier_products_fts(supplier_products_fts, rowid, designation, brand, supplier_name)
+            VALUES ('delete', old.id, old.designation, old.brand, old.supplier_name);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS supplier_products_fts_au AFTER UPDATE ON supplier_products BEGIN
+            INSERT INTO supplier_products_fts(supplier_products_fts, rowid, designation, brand, supplier_name)
+            VALUES ('delete', old.id, old.designation, old.brand, old.supplier_name);
+            INSERT INTO supplier_products_fts(rowid, designation, brand, supplier_name)
+            VALUES (new.id, new.designation, new.brand, new.supplier_name);
+        END
+    """)
+    if not fts_exists:
+        logger.info("Migration: Construction de l'index plein texte supplier_products_fts")
+        cursor.execute("INSERT INTO supplier_products_fts(supplier_products_fts) VALUES ('rebuild')")
+
+
 def init_database():
     """Initialise la base de données avec les tables nécessaires."""
     conn = get_connection()
@@ -94,6 +193,13 @@ def init_database():
         cursor.execute("ALTER TABLE supplier_products ADD COLUMN stock_availability TEXT")
         cursor.execute("ALTER TABLE supplier_products ADD COLUMN supplier_code TEXT")
 
+    # Migration : empreinte de contenu pour l'indexation incrémentale
+    try:
+        cursor.execute("SELECT content_hash FROM indexed_files LIMIT 1")
+    except sqlite3.OperationalError:
+        logger.info("Migration: Ajout de la colonne content_hash")
+        cursor.execute("ALTER TABLE indexed_files ADD COLUMN content_hash TEXT")
+
     # Table de configuration de l'indexation
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS indexation_config (
@@ -132,6 +238,12 @@ def init_database():
         CREATE INDEX IF NOT EXISTS idx_supplier_products_supplier
         ON supplier_products(supplier_name)
     """)
+    # Suppression des produits d'un fichier lors de sa réindexation
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_supplier_products_file
+        ON supplier_products(file_id)
+    """)
+    _init_search_index(cursor, conn)
 
     conn.commit()
     conn.close()
@@ -182,42 +294,73 @@ def update_file_status(file_id: int, status: str, error_message: str = None, ite
     conn.close()
 
 
-def add_supplier_product(file_id: int, product_data: Dict[str, Any]) -> int:
-    """Ajoute un produit fournisseur extrait avec métadonnées enrichies."""
-    conn = get_connection()
-    cursor = conn.cursor()
+_PRODUCT_INSERT_SQL = """
+    INSERT INTO supplier_products
+    (file_id, supplier_reference, designation, unit_price, currency,
+     delivery_time, supplier_name, category, brand, min_quantity, additional_data,
+     delivery_days, transport_cost, transport_days, weight, dimensions,
+     technical_specs, stock_availability, supplier_code, reference_norm)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
-    additional_data = json.dumps(product_data.get('additional_data', {})) if product_data.get('additional_data') else None
 
-    cursor.execute("""
-        INSERT INTO supplier_products
-        (file_id, supplier_reference, designation, unit_price, currency,
-         delivery_time, supplier_name, category, brand, min_quantity, additional_data,
-         delivery_days, transport_cost, transport_days, weight, dimensions,
-         technical_specs, stock_availability, supplier_code)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+def _product_row(file_id: int, product: Dict[str, Any]) -> tuple:
+    """Convertit un produit extrait en ligne d'insertion supplier_products."""
+    additional_data = json.dumps(product.get('additional_data', {})) if product.get('additional_data') else None
+    return (
         file_id,
-        product_data.get('supplier_reference'),
-        product_data.get('designation'),
-        product_data.get('unit_price'),
-        product_data.get('currency', 'EUR'),
-        product_data.get('delivery_time'),
-        product_data.get('supplier_name'),
-        product_data.get('category'),
-        product_data.get('brand'),
-        product_data.get('min_quantity'),
+        product.get('supplier_reference'),
+        product.get('designation'),
+        product.get('unit_price'),
+        product.get('currency', 'EUR'),
+        product.get('delivery_time'),
+        product.get('supplier_name'),
+        product.get('category'),
+        product.get('brand'),
+        product.get('min_quantity'),
         additional_data,
         # Nouveaux champs métadonnées
-        product_data.get('delivery_days'),
-        product_data.get('transport_cost'),
-        product_data.get('transport_days'),
-        product_data.get('weight'),
-        product_data.get('dimensions'),
-        product_data.get('technical_specs'),
-        product_data.get('stock_availability'),
-        product_data.get('supplier_code')
-    ))
+        product.get('delivery_days'),
+        product.get('transport_cost'),
+        product.get('transport_days'),
+        product.get('weight'),
+        product.get('dimensions'),
+        product.get('technical_specs'),
+        product.get('stock_availability'),
+        product.get('supplier_code'),
+        normalize_reference(product.get('supplier_reference'))
+    )
+
+
+def _bump_generation(cursor: sqlite3.Cursor):
+    """Signale une modification des produits (invalide les caches lecteurs, tous workers)."""
+    cursor.execute("""
+        INSERT INTO indexation_config (key, value) VALUES (?, '1')
+        ON CONFLICT(key) DO UPDATE SET
+            value = CAST(value AS INTEGER) + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """, (_GENERATION_KEY,))
+
+
+def get_tariffs_generation() -> int:
+    """Numéro de version des produits indexés, incrémenté à chaque (ré)indexation."""
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT value FROM indexation_config WHERE key = ?", (_GENERATION_KEY,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return int(row['value']) if row else 0
+
+
+def add_supplier_product(file_id: int, product_data: Dict[str, Any]) -> int:
+    """Ajoute un produit fournisseur extrait avec métadonnées enrichies."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(_PRODUCT_INSERT_SQL, _product_row(file_id, product_data))
+    _bump_generation(cursor)
 
     product_id = cursor.lastrowid
     conn.commit()
@@ -232,66 +375,266 @@ def add_supplier_products_batch(file_id: int, products: List[Dict[str, Any]]) ->
 
     # Supprimer les anciens produits de ce fichier
     cursor.execute("DELETE FROM supplier_products WHERE file_id = ?", (file_id,))
-
-    for product in products:
-        additional_data = json.dumps(product.get('additional_data', {})) if product.get('additional_data') else None
-
-        cursor.execute("""
-            INSERT INTO supplier_products
-            (file_id, supplier_reference, designation, unit_price, currency,
-             delivery_time, supplier_name, category, brand, min_quantity, additional_data,
-             delivery_days, transport_cost, transport_days, weight, dimensions,
-             technical_specs, stock_availability, supplier_code)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            file_id,
-            product.get('supplier_reference'),
-            product.get('designation'),
-            product.get('unit_price'),
-            product.get('currency', 'EUR'),
-            product.get('delivery_time'),
-            product.get('supplier_name'),
-            product.get('category'),
-            product.get('brand'),
-            product.get('min_quantity'),
-            additional_data,
-            # Nouveaux champs métadonnées
-            product.get('delivery_days'),
-            product.get('transport_cost'),
-            product.get('transport_days'),
-            product.get('weight'),
-            product.get('dimensions'),
-            product.get('technical_specs'),
-            product.get('stock_availability'),
-            product.get('supplier_code')
-        ))
+    cursor.executemany(_PRODUCT_INSERT_SQL, [_product_row(file_id, p) for p in products])
+    _bump_generation(cursor)
 
     conn.commit()
     conn.close()
     return len(products)
 
 
-def search_products(query: str, limit: int = 50) -> List[Dict]:
-    """Recherche des produits par référence ou désignation."""
+def get_file_fingerprints() -> Dict[str, Dict[str, Any]]:
+    """
+    Retourne l'empreinte connue de chaque fichier indexé :
+    {file_path: {size, last_modified, content_hash, status}}
+    """
     conn = get_connection()
     cursor = conn.cursor()
+    cursor.execute("""
+        SELECT file_path, file_size, last_modified, content_hash, status
+        FROM indexed_files
+    """)
+    results = {
+        row['file_path']: {
+            'size': row['file_size'],
+            'last_modified': row['last_modified'],
+            'content_hash': row['content_hash'],
+            'status': row['status'],
+        }
+        for row in cursor.fetchall()
+    }
+    conn.close()
+    return results
 
-    search_term = f"%{query}%"
+
+def _upsert_indexed_file(cursor: sqlite3.Cursor, file_info: Dict[str, Any],
+                         content_hash: Optional[str]) -> int:
     cursor.execute("""
+        INSERT INTO indexed_files (file_path, file_name, file_type, file_size, last_modified,
+                                   indexed_at, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(file_path) DO UPDATE SET
+            file_name = excluded.file_name,
+            file_type = excluded.file_type,
+            file_size = excluded.file_size,
+            last_modified = excluded.last_modified,
+            indexed_at = CURRENT_TIMESTAMP,
+            content_hash = excluded.content_hash,
+            status = 'indexed',
+            error_message = NULL
+    """, (file_info['path'], file_info['name'], file_info['type'], file_info['size'],
+          file_info['modified'], datetime.now(), content_hash))
+    cursor.execute("SELECT id FROM indexed_files WHERE file_path = ?", (file_info['path'],))
+    return cursor.fetchone()[0]
+
+
+def replace_file_products(file_info: Dict[str, Any], products: List[Dict[str, Any]],
+                          content_hash: Optional[str] = None) -> int:
+    """
+    Indexe un fichier en une seule transaction : fiche indexed_files, suppression
+    des anciens produits, insertion groupée (executemany) et statut final.
+    Retourne le nombre de produits insérés.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        file_id = _upsert_indexed_file(cursor, file_info, content_hash)
+        cursor.execute("DELETE FROM supplier_products WHERE file_id = ?", (file_id,))
+        if products:
+            cursor.executemany(_PRODUCT_INSERT_SQL, [_product_row(file_id, p) for p in products])
+            cursor.execute("""
+                UPDATE indexed_files SET status = 'indexed', error_message = NULL, items_count = ?
+                WHERE id = ?
+            """, (len(products), file_id))
+        else:
+            cursor.execute("""
+                UPDATE indexed_files SET status = 'empty', error_message = ?, items_count = 0
+                WHERE id = ?
+            """, ("Aucun produit extrait", file_id))
+        _bump_generation(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(products)
+
+
+def touch_indexed_file(file_info: Dict[str, Any]):
+    """Met à jour taille/date d'un fichier dont le contenu (hash) n'a pas changé."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE indexed_files SET file_size = ?, last_modified = ?
+        WHERE file_path = ?
+    """, (file_info['size'], file_info['modified'], file_info['path']))
+    conn.commit()
+    conn.close()
+
+
+def record_file_error(file_info: Dict[str, Any], error_message: str):
+    """Enregistre un fichier en erreur (sans empreinte, pour forcer une nouvelle tentative)."""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        file_id = _upsert_indexed_file(cursor, file_info, None)
+        cursor.execute("""
+            UPDATE indexed_files SET status = 'error', error_message = ?, items_count = 0
+            WHERE id = ?
+        """, (error_message, file_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _next_prefix(prefix: str) -> str:
+    """Borne supérieure exclusive des chaînes commençant par `prefix` (range scan sur l'index)."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def find_products_by_reference(reference: str, limit: int = 1, prefix: bool = False) -> List[Dict]:
+    """
+    Recherche indexée par référence fournisseur normalisée (exacte, ou par préfixe).
+    Les lignes avec un prix sont retournées en premier, puis les plus récentes.
+    """
+    normalized = normalize_reference(reference)
+    if not normalized:
+        return []
+
+    if prefix:
+        condition = "sp.reference_norm >= ? AND sp.reference_norm < ?"
+        params = (normalized, _next_prefix(normalized))
+    else:
+        condition = "sp.reference_norm = ?"
+        params = (normalized,)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
         SELECT sp.*, if.file_name, if.file_path
         FROM supplier_products sp
         JOIN indexed_files if ON sp.file_id = if.id
-        WHERE sp.supplier_reference LIKE ?
-           OR sp.designation LIKE ?
-           OR sp.supplier_name LIKE ?
+        WHERE {condition}
+        ORDER BY (sp.unit_price > 0) DESC, sp.id DESC
         LIMIT ?
-    """, (search_term, search_term, search_term, limit))
+    """, (*params, limit))
 
     results = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return results
 
 
+def find_products_by_references(references: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Recherche groupée par références exactes : une requête indexée (IN) au lieu
+    d'une par référence. Retourne {référence demandée: lignes (prix d'abord, plus récentes)}.
+    """
+    by_norm: Dict[str, List[str]] = {}
+    for reference in references:
+        normalized = normalize_reference(reference)
+        if normalized:
+            by_norm.setdefault(normalized, []).append(reference)
+    results: Dict[str, List[Dict]] = {reference: [] for reference in references}
+    if not by_norm:
+        return results
+
+    norms = list(by_norm)
+    conn = get_connection()
+    try:
+        for start in range(0, len(norms), _IN_CHUNK_SIZE):
+            chunk = norms[start:start + _IN_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f"""
+                SELECT sp.*, if.file_name, if.file_path
+                FROM supplier_products sp
+                JOIN indexed_files if ON sp.file_id = if.id
+                WHERE sp.reference_norm IN ({placeholders})
+                ORDER BY (sp.unit_price > 0) DESC, sp.id DESC
+            """, chunk).fetchall()
+            for row in rows:
+                for reference in by_norm[row['reference_norm']]:
+                    results[reference].append(dict(row))
+    finally:
+        conn.close()
+    return results
+
+
+def get_supplier_price_by_reference(reference: str) -> Optional[Dict]:
+    """
+    API du moteur de prix : meilleure ligne tarifaire pour une référence exacte
+    (lookup B-tree, sans parcours de la table). None si aucun prix connu.
+    """
+    products = find_products_by_reference(reference, limit=1)
+    if products and products[0].get('unit_price') and products[0]['unit_price'] > 0:
+        return products[0]
+    return None
+
+
+def _fts_query(query: str) -> Optional[str]:
+    """Convertit une saisie libre en requête FTS5 (tous les mots, préfixes acceptés)."""
+    terms = [t for t in re.findall(r'\w+', query, flags=re.UNICODE) if t]
+    if not terms:
+        return None
+    return ' '.join(f'"{t}"*' for t in terms)
+
+
+def search_products(query: str, limit: int = 50) -> List[Dict]:
+    """
+    Recherche des produits par référence ou désignation.
+
+    1. Référence normalisée : exacte puis préfixe (index B-tree)
+    2. Désignation / marque / fournisseur via l'index plein texte FTS5
+    3. Repli LIKE (sous-chaîne) uniquement si les index ne trouvent rien
+    """
+    results = find_products_by_reference(query, limit=limit)
+    seen = {r['id'] for r in results}
+
+    def _extend(rows):
+        for row in rows:
+            if len(results) >= limit:
+                return
+            if row['id'] not in seen:
+                seen.add(row['id'])
+                results.append(row)
+
+    if len(results) < limit:
+        _extend(find_products_by_reference(query, limit=limit, prefix=True))
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        fts_query = _fts_query(query) if FTS5_ENABLED else None
+        if fts_query and len(results) < limit:
+            cursor.execute("""
+                SELECT sp.*, if.file_name, if.file_path
+                FROM supplier_products_fts fts
+                JOIN supplier_products sp ON sp.id = fts.rowid
+                JOIN indexed_files if ON sp.file_id = if.id
+                WHERE supplier_products_fts MATCH ?
+                ORDER BY fts.rank
+                LIMIT ?
+            """, (fts_query, limit))
+            _extend(dict(row) for row in cursor.fetchall())
+
+        if not results:
+            search_term = f"%{query}%"
+            cursor.execute("""
+                SELECT sp.*, if.file_name, if.file_path
+                FROM supplier_products sp
+                JOIN indexed_files if ON sp.file_id = if.id
+                WHERE sp.supplier_reference LIKE ?
+                   OR sp.designation LIKE ?
+                   OR sp.supplier_name LIKE ?
+                LIMIT ?
+            """, (search_term, search_term, search_term, limit))
+            _extend(dict(row) for row in cursor.fetchall())
+    finally:
+        conn.close()
+
+    return results
+
+
 def get_all_products(limit: int = 1000, offset: int = 0) -> List[Dict]:
     """Récupère tous les produits indexés."""
     conn = get_connection()
@@ -386,7 +729,7 @@ def update_indexation_session(session_id: int, status: str,
     conn = get_connection()
     cursor = conn.cursor()
 
-    completed_at = datetime.now() if status in ['completed', 'error'] else None
+    completed_at = datetime.now() if status in ['completed', 'error', 'stopped'] else None
 
     cursor.execute("""
         UPDATE indexation_history
@@ -408,6 +751,7 @@ def clear_all_data():
 
     cursor.execute("DELETE FROM supplier_products")
     cursor.execute("DELETE FROM indexed_files")
+    _bump_generation(cursor)
 
     conn.commit()
     conn.close()
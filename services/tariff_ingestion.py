@@ -0,0 +1,171 @@
+"""
+Pipeline d'indexation parallèle des tarifs fournisseurs.
+
+- Parsing (PyMuPDF / openpyxl / tesseract) dans un pool de processus :
+  la boucle asyncio n'est plus bloquée et tous les cœurs sont utilisés
+- Indexation incrémentale : un fichier dont (chemin, taille, date) est inchangé
+  n'est pas relu ; si seule la date a bougé, le hash du contenu évite le reparsing
+- Écriture d'un fichier en une seule transaction (executemany), sérialisée
+  dans un thread pour ne pas bloquer la boucle
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Nombre de processus de parsing (défaut : nombre de cœurs)
+INDEXATION_WORKERS = int(os.getenv("TARIFF_INDEXATION_WORKERS", "0")) or (os.cpu_count() or 1)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_content_hash(file_path: str) -> str:
+    """Hash SHA-256 du contenu d'un fichier (lecture par blocs)."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_worker(file_path: str, known_hash: Optional[str]) -> Dict[str, Any]:
+    """
+    Exécuté dans un processus du pool : hash puis parsing du fichier.
+    Le parsing est évité si le contenu correspond au hash déjà indexé.
+    """
+    try:
+        content_hash = file_content_hash(file_path)
+        if known_hash and content_hash == known_hash:
+            return {"hash": content_hash, "unchanged": True, "products": [], "error": None}
+
+        from services.file_parsers import parse_file
+        return {"hash": content_hash, "unchanged": False, "products": parse_file(file_path), "error": None}
+    except Exception as e:
+        return {"hash": None, "unchanged": False, "products": [], "error": str(e)}
+
+
+def is_unchanged(file_info: Dict[str, Any], fingerprint: Optional[Dict[str, Any]]) -> bool:
+    """Vrai si le fichier est déjà indexé avec la même taille et la même date."""
+    if not fingerprint or not fingerprint.get("content_hash"):
+        return False
+    if fingerprint.get("status") == "error":
+        return False
+    return (
+        fingerprint.get("size") == file_info["size"]
+        and str(fingerprint.get("last_modified")) == str(file_info["modified"])
+    )
+
+
+def _create_executor(max_workers: int) -> Executor:
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    except (OSError, NotImplementedError) as e:
+        # Environnements sans multiprocessing (sandbox, certains hébergements)
+        logger.warning(f"⚠️ Pool de processus indisponible ({e}) - parsing en threads")
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+
+async def run_ingestion(files: List[Dict[str, Any]], state: Dict[str, Any],
+                        max_workers: Optional[int] = None,
+                        executor: Optional[Executor] = None) -> Dict[str, int]:
+    """
+    Indexe `files` (format scan_folder) et met à jour `state` (indexation_state).
+    S'arrête proprement si state["running"] passe à False.
+
+    Returns:
+        Compteurs : files_processed, files_success, files_error, files_skipped, items_extracted
+    """
+    from services.supplier_tariffs_db import (
+        get_file_fingerprints, replace_file_products, touch_indexed_file, record_file_error
+    )
+
+    counters = {
+        "files_processed": 0,
+        "files_success": 0,
+        "files_error": 0,
+        "files_skipped": 0,
+        "items_extracted": 0,
+    }
+    total_files = len(files)
+    state["files_total"] = total_files
+    state["files_done"] = 0
+    state["files_skipped"] = 0
+
+    def _advance(file_info: Dict[str, Any]):
+        counters["files_processed"] += 1
+        state["files_done"] = counters["files_processed"]
+        state["files_skipped"] = counters["files_skipped"]
+        state["current_file"] = file_info["name"]
+        state["progress"] = int(counters["files_processed"] / total_files * 100) if total_files else 100
+
+    fingerprints = await asyncio.to_thread(get_file_fingerprints)
+
+    to_parse = []
+    for file_info in files:
+        if is_unchanged(file_info, fingerprints.get(file_info["path"])):
+            counters["files_skipped"] += 1
+            counters["files_success"] += 1
+            _advance(file_info)
+        else:
+            to_parse.append(file_info)
+
+    logger.info(f"📂 Indexation: {len(to_parse)} fichiers à analyser, {counters['files_skipped']} inchangés")
+    if not to_parse:
+        return counters
+
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = _create_executor(min(max_workers or INDEXATION_WORKERS, len(to_parse)))
+
+    pending = {}
+    try:
+        for file_info in to_parse:
+            known = fingerprints.get(file_info["path"]) or {}
+            known_hash = known.get("content_hash") if known.get("status") != "error" else None
+            future = loop.run_in_executor(executor, _parse_worker, file_info["path"], known_hash)
+            pending[future] = file_info
+
+        while pending:
+            if not state.get("running", True):
+                logger.info("⏹️ Indexation interrompue à la demande")
+                break
+
+            done, _ = await asyncio.wait(set(pending), return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                file_info = pending.pop(future)
+                try:
+                    result = future.result()
+                    if result["error"]:
+                        raise RuntimeError(result["error"])
+                    if result["unchanged"]:
+                        await asyncio.to_thread(touch_indexed_file, file_info)
+                        counters["files_skipped"] += 1
+                    else:
+                        count = await asyncio.to_thread(
+                            replace_file_products, file_info, result["products"], result["hash"]
+                        )
+                        counters["items_extracted"] += count
+                        if count:
+                            logger.info(f"Indexé: {file_info['name']} - {count} produits")
+                    counters["files_success"] += 1
+                except Exception as e:
+                    logger.error(f"Erreur indexation {file_info['path']}: {e}")
+                    counters["files_error"] += 1
+                    try:
+                        await asyncio.to_thread(record_file_error, file_info, str(e))
+                    except Exception:
+                        pass
+                _advance(file_info)
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return counters
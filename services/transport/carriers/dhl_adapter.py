@@ -14,12 +14,10 @@ Endpoints :
 from __future__ import annotations
 import asyncio
 import base64
-import hashlib
 import logging
 import os
-import time
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 import httpx
 from dotenv import load_dotenv
@@ -32,6 +30,12 @@ from ..carrier_interface import (
     Shipper,
     ShippingRate,
 )
+from ..rate_cache import (
+    RATE_CACHE_MAX_ENTRIES,
+    AdapterRateCache,
+    CarrierRateCache,
+    get_carrier_rate_cache,
+)
 
 load_dotenv()
 
@@ -61,60 +65,32 @@ DHL_MAX_RETRIES = int(os.getenv("DHL_MAX_RETRIES", "2"))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Cache en mémoire (TTL 5 min)
+# Cache des tarifs (TTL 5 min) — voir services/transport/rate_cache.py
 # ─────────────────────────────────────────────────────────────────────────────
 
-class _RateCache:
-    """Cache simple TTL pour les tarifs DHL."""
+class _RateCache(AdapterRateCache):
+    """
+    Cache TTL des tarifs DHL, cloisonné par environnement (TEST / PROD).
 
-    def __init__(self, ttl_seconds: int = DHL_CACHE_TTL_SECONDS, max_entries: int = 100):
-        self._ttl = ttl_seconds
-        self._max = max_entries
-        self._store: Dict[str, Tuple[float, List[ShippingRate]]] = {}
+    Sans `store`, utilise une base privée en mémoire ; l'adapter reçoit le
+    cache persistant partagé entre workers.
+    """
 
-    def _make_key(
+    def __init__(
         self,
-        packages: List[PackageInput],
-        destination: Destination,
-    ) -> str:
-        """Clé de cache : destination + poids total + volume total"""
-        total_weight = round(sum(p.weight_kg for p in packages), 2)
-        total_volume = round(sum(p.volume_m3 for p in packages), 4)
-        raw = (
-            f"{destination.country_code}:{destination.postal_code}:"
-            f"{destination.city_name}:{total_weight}:{total_volume}"
+        ttl_seconds: int = DHL_CACHE_TTL_SECONDS,
+        max_entries: int = RATE_CACHE_MAX_ENTRIES,
+        store: Optional[CarrierRateCache] = None,
+        environment: str = "TEST",
+    ):
+        super().__init__(
+            scope=f"DHL:{environment}",
+            store=store or CarrierRateCache(ttl_seconds=ttl_seconds, max_entries=max_entries),
+            ttl_seconds=ttl_seconds,
         )
-        return hashlib.md5(raw.encode()).hexdigest()
-
-    def get(
-        self, packages: List[PackageInput], destination: Destination
-    ) -> Optional[List[ShippingRate]]:
-        key = self._make_key(packages, destination)
-        entry = self._store.get(key)
-        if entry is None:
-            return None
-        ts, rates = entry
-        if time.time() - ts > self._ttl:
-            del self._store[key]
-            return None
-        logger.debug(f"✓ Cache DHL hit : {key[:8]}…")
-        return rates
-
-    def set(
-        self,
-        packages: List[PackageInput],
-        destination: Destination,
-        rates: List[ShippingRate],
-    ) -> None:
-        # FIFO cleanup si trop plein
-        if len(self._store) >= self._max:
-            oldest_key = next(iter(self._store))
-            del self._store[oldest_key]
-        key = self._make_key(packages, destination)
-        self._store[key] = (time.time(), rates)
 
-    def invalidate(self) -> None:
-        self._store.clear()
+    def use_environment(self, environment: str) -> None:
+        self.scope = f"DHL:{environment}"
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -128,14 +104,18 @@ class DHLCarrierAdapter(CarrierAdapter):
     Fonctionnalités :
     - Authentification Basic Auth
     - Calcul tarifs (endpoint /rates)
-    - Cache TTL 5 minutes par destination + poids/volume
+    - Cache TTL 5 minutes partagé (empreinte colis par colis + destination +
+      valeur déclarée)
     - Retry automatique (max 2 tentatives)
     - Fallback gracieux sur erreur API
     """
 
     def __init__(self) -> None:
-        self._cache = _RateCache()
         self._base_url = DHL_URL_TEST if DHL_USE_TEST_ENV else DHL_URL_PROD
+        self._cache = _RateCache(
+            store=get_carrier_rate_cache(),
+            environment="TEST" if DHL_USE_TEST_ENV else "PROD",
+        )
         self._auth_header = self._build_auth_header()
         env_label = "TEST" if DHL_USE_TEST_ENV else "PROD"
         logger.info(f"✓ DHLCarrierAdapter initialisé [{env_label}] → {self._base_url}")
@@ -155,11 +135,13 @@ class DHLCarrierAdapter(CarrierAdapter):
     def use_production(self) -> None:
         """Bascule sur l'environnement de production."""
         self._base_url = DHL_URL_PROD
+        self._cache.use_environment("PROD")
         logger.info("✓ DHL basculé sur environnement PRODUCTION")
 
     def use_test(self) -> None:
         """Bascule sur l'environnement de test."""
         self._base_url = DHL_URL_TEST
+        self._cache.use_environment("TEST")
         logger.info("✓ DHL basculé sur environnement TEST")
 
     # ─────────────────────────────────────────────────────────────
@@ -193,8 +175,8 @@ class DHLCarrierAdapter(CarrierAdapter):
         if not self.is_available():
             raise CarrierAPIError("DHL", "Credentials non configurés")
 
-        # Vérifier le cache
-        cached = self._cache.get(packages, destination)
+        # Vérifier le cache (clé : colis, destination, expéditeur, valeur déclarée)
+        cached = self._cache.get(packages, destination, shipper, declared_value, currency)
         if cached is not None:
             return cached
 
@@ -211,7 +193,7 @@ class DHLCarrierAdapter(CarrierAdapter):
         rates = self._parse_response(raw_response, packages)
 
         # Mettre en cache
-        self._cache.set(packages, destination, rates)
+        self._cache.set(packages, destination, rates, shipper, declared_value, currency)
 
         return rates
 
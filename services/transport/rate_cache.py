@@ -0,0 +1,267 @@
+"""
+Cache des tarifs transporteurs, commun à tous les CarrierAdapter
+
+- Clé : empreinte canonique colis par colis (poids + dimensions triées, ordre
+  des colis indifférent) + destination + expéditeur + valeur déclarée + carrier.
+  Deux découpages différents de même poids/volume total ne se confondent plus.
+- Persistance SQLite locale (data/carrier_rate_cache.db, WAL) : partagé entre
+  workers et conservé après redémarrage
+- LRU réel (last_access) borné à `max_entries`, TTL par lecture
+- Compteurs hits / misses par carrier
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .carrier_interface import Destination, PackageInput, Shipper, ShippingRate
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent.parent / "data" / "carrier_rate_cache.db"
+
+RATE_CACHE_TTL_SECONDS = int(os.getenv("CARRIER_RATE_CACHE_TTL_SECONDS", "300"))  # 5 minutes
+RATE_CACHE_MAX_ENTRIES = int(os.getenv("CARRIER_RATE_CACHE_MAX_ENTRIES", "5000"))
+
+
+def rate_fingerprint(
+    carrier: str,
+    packages: List[PackageInput],
+    destination: Destination,
+    shipper: Optional[Shipper] = None,
+    declared_value: Optional[float] = None,
+    currency: Optional[str] = None,
+) -> str:
+    """Empreinte canonique d'une demande de tarif (SHA-256 hexadécimal)."""
+    parcels = sorted(
+        (round(p.weight_kg, 2), *sorted((round(p.length_cm, 1), round(p.width_cm, 1), round(p.height_cm, 1)), reverse=True))
+        for p in packages
+    )
+    canonical = {
+        "carrier": carrier,
+        "packages": parcels,
+        "destination": [
+            destination.country_code.upper(),
+            destination.postal_code.strip().upper(),
+            destination.city_name.strip().upper(),
+        ],
+        "shipper": [shipper.country_code.upper(), shipper.postal_code.strip()] if shipper else None,
+        "declared_value": round(declared_value, 2) if declared_value is not None else None,
+        "currency": currency.upper() if currency else None,
+    }
+    return hashlib.sha256(json.dumps(canonical, separators=(",", ":")).encode()).hexdigest()
+
+
+class CarrierRateCache:
+    """
+    Stockage LRU/TTL des tarifs.
+
+    db_path=None : base SQLite privée en mémoire (tests, adapters isolés).
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: int = RATE_CACHE_TTL_SECONDS,
+        max_entries: int = RATE_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.db_path = str(db_path) if db_path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._memory_conn: Optional[sqlite3.Connection] = None
+        if self.db_path:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        else:
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._memory_conn is not None:
+            return self._memory_conn
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn is not self._memory_conn:
+            conn.close()
+
+    def _init_db(self) -> None:
+        conn = self._connect()
+        try:
+            if self.db_path:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    carrier TEXT NOT NULL,
+                    rates TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_cache_last_access ON rate_cache(last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_cache_carrier ON rate_cache(carrier)")
+            conn.commit()
+        finally:
+            self._release(conn)
+
+    def _count(self, counters: Dict[str, int], carrier: str) -> None:
+        counters[carrier] = counters.get(carrier, 0) + 1
+
+    def get(self, cache_key: str, carrier: str, ttl_seconds: Optional[int] = None) -> Optional[List[ShippingRate]]:
+        """Tarifs en cache encore valides, ou None. Une lecture rafraîchit la position LRU."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT rates, created_at FROM rate_cache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row is None or now - row[1] > ttl:
+                    if row is not None:
+                        conn.execute("DELETE FROM rate_cache WHERE cache_key = ?", (cache_key,))
+                        conn.commit()
+                    self._count(self._misses, carrier)
+                    return None
+                conn.execute("UPDATE rate_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+                conn.commit()
+                self._count(self._hits, carrier)
+            finally:
+                self._release(conn)
+        logger.debug(f"✓ Cache tarifs {carrier} hit : {cache_key[:8]}…")
+        return [ShippingRate(**r) for r in json.loads(row[0])]
+
+    def set(self, cache_key: str, carrier: str, rates: List[ShippingRate]) -> None:
+        now = time.time()
+        payload = json.dumps([r.model_dump(exclude={"raw_response"}) for r in rates])
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO rate_cache (cache_key, carrier, rates, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (cache_key, carrier, payload, now, now),
+                )
+                # Éviction LRU au-delà de la capacité
+                conn.execute(
+                    """
+                    DELETE FROM rate_cache WHERE cache_key IN (
+                        SELECT cache_key FROM rate_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+                conn.commit()
+            finally:
+                self._release(conn)
+
+    def invalidate(self, carrier: Optional[str] = None) -> None:
+        """Vide le cache (d'un carrier, ou entièrement)."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                if carrier:
+                    conn.execute("DELETE FROM rate_cache WHERE carrier = ?", (carrier,))
+                else:
+                    conn.execute("DELETE FROM rate_cache")
+                conn.commit()
+            finally:
+                self._release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs hits/misses (de ce processus) et nombre d'entrées stockées."""
+        conn = self._connect()
+        try:
+            entries = conn.execute("SELECT COUNT(*) FROM rate_cache").fetchone()[0]
+        finally:
+            self._release(conn)
+        hits = sum(self._hits.values())
+        misses = sum(self._misses.values())
+        carriers = sorted(set(self._hits) | set(self._misses))
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "by_carrier": {
+                c: {"hits": self._hits.get(c, 0), "misses": self._misses.get(c, 0)} for c in carriers
+            },
+        }
+
+
+class AdapterRateCache:
+    """
+    Vue d'un CarrierAdapter sur le cache partagé : calcule l'empreinte et
+    cloisonne les entrées par `scope` (carrier + environnement).
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        store: Optional[CarrierRateCache] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        self.scope = scope
+        self.store = store or CarrierRateCache()
+        self._ttl = ttl_seconds
+
+    def get(
+        self,
+        packages: List[PackageInput],
+        destination: Destination,
+        shipper: Optional[Shipper] = None,
+        declared_value: Optional[float] = None,
+        currency: Optional[str] = None,
+    ) -> Optional[List[ShippingRate]]:
+        key = rate_fingerprint(self.scope, packages, destination, shipper, declared_value, currency)
+        return self.store.get(key, self.scope, self._ttl)
+
+    def set(
+        self,
+        packages: List[PackageInput],
+        destination: Destination,
+        rates: List[ShippingRate],
+        shipper: Optional[Shipper] = None,
+        declared_value: Optional[float] = None,
+        currency: Optional[str] = None,
+    ) -> None:
+        key = rate_fingerprint(self.scope, packages, destination, shipper, declared_value, currency)
+        self.store.set(key, self.scope, rates)
+
+    def invalidate(self) -> None:
+        self.store.invalidate(self.scope)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Singleton
+# ─────────────────────────────────────────────────────────────────────────────
+
+_rate_cache: Optional[CarrierRateCache] = None
+
+
+def get_carrier_rate_cache() -> CarrierRateCache:
+    """Cache persistant partagé (CARRIER_RATE_CACHE_PATH, défaut data/carrier_rate_cache.db)."""
+    global _rate_cache
+    if _rate_cache is None:
+        path = os.getenv("CARRIER_RATE_CACHE_PATH") or str(DB_PATH)
+        try:
+            _rate_cache = CarrierRateCache(path)
+            logger.info(f"✓ Cache tarifs transporteurs : {path}")
+        except sqlite3.Error as exc:
+            logger.warning(f"⚠️ Cache tarifs persistant indisponible ({exc}) — cache mémoire")
+            _rate_cache = CarrierRateCache()
+    return _rate_cache
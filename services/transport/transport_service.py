@@ -5,13 +5,16 @@ Orchestre les adapters carriers et expose calculate_shipping()
 Pipeline :
   PackingResponse (dhl_packages)
     → TransportService.calculate_shipping()
-    → DHLCarrierAdapter.get_rate()
+    → DHLCarrierAdapter.get_rate()        (carriers interrogés en parallèle)
     → ShippingRate (prix, délai, service)
 """
 
 from __future__ import annotations
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
@@ -26,6 +29,9 @@ from .carrier_interface import (
 
 logger = logging.getLogger(__name__)
 
+# Délai maximal accordé à chaque carrier (retries compris) avant de l'écarter de la réponse
+CARRIER_DEADLINE_SECONDS = float(os.getenv("TRANSPORT_CARRIER_DEADLINE_SECONDS", "25"))
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Modèles d'entrée / sortie du service
@@ -103,10 +109,19 @@ class TransportService:
     - Normaliser les données packages depuis PackingResponse
     - Retourner les tarifs disponibles triés par prix
     - Gérer les erreurs carrier avec fallback gracieux
+
+    Les carriers sont interrogés en parallèle : la latence est celle du plus lent
+    (borné par `carrier_deadline_seconds`), pas la somme. Un carrier en erreur ou
+    hors délai est reporté dans `carrier_errors` sans bloquer les autres tarifs.
+    Un adapter peut définir son propre délai via un attribut `deadline_seconds`.
     """
 
-    def __init__(self) -> None:
+    carrier_deadline_seconds: float = CARRIER_DEADLINE_SECONDS
+
+    def __init__(self, carrier_deadline_seconds: Optional[float] = None) -> None:
         self._carriers: Dict[str, CarrierAdapter] = {}
+        if carrier_deadline_seconds is not None:
+            self.carrier_deadline_seconds = carrier_deadline_seconds
         self._register_default_carriers()
 
     def _register_default_carriers(self) -> None:
@@ -184,31 +199,25 @@ class TransportService:
                 f"⚠️ Carrier '{carrier}' inconnu — fallback sur '{first_key}'"
             )
 
-        # Appeler chaque carrier
+        # Appeler les carriers en parallèle
+        results = await asyncio.gather(*(
+            self._query_carrier(
+                adapter,
+                packages=package_inputs,
+                destination=destination,
+                shipper=shipper,
+                declared_value=declared_value,
+                currency=currency,
+            )
+            for adapter in carriers_to_query.values()
+        ))
+
         all_rates: List[ShippingRate] = []
         carrier_errors: List[str] = []
-
-        for key, adapter in carriers_to_query.items():
-            try:
-                rates = await adapter.get_rate(
-                    packages=package_inputs,
-                    destination=destination,
-                    shipper=shipper,
-                    declared_value=declared_value,
-                    currency=currency,
-                )
-                all_rates.extend(rates)
-                logger.info(
-                    f"✓ {adapter.carrier_name} : {len(rates)} tarif(s)"
-                )
-            except CarrierAPIError as exc:
-                msg = f"{adapter.carrier_name} : {exc}"
-                carrier_errors.append(msg)
-                logger.error(f"✗ {msg}")
-            except Exception as exc:
-                msg = f"{adapter.carrier_name} : erreur inattendue — {exc}"
-                carrier_errors.append(msg)
-                logger.error(f"✗ {msg}", exc_info=True)
+        for rates, error in results:
+            all_rates.extend(rates)
+            if error:
+                carrier_errors.append(error)
 
         if not all_rates and carrier_errors:
             return ShippingResponse(
@@ -234,6 +243,37 @@ class TransportService:
             carrier_errors=carrier_errors,
         )
 
+    async def _query_carrier(
+        self, adapter: CarrierAdapter, **rate_kwargs: Any
+    ) -> Tuple[List[ShippingRate], Optional[str]]:
+        """
+        Interroge un carrier sous délai.
+
+        Returns:
+            (tarifs, message d'erreur ou None) — ne lève jamais d'exception
+        """
+        deadline = getattr(adapter, "deadline_seconds", None) or self.carrier_deadline_seconds
+        start = time.perf_counter()
+        try:
+            rates = await asyncio.wait_for(adapter.get_rate(**rate_kwargs), timeout=deadline)
+        except asyncio.TimeoutError:
+            msg = f"{adapter.carrier_name} : pas de réponse sous {deadline:g}s"
+            logger.error(f"✗ {msg}")
+            return [], msg
+        except CarrierAPIError as exc:
+            msg = f"{adapter.carrier_name} : {exc}"
+            logger.error(f"✗ {msg}")
+            return [], msg
+        except Exception as exc:
+            msg = f"{adapter.carrier_name} : erreur inattendue — {exc}"
+            logger.error(f"✗ {msg}", exc_info=True)
+            return [], msg
+
+        logger.info(
+            f"✓ {adapter.carrier_name} : {len(rates)} tarif(s) en {time.perf_counter() - start:.2f}s"
+        )
+        return list(rates), None
+
     # ─────────────────────────────────────────────────────────────
     # Utilitaires
     # ─────────────────────────────────────────────────────────────
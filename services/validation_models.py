@@ -168,6 +168,7 @@ class ValidationListFilter(BaseModel):
     date_to: Optional[datetime] = None
     limit: int = Field(default=50, le=200)
     offset: int = Field(default=0, ge=0)
+    cursor: Optional[str] = Field(None, description="Curseur de la page suivante (pagination keyset)")
 
 
 class ValidationStatistics(BaseModel):
@@ -4,20 +4,23 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-import time
 from datetime import datetime, timezone
-from typing import Dict, Set, List, Optional
+from typing import Any, Dict, Set, List, Optional, Tuple
 
 from fastapi import WebSocket, WebSocketDisconnect
-from pydantic import BaseModel, Extra, ValidationError
 from prometheus_client import Counter, Histogram
 from services.progress_tracker import progress_tracker
 
 # Constants
 DEFAULT_TIMEOUT = 30.0
-RETRY_INTERVAL = 0.1
 MAX_RETRIES = 6
 INITIAL_DELAY = 5.0
+# Nombre max de messages conservés par tâche pour les clients qui se connectent en retard
+PENDING_BUFFER_SIZE = 50
+# Types de messages dont seule la dernière valeur (par step_id) a de l'intérêt
+COALESCED_MESSAGE_TYPES = {"progress_update"}
+# Nombre max de tâches dont les numéros de séquence sont conservés (tâches jamais clôturées)
+SEQUENCE_TASKS_MAX = 1000
 
 # Metrics
 WS_MESSAGES_SENT = Counter(
@@ -34,21 +37,95 @@ def json_serializer(obj):
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
-class TaskUpdateModel(BaseModel, extra=Extra.forbid):
-    type: str
-    task_id: str
-    timestamp: datetime
 
 
-class UserInteractionModel(TaskUpdateModel):
-    interaction_data: dict
+def _coalesce_key(message: dict) -> Optional[Tuple[str, Any]]:
+    """Clé de coalescence d'un message (None si le message ne doit jamais être fusionné)"""
+    msg_type = message.get("type")
+    if msg_type in COALESCED_MESSAGE_TYPES:
+        return (msg_type, message.get("step_id"))
+    return None
 
 
-class StepUpdateModel(TaskUpdateModel):
-    step_id: str
-    status: str
-    message: str
-    details: dict = {}
+class TaskBroker:
+    """
+    Signalisation événementielle par tâche.
+
+    - un asyncio.Event par task_id, positionné dès qu'un abonné est connecté :
+      les émetteurs attendent l'événement au lieu de sonder task_connections
+    - un numéro de séquence par (task_id, clé de coalescence) : une mise à
+      jour de progression devenue obsolète pendant l'attente n'est pas envoyée.
+      Oublié à la clôture de la tâche ; au plus SEQUENCE_TASKS_MAX tâches
+      suivies (les plus anciennes sont abandonnées)
+    """
+
+    def __init__(self) -> None:
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._sequences: Dict[str, Dict[Tuple[str, Any], int]] = {}
+
+    def _event(self, task_id: str) -> asyncio.Event:
+        event = self._events.get(task_id)
+        if event is None:
+            event = self._events[task_id] = asyncio.Event()
+        return event
+
+    def subscribed(self, task_id: str) -> None:
+        """Réveille tous les émetteurs en attente d'un abonné pour cette tâche"""
+        self._event(task_id).set()
+
+    def unsubscribed(self, task_id: str) -> None:
+        """Plus aucun abonné : les prochains émetteurs devront attendre"""
+        event = self._events.get(task_id)
+        if event is not None:
+            event.clear()
+
+    async def wait_for_subscriber(self, task_id: str, timeout: float) -> bool:
+        """Attend qu'un abonné soit connecté (True) ou l'expiration du délai (False)"""
+        event = self._event(task_id)
+        if event.is_set():
+            return True
+        self._waiters[task_id] = self._waiters.get(task_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            remaining = self._waiters.get(task_id, 1) - 1
+            if remaining > 0:
+                self._waiters[task_id] = remaining
+            else:
+                self._waiters.pop(task_id, None)
+                # Libérer l'événement d'une tâche sans abonné ni émetteur
+                if not event.is_set() and self._events.get(task_id) is event:
+                    self._events.pop(task_id, None)
+
+    def next_sequence(self, task_id: str, key: Tuple[str, Any]) -> int:
+        sequences = self._sequences.get(task_id)
+        if sequences is None:
+            sequences = self._sequences[task_id] = {}
+            if len(self._sequences) > SEQUENCE_TASKS_MAX:
+                del self._sequences[next(iter(self._sequences))]
+        seq = sequences.get(key, 0) + 1
+        sequences[key] = seq
+        return seq
+
+    def is_superseded(self, task_id: str, key: Tuple[str, Any], seq: int) -> bool:
+        return self._sequences.get(task_id, {}).get(key, seq) > seq
+
+    def transfer(self, old_task_id: str, new_task_id: str) -> None:
+        if old_task_id in self._sequences:
+            self._sequences[new_task_id] = self._sequences.pop(old_task_id)
+        self.unsubscribed(old_task_id)
+        self.subscribed(new_task_id)
+
+    def discard(self, task_id: str) -> None:
+        """Oublie l'état d'une tâche (les émetteurs en attente expireront normalement)"""
+        self.unsubscribed(task_id)
+        if not self._waiters.get(task_id):
+            self._events.pop(task_id, None)
+        self._sequences.pop(task_id, None)
 
 
 class WebSocketManager:
@@ -61,6 +138,7 @@ class WebSocketManager:
         self.active_connections: Dict[str, Set["WebSocket"]] = {"all": set()}
         self.task_connections: Dict[str, Set["WebSocket"]] = {}
         self.pending_messages: Dict[str, List[dict]] = {}
+        self.broker = TaskBroker()
         # Références aux tâches fire-and-forget (évite garbage collection prématurée)
         self._background_tasks: set = set()
 
@@ -77,6 +155,7 @@ class WebSocketManager:
         self.active_connections.setdefault("all", set()).add(websocket)
         if task_id:
             self.task_connections.setdefault(task_id, set()).add(websocket)
+            self.broker.subscribed(task_id)
             logger.info(f"✅ WebSocket AJOUTÉ - Connexions pour {task_id}: {len(self.task_connections[task_id])}")
         
         # Vérifier les messages en attente et les traiter (éviter duplications)
@@ -105,7 +184,7 @@ class WebSocketManager:
         """
         try:
             if task_id:
-                self.task_connections.get(task_id, set()).discard(websocket)
+                self._remove_task_socket(task_id, websocket)
             self.active_connections.get("all", set()).discard(websocket)
             
             # Fermer proprement la connexion si encore ouverte
@@ -130,73 +209,99 @@ class WebSocketManager:
         :param wait: attendre une connexion active
         :param timeout: délai d'attente maximal
         """
-
-
-        if wait:
-            start = time.monotonic()
-            while not self.task_connections.get(task_id):
-                if time.monotonic() - start > timeout:
-                    logger.warning(
-                        "Aucune connexion pour tâche après timeout, message stocké pour task_id=%s", task_id
-                    )
-                    # Stockage automatique dans la file d'attente
-                    self.pending_messages.setdefault(task_id, []).append(message)
-                    return
-                await asyncio.sleep(RETRY_INTERVAL)
+        key = _coalesce_key(message)
+        seq = self.broker.next_sequence(task_id, key) if key else None
+
+        if wait and not self.task_connections.get(task_id):
+            connected = await self.broker.wait_for_subscriber(task_id, timeout)
+            # Une progression plus récente pour la même étape a été émise pendant l'attente
+            if key and self.broker.is_superseded(task_id, key, seq):
+                logger.debug(f"Message {key} obsolète ignoré pour task_id={task_id}")
+                return
+            if not connected:
+                logger.warning(
+                    "Aucune connexion pour tâche après timeout, message stocké pour task_id=%s", task_id
+                )
+                # Stockage automatique dans la file d'attente (bornée)
+                self._buffer_pending(task_id, message)
+                return
 
         sockets = list(self.task_connections.get(task_id) or self.active_connections.get("all", []))
-        logger.debug(f"🔍 DEBUG BROADCAST: task_id={task_id}")
-        logger.debug(f"🔍 DEBUG BROADCAST: task_connections keys={list(self.task_connections.keys())}")
-        logger.debug(f"🔍 DEBUG BROADCAST: sockets pour {task_id}={len(sockets)}")
         if not sockets:
             logger.warning("Aucune socket disponible pour broadcast", extra={"task_id": task_id})
             return
+
+        payload = self._prepare_payload(task_id, message)
+        if payload is None:
+            return
+
+        # Sérialisation unique puis envoi concurrent à toutes les sockets
+        text = json.dumps(payload, default=json_serializer)
+        msg_type = payload.get("type")
+        await asyncio.gather(*(self._send_text(ws, task_id, msg_type, text) for ws in sockets))
+
+    def _prepare_payload(self, task_id: str, message: dict) -> Optional[dict]:
+        """Complète les champs requis (type, task_id, timestamp) et contrôle leur type"""
         # Normaliser la présence de 'timestamp'
         if 'timestamp' not in message:
             message['timestamp'] = datetime.now(timezone.utc).isoformat()
-        # Validate payload
         # CORRECTION: Assurer la présence du task_id dans le message
         if 'task_id' not in message:
             message['task_id'] = task_id
-        
-        # Validate payload
+        if 'type' not in message:
+            message['type'] = 'task_update'
+
+        if not isinstance(message['type'], str) or not isinstance(message['task_id'], str):
+            logger.error("Payload invalide pour broadcast: type/task_id non textuels", extra={"task_id": task_id})
+            return None
+        if not isinstance(message['timestamp'], (str, datetime)):
+            logger.error("Payload invalide pour broadcast: timestamp incorrect", extra={"task_id": task_id})
+            return None
+        return message
+
+    async def _send_text(self, ws: WebSocket, task_id: str, msg_type: Optional[str], text: str) -> None:
+        """Envoi instrumenté d'un payload déjà sérialisé vers une socket"""
         try:
-            # Assurer la présence des champs requis
-            if 'task_id' not in message:
-                message['task_id'] = task_id
-            if 'type' not in message:
-                message['type'] = 'task_update'
-                
-            validated = TaskUpdateModel(**{k: message[k] for k in ["type", "task_id", "timestamp"]})
-            payload = {**validated.dict(), **{k: v for k, v in message.items() if k not in validated.__fields__}}
-        except ValidationError as e:
-            logger.error(f"Payload invalide pour broadcast: {e}", extra={"task_id": task_id})
-            return
-        except Exception as e:
-            logger.error(f"Erreur validation payload: {e}", extra={"task_id": task_id})
+            with WS_SEND_LATENCY.labels(task_id=task_id, type=msg_type).time():
+                await ws.send_text(text)
+            WS_MESSAGES_SENT.labels(task_id=task_id, type=msg_type).inc()
+        except WebSocketDisconnect:
+            logger.info("Client déconnecté proprement", extra={"task_id": task_id})
+            self._cleanup_ws(ws, task_id)
+        except asyncio.TimeoutError:
+            logger.error("Envoi WebSocket timeout", extra={"task_id": task_id})
+            self._cleanup_ws(ws, task_id)
+        except Exception:
+            logger.exception("Erreur inattendue lors de l'envoi WebSocket", extra={"task_id": task_id})
+            self._cleanup_ws(ws, task_id)
+
+    def _buffer_pending(self, task_id: str, message: dict) -> None:
+        """
+        Stocke un message pour un client qui se connectera plus tard.
+        Les progressions d'une même étape sont fusionnées et la file est bornée
+        à PENDING_BUFFER_SIZE (les plus anciens messages sont abandonnés).
+        """
+        pending = self.pending_messages.setdefault(task_id, [])
+        key = _coalesce_key(message)
+        if key:
+            pending[:] = [msg for msg in pending if _coalesce_key(msg) != key]
+        pending.append(message)
+        if len(pending) > PENDING_BUFFER_SIZE:
+            del pending[:len(pending) - PENDING_BUFFER_SIZE]
+
+    def _remove_task_socket(self, task_id: str, websocket: WebSocket) -> None:
+        sockets = self.task_connections.get(task_id)
+        if sockets is None:
             return
-
-        # Send and instrument
-        for ws in sockets:
-            try:
-                with WS_SEND_LATENCY.labels(task_id=task_id, type=payload.get("type")).time():
-                    await ws.send_text(json.dumps(payload, default=json_serializer))
-                WS_MESSAGES_SENT.labels(task_id=task_id, type=payload.get("type")).inc()
-            except WebSocketDisconnect:
-                logger.info("Client déconnecté proprement", extra={"task_id": task_id})
-                self._cleanup_ws(ws, task_id)
-            except asyncio.TimeoutError:
-                logger.error("Envoi WebSocket timeout", extra={"task_id": task_id})
-                self._cleanup_ws(ws, task_id)
-            except Exception:
-                logger.exception("Erreur inattendue lors de l'envoi WebSocket", extra={"task_id": task_id})
-                self._cleanup_ws(ws, task_id)
+        sockets.discard(websocket)
+        if not sockets:
+            self.broker.unsubscribed(task_id)
 
     def _cleanup_ws(self, websocket: WebSocket, task_id: str) -> None:
         """
         Nettoie une connexion WebSocket des enregistrements.
         """
-        self.task_connections.get(task_id, set()).discard(websocket)
+        self._remove_task_socket(task_id, websocket)
         self.active_connections.get("all", set()).discard(websocket)
 
     async def send_task_update(
@@ -275,7 +380,7 @@ class WebSocketManager:
             
             if not message_exists:
                 logger.warning(f"⚠️ Pas de connexion active pour {task_id}, message stocké")
-                self.pending_messages.setdefault(task_id, []).append(message)
+                self._buffer_pending(task_id, message)
             else:
                 logger.info(f"📨 Message similaire déjà en attente pour {task_id}, ignorer duplication")
                 
@@ -298,7 +403,7 @@ class WebSocketManager:
             logger.error(f"❌ Erreur envoi initial pour {task_id}: {e}")
             # Seulement stocker si l'envoi a échoué
             if not message.get('_sent'):
-                self.pending_messages.setdefault(task_id, []).append(message)
+                self._buffer_pending(task_id, message)
                 self._schedule_retry(task_id)
 
     async def _attempt_reconnection(self, task_id: str) -> None:
@@ -403,6 +508,7 @@ class WebSocketManager:
                 self.pending_messages[new_task_id] = self.pending_messages.pop(old_task_id)
             # Nettoyer ancienne entrée
             self.task_connections.pop(old_task_id)
+            self.broker.transfer(old_task_id, new_task_id)
             logger.info(f"🔄 Connexions transférées: {old_task_id} → {new_task_id}")
             # Notifier les clients du changement
             for websocket in connections:
@@ -426,11 +532,8 @@ class WebSocketManager:
             logger.info(f"🧹 Messages en attente nettoyés pour {task_id}")
             
     async def close_task_connections(self, task_id: str):
-        """Ferme proprement toutes les connexions WebSocket d'une tâche"""
-        if task_id not in self.task_connections:
-            return
-        
-        connections = self.task_connections[task_id].copy()
+        """Ferme proprement toutes les connexions WebSocket d'une tâche et oublie son état"""
+        connections = self.task_connections.get(task_id, set()).copy()
         for websocket in connections:
             try:
                 # Envoyer notification finale
@@ -448,6 +551,7 @@ class WebSocketManager:
         # Nettoyer les références
         self.task_connections.pop(task_id, None)
         self.pending_messages.pop(task_id, None)
+        self.broker.discard(task_id)
         logger.info(f"🧹 Connexions WebSocket fermées pour {task_id}")
 # Instance globale
 websocket_manager = WebSocketManager()
@@ -26,6 +26,7 @@ from fastapi.testclient import TestClient
 
 from auth.dependencies import get_current_user
 from services.progress_tracker import progress_tracker
+from services.progress_task_store import MemoryTaskStore
 
 
 # ── Fixtures communes ───────────────────────────────────────────────────────────
@@ -35,14 +36,17 @@ def clean_tracker():
     """Isole l'état global du progress_tracker entre les tests."""
     active_backup = dict(progress_tracker.active_tasks)
     completed_backup = list(progress_tracker.completed_tasks)
+    store_backup = progress_tracker.store
     progress_tracker.active_tasks.clear()
     progress_tracker.completed_tasks.clear()
+    progress_tracker.store = MemoryTaskStore()
     try:
         yield
     finally:
         progress_tracker.active_tasks.clear()
         progress_tracker.active_tasks.update(active_backup)
         progress_tracker.completed_tasks[:] = completed_backup
+        progress_tracker.store = store_backup
 
 
 def _progress_client():
@@ -63,14 +63,14 @@ class _FakeSession:
 
 
 def _patch_local_db(monkeypatch, row):
-    """Branche un faux moteur SQLAlchemy renvoyant `row` (ou None)."""
-    import sqlalchemy
-    import sqlalchemy.orm
+    """Branche une fausse fabrique de sessions produits_sap renvoyant `row` (ou None)."""
+    import services.produits_sap_search as produits_sap_search
 
     monkeypatch.setenv("DATABASE_URL", "postgresql://fake/db")
-    monkeypatch.setattr(sqlalchemy, "create_engine", lambda *a, **k: object())
     monkeypatch.setattr(
-        sqlalchemy.orm, "sessionmaker", lambda *a, **k: (lambda: _FakeSession(row))
+        produits_sap_search,
+        "get_produits_sap_sessionmaker",
+        lambda *a, **k: (lambda: _FakeSession(row)),
     )
 
 
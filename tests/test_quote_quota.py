@@ -197,6 +197,29 @@ class TestQuotaWiringSalesQuotation:
             assert row is not None
             assert row.count == 1
 
+    @pytest.mark.asyncio
+    async def test_failed_creation_releases_unit_timeout_keeps_it(self, sap_service, payload, quota):
+        """Erreur SAP → unité de quota rendue ; timeout (devis peut-être créé) → unité gardée."""
+        import httpx
+
+        rejected = MagicMock()
+        rejected.status_code = 400
+        rejected.json.return_value = {"error": {"code": "-10", "message": {"value": "Client inconnu"}}}
+        sap_service.session_id = "FAKE"
+        sap_service.session_timeout = datetime(2099, 1, 1)
+
+        with patch("services.sap_quotation_service.get_quote_quota_service", return_value=quota), \
+             patch.object(sap_service, "ensure_session", new=AsyncMock(return_value=True)), \
+             patch.object(sap_service, "_call_sap_post", new=AsyncMock(return_value=rejected)):
+            assert (await sap_service.create_sales_quotation(payload)).success is False
+        assert quota.release() is False  # déjà rendue
+
+        with patch("services.sap_quotation_service.get_quote_quota_service", return_value=quota), \
+             patch.object(sap_service, "ensure_session", new=AsyncMock(return_value=True)), \
+             patch.object(sap_service, "_call_sap_post", new=AsyncMock(side_effect=httpx.ReadTimeout("lent"))):
+            assert (await sap_service.create_sales_quotation(payload)).error_code == "SAP_TIMEOUT"
+        assert quota.release() is True  # restée mise de côté
+
 
 # ============================================================
 # TESTS : BRANCHEMENT 3e chemin — routes_sap_rondot (mock SAP)
@@ -339,6 +362,7 @@ class TestQuotaWiringMcpConnector:
             row = s.query(QuoteUsageCounter).filter_by(society_id="RONDOT").first()
             # check_quota a créé la ligne à 0 ; aucun incrément car création échouée
             assert (row.count if row else 0) == 0
+        assert quota.release() is False  # unité déjà rendue après l'échec
 
     @pytest.mark.asyncio
     async def test_create_sap_quote_blocked_when_full(self, quota):
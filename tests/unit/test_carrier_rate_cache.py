@@ -0,0 +1,98 @@
+"""
+Tests unitaires — Cache partagé des tarifs transporteurs
+Couvre : empreinte canonique, LRU, persistance entre instances (workers),
+cloisonnement par carrier, compteurs hits/misses, clé DHL incluant la
+valeur déclarée
+"""
+
+import pytest
+
+import services.transport.carriers.dhl_adapter as dhl_adapter
+from services.transport.carrier_interface import Destination, PackageInput, ShippingRate
+from services.transport.rate_cache import AdapterRateCache, CarrierRateCache, rate_fingerprint
+
+PARIS = Destination(postal_code="75001", city_name="PARIS", country_code="FR")
+
+
+def _pkg(weight, l=30.0, w=20.0, h=20.0):
+    return PackageInput(weight_kg=weight, length_cm=l, width_cm=w, height_cm=h)
+
+
+def _rates(price):
+    return [ShippingRate(carrier="X", service_code="S", service_name="STD", price=price)]
+
+
+def test_fingerprint_is_order_and_orientation_independent():
+    a = rate_fingerprint("DHL", [_pkg(1.0), _pkg(2.0, 40, 30, 10)], PARIS)
+    b = rate_fingerprint("DHL", [_pkg(2.0, 10, 40, 30), _pkg(1.0, 20, 30, 20)], PARIS)
+    assert a == b
+    assert a != rate_fingerprint("UPS", [_pkg(1.0), _pkg(2.0, 40, 30, 10)], PARIS)
+
+
+def test_lru_evicts_least_recently_used():
+    store = CarrierRateCache(max_entries=2)
+    store.set("k1", "DHL", _rates(1))
+    store.set("k2", "DHL", _rates(2))
+    assert store.get("k1", "DHL") is not None  # k1 devient le plus récent
+    store.set("k3", "DHL", _rates(3))
+
+    assert store.get("k2", "DHL") is None
+    assert store.get("k1", "DHL")[0].price == 1
+    assert store.get("k3", "DHL")[0].price == 3
+
+
+def test_persisted_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "rates.db")
+    AdapterRateCache("UPS", store=CarrierRateCache(path)).set([_pkg(1.0)], PARIS, _rates(12.5))
+
+    other_worker = AdapterRateCache("UPS", store=CarrierRateCache(path))
+    assert other_worker.get([_pkg(1.0)], PARIS)[0].price == 12.5
+
+
+def test_invalidate_is_scoped_to_carrier():
+    store = CarrierRateCache()
+    dhl, ups = AdapterRateCache("DHL", store=store), AdapterRateCache("UPS", store=store)
+    dhl.set([_pkg(1.0)], PARIS, _rates(10))
+    ups.set([_pkg(1.0)], PARIS, _rates(11))
+
+    dhl.invalidate()
+
+    assert dhl.get([_pkg(1.0)], PARIS) is None
+    assert ups.get([_pkg(1.0)], PARIS)[0].price == 11
+
+
+def test_hit_miss_counters():
+    store = CarrierRateCache()
+    view = AdapterRateCache("DHL", store=store)
+    view.get([_pkg(1.0)], PARIS)
+    view.set([_pkg(1.0)], PARIS, _rates(10))
+    view.get([_pkg(1.0)], PARIS)
+    view.get([_pkg(1.0)], PARIS)
+
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["by_carrier"]["DHL"] == {"hits": 2, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_dhl_cache_key_includes_declared_value(monkeypatch):
+    monkeypatch.setattr(dhl_adapter.DHLCarrierAdapter, "is_available", lambda self: True)
+    adapter = dhl_adapter.DHLCarrierAdapter()
+    adapter._cache = dhl_adapter._RateCache()
+    calls = []
+
+    async def fake_call(payload):
+        calls.append(payload)
+        return {}
+
+    monkeypatch.setattr(adapter, "_call_with_retry", fake_call)
+    monkeypatch.setattr(adapter, "_parse_response", lambda raw, packages: _rates(len(calls)))
+
+    async def quote(value, currency="EUR"):
+        return (await adapter.get_rate([_pkg(1.0)], PARIS, declared_value=value, currency=currency))[0].price
+
+    assert await quote(100.0) == 1
+    assert await quote(100.0) == 1
+    assert await quote(5000.0) == 2
+    assert await quote(5000.0, "USD") == 3
+    assert len(calls) == 3
@@ -0,0 +1,69 @@
+"""
+Tests unitaires — Déduplication des clients par nom (utils/client_dedup.py)
+"""
+
+import pytest
+
+from utils.client_dedup import (
+    ClientDeduplicator,
+    find_duplicate_groups,
+    normalize_company_name,
+)
+
+
+class TestNormalizeCompanyName:
+    def test_generic_words_removed(self):
+        assert normalize_company_name("Rondot EURL") == "RONDOT"
+
+    def test_group_kept(self):
+        assert normalize_company_name("Rondot Group") == "RONDOT GROUP"
+
+    def test_empty(self):
+        assert normalize_company_name("") == ""
+
+
+class TestExactMode:
+    def test_groups_identical_normalized_names(self):
+        clients = [
+            {"Name": "RONDOT SA"},
+            {"Name": "ACME"},
+            {"Name": "Rondot"},
+            {"Name": "Rondot Group"},
+        ]
+        assert ClientDeduplicator().find_groups(clients) == [[0, 2]]
+
+    def test_length_tolerance_applied_in_bucket(self):
+        clients = [
+            {"Name": "ACME"},
+            {"Name": "ACME COMPANY"},  # même nom normalisé, écart de longueur > 3
+            {"Name": "ACME CO"},
+        ]
+        assert ClientDeduplicator().find_groups(clients) == [[0, 2]]
+
+    def test_sap_card_name_used_for_grouping(self):
+        clients = [{"CardName": "RONDOT"}, {"CardName": "RONDOT LTD"}]
+        assert find_duplicate_groups(clients) == [[0, 1]]
+
+    def test_no_duplicates(self):
+        clients = [{"Name": f"Client {i}"} for i in range(50)]
+        assert ClientDeduplicator().find_groups(clients) == []
+
+    def test_large_list_is_linear(self):
+        clients = [{"Name": f"Client {i % 1000}"} for i in range(10000)]
+        groups = ClientDeduplicator().find_groups(clients)
+        assert len(groups) == 1000
+        assert all(len(g) == 10 for g in groups)
+
+
+class TestFuzzyMode:
+    def test_typo_grouped(self):
+        clients = [{"Name": "RONDOT"}, {"Name": "RONDOTT"}, {"Name": "ACME"}]
+        assert ClientDeduplicator(mode="fuzzy").find_groups(clients) == [[0, 1]]
+
+    def test_different_prefix_not_compared(self):
+        clients = [{"Name": "XRONDOT"}, {"Name": "RONDOT"}]
+        assert ClientDeduplicator(mode="fuzzy").find_groups(clients) == []
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            ClientDeduplicator(mode="phonetic")
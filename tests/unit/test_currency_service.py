@@ -0,0 +1,76 @@
+"""
+Tests unitaires — CurrencyService (table des taux unique)
+Couvre : une requête pour toutes les paires et taux croisés, requête partagée
+entre appels concurrents, secours sur la dernière table persistée
+"""
+
+import asyncio
+
+import pytest
+
+from services.currency_service import CurrencyService
+
+EUR_TABLE = {"EUR": 1.0, "USD": 1.10, "GBP": 0.85, "CHF": 0.95}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(CurrencyService, "RATES_FILE", tmp_path / "currency_rates.json")
+    monkeypatch.delenv("PRICING_BASE_CURRENCY", raising=False)
+    return _service_with_source(EUR_TABLE)
+
+
+def _service_with_source(table):
+    svc = CurrencyService()
+    svc.source_calls = 0
+
+    async def fetch(base_currency):
+        svc.source_calls += 1
+        await asyncio.sleep(0.01)
+        return dict(table) if table is not None else None
+
+    svc._fetch_rate_table_from_api = fetch
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_one_fetch_for_all_pairs_and_cross_rates(service):
+    usd_gbp = await service.get_exchange_rate("USD", "GBP")
+    assert usd_gbp.rate == pytest.approx(0.85 / 1.10)
+    assert (await service.convert(100, "CHF", "EUR")) == pytest.approx(round(100 / 0.95, 2))
+    assert await service.get_all_rates_from_base() == EUR_TABLE
+
+    assert service.source_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch(service):
+    pairs = [("EUR", "USD"), ("USD", "CHF"), ("GBP", "EUR"), ("CHF", "GBP")] * 10
+
+    rates = await asyncio.gather(*(service.get_exchange_rate(a, b) for a, b in pairs))
+
+    assert all(r is not None and not r.is_stale for r in rates)
+    assert service.source_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_persisted_table_used_when_source_down(service):
+    await service.get_exchange_rate("EUR", "USD")
+
+    offline = _service_with_source(None)
+    rate = await offline.get_exchange_rate("EUR", "USD")
+
+    assert rate.rate == pytest.approx(1.10)
+    assert rate.is_stale is True
+    assert offline.get_cache_status()["is_stale"] is True
+
+    # Pendant la panne, pas de nouvelle rafale de requêtes
+    await offline.get_exchange_rate("GBP", "CHF")
+    assert offline.source_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_no_table_at_all(service):
+    offline = _service_with_source(None)
+    assert await offline.get_exchange_rate("EUR", "USD") is None
+    assert (await offline.get_exchange_rate("EUR", "EUR")).rate == 1.0
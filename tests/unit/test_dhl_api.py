@@ -59,6 +59,7 @@ def adapter():
     """Adapter DHL pointant sur l'env TEST."""
     a = DHLCarrierAdapter()
     a._base_url = DHL_URL_TEST
+    a._cache = _RateCache()  # cache privé en mémoire : pas de partage entre tests
     return a
 
 
@@ -127,6 +128,14 @@ class TestRateCache:
         cache.set(one_package, destination_paris, fake)
         assert cache.get(one_package, destination_dubai) is None
 
+    def test_split_packages_same_totals_different_keys(self, destination_paris):
+        cache = _RateCache()
+        fake = [ShippingRate(carrier="DHL", service_code="P", service_name="X", price=10, currency="EUR", delivery_days=1)]
+        one_box = [PackageInput(weight_kg=2.0, length_cm=40.0, width_cm=20.0, height_cm=20.0)]
+        two_boxes = [PackageInput(weight_kg=1.0, length_cm=20.0, width_cm=20.0, height_cm=20.0)] * 2
+        cache.set(one_box, destination_paris, fake)
+        assert cache.get(two_boxes, destination_paris) is None
+
     def test_invalidate_clears_cache(self, one_package, destination_paris):
         cache = _RateCache()
         fake = [ShippingRate(carrier="DHL", service_code="P", service_name="X", price=10, currency="EUR", delivery_days=1)]
@@ -318,8 +327,8 @@ class TestDHLErrorHandling:
                 delivery_days=2,
             )
         ]
-        # Pré-remplir le cache
-        adapter._cache.set(one_package, destination_paris, fake_rates)
+        # Pré-remplir le cache (valeur déclarée par défaut de get_rate)
+        adapter._cache.set(one_package, destination_paris, fake_rates, None, 100.0, "EUR")
 
         call_count = 0
 
@@ -0,0 +1,88 @@
+"""
+Tests unitaires — Résolution groupée des dimensions (PackingService)
+Couvre : une requête pour N articles, cache, invalidation à la réindexation,
+erreur DB passagère jamais mise en cache
+"""
+
+import json
+
+import pytest
+
+import services.supplier_tariffs_db as tariffs_db
+from services.packing.dimension_resolver import DimensionResolver
+from services.packing.packing_service import PackingItemInput, PackingService
+from services.supplier_tariffs_db import replace_file_products
+
+
+@pytest.fixture
+def tariffs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tariffs_db, "DB_PATH", tmp_path / "supplier_tariffs.db")
+    tariffs_db.init_database()
+    products = [
+        {
+            "supplier_reference": f"REF-{i:03d}",
+            "designation": f"Article {i}",
+            "weight": 1.0 + i,
+            "dimensions": json.dumps({"length": 20, "width": 10, "height": 5}),
+        }
+        for i in range(40)
+    ]
+    replace_file_products(_file(), products)
+    return products
+
+
+def _file():
+    return {"path": "/tarifs/logistique.csv", "name": "logistique.csv", "type": "csv",
+            "size": 1, "modified": "2026-01-01 00:00:00"}
+
+
+def test_single_query_for_many_items(tariffs):
+    resolver = DimensionResolver()
+    codes = [f"REF-{i:03d}" for i in range(40)] + ["INCONNU"]
+
+    dims = resolver.resolve_many(codes)
+
+    assert resolver.queries == 1
+    assert dims["REF-005"] == {"weight": 6.0, "length_cm": 20.0, "width_cm": 10.0, "height_cm": 5.0}
+    assert dims["INCONNU"] is None
+
+
+def test_cached_until_reindexation(tariffs):
+    resolver = DimensionResolver()
+    resolver.resolve_many(["REF-001", "INCONNU"])
+    resolver.resolve_many(["REF-001", "INCONNU"])
+    assert resolver.queries == 1
+
+    replace_file_products(_file(), [{"supplier_reference": "REF-001", "weight": 9.5}])
+
+    assert resolver.resolve_many(["REF-001"])["REF-001"] == {"weight": 9.5}
+    assert resolver.queries == 2
+
+
+def test_db_error_not_cached(tariffs, monkeypatch):
+    resolver = DimensionResolver()
+    real_lookup = tariffs_db.find_products_by_references
+
+    def locked(references):
+        raise tariffs_db.sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(tariffs_db, "find_products_by_references", locked)
+    assert resolver.resolve_many(["REF-001", "REF-002"]) == {"REF-001": None, "REF-002": None}
+
+    monkeypatch.setattr(tariffs_db, "find_products_by_references", real_lookup)
+    dims = resolver.resolve_many(["REF-001", "REF-002"])
+    assert dims["REF-001"] == {"weight": 2.0, "length_cm": 20.0, "width_cm": 10.0, "height_cm": 5.0}
+    assert resolver.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_packing_service_resolves_in_one_query(tariffs):
+    service = PackingService()
+    service._resolver = DimensionResolver()
+    items = [PackingItemInput(item_code=f"REF-{i:03d}", quantity=1) for i in range(10)]
+
+    result = await service.suggest_packages(items)
+
+    assert result.success is True
+    assert service._resolver.queries == 1
+    assert result.total_weight_kg == pytest.approx(sum(1.0 + i for i in range(10)))
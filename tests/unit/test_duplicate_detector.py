@@ -0,0 +1,94 @@
+"""
+Tests unitaires — DuplicateDetector (index MinHash/LSH)
+Couvre : doublon probable au-delà des 10 derniers emails du client, doublon
+possible sur sujet/corps, absence de faux positifs, indexation des lignes existantes
+"""
+
+import sqlite3
+
+import pytest
+
+from services.duplicate_detector import DuplicateDetector, DuplicateType
+
+
+@pytest.fixture
+def detector(tmp_path):
+    return DuplicateDetector(db_path=str(tmp_path / "dup.db"))
+
+
+def _register_noise(detector, count, sender="achats@acme.fr", client="C001"):
+    for i in range(count):
+        detector.register_email(
+            email_id=f"noise-{i}",
+            sender_email=sender,
+            subject=f"Commande réassort lot {i} référence {i * 7}",
+            client_card_code=client,
+            product_codes=[f"NOISE-{i}-{j}" for j in range(5)],
+        )
+
+
+def test_probable_duplicate_found_beyond_recent_window(detector):
+    detector.register_email(
+        email_id="original", sender_email="achats@acme.fr", subject="Demande de prix",
+        client_card_code="C001", product_codes=["A100", "B200", "C300", "D400", "E500"],
+    )
+    _register_noise(detector, 50)
+
+    result = detector.check_duplicate(
+        email_id="new", sender_email="autre@acme.fr", subject="Besoin urgent",
+        client_card_code="C001", product_codes=["A100", "B200", "C300", "D400", "E500", "F600"],
+    )
+
+    assert result.duplicate_type == DuplicateType.PROBABLE
+    assert result.existing_quote.email_id == "original"
+    assert result.confidence == pytest.approx(5 / 6)
+
+
+def test_possible_duplicate_on_subject_and_body(detector):
+    body = "Bonjour, merci de nous chiffrer 12 imprimantes laser et 4 cartouches toner noir."
+    detector.register_email(
+        email_id="original", sender_email="achats@acme.fr",
+        subject="Demande de devis imprimantes", body=body,
+    )
+    _register_noise(detector, 30)
+
+    result = detector.check_duplicate(
+        email_id="relance", sender_email="achats@acme.fr",
+        subject="RE: Demande de devis imprimantes", body=body,
+    )
+
+    assert result.duplicate_type == DuplicateType.POSSIBLE
+    assert result.existing_quote.email_id == "original"
+
+
+def test_unrelated_email_is_not_duplicate(detector):
+    _register_noise(detector, 30)
+
+    result = detector.check_duplicate(
+        email_id="new", sender_email="achats@acme.fr", subject="Demande de devis imprimantes",
+        client_card_code="C001", product_codes=["X1", "X2", "X3"],
+    )
+
+    assert result.is_duplicate is False
+    assert result.duplicate_type == DuplicateType.NONE
+
+
+def test_existing_rows_indexed_at_startup(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    DuplicateDetector(db_path=str(db_path))
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO processed_emails (email_id, email_subject, sender_email, client_card_code, product_codes) "
+        "VALUES ('legacy', 'Devis vannes inox', 'achats@acme.fr', 'C001', '[\"V1\", \"V2\", \"V3\"]')"
+    )
+    conn.commit()
+    conn.close()
+
+    detector = DuplicateDetector(db_path=str(db_path))
+    result = detector.check_duplicate(
+        email_id="new", sender_email="x@acme.fr", subject="Autre sujet",
+        client_card_code="C001", product_codes=["V1", "V2", "V3"],
+    )
+
+    assert result.duplicate_type == DuplicateType.PROBABLE
+    assert result.existing_quote.email_id == "legacy"
@@ -0,0 +1,128 @@
+"""
+Tests unitaires — EmailAnalyzer.quick_classify (matchers pré-compilés)
+Couvre : mots-clés de sujet chevauchants, résultats identiques à l'ancien
+algorithme (une recherche par mot-clé / pattern) et benchmark sur quelques
+milliers de corps d'email de taille réelle (hors suite unitaire : mesure de
+temps, lancé avec RUN_PERFORMANCE_TESTS=1)
+"""
+
+import os
+import random
+import re
+import time
+
+import pytest
+
+from services.email_analyzer import (
+    QUANTITY_PATTERNS,
+    QUOTE_KEYWORDS_BODY,
+    QUOTE_KEYWORDS_SUBJECT,
+    EmailAnalyzer,
+)
+
+
+def _reference_classify(subject, body_preview):
+    """Ancien algorithme : une recherche par mot-clé et par pattern."""
+    subject_lower = subject.lower()
+    body_lower = body_preview.lower()
+    combined = f"{subject_lower} {body_lower}"
+    matched_rules, score = [], 0
+    for keyword in QUOTE_KEYWORDS_SUBJECT:
+        if keyword in subject_lower:
+            matched_rules.append(f"Subject contains '{keyword}'")
+            score += 30
+    for phrase in QUOTE_KEYWORDS_BODY:
+        if phrase in body_lower:
+            matched_rules.append("Body contains quote phrase")
+            score += 25
+            break
+    for pattern in QUANTITY_PATTERNS:
+        if re.search(pattern, combined, re.IGNORECASE):
+            matched_rules.append("Contains quantity patterns")
+            score += 15
+            break
+    return score, matched_rules
+
+
+_FILLER = (
+    "bonjour suite à notre échange concernant la ligne de production nous avons "
+    "besoin des pièces suivantes pour la maintenance de la machine cordialement "
+    "hello team regarding the maintenance schedule of the press line please note "
+    "the delivery week ref 4021-77 drawing rev b best regards service achats"
+).split()
+_SUBJECTS = [
+    "RE: Spare parts request for quotation", "TR: INFO / OFFRE de prix", "Price request",
+    "Meeting notes", "Facture 2024-118", "FW: Inquiry - pusher blade", "Devis", "Commande 4500123",
+]
+_INSERTS = [
+    "please find attached", "merci de nous faire un devis", "12 pcs", "qty: 4",
+    "3x joint torique", "quantité : 10", "a12 pcs", "kindly quote", "à chiffrer",
+]
+
+
+def _corpus(n=3000, seed=7):
+    rng = random.Random(seed)
+    emails = []
+    for _ in range(n):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(200, 700))]
+        for insert in rng.sample(_INSERTS, rng.randint(0, 2)):
+            words.insert(rng.randint(0, len(words)), insert)
+        emails.append((rng.choice(_SUBJECTS), " ".join(words)))
+    return emails
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmailAnalyzer()
+
+
+def test_overlapping_subject_keywords(analyzer):
+    result = analyzer.quick_classify("Request for quotation - spare parts, offre de prix", "")
+
+    assert result["matched_rules"] == [
+        "Subject contains 'prix'",
+        "Subject contains 'offre de prix'",
+        "Subject contains 'offre'",
+        "Subject contains 'quotation'",
+        "Subject contains 'request for quotation'",
+        "Subject contains 'spare parts'",
+        "Subject contains 'spare part'",
+    ]
+    assert result["score"] == 7 * 30
+    assert result["confidence"] == "high"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12 pcs", True), ("a12 pcs", False), ("3x vis", True), ("QTY: 4", True),
+    ("quantité: 9", True), ("5 eaches", False), ("aqty 5", False),
+])
+def test_quantity_patterns(analyzer, text, expected):
+    assert ("Contains quantity patterns" in analyzer.quick_classify("", text)["matched_rules"]) is expected
+
+
+def test_same_results_as_reference(analyzer):
+    for subject, body in _corpus(n=1000):
+        for preview in (body[:500], body):
+            result = analyzer.quick_classify(subject, preview)
+            assert (result["score"], result["matched_rules"]) == _reference_classify(subject, preview)
+
+
+@pytest.mark.performance
+@pytest.mark.skipif(not os.getenv("RUN_PERFORMANCE_TESTS"), reason="benchmark : RUN_PERFORMANCE_TESTS=1")
+def test_benchmark_real_sized_bodies(analyzer):
+    emails = _corpus()
+    assert sum(len(body) for _, body in emails) / len(emails) > 2000
+
+    def best_of(fn):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for subject, body in emails:
+                fn(subject, body)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    compiled = best_of(analyzer.quick_classify)
+    reference = best_of(_reference_classify)
+
+    assert compiled < reference * 0.8, f"compilé {compiled:.3f}s vs référence {reference:.3f}s"
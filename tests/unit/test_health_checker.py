@@ -0,0 +1,146 @@
+"""
+Tests unitaires — HealthChecker (sondes parallèles + rapport en cache)
+Couvre : sondes lancées simultanément, délai global (sondes bloquées annulées), rapport partagé
+entre appels sans nouvelle sonde, rafraîchissement périodique sans les sondes LLM
+"""
+
+import asyncio
+
+import pytest
+
+import services.health_checker as health_checker
+from services.health_checker import HealthChecker, get_health_report
+
+PROBE_NAMES = [
+    "environment_check", "database", "sap_connection", "claude_api",
+    "mistral_api", "sap_data_retrieval", "routes_availability",
+]
+
+
+class _Probes:
+    def __init__(self, delay=0.1, hang=()):
+        self.calls = 0
+        self.called = []
+        self.cancelled = []
+        self.in_flight = 0
+        self.peak = 0
+        self.delay = delay
+        self.hang = set(hang)
+
+    def install(self, monkeypatch):
+        for name in PROBE_NAMES:
+            monkeypatch.setattr(HealthChecker, self._method(name), self._probe(name))
+
+    @staticmethod
+    def _method(name):
+        return {"environment_check": "_test_environment"}.get(name, f"_test_{name}")
+
+    def _probe(self, name):
+        async def probe(checker):
+            self.calls += 1
+            self.called.append(name)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                await asyncio.sleep(60 if name in self.hang else self.delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(name)
+                raise
+            finally:
+                self.in_flight -= 1
+            return {"success": True, "message": "OK"}
+        return probe
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(monkeypatch):
+    monkeypatch.setattr(health_checker, "_cached_report", None)
+    monkeypatch.setattr(health_checker, "_refresh_task", None)
+    monkeypatch.setattr(health_checker, "_refresher_task", None)
+
+
+@pytest.mark.asyncio
+async def test_probes_run_concurrently(monkeypatch):
+    probes = _Probes(delay=0.05)
+    probes.install(monkeypatch)
+
+    report = await HealthChecker().run_full_health_check()
+
+    assert probes.peak == len(PROBE_NAMES)  # séquentiel : 1
+    assert list(report["detailed_results"]) == PROBE_NAMES
+    assert report["nova_system_status"] == "healthy"
+
+
+@pytest.mark.asyncio
+async def test_overall_deadline_bounds_slow_probes(monkeypatch):
+    probes = _Probes(hang={"sap_connection", "claude_api"})
+    probes.install(monkeypatch)
+    monkeypatch.setattr(health_checker, "HEALTH_CHECK_DEADLINE_S", 0.3)
+
+    report = await HealthChecker().run_full_health_check()
+
+    assert sorted(probes.cancelled) == ["claude_api", "sap_connection"]
+    assert report["summary"]["successful"] == 5
+    assert "Délai global" in report["detailed_results"]["sap_connection"]["message"]
+
+
+@pytest.mark.asyncio
+async def test_report_shared_between_callers(monkeypatch):
+    probes = _Probes(delay=0.05)
+    probes.install(monkeypatch)
+
+    reports = await asyncio.gather(*(get_health_report() for _ in range(10)))
+    await get_health_report()
+
+    assert probes.calls == len(PROBE_NAMES)
+    assert all(r is reports[0] for r in reports)
+
+
+@pytest.mark.asyncio
+async def test_cached_report_served_without_probing(monkeypatch):
+    probes = _Probes(delay=0.05)
+    probes.install(monkeypatch)
+    first = await get_health_report()
+
+    for _ in range(20):
+        assert (await get_health_report()) is first
+    assert health_checker.get_cached_health_report() is first
+    assert probes.calls == len(PROBE_NAMES)
+
+    assert (await get_health_report(force=True)) is not first
+    assert probes.calls == 2 * len(PROBE_NAMES)
+
+
+@pytest.mark.asyncio
+async def test_periodic_refresh_skips_llm_probes(monkeypatch):
+    probes = _Probes(delay=0.01)
+    probes.install(monkeypatch)
+    first = await get_health_report()
+
+    async def refreshed_once():
+        while health_checker.get_cached_health_report() is first:
+            await asyncio.sleep(0.01)
+
+    health_checker.start_health_refresher(interval_s=0.05)
+    await asyncio.wait_for(refreshed_once(), timeout=10)
+    await health_checker.stop_health_refresher()
+
+    refreshed = health_checker.get_cached_health_report()
+    assert refreshed is not first
+    assert probes.called.count("claude_api") == probes.called.count("mistral_api") == 1
+    assert probes.called.count("database") >= 2
+    assert list(refreshed["detailed_results"]) == PROBE_NAMES
+    assert refreshed["detailed_results"]["claude_api"] is first["detailed_results"]["claude_api"]
+
+
+@pytest.mark.asyncio
+async def test_refresher_enabled_by_default():
+    assert 0 < health_checker.HEALTH_REFRESH_INTERVAL_S <= 60
+    health_checker.start_health_refresher()
+    assert health_checker._refresher_task is not None
+    await health_checker.stop_health_refresher()
+
+
+def test_refresher_disabled_with_zero_interval():
+    health_checker.start_health_refresher(interval_s=0)
+    assert health_checker._refresher_task is None
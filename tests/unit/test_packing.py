@@ -1,6 +1,6 @@
 """
 Tests unitaires — Moteur de colisage (Packing)
-Couvre : BoxCatalog, FFD algorithm, PackingService
+Couvre : BoxCatalog, FFD algorithm, colisage 3D, PackingService
 """
 
 import pytest
@@ -14,6 +14,8 @@ from services.packing.packing_algorithm import (
     FirstFitDecreasingPacker,
     PackingItem,
 )
+from services.packing import packing_3d
+from services.packing.packing_3d import SpacePacker3D
 from services.packing.packing_service import PackingItemInput, PackingService
 
 
@@ -166,6 +168,66 @@ class TestFirstFitDecreasing:
         assert "REF-001" in result.packages[0].item_codes
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Colisage 3D
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestSpacePacker3D(TestFirstFitDecreasing):
+    """Mêmes garanties que le FFD, plus le placement géométrique."""
+
+    def setup_method(self):
+        self.packer = SpacePacker3D()
+
+    def test_denser_than_volume_ffd(self):
+        # 20×20×10 couchés sur la tranche : 3 tiennent dans un S (30×20×20)
+        items = [self._item("P", w=1.0, l=20.0, wi=20.0, h=10.0, qty=3)]
+        assert FirstFitDecreasingPacker().pack(items).box_count == 2
+        result = self.packer.pack(items)
+        assert result.box_count == 1
+        assert result.packages[0].fill_ratio == pytest.approx(1.0)
+
+    def test_long_item_needs_physical_fit(self):
+        # Volume faible mais 35 cm de long : ne rentre pas dans un S (30 cm)
+        result = self.packer.pack([self._item("TUBE", w=0.5, l=35.0, wi=5.0, h=5.0)])
+        assert result.packages[0].box_type == BoxType.M
+
+    def test_keep_upright_limits_orientations(self):
+        item = PackingItem(item_code="U", weight_kg=0.1, length_cm=10.0, width_cm=10.0,
+                           height_cm=25.0, quantity=1, keep_upright=True)
+        # Debout, 25 cm > 20 cm de hauteur du S : colis M
+        assert self.packer.pack([item]).packages[0].box_type == BoxType.M
+
+    def test_identical_lines_grouped(self):
+        items = [self._item("A", qty=2), self._item("A", qty=3)]
+        result = self.packer.pack(items)
+        assert sum(p.items_count for p in result.packages) == 5
+        assert result.packages[0].item_codes == ["A"]
+
+    def test_thousands_of_units_placed_by_blocks(self, monkeypatch):
+        placements = []
+        place_block = packing_3d._OpenBox.place_block
+
+        def counting_place_block(box, group):
+            placed = place_block(box, group)
+            placements.append(placed)
+            return placed
+
+        monkeypatch.setattr(packing_3d._OpenBox, "place_block", counting_place_block)
+        items = [
+            self._item("VIS", w=0.01, l=3.0, wi=1.0, h=1.0, qty=5000),
+            self._item("BOITIER", w=1.2, l=22.0, wi=14.0, h=9.0, qty=400),
+        ]
+        result = self.packer.pack(items)
+
+        # Placement par blocs : le nombre de poses suit le nombre de colis, pas d'unités
+        blocks = [placed for placed in placements if placed]
+        assert len(blocks) <= 2 * len(result.packages)
+        assert len(placements) < 5400 // 10
+        assert sum(p.items_count for p in result.packages) == 5400
+        assert result.total_weight_kg == pytest.approx(530.0)
+        assert all(p.weight_kg <= BOX_CATALOG[-1].max_weight_kg for p in result.packages)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # PackingService (sans DB)
 # ─────────────────────────────────────────────────────────────────────────────
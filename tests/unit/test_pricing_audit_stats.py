@@ -0,0 +1,98 @@
+"""
+Tests unitaires — Statistiques pricing (pricing_audit_db)
+Couvre : mise à jour incrémentale à l'enregistrement, identique au recalcul
+complet, recalcul après modification d'une décision, requête par plage indexée
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import services.pricing_audit_db as pricing_audit_db
+from services.pricing_models import PricingCaseType, PricingDecision
+
+TODAY = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=10)
+
+
+@pytest.fixture
+def audit_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(pricing_audit_db, "DB_PATH", tmp_path / "supplier_tariffs.db")
+    pricing_audit_db.init_pricing_audit_tables()
+
+
+def _decision(n, case_type, margin=None, requires_validation=False, created_at=TODAY):
+    return PricingDecision(
+        decision_id=f"D{n}",
+        item_code="A1",
+        card_code="C001",
+        quantity=1,
+        case_type=case_type,
+        case_description="test",
+        calculated_price=10.0,
+        justification="test",
+        margin_applied=margin,
+        requires_validation=requires_validation,
+        created_at=created_at,
+    )
+
+
+def _stats_rows():
+    conn = pricing_audit_db.get_connection()
+    rows = conn.execute(
+        "SELECT date, total_decisions, cas_1_count, cas_2_count, cas_3_count, cas_4_count, "
+        "requiring_validation, margin_sum, margin_count, avg_margin FROM pricing_statistics ORDER BY date"
+    ).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def _save_workload():
+    yesterday = TODAY - timedelta(days=1)
+    pricing_audit_db.save_pricing_decision(_decision(1, PricingCaseType.CAS_1_HC, 40.0))
+    pricing_audit_db.save_pricing_decision(_decision(2, PricingCaseType.CAS_3_HA, 30.0, requires_validation=True))
+    pricing_audit_db.save_pricing_decision(_decision(3, PricingCaseType.CAS_4_NP))
+    pricing_audit_db.save_pricing_decision(_decision(4, PricingCaseType.SAP_FUNCTION, 50.0))
+    pricing_audit_db.save_pricing_decision(_decision(5, PricingCaseType.CAS_2_HCM, 20.0, created_at=yesterday))
+
+
+def test_incremental_statistics(audit_db):
+    _save_workload()
+
+    today = pricing_audit_db.get_statistics(days_back=1)
+    assert len(today) == 1
+    assert today[0]["total_decisions"] == 4
+    assert (today[0]["cas_1_count"], today[0]["cas_3_count"], today[0]["cas_4_count"]) == (1, 1, 1)
+    assert today[0]["requiring_validation"] == 1
+    assert today[0]["avg_margin"] == pytest.approx(40.0)
+    assert len(pricing_audit_db.get_statistics(days_back=7)) == 2
+
+
+def test_incremental_matches_full_recompute(audit_db):
+    _save_workload()
+    incremental = _stats_rows()
+
+    pricing_audit_db.recompute_statistics()
+
+    assert _stats_rows() == incremental
+
+
+def test_update_decision_recomputes_its_day(audit_db):
+    _save_workload()
+
+    pricing_audit_db.update_pricing_decision("D1", {"case_type": "CAS_2_HCM", "margin_applied": 10.0})
+
+    today = pricing_audit_db.get_statistics(days_back=1)[0]
+    assert (today["cas_1_count"], today["cas_2_count"]) == (0, 1)
+    assert today["avg_margin"] == pytest.approx(30.0)
+
+
+def test_range_recompute_uses_created_at_index(audit_db):
+    conn = pricing_audit_db.get_connection()
+    plan = " ".join(
+        row["detail"] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM pricing_decisions WHERE created_at >= ? AND created_at < ?",
+            ("2026-01-01", "2026-01-02"),
+        )
+    )
+    conn.close()
+    assert "idx_pricing_created_at" in plan
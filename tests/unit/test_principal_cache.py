@@ -0,0 +1,109 @@
+"""
+Tests unitaires — Cache des utilisateurs authentifiés (get_current_user)
+Couvre : une seule lecture DB pour N requêtes, invalidation à la désactivation,
+nouveau token = nouvelle vérification, TTL et taille bornée
+"""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import auth.auth_db as auth_db
+import auth.dependencies as dependencies
+import auth.jwt_service as jwt_service
+from auth.dependencies import AuthenticatedUser, get_current_user
+from auth.jwt_service import create_access_token
+from auth.principal_cache import PrincipalCache, principal_cache
+
+
+@pytest.fixture
+def user(tmp_path, monkeypatch):
+    # SECRET_KEY est lu à l'import de jwt_service : la variable d'environnement ne suffit pas
+    monkeypatch.setattr(jwt_service, "SECRET_KEY", "test_secret_key_for_unit_tests_32chars!!")
+    monkeypatch.setattr(auth_db, "DB_PATH", tmp_path / "nova_auth_test.db")
+    auth_db._init_db()
+    principal_cache.clear()
+    sid = auth_db.create_society("Cache Corp", "CACHE_DB", "https://sap.test/b1s/v1", max_users=5)
+    uid = auth_db.create_user(sid, "cache_user", "Cache User", "ADV")
+    yield {"society_id": sid, "user_id": uid}
+    principal_cache.clear()
+
+
+@pytest.fixture
+def db_reads(monkeypatch):
+    calls = []
+    real = dependencies.get_user_by_id
+
+    def counting(user_id):
+        calls.append(user_id)
+        return real(user_id)
+
+    monkeypatch.setattr(dependencies, "get_user_by_id", counting)
+    return calls
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(u: AuthenticatedUser = Depends(get_current_user)):
+        return {"user_id": u.user_id, "role": u.role}
+
+    return TestClient(app)
+
+
+def _token(user):
+    return create_access_token(
+        user_id=user["user_id"],
+        sap_username="cache_user",
+        society_id=user["society_id"],
+        sap_company_db="CACHE_DB",
+        role="ADV",
+        mailbox_ids=[],
+    )
+
+
+def _get(client, token):
+    return client.get("/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_repeated_requests_hit_db_once(user, db_reads, client):
+    token = _token(user)
+    for _ in range(5):
+        assert _get(client, token).status_code == 200
+    assert db_reads == [user["user_id"]]
+
+
+def test_deactivation_takes_effect_immediately(user, db_reads, client):
+    token = _token(user)
+    assert _get(client, token).status_code == 200
+
+    auth_db.deactivate_user(user["user_id"])
+
+    assert _get(client, token).status_code == 401
+    assert len(db_reads) == 2
+
+
+def test_new_token_is_checked_again(user, db_reads, client):
+    assert _get(client, _token(user)).status_code == 200
+    assert _get(client, _token(user)).status_code == 200
+    assert len(db_reads) == 2
+
+
+def test_ttl_and_bound(monkeypatch):
+    import auth.principal_cache as module
+
+    clock = [100.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: clock[0])
+    cache = PrincipalCache(ttl_seconds=30, max_entries=2)
+    cache.put(1, "a", "p1")
+    cache.put(2, "b", "p2")
+    cache.put(3, "c", "p3")
+
+    assert len(cache) == 2
+    assert cache.get(1, "a") is None
+    assert cache.get(3, "c") == "p3"
+
+    clock[0] += 31
+    assert cache.get(3, "c") is None
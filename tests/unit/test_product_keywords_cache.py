@@ -0,0 +1,84 @@
+"""
+Tests unitaires — Extraction des mots-clés produits (cache + règles + LLM)
+Couvre : normalisation, confiance des règles, nombre d'appels LLM sur une
+charge répétée, persistance entre instances
+"""
+
+import pytest
+
+import services.product_keywords_cache as keywords_cache
+from services.local_product_search import LocalProductSearchService
+from services.product_keywords_cache import normalize_description, rule_based_keywords
+
+
+class _CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def extract_with_claude(self, prompt):
+        self.calls += 1
+        return {"category": "autre", "tech_keywords": "inox|m6", "brand_hint": "", "specs_hint": "m6"}
+
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(keywords_cache, "DB_PATH", tmp_path / "product_keywords.db")
+    keywords_cache.init_database()
+
+
+def _service():
+    service = LocalProductSearchService.__new__(LocalProductSearchService)
+    service.llm_extractor = _CountingLLM()
+    return service
+
+
+def test_normalization_merges_near_identical_descriptions():
+    assert normalize_description("Imprimante LASER  HP, écran") == normalize_description("hp imprimante laser ecran")
+    assert normalize_description("Vis de fixation M6") == normalize_description("vis fixation m6")
+    assert normalize_description("Vis M6") != normalize_description("Vis M8")
+
+
+def test_rule_based_confidence():
+    keywords, confidence = rule_based_keywords("Imprimante laser HP 40 ppm")
+    assert keywords == {
+        "category": "imprimante",
+        "tech_keywords": "laser",
+        "brand_hint": "hp",
+        "specs_hint": "40 ppm",
+    }
+    assert confidence == pytest.approx(1.0)
+
+    _, low = rule_based_keywords("Vis tête fraisée inox M6")
+    assert low < keywords_cache.RULES_MIN_CONFIDENCE
+
+
+@pytest.mark.asyncio
+async def test_llm_called_once_per_unknown_description(cache_db):
+    service = _service()
+    workload = [
+        "Vis tête fraisée inox M6",
+        "vis tete fraisee INOX m6",
+        "Imprimante laser HP 40 ppm",
+        "Écran Dell 27 pouces",
+        "Rondelle plate inox M6",
+    ] * 20
+
+    for description in workload:
+        await service._extract_search_keywords(description)
+
+    # Seules les 2 descriptions (normalisées) hors règles ont coûté un appel
+    assert service.llm_extractor.calls == 2
+    stats = keywords_cache.get_cache_stats()
+    assert (stats["llm_entries"], stats["rules_entries"]) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_cache_shared_between_instances(cache_db):
+    first = _service()
+    await first._extract_search_keywords("Vis tête fraisée inox M6")
+
+    other = _service()
+    keywords = await other._extract_search_keywords("VIS tete fraisee inox M6")
+
+    assert other.llm_extractor.calls == 0
+    assert keywords["tech_keywords"] == "inox|m6"
@@ -0,0 +1,84 @@
+"""
+Tests unitaires — ProductMappingDB (index mémoire + compteurs différés)
+Couvre : lectures sans accès SQLite, index tenu à jour par save/validate/delete,
+écriture groupée des compteurs d'utilisation
+"""
+
+import sqlite3
+
+import pytest
+
+import services.product_mapping_db as product_mapping_db
+from services.product_mapping_db import ProductMappingDB
+
+
+@pytest.fixture
+def mapping_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(product_mapping_db, "USAGE_FLUSH_INTERVAL_S", 3600)
+    db = ProductMappingDB(db_path=str(tmp_path / "mapping.db"))
+    db.save_mapping("HST-117", "PUSHER BLADE", "C0249", "A0001", "EXACT", 100, status="VALIDATED")
+    db.save_mapping("REF-9", "JOINT", "GLOBAL", "A0009", "EXACT", 100, status="VALIDATED")
+    db.save_mapping("NEW-1", "INCONNU", "C0249")
+    return db
+
+
+def _use_count(db, code, supplier):
+    conn = sqlite3.connect(db.db_path)
+    row = conn.execute(
+        "SELECT use_count FROM product_code_mapping WHERE external_code = ? AND supplier_card_code = ?",
+        (code, supplier),
+    ).fetchone()
+    conn.close()
+    return row[0]
+
+
+def test_lookups_served_from_memory(mapping_db, monkeypatch):
+    mapping_db.get_mapping("HST-117", "C0249")  # chargement de l'index
+
+    def no_sqlite(*args, **kwargs):
+        raise AssertionError("SQLite ne doit pas être ouvert pour une lecture")
+
+    monkeypatch.setattr(product_mapping_db.sqlite3, "connect", no_sqlite)
+    for _ in range(50):
+        assert mapping_db.get_mapping("HST-117", "C0249")["matched_item_code"] == "A0001"
+        assert mapping_db.get_mapping("REF-9", "C0249")["matched_item_code"] == "A0009"
+        assert mapping_db.get_mapping("NEW-1", "C0249") is None
+
+
+def test_usage_counts_flushed_in_batches(mapping_db, monkeypatch):
+    monkeypatch.setattr(product_mapping_db, "USAGE_FLUSH_THRESHOLD", 40)
+
+    for _ in range(30):
+        mapping_db.get_mapping("HST-117", "C0249")
+    assert _use_count(mapping_db, "HST-117", "C0249") == 1
+
+    for _ in range(10):
+        mapping_db.get_mapping("REF-9", None)
+    assert _use_count(mapping_db, "HST-117", "C0249") == 31
+    assert _use_count(mapping_db, "REF-9", "GLOBAL") == 11
+
+    mapping_db.get_mapping("HST-117", "C0249")
+    assert mapping_db.flush_usage() == 1
+    assert _use_count(mapping_db, "HST-117", "C0249") == 32
+
+
+def test_index_follows_writes(mapping_db):
+    assert mapping_db.get_mapping("NEW-1", "C0249") is None
+
+    mapping_db.validate_mapping("NEW-1", "C0249", "A0042")
+    assert mapping_db.get_mapping("NEW-1", "C0249")["matched_item_code"] == "A0042"
+
+    mapping_db.save_mapping("HST-117", "PUSHER BLADE", "C0249", "A0002", "MANUAL", 100, status="VALIDATED")
+    assert mapping_db.get_mapping("HST-117", "C0249")["matched_item_code"] == "A0002"
+
+    assert mapping_db.delete_mapping("HST-117", "C0249") is True
+    assert mapping_db.get_mapping("HST-117", "C0249") is None
+
+
+def test_pending_counts_kept_when_mapping_is_saved_again(mapping_db):
+    for _ in range(5):
+        mapping_db.get_mapping("HST-117", "C0249")
+
+    mapping_db.save_mapping("HST-117", "PUSHER BLADE", "C0249", "A0001", "EXACT", 100, status="VALIDATED")
+
+    assert _use_count(mapping_db, "HST-117", "C0249") == 6
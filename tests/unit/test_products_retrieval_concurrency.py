@@ -0,0 +1,87 @@
+"""
+Tests unitaires — Résolution concurrente des lignes produits (devis_workflow)
+Couvre : ordre des lignes conservé, concurrence bornée, progression ordonnée,
+isolation des erreurs par ligne
+"""
+
+import asyncio
+
+import pytest
+
+from workflow.devis_workflow import EnhancedDevisWorkflow
+
+
+def _workflow(delays, limit=3):
+    wf = EnhancedDevisWorkflow.__new__(EnhancedDevisWorkflow)
+    wf.context = {}
+    wf.task_id = None
+    wf.product_lookup_concurrency = limit
+    wf.progress = []
+    wf.in_flight = 0
+    wf.max_in_flight = 0
+
+    async def smart_search(product_name, product_code=""):
+        wf.in_flight += 1
+        wf.max_in_flight = max(wf.max_in_flight, wf.in_flight)
+        await asyncio.sleep(delays[product_code])
+        wf.in_flight -= 1
+        return {
+            "found": True,
+            "method": "stub",
+            "products": [{"ItemCode": product_code, "ItemName": product_name, "Price": 10.0}],
+        }
+
+    wf._smart_product_search = smart_search
+    wf._track_step_progress = lambda step_id, progress, message="": wf.progress.append(progress)
+    return wf
+
+
+def _lines(count):
+    return [{"code": f"P{i}", "name": f"Article modèle {i}", "quantity": i + 1} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_order_preserved_with_bounded_concurrency():
+    # Les premières lignes sont les plus lentes : elles terminent en dernier
+    delays = {f"P{i}": 0.05 - i * 0.005 for i in range(8)}
+    wf = _workflow(delays, limit=3)
+
+    result = await wf._process_products_retrieval(_lines(8))
+
+    assert result["status"] == "success"
+    assert [p["code"] for p in result["products"]] == [f"P{i}" for i in range(8)]
+    assert [p["quantity"] for p in result["products"]] == list(range(1, 9))
+    assert wf.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_progress_emitted_in_line_order():
+    delays = {f"P{i}": 0.03 if i == 0 else 0.0 for i in range(5)}
+    wf = _workflow(delays, limit=5)
+
+    await wf._process_products_retrieval(_lines(5))
+
+    line_progress = wf.progress[1:-1]
+    assert line_progress == sorted(line_progress)
+    assert len(line_progress) == 5
+    assert (wf.progress[0], wf.progress[-1]) == (10, 100)
+
+
+@pytest.mark.asyncio
+async def test_failing_line_is_isolated():
+    wf = _workflow({f"P{i}": 0.0 for i in range(3)})
+    original_format = EnhancedDevisWorkflow._format_product_data
+
+    def format_product(sap_product, quantity):
+        if sap_product["ItemCode"] == "P1":
+            raise RuntimeError("SAP indisponible")
+        return original_format(wf, sap_product, quantity)
+
+    wf._format_product_data = format_product
+
+    result = await wf._process_products_retrieval(_lines(3))
+
+    assert result["status"] == "product_selection_required"
+    failed = [p for p in result["products"] if p.get("error")]
+    assert [p["code"] for p in failed] == ["P1"]
+    assert "SAP indisponible" in failed[0]["error"]
@@ -0,0 +1,111 @@
+"""
+Tests unitaires — Accès partagé produits_sap
+Couvre : moteur unique par processus, repli LIKE classé sans pg_trgm,
+produits sans stock inclus sur demande, DATABASE_URL absente
+"""
+
+import pytest
+from sqlalchemy import text
+
+import services.produits_sap_search as produits_sap_search
+from services.produits_sap_search import (
+    dispose_engines,
+    get_produits_sap_engine,
+    get_produits_sap_sessionmaker,
+    search_similar_products,
+)
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'produits.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    dispose_engines()
+    with get_produits_sap_engine().begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE produits_sap (
+                item_code TEXT PRIMARY KEY, item_name TEXT, u_description TEXT,
+                avg_price REAL, on_hand INTEGER, items_group_code TEXT,
+                manufacturer TEXT, sales_unit TEXT, valid BOOLEAN
+            )
+        """))
+        conn.execute(
+            text("INSERT INTO produits_sap VALUES (:c, :n, :d, 10, :s, '100', 'HP', 'UN', :v)"),
+            [
+                {"c": "A1", "n": "Imprimante laser HP couleur", "d": "", "s": 3, "v": True},
+                {"c": "A2", "n": "Imprimante jet d'encre", "d": "", "s": 50, "v": True},
+                {"c": "A3", "n": "Toner laser noir", "d": "pour imprimante", "s": 8, "v": True},
+                {"c": "A4", "n": "Imprimante laser obsolète", "d": "", "s": 9, "v": False},
+                {"c": "A5", "n": "Imprimante laser rupture", "d": "", "s": 0, "v": True},
+            ],
+        )
+    yield url
+    dispose_engines()
+
+
+def test_engine_is_shared(db_url, monkeypatch):
+    calls = []
+    real = produits_sap_search.sqlalchemy.create_engine
+    monkeypatch.setattr(
+        produits_sap_search.sqlalchemy, "create_engine",
+        lambda *a, **k: calls.append(a) or real(*a, **k),
+    )
+    dispose_engines()
+
+    engines = {id(get_produits_sap_engine()) for _ in range(5)}
+
+    assert len(engines) == 1
+    assert len(calls) == 1
+    assert get_produits_sap_sessionmaker() is get_produits_sap_sessionmaker()
+
+
+def test_like_fallback_ranks_candidates(db_url):
+    results = search_similar_products("imprimante laser")
+
+    codes = [p["ItemCode"] for p in results]
+    # Produits invalides / sans stock exclus ; tous les termes trouvés en tête
+    assert codes == ["A3", "A1", "A2"]
+    assert results[0]["similarity_score"] == pytest.approx(1.0)
+    assert results[2]["similarity_score"] == pytest.approx(0.5)
+    assert results[0]["source"] == "local_db"
+
+
+def test_out_of_stock_included_on_request(db_url):
+    codes = [p["ItemCode"] for p in search_similar_products("imprimante laser", in_stock_only=False)]
+
+    assert "A5" in codes
+    assert "A4" not in codes
+
+
+def test_trigram_query_stock_filter(db_url, monkeypatch):
+    engine = get_produits_sap_engine()
+    monkeypatch.setitem(produits_sap_search._trgm_available, str(engine.url), True)
+    executed = []
+
+    class FakeSession:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def get_bind(self):
+            return engine
+
+        def execute(self, statement, params=None):
+            executed.append(str(statement))
+            return type("Result", (), {"fetchall": lambda self: []})()
+
+    monkeypatch.setattr(produits_sap_search, "get_produits_sap_sessionmaker", lambda db_url=None: FakeSession)
+
+    search_similar_products("imprimante")
+    search_similar_products("imprimante", in_stock_only=False)
+
+    assert "on_hand > 0" in executed[1]
+    assert "on_hand > 0" not in executed[3]
+
+
+def test_missing_database_url(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    assert get_produits_sap_engine() is None
+    assert search_similar_products("imprimante") == []
@@ -0,0 +1,88 @@
+"""
+Tests unitaires — Historique persistant du ProgressTracker
+Couvre : SQLiteTaskStore, éviction TTL du cache mémoire, statistiques indexées
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.progress_task_store import MemoryTaskStore, SQLiteTaskStore
+from services.progress_tracker import ProgressTracker
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    return SQLiteTaskStore(str(tmp_path / "progress_tasks.db"))
+
+
+def _task(task_id: str, status: str = "completed", end_time: str = None) -> dict:
+    return {
+        "task_id": task_id,
+        "status": status,
+        "start_time": "2026-01-01T10:00:00",
+        "end_time": end_time or datetime.now().isoformat(),
+        "duration": 1.5,
+        "result": {"doc_num": 42, "lines": ["A00001"]},
+    }
+
+
+class TestSQLiteTaskStore:
+    def test_roundtrip(self, sqlite_store):
+        sqlite_store.save(_task("t1"))
+        assert sqlite_store.get("t1")["result"] == {"doc_num": 42, "lines": ["A00001"]}
+        assert sqlite_store.get("absent") is None
+
+    def test_list_recent_is_bounded_and_chronological(self, sqlite_store):
+        for i in range(10):
+            sqlite_store.save(_task(f"t{i}", end_time=f"2026-01-01T10:00:{i:02d}"))
+        assert [t["task_id"] for t in sqlite_store.list_recent(3)] == ["t7", "t8", "t9"]
+
+    def test_count_by_status(self, sqlite_store):
+        sqlite_store.save(_task("ok1"))
+        sqlite_store.save(_task("ok2"))
+        sqlite_store.save(_task("ko", status="failed"))
+        assert sqlite_store.count_by_status() == {"completed": 2, "failed": 1}
+
+    def test_purge(self, sqlite_store):
+        sqlite_store.save(_task("old", end_time=(datetime.now() - timedelta(days=200)).isoformat()))
+        sqlite_store.save(_task("new"))
+        assert sqlite_store.purge_older_than(datetime.now() - timedelta(days=90)) == 1
+        assert sqlite_store.get("old") is None
+
+    def test_visible_from_another_instance(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        SQLiteTaskStore(path).save(_task("shared"))
+        assert SQLiteTaskStore(path).get("shared") is not None
+
+
+class TestProgressTrackerEviction:
+    def test_completed_task_written_through(self, sqlite_store):
+        tracker = ProgressTracker(store=sqlite_store)
+        task = tracker.create_task(user_prompt="devis")
+        tracker.complete_task(task.task_id, {"ok": True})
+
+        assert sqlite_store.get(task.task_id)["result"] == {"ok": True}
+        assert tracker.get_task_statistics()["successful_tasks"] == 1
+
+    def test_ttl_eviction_keeps_history_readable(self):
+        tracker = ProgressTracker(store=MemoryTaskStore())
+        tracker.completed_ttl_seconds = 0
+        task = tracker.create_task()
+        tracker.complete_task(task.task_id, {"ok": True})
+        assert len(tracker.completed_tasks) == 1
+
+        tracker.evict_expired()
+
+        assert tracker.completed_tasks == []
+        assert tracker.get_task_from_history(task.task_id)["task_id"] == task.task_id
+        assert [t["task_id"] for t in tracker.get_task_history()] == [task.task_id]
+
+    def test_abandoned_active_task_archived(self):
+        tracker = ProgressTracker(store=MemoryTaskStore())
+        task = tracker.create_task()
+        task.start_time = datetime.now() - timedelta(hours=48)
+
+        assert tracker.cleanup_old_tasks(24) == 1
+        assert task.task_id not in tracker.active_tasks
+        assert tracker.get_task_statistics()["failed_tasks"] == 1
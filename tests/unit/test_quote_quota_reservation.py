@@ -0,0 +1,165 @@
+"""
+Tests unitaires — QuoteQuotaService (réservation du quota par blocs)
+Exécutés sur une base SQLite fichier partagée par plusieurs workers.
+Couvre : check_quota servi sans accès base, jamais plus de max_quota devis
+sous contention (workers × threads), restitution des unités non consommées,
+expiration des réservations d'un worker arrêté, création SAP lente (unité
+jamais recyclée sur délai), unité rendue après une création en échec
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import services.quote_quota_service as quote_quota_service
+from models.database_models import Base, QuoteQuotaReservation, QuoteUsageCounter
+from services.quote_quota_service import QuotaDevisDepasse, QuoteQuotaService
+
+PERIOD = "2026-06"
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'quota.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _worker(session_factory):
+    return QuoteQuotaService(session_factory=session_factory, default_society="RONDOT", default_max_quota=50)
+
+
+def _count(session_factory):
+    with session_factory() as s:
+        return s.query(QuoteUsageCounter).filter_by(society_id="RONDOT", period=PERIOD).one().count
+
+
+def _reserved(session_factory):
+    with session_factory() as s:
+        return sum(r.slots for r in s.query(QuoteQuotaReservation).all())
+
+
+def test_block_reserved_then_served_locally(session_factory, monkeypatch):
+    monkeypatch.setattr(quote_quota_service, "QUOTA_RESERVATION_BLOCK", 5)
+    quota = _worker(session_factory)
+    calls = []
+    factory = quota._session_factory
+    quota._session_factory = lambda: calls.append(1) or factory()
+
+    for _ in range(5):
+        quota.check_quota(period=PERIOD)
+        quota.increment(period=PERIOD)
+
+    # 1 réservation + 5 réconciliations : aucun check_quota n'a touché la base ensuite
+    assert len(calls) == 6
+    assert _count(session_factory) == 5
+    assert _reserved(session_factory) == 0
+
+
+def test_concurrent_workers_never_exceed_quota(session_factory, monkeypatch):
+    monkeypatch.setattr(quote_quota_service, "QUOTA_RESERVATION_BLOCK", 4)
+    workers = [_worker(session_factory) for _ in range(4)]
+    created, errors = [], []
+
+    def create_quotes(quota):
+        for _ in range(25):
+            try:
+                quota.check_quota(period=PERIOD)
+            except QuotaDevisDepasse:
+                continue
+            except Exception as e:  # pragma: no cover - diagnostic
+                errors.append(e)
+                continue
+            created.append(quota.increment(period=PERIOD))
+
+    threads = [threading.Thread(target=create_quotes, args=(w,)) for w in workers for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(created) <= 50
+    assert sorted(created) == list(range(1, len(created) + 1))
+    assert _count(session_factory) == len(created)
+
+    # Unités non consommées rendues : un worker restant complète exactement le quota
+    for w in workers:
+        w.release_reservations()
+    assert _reserved(session_factory) == 0
+    last = _worker(session_factory)
+    while True:
+        try:
+            last.check_quota(period=PERIOD)
+        except QuotaDevisDepasse as e:
+            assert e.count == 50
+            break
+        last.increment(period=PERIOD)
+    assert _count(session_factory) == 50
+
+
+def test_reservations_block_other_workers_until_released(session_factory, monkeypatch):
+    monkeypatch.setattr(quote_quota_service, "QUOTA_RESERVATION_BLOCK", 10)
+    small = QuoteQuotaService(session_factory=session_factory, default_society="RONDOT", default_max_quota=4)
+    other = QuoteQuotaService(session_factory=session_factory, default_society="RONDOT", default_max_quota=4)
+
+    small.check_quota(period=PERIOD)  # Fin de quota : seule la moitié du reste est réservée
+    other.check_quota(period=PERIOD)
+    assert _reserved(session_factory) == 3
+
+    assert small.release_reservations() == 2
+    other.increment(period=PERIOD)
+    other.check_quota(period=PERIOD)
+    other.check_quota(period=PERIOD)
+    other.check_quota(period=PERIOD)
+    with pytest.raises(QuotaDevisDepasse):
+        other.check_quota(period=PERIOD)
+
+
+def test_expired_reservation_is_reclaimed(session_factory):
+    crashed = _worker(session_factory)
+    crashed.check_quota(period=PERIOD)
+    with session_factory() as s:
+        s.query(QuoteQuotaReservation).update({"expires_at": datetime.now() - timedelta(seconds=1)})
+        s.commit()
+
+    survivor = _worker(session_factory)
+    for _ in range(50):
+        survivor.check_quota(period=PERIOD)
+        survivor.increment(period=PERIOD)
+    assert _count(session_factory) == 50
+
+
+def test_slow_creation_never_over_issues(session_factory, monkeypatch):
+    quota = QuoteQuotaService(session_factory=session_factory, default_society="RONDOT", default_max_quota=1)
+    quota.check_quota(period=PERIOD)
+
+    # Création SAP plus longue que QUOTA_HOLD_TIMEOUT_S (réservation en base toujours valide)
+    clock = quote_quota_service.time.monotonic() + quote_quota_service.QUOTA_HOLD_TIMEOUT_S * 4
+    monkeypatch.setattr(quote_quota_service.time, "monotonic", lambda: clock)
+    with pytest.raises(QuotaDevisDepasse):
+        quota.check_quota(period=PERIOD)
+
+    assert quota.increment(period=PERIOD) == 1
+    with pytest.raises(QuotaDevisDepasse):
+        quota.check_quota(period=PERIOD)
+    assert _count(session_factory) == 1
+
+
+def test_failed_creation_releases_unit(session_factory):
+    quota = QuoteQuotaService(session_factory=session_factory, default_society="RONDOT", default_max_quota=1)
+    quota.check_quota(period=PERIOD)
+    assert quota.release(period=PERIOD) is True
+    assert quota.release(period=PERIOD) is False  # rien de plus à rendre
+
+    quota.check_quota(period=PERIOD)
+    assert quota.increment(period=PERIOD) == 1
+    with pytest.raises(QuotaDevisDepasse):
+        quota.check_quota(period=PERIOD)
@@ -0,0 +1,175 @@
+"""
+Tests unitaires — Cache des verdicts de risque client
+Couvre : un seul appel Pappers pour des vérifications répétées ou simultanées,
+clé partagée nom/SIREN, rafraîchissement avant expiration, UNKNOWN non mis en cache,
+balayage : une revérification par entreprise, attente après échec, purge des
+verdicts trop anciens, verdicts non consultés ignorés
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+# Même clé factice que tests/test_risk_check.py (lue à l'import du service)
+os.environ.setdefault("PAPPERS_API_KEY", "test_key")
+
+import services.risk_verdict_cache as risk_cache
+from services.risk_verdict_cache import get_company_risk_cached, normalize_company_name
+
+
+class _FakePappers:
+    def __init__(self, status="OK"):
+        self.calls = 0
+        self.status = status
+        self.sirens = {}
+
+    async def __call__(self, company_name=None, siren=None):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return {
+            "status": self.status,
+            "reason": f"appel {self.calls}",
+            "source": "pappers",
+            "raw": {"siren": self.sirens.get(company_name, "123456789"), "nom_entreprise": "ACME"}
+            if self.status != "UNKNOWN" else {},
+        }
+
+
+@pytest.fixture
+def pappers(tmp_path, monkeypatch):
+    monkeypatch.setattr(risk_cache, "DB_PATH", tmp_path / "risk_verdicts.db")
+    risk_cache.init_database()
+    fake = _FakePappers()
+    monkeypatch.setattr(risk_cache, "get_company_risk", fake)
+    return fake
+
+
+def test_name_normalization():
+    assert normalize_company_name("ACME S.A.S.") == normalize_company_name("Acme SAS")
+    assert normalize_company_name("Société Générale d'Électricité") == "generale d electricite"
+    assert normalize_company_name("SARL") is None
+
+
+@pytest.mark.asyncio
+async def test_repeated_checks_hit_pappers_once(pappers):
+    first = await get_company_risk_cached(company_name="ACME SAS")
+    for _ in range(10):
+        again = await get_company_risk_cached(company_name="Acme S.A.S.")
+
+    assert pappers.calls == 1
+    assert "cached" not in first
+    assert again["cached"] is True and again["status"] == "OK"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_checks_share_one_call(pappers):
+    results = await asyncio.gather(*(get_company_risk_cached(company_name="ACME SAS") for _ in range(20)))
+
+    assert pappers.calls == 1
+    assert {r["status"] for r in results} == {"OK"}
+
+
+@pytest.mark.asyncio
+async def test_verdict_by_name_reused_for_siren(pappers):
+    await get_company_risk_cached(company_name="ACME SAS")
+    result = await get_company_risk_cached(siren="123 456 789")
+
+    assert pappers.calls == 1
+    assert result["cached"] is True
+
+
+@pytest.mark.asyncio
+async def test_near_expiry_refreshed_in_background(pappers, monkeypatch):
+    await get_company_risk_cached(company_name="ACME SAS")
+    conn = risk_cache.get_connection()
+    conn.execute("UPDATE risk_verdicts SET expires_at = ?", (time.time() + 60,))
+    conn.commit()
+    conn.close()
+
+    served = await get_company_risk_cached(company_name="ACME SAS")
+    assert served["cached"] is True and served["reason"] == "appel 1"
+
+    await asyncio.gather(*risk_cache._inflight.values())
+    assert pappers.calls == 2
+    refreshed = await get_company_risk_cached(company_name="ACME SAS")
+    assert refreshed["reason"] == "appel 2"
+    assert await risk_cache.refresh_expiring_verdicts() == 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_not_cached_and_expired_verdict_served(pappers):
+    pappers.status = "UNKNOWN"
+    await get_company_risk_cached(company_name="ACME SAS")
+    await get_company_risk_cached(company_name="ACME SAS")
+    assert pappers.calls == 2
+
+    pappers.status = "WARNING"
+    await get_company_risk_cached(company_name="ACME SAS")
+    conn = risk_cache.get_connection()
+    conn.execute("UPDATE risk_verdicts SET expires_at = ?", (time.time() - 1,))
+    conn.commit()
+    conn.close()
+
+    pappers.status = "UNKNOWN"
+    result = await get_company_risk_cached(company_name="ACME SAS")
+    assert result["status"] == "WARNING"
+    assert result["stale"] is True
+
+
+def _set_all(sql, *params):
+    conn = risk_cache.get_connection()
+    conn.execute(f"UPDATE risk_verdicts SET {sql}", params)
+    conn.commit()
+    conn.close()
+
+
+def _row_count():
+    conn = risk_cache.get_connection()
+    count = conn.execute("SELECT COUNT(*) FROM risk_verdicts").fetchone()[0]
+    conn.close()
+    return count
+
+
+@pytest.mark.asyncio
+async def test_sweep_checks_each_company_once(pappers):
+    pappers.sirens = {"ACME SAS": "111111111", "BETA SARL": "222222222"}
+    await get_company_risk_cached(company_name="ACME SAS")
+    await get_company_risk_cached(company_name="BETA SARL")
+    assert _row_count() == 4  # clés nom + SIREN
+    _set_all("expires_at = ?", time.time() + 60)
+
+    assert await risk_cache.refresh_expiring_verdicts() == 2
+    assert pappers.calls == 4
+    assert await risk_cache.refresh_expiring_verdicts() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_backs_off_then_purged(pappers):
+    await get_company_risk_cached(company_name="ACME SAS")
+    _set_all("expires_at = ?", time.time() + 60)
+
+    pappers.status = "UNKNOWN"
+    assert await risk_cache.refresh_expiring_verdicts() == 1
+    assert await risk_cache.refresh_expiring_verdicts() == 0
+    assert pappers.calls == 2
+
+    _set_all("expires_at = ?", time.time() - risk_cache.RISK_CACHE_STALE_GRACE_HOURS * 3600 - 1)
+    assert await risk_cache.refresh_expiring_verdicts() == 0
+    assert _row_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_skips_verdicts_not_consulted_recently(pappers):
+    await get_company_risk_cached(company_name="ACME SAS")
+    _set_all("expires_at = ?, last_accessed = ?",
+             time.time() + 60, time.time() - risk_cache.RISK_CACHE_ACTIVE_HOURS * 3600 - 1)
+
+    assert await risk_cache.refresh_expiring_verdicts() == 0
+    assert pappers.calls == 1
+
+    # Nouvelle consultation : de nouveau éligible
+    await get_company_risk_cached(company_name="ACME SAS")
+    await asyncio.gather(*risk_cache._inflight.values())
+    assert pappers.calls == 2
@@ -0,0 +1,112 @@
+"""
+Tests unitaires — Création groupée Salesforce (sObject Collections)
+Exécutés contre un faux endpoint Salesforce local (HTTP) qui compte les requêtes.
+Couvre : lots de 200, tout ou rien avec annulation des lots déjà créés
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from simple_salesforce import Salesforce
+
+from services.salesforce_bulk import create_records_bulk
+
+
+class _FakeSalesforce(BaseHTTPRequestHandler):
+    """Sous-ensemble de composite/sobjects : refuse toute ligne de quantité <= 0 (allOrNone)."""
+
+    store = {}
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(("POST", len(payload["records"])))
+        records = payload["records"]
+        if any(r.get("Quantity", 1) <= 0 for r in records):
+            self._reply([
+                {"success": False, "errors": [
+                    {"statusCode": "FIELD_INTEGRITY_EXCEPTION", "message": "Quantity must be positive"}
+                    if r.get("Quantity", 1) <= 0 else
+                    {"statusCode": "ALL_OR_NONE_OPERATION_ROLLED_BACK", "message": "Rolled back"}
+                ]}
+                for r in records
+            ])
+            return
+        results = []
+        for record in records:
+            record_id = f"00k{len(self.store):012d}"
+            self.store[record_id] = record
+            results.append({"id": record_id, "success": True, "errors": []})
+        self._reply(results)
+
+    def do_DELETE(self):
+        ids = parse_qs(urlparse(self.path).query)["ids"][0].split(",")
+        self.requests.append(("DELETE", len(ids)))
+        self._reply([{"id": i, "success": self.store.pop(i, None) is not None, "errors": []} for i in ids])
+
+
+@pytest.fixture
+def sf():
+    _FakeSalesforce.store = {}
+    _FakeSalesforce.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeSalesforce)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = Salesforce(session_id="test", instance_url="https://127.0.0.1", version="55.0")
+    client.base_url = f"http://127.0.0.1:{server.server_address[1]}/services/data/v55.0/"
+    yield client
+    server.shutdown()
+    server.server_close()
+
+
+def _lines(count, bad_index=None):
+    return [
+        {"OpportunityId": "006A", "PricebookEntryId": "01uA", "UnitPrice": 10.0,
+         "Quantity": 0 if i == bad_index else i + 1}
+        for i in range(count)
+    ]
+
+
+def test_lines_sent_in_chunks(sf):
+    result = create_records_bulk(sf, "OpportunityLineItem", _lines(450))
+
+    assert result["success"] is True
+    assert len(result["ids"]) == 450
+    assert _FakeSalesforce.requests == [("POST", 200), ("POST", 200), ("POST", 50)]
+    assert len(_FakeSalesforce.store) == 450
+
+
+def test_single_request_for_typical_quote(sf):
+    result = create_records_bulk(sf, "OpportunityLineItem", _lines(30))
+
+    assert result["success"] is True
+    assert result["requests"] == 1
+    assert _FakeSalesforce.requests == [("POST", 30)]
+
+
+def test_failure_rolls_back_previous_chunks(sf):
+    result = create_records_bulk(sf, "OpportunityLineItem", _lines(450, bad_index=420))
+
+    assert result["success"] is False
+    assert result["errors"] == [
+        {"index": 420, "statusCode": "FIELD_INTEGRITY_EXCEPTION", "message": "Quantity must be positive"}
+    ]
+    assert result["rolled_back"] == 400
+    assert _FakeSalesforce.store == {}
+    assert _FakeSalesforce.requests == [
+        ("POST", 200), ("POST", 200), ("POST", 50), ("DELETE", 200), ("DELETE", 200),
+    ]
@@ -0,0 +1,157 @@
+"""
+Tests unitaires — Pool de sessions SAP Service Layer
+Exécutés contre un faux Service Layer local (HTTP) qui compte logins et requêtes.
+Couvre : requêtes concurrentes réparties sur les sessions, une seule reconnexion
+par session après expiration, erreur switch company (305), statistiques
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.sap_business_service import SAPBusinessService
+from services.sap_session_pool import SAPSessionPool
+
+
+class _FakeServiceLayer(BaseHTTPRequestHandler):
+    """Sous-ensemble du Service Layer : /Login, /Logout, GET /Items (lent)."""
+
+    lock = threading.Lock()
+    sessions = set()
+    logins = 0
+    active = {}
+    max_active = 0
+    overlap_on_session = False
+    switch_company_once = set()
+
+    @classmethod
+    def reset(cls):
+        cls.sessions, cls.logins, cls.active = set(), 0, {}
+        cls.max_active, cls.overlap_on_session, cls.switch_company_once = 0, False, set()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, status=200, cookies=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for cookie in cookies:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _session(self):
+        cookies = dict(c.strip().split("=", 1) for c in (self.headers.get("Cookie") or "").split(";") if "=" in c)
+        return cookies.get("B1SESSION"), cookies.get("ROUTEID")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        cls = type(self)
+        if self.path.endswith("/Login"):
+            with cls.lock:
+                cls.logins += 1
+                session_id = f"S{cls.logins}"
+                cls.sessions.add(session_id)
+            self._reply({"SessionId": session_id}, cookies=[f"B1SESSION={session_id}; Path=/", "ROUTEID=.node1; Path=/"])
+        else:
+            with cls.lock:
+                cls.sessions.discard(self._session()[0])
+            self._reply({})
+
+    def do_GET(self):
+        cls = type(self)
+        session_id, route_id = self._session()
+        if session_id not in cls.sessions or route_id != ".node1":
+            self._reply({"error": {"code": 301, "message": "Invalid session"}}, status=401)
+            return
+        if session_id in cls.switch_company_once:
+            cls.switch_company_once.discard(session_id)
+            self._reply({"error": {"code": 305, "message": "Switch company error"}}, status=500)
+            return
+        with cls.lock:
+            if cls.active.get(session_id):
+                cls.overlap_on_session = True
+            cls.active[session_id] = cls.active.get(session_id, 0) + 1
+            cls.max_active = max(cls.max_active, sum(cls.active.values()))
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active[session_id] -= 1
+        self._reply({"value": [{"ItemCode": "A1", "Session": session_id}]})
+
+
+@pytest.fixture
+def service_layer():
+    _FakeServiceLayer.reset()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeServiceLayer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/b1s/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def _service(base_url, size):
+    service = SAPBusinessService()
+    service.pool = SAPSessionPool(base_url, "SBODEMO", "manager", "secret", size=size, switch_company_delay_s=0)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_spread_over_pool(service_layer):
+    service = _service(service_layer, size=3)
+
+    results = await asyncio.gather(*(service._call_sap("/Items") for _ in range(12)))
+
+    assert len({r["value"][0]["Session"] for r in results}) == 3
+    assert _FakeServiceLayer.logins == 3
+    assert _FakeServiceLayer.max_active == 3
+    assert _FakeServiceLayer.overlap_on_session is False
+    stats = service.get_pool_stats()
+    assert (stats["size"], stats["in_use"], stats["logged_in"], stats["requests"]) == (3, 0, 3, 12)
+    await service.logout()
+
+
+@pytest.mark.asyncio
+async def test_light_load_uses_a_single_session(service_layer):
+    service = _service(service_layer, size=3)
+
+    for _ in range(5):
+        await service._call_sap("/Items")
+
+    assert _FakeServiceLayer.logins == 1
+    assert service.session_id == "S1"
+    await service.logout()
+
+
+@pytest.mark.asyncio
+async def test_expired_sessions_relogin_once_each(service_layer):
+    service = _service(service_layer, size=2)
+    await asyncio.gather(*(service._call_sap("/Items") for _ in range(4)))
+    assert _FakeServiceLayer.logins == 2
+
+    _FakeServiceLayer.sessions.clear()  # Redémarrage du Service Layer
+    results = await asyncio.gather(*(service._call_sap("/Items") for _ in range(10)))
+
+    assert len(results) == 10
+    assert _FakeServiceLayer.logins == 4
+    await service.logout()
+
+
+@pytest.mark.asyncio
+async def test_switch_company_error_only_resets_that_session(service_layer):
+    service = _service(service_layer, size=2)
+    await asyncio.gather(*(service._call_sap("/Items") for _ in range(2)))
+    _FakeServiceLayer.switch_company_once.add("S1")
+
+    await asyncio.gather(*(service._call_sap("/Items") for _ in range(6)))
+
+    assert _FakeServiceLayer.logins == 3
+    assert "S2" in _FakeServiceLayer.sessions
+    await service.logout()
+    assert _FakeServiceLayer.sessions == set()
@@ -0,0 +1,215 @@
+"""
+Tests unitaires — SuggestionIndex (index de suggestions pré-calculé)
+Couvre : mêmes meilleures suggestions que le parcours complet (codes, préfixes,
+noms, fautes de frappe, mots contenus dans un mot, éléments partiels), scores
+groupés identiques, réutilisation de l'index tant que les données ne changent
+pas, branchement dans SuggestionEngine (et repli sur le parcours complet).
+Latence sur 100k produits : hors suite unitaire (mesure de temps), lancée avec
+RUN_PERFORMANCE_TESTS=1
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import pytest
+
+import services.suggestion_engine as suggestion_engine
+from services.suggestion_engine import FuzzyMatcher, SuggestionEngine
+from services.suggestion_index import (
+    SuggestionIndex,
+    get_suggestion_index,
+    invalidate_suggestion_indexes,
+)
+
+FIELDS = ("ItemCode", "ItemName")
+
+
+def _catalog(n, seed=11):
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choice("abcdefgilmnoprstuv") for _ in range(rng.randint(3, 10))) for _ in range(3000)
+    ]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [
+        {
+            "ItemCode": f"{rng.choice('ABCHR')}{i:05d}-{rng.randint(0, 99)}",
+            "ItemName": " ".join(dict.fromkeys(rng.choices(vocabulary, weights, k=rng.randint(2, 5)))).upper()
+            + f" {rng.randint(1, 500)}MM",
+            "OnHand": rng.randint(0, 50),
+        }
+        for i in range(n)
+    ]
+
+
+def _printers(n, seed=1):
+    rng = random.Random(seed)
+    series = ["HP LaserJet Pro", "HP LaserJet", "HP OfficeJet Pro", "HP DeskJet", "HP EcoTank", "Epson EcoTank ET", "Canon PIXMA"]
+    supplies = "cartouche toner noir couleur tambour kit maintenance papier ramette bac fusion câble USB".split()
+    products = []
+    for i in range(n):
+        if rng.random() < 0.5:
+            name = f"{rng.choice(series)} {rng.randint(100, 9999)}{rng.choice(['', 'dn', 'dw', 'fdw'])}"
+        else:
+            name = " ".join(rng.sample(supplies, rng.randint(2, 4))).capitalize() + f" {rng.randint(10, 999)}"
+        products.append({"ItemCode": f"A{i:05d}", "ItemName": name})
+    products.append({"ItemCode": "A99999", "ItemName": "HP EcoTank 1092"})
+    return products
+
+
+def _queries(products, rng):
+    def typo(word):
+        i = rng.randrange(1, len(word))
+        return word[:i] + word[i + 1:]
+
+    sample = rng.sample(products, 80)
+    names = [p["ItemName"].lower().split() for p in sample[40:]]
+    return (
+        [("ItemCode", p["ItemCode"]) for p in sample[:20]]
+        + [("ItemCode", p["ItemCode"][:rng.randint(4, 7)]) for p in sample[20:40]]
+        + [("ItemName", " ".join(words)) for words in names[:15]]
+        + [("ItemName", " ".join(words[:2])) for words in names[15:30]]
+        + [("ItemName", f"{typo(words[0])} {words[1]}") for words in names[30:] if len(words[0]) > 4]
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes():
+    invalidate_suggestion_indexes()
+    yield
+    invalidate_suggestion_indexes()
+
+
+def test_same_best_suggestions_as_full_scan():
+    products = _catalog(5000)
+    index = SuggestionIndex(products, FIELDS)
+    rng = random.Random(3)
+
+    gaps = []
+    for field, query in _queries(products, rng):
+        expected = FuzzyMatcher.find_best_matches(query, products, key_field=field, limit=3)
+        found = index.search(query, field, limit=3)
+        assert found, query
+        assert found[0]["matched_field"] == field
+        gaps.append(expected[0]["similarity_score"] - found[0]["similarity_score"])
+
+    # Même meilleur score dans la grande majorité des cas, jamais très loin sinon
+    assert sum(1 for gap in gaps if gap > 0) <= len(gaps) // 10
+    assert max(gaps) < 10
+
+
+def test_in_word_and_partial_matches_like_full_scan():
+    products = _printers(3000)
+    index = SuggestionIndex(products, FIELDS)
+
+    for query in ("jet", "tank", "laser", "officejet", "ecotank 12"):
+        expected = FuzzyMatcher.find_best_matches(query, products, key_field="ItemName", limit=3)
+        found = index.search(query, "ItemName", limit=3)
+        assert [m["similarity_score"] for m in found] == [m["similarity_score"] for m in expected], query
+
+    assert "HP EcoTank 1092" in [m["ItemName"] for m in index.search("ecotank 12", "ItemName", limit=3)]
+    assert all("jet" in m["ItemName"].lower() for m in index.search("jet", "ItemName", limit=5))
+
+
+def test_batch_scores_equal_calculate_similarity():
+    rng = random.Random(2)
+    alphabet = "abcdeéfgh ijk-LMN0123 "
+    values = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 25))) for _ in range(2000)] + ["  ", " Abc "]
+    for query in ("abc", "hp ecotank 12", "éfg ij", "1"):
+        assert FuzzyMatcher.calculate_similarities(query, values) == [
+            FuzzyMatcher.calculate_similarity(query, value) for value in values
+        ]
+
+
+def test_exact_code_and_prefix_first():
+    products = _catalog(5000)
+    index = SuggestionIndex(products, FIELDS)
+
+    assert index.search("B00042-7", "ItemCode", limit=3)[0]["ItemCode"].startswith("B00042")
+    exact = products[1234]
+    result = index.search(exact["ItemCode"], "ItemCode", limit=3)
+    assert result[0]["ItemCode"] == exact["ItemCode"]
+    assert result[0]["similarity_score"] == 100.0
+    assert result[0]["OnHand"] == exact["OnHand"]
+    assert index.search("", "ItemName") == []
+
+
+def test_index_rebuilt_only_when_data_changes(monkeypatch):
+    products = _catalog(2000)
+    builds = []
+    original_init = SuggestionIndex.__init__
+
+    def counting_init(self, items, fields):
+        builds.append(len(items))
+        original_init(self, items, fields)
+
+    monkeypatch.setattr(SuggestionIndex, "__init__", counting_init)
+
+    first = get_suggestion_index(products, FIELDS)
+    assert get_suggestion_index(products, FIELDS) is first
+
+    # Même contenu rechargé (nouvelle liste) : pas de reconstruction, stock relu
+    reloaded = [dict(p, OnHand=999) for p in products]
+    assert get_suggestion_index(reloaded, FIELDS) is first
+    assert first.search(products[0]["ItemCode"], "ItemCode", limit=1)[0]["OnHand"] == 999
+
+    changed = reloaded[:-1] + [{**reloaded[-1], "ItemName": "ROULEMENT A BILLES 6204"}]
+    rebuilt = get_suggestion_index(changed, FIELDS)
+    assert rebuilt is not first
+    assert rebuilt.search("roulement billes 6204", "ItemName", limit=1)[0]["ItemCode"] == changed[-1]["ItemCode"]
+    assert builds == [2000, 2000]
+
+
+def test_engine_uses_index_for_large_catalogs(monkeypatch):
+    products = _catalog(3000)
+    clients = [{"Name": p["ItemName"].title(), "CardCode": p["ItemCode"]} for p in products]
+    engine = SuggestionEngine()
+
+    monkeypatch.setattr(suggestion_engine, "INDEX_MIN_CANDIDATES", 10**9)
+    scanned_product = asyncio.run(engine.suggest_product(products[42]["ItemCode"], products))
+    scanned_client = asyncio.run(engine.suggest_client(clients[7]["Name"], clients))
+
+    monkeypatch.setattr(suggestion_engine, "INDEX_MIN_CANDIDATES", 500)
+    monkeypatch.setattr(FuzzyMatcher, "find_best_matches", staticmethod(lambda *a, **k: pytest.fail("parcours complet")))
+    indexed_product = asyncio.run(engine.suggest_product(products[42]["ItemCode"], products))
+    indexed_client = asyncio.run(engine.suggest_client(clients[7]["Name"], clients))
+
+    assert indexed_product.primary_suggestion.suggested_value == scanned_product.primary_suggestion.suggested_value
+    assert indexed_client.primary_suggestion.suggested_value == scanned_client.primary_suggestion.suggested_value
+    assert indexed_client.primary_suggestion.suggested_value == clients[7]["Name"]
+
+
+def test_engine_falls_back_to_full_scan_without_index_match(monkeypatch):
+    products = _printers(1000)
+    engine = SuggestionEngine()
+    expected = FuzzyMatcher.find_best_matches("ecotank 1092", products, key_field="ItemName", limit=5)
+
+    monkeypatch.setattr(SuggestionIndex, "search", lambda self, *a, **k: [])
+    result = asyncio.run(engine.suggest_product("ecotank 1092", products))
+
+    assert result.has_suggestions
+    assert expected[0]["ItemName"] == "HP EcoTank 1092"
+    assert result.primary_suggestion.suggested_value == "A99999 - HP EcoTank 1092"
+
+
+@pytest.mark.performance
+@pytest.mark.skipif(not os.getenv("RUN_PERFORMANCE_TESTS"), reason="benchmark : RUN_PERFORMANCE_TESTS=1")
+def test_latency_on_100k_products():
+    products = _catalog(100_000)
+    index = get_suggestion_index(products, FIELDS)
+    rng = random.Random(5)
+    queries = _queries(products, rng)
+
+    timings = []
+    for field, query in queries:
+        runs = []
+        for _ in range(3):
+            start = time.perf_counter()
+            index.search(query, field, limit=3)
+            runs.append(time.perf_counter() - start)
+        timings.append(min(runs))
+
+    median_ms = statistics.median(timings) * 1000
+    assert median_ms < 1.0, f"médiane {median_ms:.2f} ms"
@@ -0,0 +1,84 @@
+"""
+Tests unitaires — Index de recherche des tarifs fournisseurs
+Couvre : référence normalisée (exacte / préfixe), FTS5 sur la désignation,
+synchronisation de l'index à la réindexation, plan de requête indexé
+"""
+
+import pytest
+
+import services.supplier_tariffs_db as tariffs_db
+from services.supplier_tariffs_db import (
+    find_products_by_reference, get_supplier_price_by_reference,
+    normalize_reference, replace_file_products, search_products
+)
+
+
+@pytest.fixture
+def tariffs_db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(tariffs_db, "DB_PATH", tmp_path / "supplier_tariffs.db")
+    tariffs_db.init_database()
+    return tmp_path
+
+
+def _file(name="tarif.csv"):
+    return {"path": f"/tarifs/{name}", "name": name, "type": "csv", "size": 10, "modified": "2026-01-01 00:00:00"}
+
+
+def _products():
+    return [
+        {"supplier_reference": "AB-123.45", "designation": "Vérin pneumatique compact", "unit_price": 12.5,
+         "supplier_name": "Festo", "brand": "Festo"},
+        {"supplier_reference": "AB12399", "designation": "Capteur inductif", "unit_price": 40.0,
+         "supplier_name": "Sick"},
+        {"supplier_reference": "XY-1", "designation": "Joint torique", "unit_price": None},
+    ]
+
+
+def test_normalize_reference():
+    assert normalize_reference(" ab-12.3 x ") == "AB123X"
+    assert normalize_reference("") is None
+    assert normalize_reference("--") is None
+
+
+def test_exact_reference_ignores_punctuation(tariffs_db_path):
+    replace_file_products(_file(), _products())
+
+    assert [p["designation"] for p in find_products_by_reference("ab 123 45")] == ["Vérin pneumatique compact"]
+    assert len(find_products_by_reference("AB123", limit=10, prefix=True)) == 2
+
+
+def test_price_api_requires_a_price(tariffs_db_path):
+    replace_file_products(_file(), _products())
+
+    assert get_supplier_price_by_reference("AB12345")["unit_price"] == 12.5
+    assert get_supplier_price_by_reference("XY1") is None
+    assert get_supplier_price_by_reference("INCONNU") is None
+
+
+def test_full_text_search_on_designation(tariffs_db_path):
+    replace_file_products(_file(), _products())
+
+    results = search_products("verin pneum")
+    assert [r["supplier_reference"] for r in results] == ["AB-123.45"]
+    assert [r["supplier_reference"] for r in search_products("sick")] == ["AB12399"]
+
+
+def test_reindexing_a_file_updates_the_fts_index(tariffs_db_path):
+    replace_file_products(_file(), _products())
+    replace_file_products(_file(), [{"supplier_reference": "Z9", "designation": "Courroie crantée"}])
+
+    assert search_products("capteur") == []
+    assert [r["supplier_reference"] for r in search_products("courroie")] == ["Z9"]
+
+
+def test_reference_lookup_uses_index(tariffs_db_path):
+    conn = tariffs_db.get_connection()
+    try:
+        plan = " ".join(
+            row["detail"] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM supplier_products WHERE reference_norm = ?", ("AB1",)
+            )
+        )
+    finally:
+        conn.close()
+    assert "idx_supplier_products_reference_norm" in plan
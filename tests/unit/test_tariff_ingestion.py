@@ -0,0 +1,100 @@
+"""
+Tests unitaires — Indexation incrémentale des tarifs fournisseurs
+Couvre : insertion groupée par fichier, saut des fichiers inchangés,
+contenu identique après touch, réindexation d'un fichier modifié
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import services.supplier_tariffs_db as tariffs_db
+from services.file_parsers import scan_folder
+from services.tariff_ingestion import run_ingestion
+
+
+@pytest.fixture
+def tariffs_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(tariffs_db, "DB_PATH", tmp_path / "supplier_tariffs.db")
+    tariffs_db.init_database()
+    folder = tmp_path / "tarifs"
+    folder.mkdir()
+    return folder
+
+
+def _write_csv(path, rows):
+    lines = ["reference;designation;prix"] + [f"{r};Produit {r};{p}" for r, p in rows]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def _index(folder):
+    state = {"running": True, "progress": 0, "current_file": None}
+    # Threads plutôt que processus : la base de test est patchée dans ce processus
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        counters = asyncio.run(run_ingestion(scan_folder(str(folder)), state, executor=executor))
+    return counters, state
+
+
+def _product_count():
+    conn = tariffs_db.get_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM supplier_products").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_first_run_indexes_all_files(tariffs_env):
+    _write_csv(tariffs_env / "a.csv", [("A1", "10,50"), ("A2", "20")])
+    _write_csv(tariffs_env / "b.csv", [("B1", "5")])
+
+    counters, state = _index(tariffs_env)
+
+    assert counters["files_success"] == 2
+    assert counters["files_skipped"] == 0
+    assert counters["items_extracted"] == 3
+    assert _product_count() == 3
+    assert state["progress"] == 100
+    assert state["files_done"] == 2
+
+
+def test_second_run_skips_unchanged_files(tariffs_env):
+    _write_csv(tariffs_env / "a.csv", [("A1", "10")])
+    _index(tariffs_env)
+
+    counters, state = _index(tariffs_env)
+
+    assert counters["files_skipped"] == 1
+    assert counters["items_extracted"] == 0
+    assert state["files_skipped"] == 1
+    assert _product_count() == 1
+
+
+def test_touched_file_with_same_content_is_not_reparsed(tariffs_env):
+    path = tariffs_env / "a.csv"
+    _write_csv(path, [("A1", "10")])
+    _index(tariffs_env)
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 60))
+
+    counters, _ = _index(tariffs_env)
+
+    assert counters["files_skipped"] == 1
+    assert counters["items_extracted"] == 0
+    # La nouvelle date est mémorisée : le passage suivant ne relit même plus le fichier
+    fingerprint = tariffs_db.get_file_fingerprints()[str(path)]
+    assert fingerprint["last_modified"] == str(scan_folder(str(tariffs_env))[0]["modified"])
+
+
+def test_modified_file_replaces_its_products(tariffs_env):
+    path = tariffs_env / "a.csv"
+    _write_csv(path, [("A1", "10"), ("A2", "20")])
+    _index(tariffs_env)
+
+    _write_csv(path, [("A3", "30")])
+    counters, _ = _index(tariffs_env)
+
+    assert counters["items_extracted"] == 1
+    refs = [p["supplier_reference"] for p in tariffs_db.get_all_products()]
+    assert refs == ["A3"]
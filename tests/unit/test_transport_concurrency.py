@@ -0,0 +1,132 @@
+"""
+Tests unitaires — Interrogation parallèle des carriers (TransportService)
+Couvre : carriers interrogés simultanément, carrier lent annulé au délai,
+résultats partiels
+"""
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from services.transport.carrier_interface import (
+    CarrierAdapter,
+    CarrierAPIError,
+    Destination,
+    PackageInput,
+    Shipper,
+    ShippingRate,
+)
+from services.transport.transport_service import TransportService
+
+
+class SleepingCarrier(CarrierAdapter):
+    """Adapter factice : attend `delay` secondes puis renvoie un tarif (ou échoue)."""
+
+    # Appels en cours (tous carriers confondus) et maximum observé
+    in_flight = 0
+    peak = 0
+
+    def __init__(self, name: str, delay: float, price: float = 50.0, fail: bool = False):
+        self._name = name
+        self.delay = delay
+        self.price = price
+        self.fail = fail
+        self.cancelled = False
+
+    @property
+    def carrier_name(self) -> str:
+        return self._name
+
+    async def get_rate(
+        self,
+        packages: List[PackageInput],
+        destination: Destination,
+        shipper: Optional[Shipper] = None,
+        declared_value: float = 100.0,
+        currency: str = "EUR",
+    ) -> List[ShippingRate]:
+        SleepingCarrier.in_flight += 1
+        SleepingCarrier.peak = max(SleepingCarrier.peak, SleepingCarrier.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            SleepingCarrier.in_flight -= 1
+        if self.fail:
+            raise CarrierAPIError(self._name, "HTTP 503", status_code=503)
+        return [ShippingRate(carrier=self._name, service_code="S", service_name="STD", price=self.price)]
+
+    def is_available(self) -> bool:
+        return True
+
+
+PACKAGES = [{"weight": 5.0, "dimensions": {"length": 30, "width": 20, "height": 20}}]
+DESTINATION = Destination(postal_code="75001", city_name="PARIS", country_code="FR")
+
+
+def _service(deadline: float, *carriers: SleepingCarrier) -> TransportService:
+    service = TransportService(carrier_deadline_seconds=deadline)
+    service._carriers = {}
+    for carrier in carriers:
+        service.register_carrier(carrier.carrier_name.lower(), carrier)
+    return service
+
+
+@pytest.fixture(autouse=True)
+def reset_in_flight(monkeypatch):
+    monkeypatch.setattr(SleepingCarrier, "in_flight", 0)
+    monkeypatch.setattr(SleepingCarrier, "peak", 0)
+
+
+@pytest.mark.asyncio
+async def test_carriers_queried_concurrently():
+    service = _service(
+        2.0,
+        SleepingCarrier("A", 0.05, price=40.0),
+        SleepingCarrier("B", 0.05, price=30.0),
+        SleepingCarrier("C", 0.05, price=35.0),
+    )
+
+    response = await service.calculate_shipping(PACKAGES, DESTINATION, carrier="all")
+
+    assert SleepingCarrier.peak == 3  # séquentiel : 1
+    assert response.success
+    assert [r["carrier"] for r in response.rates] == ["B", "C", "A"]
+    assert response.best_rate["carrier"] == "B"
+
+
+@pytest.mark.asyncio
+async def test_slow_carrier_is_cut_at_deadline():
+    slow = SleepingCarrier("Slow", 5.0, price=1.0)
+    service = _service(0.2, SleepingCarrier("Fast", 0.05), slow)
+
+    response = await service.calculate_shipping(PACKAGES, DESTINATION, carrier="all")
+
+    assert slow.cancelled
+    assert response.success
+    assert response.best_rate["carrier"] == "Fast"
+    assert len(response.carrier_errors) == 1 and response.carrier_errors[0].startswith("Slow")
+
+
+@pytest.mark.asyncio
+async def test_failing_carrier_reported_with_partial_results():
+    service = _service(1.0, SleepingCarrier("Ok", 0.01), SleepingCarrier("Down", 0.01, fail=True))
+
+    response = await service.calculate_shipping(PACKAGES, DESTINATION, carrier="all")
+
+    assert response.success
+    assert [r["carrier"] for r in response.rates] == ["Ok"]
+    assert "HTTP 503" in response.carrier_errors[0]
+
+
+@pytest.mark.asyncio
+async def test_all_carriers_failing():
+    service = _service(0.1, SleepingCarrier("Slow", 1.0), SleepingCarrier("Down", 0.0, fail=True))
+
+    response = await service.calculate_shipping(PACKAGES, DESTINATION, carrier="all")
+
+    assert not response.success
+    assert len(response.carrier_errors) == 2
@@ -0,0 +1,199 @@
+"""
+Tests unitaires — QuoteValidator (file de validation + statistiques)
+Couvre : ordre de priorité réel, pagination par curseur sans doublon ni trou,
+plan de requête servi par l'index de file, compteurs incrémentaux identiques
+au recalcul complet, décision et statut enregistrés ensemble, migration d'une
+base existante
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.quote_validator import QuoteValidator
+from services.validation_models import (
+    ValidationDecision,
+    ValidationListFilter,
+    ValidationPriority,
+    ValidationRequest,
+    ValidationStatus,
+    ValidationType,
+)
+
+NOW = datetime.utcnow().replace(microsecond=0)
+PRIORITIES = [ValidationPriority.LOW, ValidationPriority.URGENT, ValidationPriority.MEDIUM, ValidationPriority.HIGH]
+
+
+@pytest.fixture
+def validator(tmp_path, monkeypatch):
+    monkeypatch.setenv("VALIDATION_NOTIFY_ON_CREATION", "false")
+    return QuoteValidator(db_path=str(tmp_path / "validation.db"))
+
+
+def _request(n, priority, requested_at, case_type="CAS_2_HCM", expires_at=None):
+    return ValidationRequest(
+        validation_id=f"val_{n:04d}",
+        validation_type=ValidationType.PRICING,
+        priority=priority,
+        item_code=f"A{n % 3}",
+        card_code="C001",
+        quantity=1,
+        calculated_price=10.0,
+        case_type=case_type,
+        justification="test",
+        requested_at=requested_at,
+        expires_at=expires_at or requested_at + timedelta(days=30),
+    )
+
+
+def _fill(validator, n=60):
+    for i in range(n):
+        validator._save_validation_request(
+            _request(i, PRIORITIES[i % 4], NOW - timedelta(hours=i % 7, minutes=i))
+        )
+
+
+def _stats_rows(validator):
+    conn = sqlite3.connect(validator.db_path)
+    rows = conn.execute(
+        "SELECT day, status, validation_type, priority, case_type, request_count, decided_count, "
+        "ROUND(decision_minutes_sum, 3) FROM validation_stats_daily WHERE request_count != 0 "
+        "OR decided_count != 0 ORDER BY 1, 2, 3, 4, 5"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def test_cursor_pages_follow_priority_then_age(validator):
+    _fill(validator)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = validator.list_pending_page(ValidationListFilter(limit=7, cursor=cursor))
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 60
+    assert len({v.validation_id for v in seen}) == 60
+    order = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+    keys = [(order[v.priority.value], v.requested_at, v.validation_id) for v in seen]
+    assert keys == sorted(keys)
+    assert seen[0].priority == ValidationPriority.URGENT
+
+
+def test_cursor_with_priority_filter(validator):
+    _fill(validator)
+
+    first, cursor = validator.list_pending_page(ValidationListFilter(priority=ValidationPriority.HIGH, limit=10))
+    rest, end = validator.list_pending_page(
+        ValidationListFilter(priority=ValidationPriority.HIGH, limit=10, cursor=cursor)
+    )
+
+    assert end is None
+    assert len(first) + len(rest) == 15
+    assert all(v.priority == ValidationPriority.HIGH for v in first + rest)
+    assert validator.count_pending_by_priority() == {"urgent": 15, "high": 15, "medium": 15, "low": 15}
+
+
+def test_queue_query_served_by_index(validator):
+    conn = sqlite3.connect(validator.db_path)
+    plan = " ".join(
+        row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM validation_requests WHERE status = ? "
+            "AND (priority_order, requested_at, validation_id) > (?, ?, ?) "
+            "ORDER BY priority_order, requested_at, validation_id LIMIT ?",
+            ("pending", 1, "2026-01-01", "val", 51),
+        )
+    )
+    conn.close()
+
+    assert "idx_validation_requests_queue" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_invalid_cursor_rejected(validator):
+    with pytest.raises(ValueError):
+        validator.list_pending_page(ValidationListFilter(cursor="pas-un-curseur"))
+
+
+def test_incremental_statistics_match_rebuild(validator):
+    _fill(validator, n=12)
+    validator._save_validation_request(
+        _request(100, ValidationPriority.LOW, NOW - timedelta(days=3), case_type=None,
+                 expires_at=NOW - timedelta(days=1))
+    )
+    validator.validate_request("val_0001", ValidationDecision(
+        validation_id="val_0001", status=ValidationStatus.APPROVED, validated_by="a@rondot.fr",
+        validated_at=NOW + timedelta(minutes=30),
+    ))
+    validator.validate_request("val_0002", ValidationDecision(
+        validation_id="val_0002", status=ValidationStatus.REJECTED, validated_by="a@rondot.fr",
+    ))
+    assert validator.expire_old_validations() == 1
+    with pytest.raises(ValueError):
+        validator.validate_request("val_0001", ValidationDecision(
+            validation_id="val_0001", status=ValidationStatus.REJECTED, validated_by="b@rondot.fr",
+        ))
+
+    stats = validator.get_statistics(days=30)
+    assert stats.total_validations == 13
+    assert (stats.pending_count, stats.approved_count, stats.rejected_count, stats.expired_count) == (10, 1, 1, 1)
+    assert stats.by_case_type == {"CAS_2_HCM": 12}
+    assert stats.avg_validation_time_minutes is not None
+    assert validator.get_statistics(days=1).total_validations == 12
+
+    incremental = _stats_rows(validator)
+    validator.rebuild_statistics()
+    assert _stats_rows(validator) == incremental
+
+
+def test_decision_and_status_saved_together(validator, monkeypatch):
+    _fill(validator, n=4)
+    before = _stats_rows(validator)
+
+    def saved(table):
+        conn = sqlite3.connect(validator.db_path)
+        rows = conn.execute(f"SELECT status FROM {table} WHERE validation_id = 'val_0001'").fetchall()
+        conn.close()
+        return rows
+
+    def failing_insert(cursor, decision):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(QuoteValidator, "_save_validation_decision", staticmethod(failing_insert))
+    with pytest.raises(sqlite3.OperationalError):
+        validator.validate_request("val_0001", ValidationDecision(
+            validation_id="val_0001", status=ValidationStatus.APPROVED, validated_by="a@rondot.fr",
+        ))
+
+    assert saved("validation_requests") == [("pending",)]
+    assert saved("validation_decisions") == []
+    assert _stats_rows(validator) == before
+
+    monkeypatch.undo()
+    validator.validate_request("val_0001", ValidationDecision(
+        validation_id="val_0001", status=ValidationStatus.APPROVED, validated_by="a@rondot.fr",
+    ))
+    assert saved("validation_requests") == [("approved",)]
+    assert saved("validation_decisions") == [("approved",)]
+
+
+def test_existing_database_migrated(tmp_path, monkeypatch):
+    monkeypatch.setenv("VALIDATION_NOTIFY_ON_CREATION", "false")
+    db_path = str(tmp_path / "legacy.db")
+    legacy = QuoteValidator(db_path=db_path)
+    _fill(legacy, n=8)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX idx_validation_requests_queue")
+    conn.execute("DROP TABLE validation_stats_daily")
+    conn.execute("ALTER TABLE validation_requests DROP COLUMN priority_order")
+    conn.commit()
+    conn.close()
+
+    migrated = QuoteValidator(db_path=db_path)
+
+    page, _ = migrated.list_pending_page(ValidationListFilter(limit=2))
+    assert [v.priority for v in page] == [ValidationPriority.URGENT, ValidationPriority.URGENT]
+    assert migrated.get_statistics().pending_count == 8
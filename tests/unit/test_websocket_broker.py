@@ -0,0 +1,130 @@
+"""
+Tests unitaires — Diffusion WebSocket événementielle (WebSocketManager + TaskBroker)
+Couvre : attente d'abonné sans polling, sérialisation unique, coalescence des
+progressions, file d'attente bornée, état des tâches libéré (clôture, borne)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from services import websocket_manager as ws_module
+from services.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    # Envois en cours, tous sockets confondus (chevauchement de la diffusion)
+    in_flight = 0
+    peak = 0
+
+    def __init__(self, delay: float = 0.0):
+        self.sent = []
+        self.delay = delay
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        FakeWebSocket.in_flight += 1
+        FakeWebSocket.peak = max(FakeWebSocket.peak, FakeWebSocket.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self.sent.append(json.loads(text))
+        finally:
+            FakeWebSocket.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def reset_in_flight():
+    FakeWebSocket.in_flight = FakeWebSocket.peak = 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_broadcast_is_released_on_connect():
+    manager = WebSocketManager()
+    ws = FakeWebSocket()
+
+    sender = asyncio.create_task(
+        manager.broadcast_to_task("t1", {"type": "step_update", "message": "hello"}, timeout=5)
+    )
+    await asyncio.sleep(0.01)
+    assert not sender.done()
+
+    await manager.connect(ws, "t1")
+    await asyncio.wait_for(sender, timeout=1)
+
+    assert [m["message"] for m in ws.sent] == ["hello"]
+    assert ws.sent[0]["task_id"] == "t1"
+
+
+@pytest.mark.asyncio
+async def test_timeout_buffers_message_for_late_joiner():
+    manager = WebSocketManager()
+    await manager.broadcast_to_task("t2", {"type": "step_update", "message": "late"}, timeout=0.01)
+    assert [m["message"] for m in manager.pending_messages["t2"]] == ["late"]
+
+    ws = FakeWebSocket()
+    await manager.connect(ws, "t2")
+    assert [m["message"] for m in ws.sent] == ["late"]
+
+
+@pytest.mark.asyncio
+async def test_rapid_progress_updates_are_coalesced():
+    manager = WebSocketManager()
+    senders = [
+        asyncio.create_task(manager.broadcast_to_task(
+            "t3", {"type": "progress_update", "step_id": "search", "progress": p}, timeout=5
+        ))
+        for p in (10, 20, 30, 40)
+    ]
+    await asyncio.sleep(0.01)
+
+    ws = FakeWebSocket()
+    await manager.connect(ws, "t3")
+    await asyncio.gather(*senders)
+
+    assert [m["progress"] for m in ws.sent] == [40]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_is_concurrent():
+    manager = WebSocketManager()
+    sockets = [FakeWebSocket(delay=0.05) for _ in range(10)]
+    for ws in sockets:
+        await manager.connect(ws, "t4")
+
+    await manager.broadcast_to_task("t4", {"type": "step_update", "message": "x"})
+
+    assert all(len(ws.sent) == 1 for ws in sockets)
+    assert FakeWebSocket.peak == len(sockets)
+
+
+@pytest.mark.asyncio
+async def test_pending_buffer_is_bounded(monkeypatch):
+    monkeypatch.setattr(ws_module, "PENDING_BUFFER_SIZE", 5)
+    manager = WebSocketManager()
+    for i in range(20):
+        await manager.broadcast_to_task("t5", {"type": "step_update", "message": str(i)}, timeout=0)
+
+    assert [m["message"] for m in manager.pending_messages["t5"]] == ["15", "16", "17", "18", "19"]
+
+
+@pytest.mark.asyncio
+async def test_task_state_released_on_close_and_bounded(monkeypatch):
+    monkeypatch.setattr(ws_module, "SEQUENCE_TASKS_MAX", 3)
+    manager = WebSocketManager()
+    ws = FakeWebSocket()
+    await manager.connect(ws, "t6")
+    await manager.broadcast_to_task("t6", {"type": "progress_update", "step_id": "s", "progress": 50})
+    await manager.broadcast_to_task("t7", {"type": "progress_update", "step_id": "s", "progress": 50}, timeout=0)
+
+    await manager.close_task_connections("t6")
+    await manager.close_task_connections("t7")  # aucune connexion : état libéré quand même
+    assert manager.broker._sequences == {}
+    assert "t7" not in manager.pending_messages
+
+    for i in range(10):
+        await manager.broadcast_to_task(f"x{i}", {"type": "progress_update", "step_id": "s"}, timeout=0)
+    assert list(manager.broker._sequences) == ["x7", "x8", "x9"]
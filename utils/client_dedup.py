@@ -0,0 +1,183 @@
+# utils/client_dedup.py
+"""
+Moteur de déduplication des clients par nom (Salesforce + SAP)
+
+Remplace la comparaison paire-à-paire O(n²) de ClientLister._find_similar_clients :
+- mode "exact" : regroupement par nom normalisé (dict), puis tolérance de
+  longueur appliquée à l'intérieur de chaque bucket -> O(n) en pratique
+- mode "fuzzy" : blocage sur les préfixes du nom normalisé, puis comparaison
+  thefuzz entre voisins (fenêtre glissante) d'un même bloc
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Mots génériques retirés avant comparaison (GROUP/GROUPE conservés pour
+# distinguer les entités, ex: RONDOT vs RONDOT Group)
+GENERIC_COMPANY_WORDS = ['SA', 'SARL', 'SAS', 'EURL', 'COMPANY', 'CO', 'LTD', 'LTEE']
+
+# Écart maximal de longueur (nom brut) pour considérer deux clients identiques
+DEFAULT_LENGTH_TOLERANCE = 3
+
+# Paramètres du mode fuzzy
+DEFAULT_FUZZY_THRESHOLD = 92
+DEFAULT_BLOCK_PREFIX_LEN = 4
+# Dans un bloc, chaque nom n'est comparé qu'à ses N voisins (tri alphabétique)
+DEFAULT_FUZZY_WINDOW = 8
+
+
+def normalize_company_name(name: str) -> str:
+    """Normalise le nom d'entreprise pour comparaison"""
+    if not name:
+        return ""
+    # Convertir en majuscules et supprimer les mots communs
+    normalized = name.upper().strip()
+    for word in GENERIC_COMPANY_WORDS:
+        normalized = normalized.replace(f' {word}', '').replace(f'{word} ', '')
+    # Supprimer espaces multiples
+    return ' '.join(normalized.split())
+
+
+def _display_name(client: Dict) -> str:
+    return client.get('Name') or client.get('CardName') or ''
+
+
+def _raw_name_length(client: Dict) -> int:
+    # Même base que l'implémentation historique : longueur du champ Name
+    return len(client.get('Name') or '')
+
+
+class ClientDeduplicator:
+    """
+    Regroupe les clients dont les noms normalisés correspondent.
+
+    Usage:
+        dedup = ClientDeduplicator()                 # mode exact
+        groups = dedup.find_groups(clients)          # [[0, 4], [2, 7, 9], ...]
+
+        fuzzy = ClientDeduplicator(mode="fuzzy", threshold=90)
+    """
+
+    MODES = ("exact", "fuzzy")
+
+    def __init__(
+        self,
+        mode: str = "exact",
+        length_tolerance: int = DEFAULT_LENGTH_TOLERANCE,
+        threshold: int = DEFAULT_FUZZY_THRESHOLD,
+        block_prefix_len: int = DEFAULT_BLOCK_PREFIX_LEN,
+        window: int = DEFAULT_FUZZY_WINDOW,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode de déduplication inconnu: {mode} (attendu: {self.MODES})")
+        self.mode = mode
+        self.length_tolerance = length_tolerance
+        self.threshold = threshold
+        self.block_prefix_len = block_prefix_len
+        self.window = window
+
+    def find_groups(self, clients: List[Dict]) -> List[List[int]]:
+        """
+        Retourne les groupes (indices, >= 2 éléments) de clients similaires,
+        ordonnés par premier indice — même format que _find_similar_clients.
+        """
+        # Normalisation une seule fois par client
+        names: List[str] = [normalize_company_name(_display_name(c)) for c in clients]
+        lengths: List[int] = [_raw_name_length(c) for c in clients]
+
+        if self.mode == "fuzzy":
+            groups = self._fuzzy_groups(names)
+        else:
+            groups = self._exact_groups(names, lengths)
+
+        groups.sort(key=lambda g: g[0])
+        return groups
+
+    # ------------------------------------------------------------------
+    # Mode exact : hash sur le nom normalisé
+    # ------------------------------------------------------------------
+
+    def _exact_groups(self, names: List[str], lengths: List[int]) -> List[List[int]]:
+        buckets: Dict[str, List[int]] = defaultdict(list)
+        for idx, name in enumerate(names):
+            if name:
+                buckets[name].append(idx)
+
+        groups: List[List[int]] = []
+        for indices in buckets.values():
+            if len(indices) < 2:
+                continue
+            # Dans un bucket : le premier client libre sert de référence et
+            # absorbe les suivants dans la tolérance de longueur (sémantique
+            # identique à l'ancienne double boucle)
+            remaining = indices
+            while len(remaining) > 1:
+                leader = remaining[0]
+                group = [leader]
+                rest = []
+                for idx in remaining[1:]:
+                    if abs(lengths[leader] - lengths[idx]) <= self.length_tolerance:
+                        group.append(idx)
+                    else:
+                        rest.append(idx)
+                if len(group) > 1:
+                    groups.append(group)
+                remaining = rest
+        return groups
+
+    # ------------------------------------------------------------------
+    # Mode fuzzy : blocage par préfixe + thefuzz sur fenêtre glissante
+    # ------------------------------------------------------------------
+
+    def _fuzzy_groups(self, names: List[str]) -> List[List[int]]:
+        from thefuzz import fuzz
+
+        blocks: Dict[str, List[int]] = defaultdict(list)
+        for idx, name in enumerate(names):
+            if name:
+                blocks[name[:self.block_prefix_len]].append(idx)
+
+        # Union-find : un client rattaché à un groupe via n'importe quel membre
+        parent = list(range(len(names)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for indices in blocks.values():
+            if len(indices) < 2:
+                continue
+            # Les noms strictement identiques sont fusionnés sans scoring
+            seen: Dict[str, int] = {}
+            distinct: List[int] = []
+            for idx in indices:
+                first = seen.setdefault(names[idx], idx)
+                if first != idx:
+                    parent[find(idx)] = find(first)
+                else:
+                    distinct.append(idx)
+
+            # Sorted neighbourhood : coût borné à O(n * window) par bloc
+            distinct.sort(key=lambda i: names[i])
+            for pos, i in enumerate(distinct):
+                for j in distinct[pos + 1:pos + 1 + self.window]:
+                    if find(i) == find(j):
+                        continue
+                    if fuzz.ratio(names[i], names[j]) >= self.threshold:
+                        parent[find(j)] = find(i)
+
+        grouped: Dict[int, List[int]] = defaultdict(list)
+        for idx, name in enumerate(names):
+            if name:
+                grouped[find(idx)].append(idx)
+        return [g for g in grouped.values() if len(g) > 1]
+
+
+def find_duplicate_groups(clients: List[Dict], mode: str = "exact", **kwargs) -> List[List[int]]:
+    """Raccourci fonctionnel vers ClientDeduplicator.find_groups"""
+    return ClientDeduplicator(mode=mode, **kwargs).find_groups(clients)
@@ -6,17 +6,21 @@ CORRECTION: Traitement approprié des réponses MCP
 
 import logging
 import asyncio
+from collections import defaultdict, deque
 from typing import List, Dict, Any
 from services.mcp_connector import MCPConnector
 from services.security_helpers import escape_soql
+from utils.client_dedup import ClientDeduplicator, normalize_company_name
 
 logger = logging.getLogger(__name__)
 
 class ClientLister:
     """Classe pour lister les clients des deux systèmes - VERSION CORRIGÉE"""
     
-    def __init__(self):
+    def __init__(self, dedup_mode: str = "exact"):
         self.mcp_connector = MCPConnector()
+        # "exact" (défaut) ou "fuzzy" (blocage par préfixe + thefuzz)
+        self.deduplicator = ClientDeduplicator(mode=dedup_mode)
     
     async def get_all_salesforce_clients(self) -> List[Dict[str, Any]]:
         """Récupère tous les comptes Salesforce - CORRIGÉ"""
@@ -393,24 +397,22 @@ class ClientLister:
         unique_clients = []
         used_sap_indices = set()
         
+        # Index CardCode -> indices SAP (ordre d'origine conservé)
+        sap_by_card_code: Dict[str, deque] = defaultdict(deque)
+        for idx, sap_client in enumerate(sap_clients):
+            sap_card_code = (sap_client.get('CardCode') or '').strip()
+            if sap_card_code:
+                sap_by_card_code[sap_card_code].append(idx)
+        
         # Traiter clients Salesforce
         for sf_client in sf_clients:
-            sf_account_number = sf_client.get('AccountNumber', '').strip()
+            sf_account_number = (sf_client.get('AccountNumber') or '').strip()
             
-            # Chercher correspondance SAP par CardCode
+            # Correspondance exacte sur l'identifiant (premier client SAP libre)
             best_match_idx = None
-            
-            if sf_account_number:  # Si Salesforce a un AccountNumber
-                for idx, sap_client in enumerate(sap_clients):
-                    if idx in used_sap_indices:
-                        continue
-                    
-                    sap_card_code = sap_client.get('CardCode', '').strip()
-                    
-                    # Correspondance exacte sur l'identifiant
-                    if sf_account_number == sap_card_code:
-                        best_match_idx = idx
-                        break
+            candidates = sap_by_card_code.get(sf_account_number) if sf_account_number else None
+            if candidates:
+                best_match_idx = candidates.popleft()
             
             # Fusionner si correspondance trouvée
             if best_match_idx is not None:
@@ -436,55 +438,11 @@ class ClientLister:
     
     def _normalize_company_name(self, name: str) -> str:
         """Normalise le nom d'entreprise pour comparaison"""
-        if not name:
-            return ""
-        # Convertir en majuscules et supprimer les mots communs
-        normalized = name.upper().strip()
-        # Supprimer les mots génériques SAUF si c'est la différence principale
-        words_to_remove = ['SA', 'SARL', 'SAS', 'EURL', 'COMPANY', 'CO', 'LTD', 'LTEE']
-        # Garder GROUP/GROUPE pour distinguer les entités (ex: RONDOT vs RONDOT Group)
-        for word in words_to_remove:
-            normalized = normalized.replace(f' {word}', '').replace(f'{word} ', '')
-        # Supprimer espaces multiples
-        return ' '.join(normalized.split())
+        return normalize_company_name(name)
 
     def _find_similar_clients(self, clients: List[Dict]) -> List[List[int]]:
-        """Trouve les groupes de clients similaires par nom"""
-        groups = []
-        used_indices = set()
-        
-        for i, client1 in enumerate(clients):
-            if i in used_indices:
-                continue
-            
-            name1 = self._normalize_company_name(
-                client1.get('Name') or client1.get('CardName') or ''
-            )
-            if not name1:
-                continue
-                
-            group = [i]
-            used_indices.add(i)
-            
-            for j, client2 in enumerate(clients[i+1:], i+1):
-                if j in used_indices:
-                    continue
-                    
-                name2 = self._normalize_company_name(
-                    client2.get('Name') or client2.get('CardName') or ''
-                )
-                
-                # Similarité stricte : noms identiques après normalisation ET longueur similaire
-                if (name1 and name2 and 
-                    name1 == name2 and 
-                    abs(len(client1.get('Name', '')) - len(client2.get('Name', ''))) <= 3):
-                    group.append(j)
-                    used_indices.add(j)
-            
-            if len(group) > 1:
-                groups.append(group)
-        
-        return groups
+        """Trouve les groupes de clients similaires par nom (regroupement par hash, O(n))"""
+        return self.deduplicator.find_groups(clients)
 
     def _merge_similar_clients(self, clients: List[Dict]) -> List[Dict]:
         """Fusionne les clients similaires après la déduplication par identifiant"""
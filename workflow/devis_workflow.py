@@ -11,7 +11,7 @@ import asyncio
 from fastapi import APIRouter, HTTPException
 
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from difflib import SequenceMatcher
 from services.llm_extractor import LLMExtractor
 from services.mcp_connector import MCPConnector, call_mcp_with_progress, test_mcp_connections_with_progress
@@ -54,8 +54,13 @@ except ImportError as e:
     VALIDATOR_AVAILABLE = False
     logger.warning(f"⚠️ Validateur client non disponible: {str(e)}")
 
+# Lignes produits résolues en parallèle (SAP / PostgreSQL / LLM) par devis
+PRODUCT_LOOKUP_CONCURRENCY = int(os.getenv("PRODUCT_LOOKUP_CONCURRENCY", "5"))
+
 class DevisWorkflow:
     """Coordinateur du workflow de devis entre Claude, Salesforce et SAP - VERSION AVEC VALIDATEUR CLIENT"""
+
+    product_lookup_concurrency: int = PRODUCT_LOOKUP_CONCURRENCY
     
     def __init__(self, validation_enabled: bool = True, draft_mode: bool = False, force_production: bool = True, task_id: str = None):
         """
@@ -3969,14 +3974,12 @@ class DevisWorkflow:
     async def _search_local_by_code(self, item_code: str) -> Optional[Dict[str, Any]]:
         """Recherche exacte par ItemCode en base locale PostgreSQL"""
         try:
-            from sqlalchemy import create_engine, text
-            from sqlalchemy.orm import sessionmaker
-            db_url = os.getenv("DATABASE_URL")
-            if not db_url:
+            from sqlalchemy import text
+            from services.produits_sap_search import get_produits_sap_sessionmaker
+            SessionLocal = get_produits_sap_sessionmaker()
+            if SessionLocal is None:
                 logger.warning("DATABASE_URL manquant pour recherche locale par code")
                 return None
-            engine = create_engine(db_url, pool_pre_ping=True)
-            SessionLocal = sessionmaker(bind=engine)
             with SessionLocal() as session:
                 result = session.execute(
                     text("""
@@ -4007,8 +4010,8 @@ class DevisWorkflow:
     async def _search_local_intelligent(self, product_name: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Recherche intelligente locale avec LLM et SQL optimisé"""
         try:
-            from sqlalchemy import create_engine, text
-            from sqlalchemy.orm import sessionmaker
+            from sqlalchemy import text
+            from services.produits_sap_search import get_produits_sap_sessionmaker
 
             keywords = criteria.get("keywords", []) or []
             category = criteria.get("category", "autre") or "autre"
@@ -4045,12 +4048,10 @@ class DevisWorkflow:
             LIMIT 10
             """
 
-            db_url = os.getenv("DATABASE_URL")
-            if not db_url:
+            SessionLocal = get_produits_sap_sessionmaker()
+            if SessionLocal is None:
                 logger.warning("DATABASE_URL manquant pour recherche locale intelligente")
                 return []
-            engine = create_engine(db_url, pool_pre_ping=True)
-            SessionLocal = sessionmaker(bind=engine)
             with SessionLocal() as session:
                 results = session.execute(text(query), params).fetchall()
                 formatted_results: List[Dict[str, Any]] = []
@@ -4074,59 +4075,10 @@ class DevisWorkflow:
         return []
 
     async def _search_local_fuzzy(self, product_name: str) -> List[Dict[str, Any]]:
-        """Recherche fuzzy locale - Version compatible sans pg_trgm"""
+        """Recherche fuzzy locale - similarité trigramme pg_trgm (repli LIKE sans l'extension)"""
         try:
-            from sqlalchemy import create_engine, text
-            from sqlalchemy.orm import sessionmaker
-            db_url = os.getenv("DATABASE_URL")
-            if not db_url:
-                logger.warning("DATABASE_URL manquant pour recherche fuzzy locale")
-                return []
-            engine = create_engine(db_url, pool_pre_ping=True)
-            SessionLocal = sessionmaker(bind=engine)
-            with SessionLocal() as session:
-                # Recherche par sous-chaînes multiples sans pg_trgm
-                search_terms = product_name.lower().split()
-                where_clauses = []
-                params = {"name": product_name}
-                
-                for i, term in enumerate(search_terms[:3]):  # Limite à 3 termes
-                    if len(term) > 2:  # Ignore les termes trop courts
-                        params[f"term_{i}"] = f"%{term}%"
-                        where_clauses.append(f"(LOWER(item_name) LIKE :term_{i} OR LOWER(u_description) LIKE :term_{i})")
-                
-                if not where_clauses:
-                    where_clauses = ["LOWER(item_name) LIKE '%' || LOWER(:name) || '%'"]
-                
-                results = session.execute(
-                    text(f"""
-                    SELECT item_code, item_name, u_description, avg_price, on_hand,
-                        items_group_code, manufacturer, sales_unit
-                    FROM produits_sap 
-                    WHERE valid = true 
-                    AND on_hand > 0
-                    AND ({' OR '.join(where_clauses)})
-                    ORDER BY on_hand DESC, LENGTH(item_name) ASC
-                    LIMIT 10
-                    """),
-                    params
-                ).fetchall()
-                formatted_results: List[Dict[str, Any]] = []
-                for row in results or []:
-                    formatted_results.append({
-                        "ItemCode": row.item_code,
-                        "ItemName": row.item_name,
-                        "U_Description": row.u_description or "",
-                        "AvgPrice": float(row.avg_price or 0),
-                        "OnHand": int(row.on_hand or 0),
-                        "QuantityOnStock": int(row.on_hand or 0),
-                        "ItemsGroupCode": row.items_group_code or "",
-                        "Manufacturer": row.manufacturer or "",
-                        "SalesUnit": row.sales_unit or "UN",
-                        "source": "local_db",
-                        "similarity_score": float(row.sim_score or 0.0)
-                    })
-                return formatted_results
+            from services.produits_sap_search import search_similar_products
+            return await asyncio.to_thread(search_similar_products, product_name, 10)
         except Exception as e:
             logger.error(f"❌ Erreur recherche fuzzy locale: {str(e)}")
         return []
@@ -4134,15 +4086,12 @@ class DevisWorkflow:
     async def _search_local_fallback(self, product_name: str) -> List[Dict[str, Any]]:
         """Recherche locale sans pg_trgm - fallback LIKE"""
         try:
-            from sqlalchemy import create_engine, text
-            from sqlalchemy.orm import sessionmaker
-            db_url = os.getenv("DATABASE_URL")
-            if not db_url:
+            from sqlalchemy import text
+            from services.produits_sap_search import get_produits_sap_sessionmaker
+            SessionLocal = get_produits_sap_sessionmaker()
+            if SessionLocal is None:
                 return []
             
-            engine = create_engine(db_url, pool_pre_ping=True)
-            SessionLocal = sessionmaker(bind=engine)
-            
             with SessionLocal() as session:
                 results = session.execute(
                     text("""
@@ -7149,15 +7098,8 @@ class DevisWorkflow:
     async def _process_products_retrieval(self, products: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Récupération des produits avec progression avancée
+        (lignes résolues en parallèle, au plus product_lookup_concurrency à la fois)
         """
-        ACCESSORY_TERMS = ('cartouche', 'encre', 'toner', 'cable', 'câble')
-
-        def _odata_escape(s: str) -> str:
-            try:
-                return str(s).replace("'", "''")
-            except Exception:
-                return str(s or "")
-
         try:
             if not products:
                 return {
@@ -7172,221 +7114,55 @@ class DevisWorkflow:
             products_needing_selection: List[Dict[str, Any]] = []
             total_products = len(products)
 
-            for i, product in enumerate(products):
+            # Résolution concurrente bornée ; résultats et progression restent dans l'ordre des lignes
+            semaphore = asyncio.Semaphore(max(1, self.product_lookup_concurrency))
+            done = [False] * total_products
+            next_progress = 0
+
+            async def _resolve(i: int, product: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+                nonlocal next_progress
                 product_name = str(product.get("name", "") or "")
                 product_code = str(product.get("code", "") or "")
                 try:
-                    quantity = int(product.get("quantity", 1) or 1)
-                except Exception:
-                    quantity = 1
-                if quantity < 1:
-                    quantity = 1
-
-                # Progression (sur i+1 pour une montée plus régulière)
-                progress = int(20 + ((i + 1) / total_products) * 70)
-                self._track_step_progress("lookup_products", progress, f"📦 Recherche '{product_name}' ({i+1}/{total_products})")
-
-                # === RECHERCHE INTELLIGENTE ===
-                try:
-                    smart_search = await self._smart_product_search(product_name, product_code)
-                    if not isinstance(smart_search, dict):
-                        smart_search = {"found": False, "products": [], "method": "invalid_response"}
-                    smart_search.setdefault("found", False)
-                    smart_search.setdefault("products", [])
-                    smart_search_method = smart_search.get("method")
+                    async with semaphore:
+                        outcome = await self._resolve_product_line(i, product)
                 except Exception as e:
-                    logger.error(f"❌ Erreur appel _smart_product_search: {str(e)}")
-                    smart_search = {"found": False, "products": [], "method": "call_error", "error": str(e)}
-                    smart_search_method = "call_error"
-
-                if smart_search["found"] and smart_search["products"]:
-                    products_found = smart_search.get("products") or []
-                    if self._is_generic_search(product_name) and len(products_found) > 1:
-                        logger.info(f"⚠️ Terme générique '{product_name}' avec {len(products_found)} options - Interaction requise")
-                        products_needing_selection.append({
-                            "original_name": product_name,
-                            "original_code": product_code,
-                            "quantity": quantity,
-                            "options": products_found[:5],
-                            "search_method": smart_search_method,
-                            "selection_reason": f"Terme '{product_name}' trop générique - {len(products_found)} produits correspondent"
-                        })
-                        continue
-                    # AJOUT: Arrêter le workflow immédiatement pour demander la sélection
-                    if products_needing_selection:
-                        logger.warning(f"⏸️ Arrêt workflow - {len(products_needing_selection)} produit(s) nécessitent sélection")
-                        return {
-                            "status": "product_selection_required",
-                            "products": products_needing_selection,
-                            "message": "Sélection de produits requise"
-                        }
-                    # Auto-sélection si 1 résultat, sinon on prend le 1er comme “best”
-                    best_list = products_found[:1] if len(products_found) == 1 else products_found[:1]
-                    if not best_list:
-                        # garde défensive ultra rare
-                        logger.debug("Aucun produit exploitable dans smart_search malgré found=True")
-                    else:
-                        best_match = best_list[0]
-                        logger.info(f"✅ Produit auto-sélectionné: {best_match.get('ItemName')} - Code: {best_match.get('ItemCode')} - Quantité: {quantity}")
-                        found_products.append({
-                            **self._format_product_data(best_match, quantity),  # Passer la vraie quantité
-                            "search_method": smart_search_method,
-                            "found": True
-                        })
+                    # Isolation : une ligne en erreur n'interrompt pas les autres
+                    logger.error(f"❌ Erreur résolution ligne {i + 1} '{product_name or product_code}': {str(e)}")
+                    outcome = ("line", {
+                        "code": product_code or f"ERROR_{i}",
+                        "name": product_name or "Erreur produit",
+                        "quantity": product.get("quantity", 1),
+                        "error": f"Erreur technique lors de la recherche: {str(e)}",
+                        "requires_manual_search": True,
+                        "original_request": product_name or product_code
+                    })
+                done[i] = True
+                # Progression (sur j+1 pour une montée plus régulière), émise dans l'ordre des lignes
+                while next_progress < total_products and done[next_progress]:
+                    j = next_progress
+                    next_progress += 1
+                    line_name = str(products[j].get("name", "") or "")
+                    progress = int(20 + ((j + 1) / total_products) * 70)
+                    self._track_step_progress("lookup_products", progress, f"📦 Recherche '{line_name}' ({j+1}/{total_products})")
+                return outcome
+
+            outcomes = await asyncio.gather(*(_resolve(i, product) for i, product in enumerate(products)))
+
+            for kind, entry in outcomes:
+                if kind == "selection":
+                    products_needing_selection.append(entry)
                     continue
-
-                # Recherche traditionnelle si recherche intelligente échoue
-                product_found = False
-
-                # Étape 1: Recherche exacte par code
-                if product_code:
-                    try:
-                        exact_search = await self.mcp_connector.call_sap_mcp(
-                            "sap_read",
-                            {"endpoint": f"/Items('{_odata_escape(product_code)}')", "method": "GET"}
-                        )
-                        if isinstance(exact_search, dict) and "error" not in exact_search and exact_search.get("ItemCode"):
-                            logger.info(f"✅ Produit trouvé par code exact: {product_code}")
-                            found_products.append({
-                                **self._format_product_data(exact_search, quantity),
-                                "search_method": "exact_code",
-                                "found": True
-                            })
-                            continue
-                    except Exception as e:
-                        logger.debug(f"Recherche par code exact échouée: {str(e)}")
-
-                # Étape 2: Recherche par nom exact
-                if product_name and not product_found:
-                    try:
-                        pn = _odata_escape(product_name)
-                        name_search = await self.mcp_connector.call_sap_mcp(
-                            "sap_read",
-                            {"endpoint": f"/Items?$filter=ItemName eq '{pn}'&$top=1", "method": "GET"}
-                        )
-                        values = (name_search or {}).get("value") or []
-                        if values:
-                            logger.info(f"✅ Produit trouvé par nom exact: {product_name}")
-                            found_products.append({
-                                **self._format_product_data(values[0], quantity),
-                                "search_method": "exact_name",
-                                "found": True
-                            })
-                            continue
-                    except Exception as e:
-                        logger.debug(f"Recherche nom exact échouée: {str(e)}")
-
-                # Étape 3: Recherches par mots-clés élargies
-                if not product_found:
-                    for keyword in self._extract_product_keywords(product_name):
-                        if not keyword:
-                            continue
-                        kw = _odata_escape(keyword)
-                        logger.info(f"🔎 Recherche avec mot-clé: '{keyword}'")
-
-                        # Recherche filtrée (éviter accessoires)
-                        try:
-                            filter_query = (
-                                f"contains(tolower(ItemName),tolower('{kw}')) "
-                                f"and not contains(tolower(ItemName),'cartouche') "
-                                f"and not contains(tolower(ItemName),'encre') "
-                                f"and not contains(tolower(ItemName),'toner') "
-                                f"and not contains(tolower(ItemName),'cable')"
-                            )
-                            result = await self.mcp_connector.call_sap_mcp(
-                                "sap_read",
-                                {"endpoint": f"/Items?$filter={filter_query}&$top=5", "method": "GET"}
-                            )
-                            values = (result or {}).get("value") or []
-                            if not values:
-                                # Fallback simple
-                                result = await self.mcp_connector.call_sap_mcp(
-                                    "sap_read",
-                                    {"endpoint": f"/Items?$filter=contains(tolower(ItemName),tolower('{kw}'))&$top=5", "method": "GET"}
-                                )
-                                values = (result or {}).get("value") or []
-
-                            if values:
-                                best_match = None
-                                for match in values:
-                                    item_name_lower = (match.get('ItemName') or '').lower()
-                                    if not any(acc in item_name_lower for acc in ACCESSORY_TERMS):
-                                        best_match = match
-                                        break
-                                if not best_match:
-                                    best_match = values[0]
-
-                                logger.info(f"✅ Produit trouvé par mot-clé '{keyword}': {best_match.get('ItemName')}")
-                                found_products.append({
-                                    **self._format_product_data(best_match, quantity),
-                                    "search_method": f"keyword_{keyword}",
-                                    "found": True
-                                })
-                                product_found = True
-                                break
-                        except Exception as e:
-                            logger.debug(f"Recherche '{keyword}' échouée: {str(e)}")
-                            # on tente le tour suivant
-
-                # Si aucun produit trouvé, utiliser le système de suggestions
-                if not product_found:
-                    logger.warning(f"❌ Produit non trouvé: {product_name or product_code}")
-                    logger.info(f"🔍 Recherche de suggestions pour: {product_name or product_code}")
-                    try:
-                        all_products_result = await self.mcp_connector.call_sap_mcp(
-                            "sap_read",
-                            {"endpoint": "/Items?$select=ItemCode,ItemName,OnHand,Price&$top=500", "method": "GET"}
-                        )
-                        if isinstance(all_products_result, dict) and "error" not in all_products_result and "value" in all_products_result:
-                            available_products = all_products_result["value"]
-                            from services.suggestion_engine import SuggestionEngine
-                            suggestion_engine = SuggestionEngine()
-                            suggestion_result = await suggestion_engine.suggest_product(product_name or product_code, available_products)
-
-                            if getattr(suggestion_result, "has_suggestions", False):
-                                found_products.append({
-                                    "code": product_code or f"UNKNOWN_{i}",
-                                    "name": product_name or "Produit à identifier",
-                                    "quantity": quantity,
-                                    "unit_price": 0.0,
-                                    "total_price": 0.0,
-                                    "currency": "EUR",
-                                    "sap_data": None,
-                                    "found": False,
-                                    "requires_selection": True,
-                                    "suggestions": suggestion_result.to_dict(),
-                                    "original_request": product_name or product_code
-                                })
-                                logger.info(f"✅ Suggestions trouvées pour: {product_name or product_code}")
-                            else:
-                                found_products.append({
-                                    "code": product_code or f"UNKNOWN_{i}",
-                                    "name": product_name or "Produit inconnu",
-                                    "quantity": quantity,
-                                    "error": f"Aucun produit similaire trouvé dans le catalogue pour '{product_name or product_code}'",
-                                    "requires_manual_search": True,
-                                    "original_request": product_name or product_code
-                                })
-                                logger.error(f"❌ Aucune suggestion trouvée pour: {product_name or product_code}")
-                        else:
-                            found_products.append({
-                                "code": product_code or f"ERROR_{i}",
-                                "name": product_name or "Produit inaccessible",
-                                "quantity": quantity,
-                                "error": "Impossible d'accéder au catalogue SAP pour trouver des alternatives",
-                                "requires_manual_search": True,
-                                "original_request": product_name or product_code
-                            })
-                    except Exception as e:
-                        logger.error(f"Erreur lors de la recherche de suggestions: {str(e)}")
-                        found_products.append({
-                            "code": product_code or f"ERROR_{i}",
-                            "name": product_name or "Erreur produit",
-                            "quantity": quantity,
-                            "error": f"Erreur technique lors de la recherche: {str(e)}",
-                            "requires_manual_search": True,
-                            "original_request": product_name or product_code
-                        })
+                if kind == "smart_found" and products_needing_selection:
+                    # Arrêter le workflow pour demander la sélection (comportement séquentiel historique)
+                    logger.warning(f"⏸️ Arrêt workflow - {len(products_needing_selection)} produit(s) nécessitent sélection")
+                    return {
+                        "status": "product_selection_required",
+                        "products": products_needing_selection,
+                        "message": "Sélection de produits requise"
+                    }
+                if entry is not None:
+                    found_products.append(entry)
 
             # Finaliser la progression
             self._track_step_progress("lookup_products", 100, "✅ Recherche terminée")
@@ -7441,6 +7217,214 @@ class DevisWorkflow:
                 "message": f"Erreur système: {str(e)}"
             }
 
+    async def _resolve_product_line(self, i: int, product: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Résout UNE ligne produit (recherche intelligente, SAP, suggestions).
+
+        Returns:
+            (nature, entrée) : "selection" (terme générique à préciser),
+            "smart_found" (trouvé par recherche intelligente) ou "line" (autres cas)
+        """
+        ACCESSORY_TERMS = ('cartouche', 'encre', 'toner', 'cable', 'câble')
+
+        def _odata_escape(s: str) -> str:
+            try:
+                return str(s).replace("'", "''")
+            except Exception:
+                return str(s or "")
+
+        product_name = str(product.get("name", "") or "")
+        product_code = str(product.get("code", "") or "")
+        try:
+            quantity = int(product.get("quantity", 1) or 1)
+        except Exception:
+            quantity = 1
+        if quantity < 1:
+            quantity = 1
+
+        # === RECHERCHE INTELLIGENTE ===
+        try:
+            smart_search = await self._smart_product_search(product_name, product_code)
+            if not isinstance(smart_search, dict):
+                smart_search = {"found": False, "products": [], "method": "invalid_response"}
+            smart_search.setdefault("found", False)
+            smart_search.setdefault("products", [])
+            smart_search_method = smart_search.get("method")
+        except Exception as e:
+            logger.error(f"❌ Erreur appel _smart_product_search: {str(e)}")
+            smart_search = {"found": False, "products": [], "method": "call_error", "error": str(e)}
+            smart_search_method = "call_error"
+
+        if smart_search["found"] and smart_search["products"]:
+            products_found = smart_search.get("products") or []
+            if self._is_generic_search(product_name) and len(products_found) > 1:
+                logger.info(f"⚠️ Terme générique '{product_name}' avec {len(products_found)} options - Interaction requise")
+                return "selection", {
+                    "original_name": product_name,
+                    "original_code": product_code,
+                    "quantity": quantity,
+                    "options": products_found[:5],
+                    "search_method": smart_search_method,
+                    "selection_reason": f"Terme '{product_name}' trop générique - {len(products_found)} produits correspondent"
+                }
+            # Auto-sélection si 1 résultat, sinon on prend le 1er comme “best”
+            best_list = products_found[:1]
+            if not best_list:
+                # garde défensive ultra rare
+                logger.debug("Aucun produit exploitable dans smart_search malgré found=True")
+                return "smart_found", None
+            best_match = best_list[0]
+            logger.info(f"✅ Produit auto-sélectionné: {best_match.get('ItemName')} - Code: {best_match.get('ItemCode')} - Quantité: {quantity}")
+            return "smart_found", {
+                **self._format_product_data(best_match, quantity),  # Passer la vraie quantité
+                "search_method": smart_search_method,
+                "found": True
+            }
+
+        # Recherche traditionnelle si recherche intelligente échoue
+
+        # Étape 1: Recherche exacte par code
+        if product_code:
+            try:
+                exact_search = await self.mcp_connector.call_sap_mcp(
+                    "sap_read",
+                    {"endpoint": f"/Items('{_odata_escape(product_code)}')", "method": "GET"}
+                )
+                if isinstance(exact_search, dict) and "error" not in exact_search and exact_search.get("ItemCode"):
+                    logger.info(f"✅ Produit trouvé par code exact: {product_code}")
+                    return "line", {
+                        **self._format_product_data(exact_search, quantity),
+                        "search_method": "exact_code",
+                        "found": True
+                    }
+            except Exception as e:
+                logger.debug(f"Recherche par code exact échouée: {str(e)}")
+
+        # Étape 2: Recherche par nom exact
+        if product_name:
+            try:
+                pn = _odata_escape(product_name)
+                name_search = await self.mcp_connector.call_sap_mcp(
+                    "sap_read",
+                    {"endpoint": f"/Items?$filter=ItemName eq '{pn}'&$top=1", "method": "GET"}
+                )
+                values = (name_search or {}).get("value") or []
+                if values:
+                    logger.info(f"✅ Produit trouvé par nom exact: {product_name}")
+                    return "line", {
+                        **self._format_product_data(values[0], quantity),
+                        "search_method": "exact_name",
+                        "found": True
+                    }
+            except Exception as e:
+                logger.debug(f"Recherche nom exact échouée: {str(e)}")
+
+        # Étape 3: Recherches par mots-clés élargies
+        for keyword in self._extract_product_keywords(product_name):
+            if not keyword:
+                continue
+            kw = _odata_escape(keyword)
+            logger.info(f"🔎 Recherche avec mot-clé: '{keyword}'")
+
+            # Recherche filtrée (éviter accessoires)
+            try:
+                filter_query = (
+                    f"contains(tolower(ItemName),tolower('{kw}')) "
+                    f"and not contains(tolower(ItemName),'cartouche') "
+                    f"and not contains(tolower(ItemName),'encre') "
+                    f"and not contains(tolower(ItemName),'toner') "
+                    f"and not contains(tolower(ItemName),'cable')"
+                )
+                result = await self.mcp_connector.call_sap_mcp(
+                    "sap_read",
+                    {"endpoint": f"/Items?$filter={filter_query}&$top=5", "method": "GET"}
+                )
+                values = (result or {}).get("value") or []
+                if not values:
+                    # Fallback simple
+                    result = await self.mcp_connector.call_sap_mcp(
+                        "sap_read",
+                        {"endpoint": f"/Items?$filter=contains(tolower(ItemName),tolower('{kw}'))&$top=5", "method": "GET"}
+                    )
+                    values = (result or {}).get("value") or []
+
+                if values:
+                    best_match = None
+                    for match in values:
+                        item_name_lower = (match.get('ItemName') or '').lower()
+                        if not any(acc in item_name_lower for acc in ACCESSORY_TERMS):
+                            best_match = match
+                            break
+                    if not best_match:
+                        best_match = values[0]
+
+                    logger.info(f"✅ Produit trouvé par mot-clé '{keyword}': {best_match.get('ItemName')}")
+                    return "line", {
+                        **self._format_product_data(best_match, quantity),
+                        "search_method": f"keyword_{keyword}",
+                        "found": True
+                    }
+            except Exception as e:
+                logger.debug(f"Recherche '{keyword}' échouée: {str(e)}")
+                # on tente le tour suivant
+
+        # Si aucun produit trouvé, utiliser le système de suggestions
+        logger.warning(f"❌ Produit non trouvé: {product_name or product_code}")
+        logger.info(f"🔍 Recherche de suggestions pour: {product_name or product_code}")
+        try:
+            all_products_result = await self.mcp_connector.call_sap_mcp(
+                "sap_read",
+                {"endpoint": "/Items?$select=ItemCode,ItemName,OnHand,Price&$top=500", "method": "GET"}
+            )
+            if isinstance(all_products_result, dict) and "error" not in all_products_result and "value" in all_products_result:
+                available_products = all_products_result["value"]
+                from services.suggestion_engine import SuggestionEngine
+                suggestion_engine = SuggestionEngine()
+                suggestion_result = await suggestion_engine.suggest_product(product_name or product_code, available_products)
+
+                if getattr(suggestion_result, "has_suggestions", False):
+                    logger.info(f"✅ Suggestions trouvées pour: {product_name or product_code}")
+                    return "line", {
+                        "code": product_code or f"UNKNOWN_{i}",
+                        "name": product_name or "Produit à identifier",
+                        "quantity": quantity,
+                        "unit_price": 0.0,
+                        "total_price": 0.0,
+                        "currency": "EUR",
+                        "sap_data": None,
+                        "found": False,
+                        "requires_selection": True,
+                        "suggestions": suggestion_result.to_dict(),
+                        "original_request": product_name or product_code
+                    }
+                logger.error(f"❌ Aucune suggestion trouvée pour: {product_name or product_code}")
+                return "line", {
+                    "code": product_code or f"UNKNOWN_{i}",
+                    "name": product_name or "Produit inconnu",
+                    "quantity": quantity,
+                    "error": f"Aucun produit similaire trouvé dans le catalogue pour '{product_name or product_code}'",
+                    "requires_manual_search": True,
+                    "original_request": product_name or product_code
+                }
+            return "line", {
+                "code": product_code or f"ERROR_{i}",
+                "name": product_name or "Produit inaccessible",
+                "quantity": quantity,
+                "error": "Impossible d'accéder au catalogue SAP pour trouver des alternatives",
+                "requires_manual_search": True,
+                "original_request": product_name or product_code
+            }
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de suggestions: {str(e)}")
+            return "line", {
+                "code": product_code or f"ERROR_{i}",
+                "name": product_name or "Erreur produit",
+                "quantity": quantity,
+                "error": f"Erreur technique lors de la recherche: {str(e)}",
+                "requires_manual_search": True,
+                "original_request": product_name or product_code
+            }
+
     def _format_product_data(self, sap_product: Dict[str, Any], quantity: int) -> Dict[str, Any]:
         """Formate les données produit SAP en format standard - CORRECTION: Préserver quantité exacte"""
         unit_price = float(sap_product.get("Price") or sap_product.get("AvgPrice", 0))